@@ -0,0 +1,39 @@
+"""
+Measures the command throughput of IPTransport with and without batching,
+against a local SCPIEmulator so no hardware is needed.
+
+Usage: python transport_throughput.py [nr_commands]
+"""
+
+import sys
+import time
+from contextlib import nullcontext
+
+from pycqed.instrument_drivers.library.Transport import IPTransport
+from pycqed.instrument_drivers.library.SCPIEmulator import SCPIEmulator
+from pycqed.instrument_drivers.physical_instruments.QuTech.QWGCore import QWGCore
+
+
+def measure_throughput(nr_commands: int = 2000):
+    rates = {}
+    with SCPIEmulator() as emulator:
+        transport = IPTransport('127.0.0.1', emulator.port, timeout=10)
+        qwgcore = QWGCore('qwg', transport)
+        try:
+            for batched in [False, True]:
+                t0 = time.perf_counter()
+                with qwgcore.batch() if batched else nullcontext():
+                    for i in range(nr_commands):
+                        transport.write(f'TEST:VALUE {i}')
+                qwgcore._ask('TEST:VALUE?')  # wait until all commands are handled
+                rates[batched] = nr_commands / (time.perf_counter() - t0)
+        finally:
+            transport.close()
+    return rates
+
+
+if __name__ == '__main__':
+    nr_commands = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rates = measure_throughput(nr_commands)
+    print(f'unbatched: {rates[False]:10.0f} commands/s')
+    print(f'batched:   {rates[True]:10.0f} commands/s ({rates[True]/rates[False]:.1f}x)')
@@ -12,6 +12,7 @@ import qutip as qtp
 import qutip.metrics as qpmetrics
 
 from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
 from collections import OrderedDict as od
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 from scipy.interpolate import griddata
@@ -19,6 +20,7 @@ from scipy.signal import argrelextrema
 from scipy import optimize
 
 from pycqed.utilities.get_default_datadir import get_default_datadir
+from pycqed.utilities.datadir_index import get_datadir_index
 from pycqed.analysis import composite_analysis as RA
 from .tools.plotting import *
 
@@ -137,17 +139,23 @@ def latest_data(contains='', older_than=None, newer_than=None, or_equal=False,
         return None
 
     daydirs.sort()
+    index = get_datadir_index(search_dir)
+    # Days outside the requested range can be skipped without searching
+    older_than_day = None if older_than is None else verify_timestamp(older_than)[0]
+    newer_than_day = None if newer_than is None else verify_timestamp(newer_than)[0]
 
     measdirs = []
     i = len(daydirs) - 1
     while len(measdirs) == 0 and i >= 0:
         daydir = daydirs[i]
+        if len(daydir) == 8 and newer_than_day is not None and daydir < newer_than_day:
+            # All remaining days are older
+            break
         # this makes sure that (most) non day dirs do not get searched
         # as they should start with a digit (e.g. YYYYMMDD)
-        if daydir[0].isdigit():
-            all_measdirs = [d for d in os.listdir(
-                os.path.join(search_dir, daydir))]
-            all_measdirs.sort()
+        if daydir[0].isdigit() and not (
+                len(daydir) == 8 and older_than_day is not None and daydir > older_than_day):
+            all_measdirs = index.get_measdirs(daydir)
             measdirs = []
             for d in all_measdirs:
                 # this routine verifies that any output directory
@@ -209,10 +217,15 @@ def get_datafilepath_from_timestamp(timestamp):
     # Not only verifies but also decomposes the timestamp
     daystamp, tstamp = verify_timestamp(timestamp)
 
-    daydir = os.listdir(os.path.join(datadir, daystamp))
+    index = get_datadir_index(datadir)
+    daydir = index.get_measdirs(daystamp)
 
     # Looking for the folder starting with the right timestamp
     measdir_names = [item for item in daydir if item.startswith(tstamp)]
+    if len(measdir_names) == 0:
+        # Make sure the index is not missing the folder
+        daydir = index.get_measdirs(daystamp, rescan=True)
+        measdir_names = [item for item in daydir if item.startswith(tstamp)]
 
     if len(measdir_names) > 1:
         raise ValueError('Timestamp is not unique')
@@ -243,8 +256,12 @@ def data_from_time(timestamp, folder=None):
     if not os.path.isdir(os.path.join(folder, daystamp)):
         raise KeyError("Requested day '%s' not found" % daystamp)
 
-    measdirs = [d for d in os.listdir(os.path.join(folder, daystamp))
-                if d[:6] == tstamp]
+    index = get_datadir_index(folder)
+    measdirs = [d for d in index.get_measdirs(daystamp) if d[:6] == tstamp]
+    if len(measdirs) == 0:
+        # Make sure the index is not missing the folder
+        measdirs = [d for d in index.get_measdirs(daystamp, rescan=True)
+                    if d[:6] == tstamp]
     if len(measdirs) == 0:
         raise KeyError("Requested data '%s_%s' not found"
                        % (daystamp, tstamp))
@@ -633,6 +650,16 @@ def get_data_from_timestamp_list(timestamps,
                                 (e, timestamp))
                 raise(e)
 
+    return _get_output_data(data, param_names, get_timestamps,
+                            remove_timestamps, numeric_params)
+
+
+def _get_output_data(data, param_names, get_timestamps, remove_timestamps,
+                     numeric_params):
+    """
+    Removes the filtered timestamps and converts the extracted data into the
+    output format of get_data_from_timestamp_list.
+    """
     if len(remove_timestamps) > 0:
         for timestamp in remove_timestamps:
             get_timestamps.remove(timestamp)
@@ -657,6 +684,212 @@ def get_data_from_timestamp_list(timestamps,
     return out_data
 
 
+class MeasurementData(object):
+    """
+    Lightweight read-only view on the datafile of a measurement.
+
+    Provides the attributes of a MeasurementAnalysis object (after calling
+    get_naming_and_values) that are used by get_data_from_ma, without the
+    plotting and fitting machinery of the analysis class.
+    """
+
+    def __init__(self, folder, TwoD=False):
+        self.folder = folder
+        self.h5filepath = measurement_filename(folder)
+        self.data_file = h5py.File(self.h5filepath, 'r')
+        self.g = self.data_file['Experimental Data']
+        for k in list(self.data_file.keys()):
+            if type(self.data_file[k]) == h5py.Group:
+                self.name = k
+        self.measurementstring = os.path.split(folder)[1]
+        self.timestamp = os.path.split(os.path.split(folder)[0])[1] \
+            + '/' + self.measurementstring[:6]
+        self.timestamp_string = os.path.split(os.path.split(folder)[0])[1] \
+            + '_' + self.measurementstring[:6]
+        self.measurementstring = self.measurementstring[7:]
+        self.default_plot_title = self.measurementstring
+        self.TwoD = TwoD
+
+    def get_naming_and_values(self):
+        # The naming conventions are those of the MeasurementAnalysis, the
+        # methods only rely on the datafile and get_key/get_values.
+        from pycqed.analysis import measurement_analysis as ma
+        if self.TwoD:
+            ma.MeasurementAnalysis.get_naming_and_values_2D(self)
+        else:
+            ma.MeasurementAnalysis.get_naming_and_values(self)
+
+    def get_key(self, key):
+        s = self.g.attrs[key]
+        if type(s) == bytes:
+            s = s.decode('utf-8')
+        if type(s) == np.ndarray:
+            s = [s.decode('utf-8') for s in s]
+        return s
+
+    def get_values(self, key):
+        names = self.get_key('sweep_parameter_names')
+        if key in names:
+            values = self.g['Data'][()][:, names.index(key)]
+        elif key in self.get_key('value_names'):
+            ind = self.get_key('value_names').index(key) + len(names)
+            values = self.g['Data'][()][:, ind]
+        else:
+            values = self.g[key][()]
+        return np.asarray(values, dtype=np.float64)
+
+    def finish(self):
+        self.data_file.close()
+
+
+def _extract_data_from_folder(folder, param_names, TwoD=False,
+                              filter_no_analysis=False, filter_dict=None,
+                              single_timestamp=False):
+    """
+    Extracts the parameters from the datafile in a folder using a
+    MeasurementData object. Runs in the worker processes of
+    get_data_from_timestamp_list_h5py and should therefore be picklable.
+
+    Returns a tuple (status, data) where status is one of
+        'ok'        data contains the extracted parameters (a dict of lists
+                    of length 0 or 1, or a dict of values if
+                    single_timestamp)
+        'removed'   the timestamp should be removed from the output
+        'key_error' data is the KeyError raised during extraction
+    """
+    try:
+        mdata = MeasurementData(folder, TwoD=TwoD)
+    except Exception as e:
+        logging.warning(e)
+        return 'removed', None
+
+    try:
+        if filter_no_analysis and 'Analysis' not in mdata.data_file.keys():
+            return 'removed', None
+
+        mdata.get_naming_and_values()
+        if 'datasaving_format' in mdata.g.attrs:
+            datasaving_format = mdata.get_key('datasaving_format')
+        else:
+            datasaving_format = 'Version 1'
+        data_version = {'Version 1': 1, 'Version 2': 2}[datasaving_format]
+
+        if single_timestamp:
+            data = get_data_from_ma(mdata, param_names,
+                                    data_version=data_version)
+            data = od([(param, _read_h5_value(value))
+                       for param, value in data.items()])
+        else:
+            data = od([(param, []) for param in param_names])
+            append_data_from_ma(mdata, param_names, data,
+                                data_version=data_version,
+                                filter_dict=filter_dict)
+            data = od([(param, [_read_h5_value(value) for value in values])
+                       for param, values in data.items()])
+        return 'ok', data
+    except KeyError as e:
+        return 'key_error', e
+    finally:
+        mdata.finish()
+
+
+def _read_h5_value(value):
+    # h5py objects can not be used after closing the file (or be send to
+    # another process), datasets are read into memory
+    if isinstance(value, h5py.Dataset):
+        return value[()]
+    return value
+
+
+def get_data_from_timestamp_list_h5py(timestamps,
+                                      param_names,
+                                      TwoD=False,
+                                      max_files=None,
+                                      filter_no_analysis=False,
+                                      numeric_params=None,
+                                      filter_dict=None,
+                                      nr_workers=None):
+    """
+    Extracts data from the datafiles of a list of timestamps.
+
+    Equivalent to get_data_from_timestamp_list with the default
+    ma_type='MeasurementAnalysis', but reads the datafiles directly using
+    h5py instead of instantiating an analysis object for every timestamp.
+    The datafiles are read in parallel using a pool of processes.
+
+    Args:
+        nr_workers (int): number of worker processes, defaults to the number
+            of CPUs. Never more processes than timestamps are started, if 1
+            the datafiles are read in the current process.
+
+    Other arguments and the output are those of get_data_from_timestamp_list.
+    """
+    if type(timestamps) is str:
+        timestamps = [timestamps]
+        single_timestamp = True
+    else:
+        single_timestamp = False
+        if type(param_names) is list:
+            data = od([(param, []) for param in param_names])
+        elif type(param_names) is dict:
+            data = od([(param, []) for param in param_names.values()])
+        else:
+            raise ValueError("Key 'param_names' is incorrect type.")
+
+    if max_files is not None:
+        get_timestamps = timestamps[:max_files]
+    else:
+        get_timestamps = timestamps
+
+    # The folders are resolved in this process as the datadir is not
+    # available in the worker processes.
+    remove_timestamps = []
+    folders = []
+    for timestamp in get_timestamps:
+        try:
+            folders.append((timestamp, get_folder(timestamp=timestamp)))
+        except Exception as e:
+            logging.warning(e)
+            remove_timestamps.append(timestamp)
+
+    names = list(param_names.values()) if type(param_names) is dict \
+        else list(param_names)
+    extract_kw = dict(param_names=names, TwoD=TwoD,
+                      filter_no_analysis=filter_no_analysis,
+                      filter_dict=filter_dict,
+                      single_timestamp=single_timestamp)
+
+    # Starting processes is expensive (especially on Windows), so never
+    # start more than there are datafiles to read
+    if nr_workers is None:
+        nr_workers = os.cpu_count() or 1
+    nr_workers = min(nr_workers, len(folders))
+    if nr_workers > 1:
+        with ProcessPoolExecutor(max_workers=nr_workers) as executor:
+            futures = [executor.submit(_extract_data_from_folder, folder,
+                                       **extract_kw)
+                       for _, folder in folders]
+            results = [future.result() for future in futures]
+    else:
+        results = [_extract_data_from_folder(folder, **extract_kw)
+                   for _, folder in folders]
+
+    for (timestamp, _), (status, new_data) in zip(folders, results):
+        if status == 'removed':
+            remove_timestamps.append(timestamp)
+        elif status == 'key_error':
+            logging.warning('KeyError "%s" when processing timestamp %s' %
+                            (new_data, timestamp))
+        elif single_timestamp:
+            data = new_data
+        else:
+            for param, vals in new_data.items():
+                data[param].extend(vals)
+
+    return _get_output_data(data, param_names, get_timestamps,
+                            remove_timestamps, numeric_params)
+
+
 def convert_instr_str_list_to_numeric_array(string_list):
     return np.double(string_list[:])
 
@@ -811,13 +1044,13 @@ def get_timestamps_in_range(timestamp_start, timestamp_end=None,
     else:
         datetime_end = datetime_from_timestamp(timestamp_end)
     days_delta = (datetime_end.date() - datetime_start.date()).days
+    index = get_datadir_index(folder)
     all_timestamps = []
     for day in reversed(list(range(days_delta + 1))):
         date = datetime_start + datetime.timedelta(days=day)
         datemark = timestamp_from_datetime(date)[:8]
         try:
-            all_measdirs = [d for d in os.listdir(
-                os.path.join(folder, datemark))]
+            all_measdirs = index.get_measdirs(datemark)
         except FileNotFoundError:
             # Sometimes, when choosing multiples days, there is a day
             # with no measurements
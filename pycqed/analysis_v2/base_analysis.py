@@ -137,6 +137,14 @@ class BaseDataAnalysis(object):
                                     dictionary of parameter names as keys and
                                     values as values. Only datasets with specified values
                                     of parameters will be extracted and used in analysis
+                                -'h5py_extraction'
+                                    read the datafiles directly using h5py
+                                    in a pool of processes instead of using
+                                    a MeasurementAnalysis per timestamp
+                                    (only for ma_type 'MeasurementAnalysis')
+                                -'extraction_workers'
+                                    number of processes used for the
+                                    h5py_extraction (default: nr of CPUs)
         :param extract_only: Should we also do the plots?
         :param do_fitting: Should the run_fitting method be executed?
         :param save_qois: Should the save save_quantities_of_interest method be executed?
@@ -326,12 +334,21 @@ class BaseDataAnalysis(object):
         # the file is as required for datasaving
         self.params_dict['folder'] = 'folder'
         filter_dict = self.options_dict.get('filter_dict', None)
-        self.raw_data_dict = a_tools.get_data_from_timestamp_list(
-            self.timestamps, param_names=self.params_dict,
-            ma_type=self.ma_type,
-            TwoD=TwoD, numeric_params=self.numeric_params,
-            filter_no_analysis=self.filter_no_analysis,
-            filter_dict=filter_dict)
+        if (self.options_dict.get('h5py_extraction', False) and
+                self.ma_type == 'MeasurementAnalysis'):
+            self.raw_data_dict = a_tools.get_data_from_timestamp_list_h5py(
+                self.timestamps, param_names=self.params_dict,
+                TwoD=TwoD, numeric_params=self.numeric_params,
+                filter_no_analysis=self.filter_no_analysis,
+                filter_dict=filter_dict,
+                nr_workers=self.options_dict.get('extraction_workers', None))
+        else:
+            self.raw_data_dict = a_tools.get_data_from_timestamp_list(
+                self.timestamps, param_names=self.params_dict,
+                ma_type=self.ma_type,
+                TwoD=TwoD, numeric_params=self.numeric_params,
+                filter_no_analysis=self.filter_no_analysis,
+                filter_dict=filter_dict)
 
         # Use timestamps to calculate datetimes and add to dictionary
         self.raw_data_dict['datetime'] = [a_tools.datetime_from_timestamp(
@@ -14,6 +14,7 @@ import logging
 # Filter and optimization tools
 import pycqed.measurement.kernel_functions_ZI as kzi
 from scipy import signal
+from scipy.linalg import toeplitz
 import cma
 
 log = logging.getLogger(__name__)
@@ -64,11 +65,19 @@ def moving_cos_fitting_window(
     fixed_params: dict = {},
     max_params: dict = {},
     min_params: dict = {},
+    engine: str = "lmfit",
 ):
     """
     NB: Intended to be used with input data in ns, this assumption is
     used to generate educated guesses for the fitting
+
+    `engine` selects how the windows are fitted:
+        "lmfit": one lmfit fit per window, seeded from the adjacent window
+        "batched": all windows at once, see `batched_cos_fitting_window`
     """
+    if engine not in ("lmfit", "batched"):
+        raise ValueError("Unknown fitting engine: {}".format(engine))
+
     model = lmfit.Model(fit_mods.CosFunc)
 
     if "offset" not in init_guess.keys():
@@ -107,6 +116,17 @@ def moving_cos_fitting_window(
     if "phase" not in init_guess.keys():
         init_guess["phase"] = 0.0
 
+    if engine == "batched":
+        return batched_cos_fitting_window(
+            x_data_ns=x_data_ns,
+            y_data=y_data,
+            fit_window_pnts_nr=fit_window_pnts_nr,
+            init_guess=init_guess,
+            fixed_params=fixed_params,
+            max_params=max_params,
+            min_params=min_params,
+        )
+
     params = model.make_params(**init_guess)
 
     def fix_pars(params, i):
@@ -186,6 +206,216 @@ def moving_cos_fitting_window(
     }
 
 
+# Parameters of fit_mods.CosFunc, in the order of its signature
+COS_PAR_NAMES = ("amplitude", "frequency", "phase", "offset")
+
+
+def batched_cos_fitting_window(
+    x_data_ns,
+    y_data,
+    fit_window_pnts_nr: int,
+    init_guess: dict,
+    fixed_params: dict = {},
+    max_params: dict = {},
+    min_params: dict = {},
+    max_iter: int = 100,
+):
+    """
+    Vectorized counterpart of `moving_cos_fitting_window`, fitting
+    `fit_mods.CosFunc` to all the windows at once. `init_guess` has to be
+    complete, i.e. contain all the parameters of `fit_mods.CosFunc`.
+
+    Every window is initialized by a linear least squares fit of the
+    amplitude, phase and offset at the guessed frequency, and then refined
+    by `batched_cos_fit`. As the lmfit engine propagates the fit result
+    from one window to the next, windows are refitted starting from the
+    result of their neighbours, for as long as this lowers their residual.
+    Finally, the phase is unwrapped outwards from the middle window, which
+    is kept closest to the guessed phase.
+
+    The bounds and the format of the results are the same as for
+    `moving_cos_fitting_window`. The results agree up to the fit tolerance,
+    except for the phase, which can differ by multiples of 2 pi.
+    """
+    pnts_per_fit_idx = fit_window_pnts_nr + 1
+    max_num_fits = len(x_data_ns) - fit_window_pnts_nr + 1
+    middle_fits_num = max_num_fits // 2
+
+    # Windows, padded with masked points at the end of the data
+    idxs = np.arange(max_num_fits)[:, None] + np.arange(pnts_per_fit_idx)
+    mask = idxs < len(x_data_ns)
+    idxs = np.minimum(idxs, len(x_data_ns) - 1)
+    t = np.asarray(x_data_ns, dtype=float)[idxs]
+    y = np.asarray(y_data, dtype=float)[idxs]
+
+    # Bounds, same as in `moving_cos_fitting_window`
+    p_min = np.array([0.1 * init_guess["amplitude"], 0.1, -100.0 * np.pi, -np.inf])
+    p_max = np.array([2.0 * init_guess["amplitude"], 0.8, 100.0 * np.pi, np.inf])
+    for par, val in max_params.items():
+        p_max[COS_PAR_NAMES.index(par)] = val
+    for par, val in min_params.items():
+        p_min[COS_PAR_NAMES.index(par)] = val
+
+    p0 = np.tile([init_guess[par] for par in COS_PAR_NAMES], (max_num_fits, 1))
+    vary = np.ones(len(COS_PAR_NAMES), dtype=bool)
+    for par, val in fixed_params.items():
+        j = COS_PAR_NAMES.index(par)
+        # iterable case is for the amplitude
+        p0[:, j] = np.asarray(val)[:max_num_fits] if isinstance(val, Iterable) else val
+        vary[j] = False
+    p0 = np.clip(p0, p_min, p_max)
+
+    p0 = _linear_cos_guess(t, y, mask, p0, vary)
+    p0 = np.clip(p0, p_min, p_max)
+    p, _, chisqr = batched_cos_fit(
+        t, y, mask, p0, vary, p_min, p_max, max_iter=max_iter
+    )
+
+    # Propagate good fits to the neighbouring windows
+    changed = np.ones(max_num_fits, dtype=bool)
+    for _ in range(max_num_fits):
+        changed_next = np.zeros(max_num_fits, dtype=bool)
+        for shift in [-1, +1]:
+            # windows for which the neighbour at i + shift changed
+            sel = np.roll(changed, -shift)
+            sel[0 if shift < 0 else -1] = False
+            sel_idxs = np.where(sel)[0]
+            if not len(sel_idxs):
+                continue
+            p_start = p[sel_idxs + shift].copy()
+            p_start[:, ~vary] = p0[sel_idxs][:, ~vary]
+            p_new, _, chisqr_new = batched_cos_fit(
+                t[sel_idxs], y[sel_idxs], mask[sel_idxs],
+                np.clip(p_start, p_min, p_max), vary, p_min, p_max,
+                max_iter=max_iter,
+            )
+            better = chisqr_new < chisqr[sel_idxs] * (1 - 1e-6) - 1e-15
+            p[sel_idxs[better]] = p_new[better]
+            chisqr[sel_idxs[better]] = chisqr_new[better]
+            changed_next[sel_idxs[better]] = True
+        changed = changed_next
+        if not np.any(changed):
+            break
+
+    # Phase continuity between adjacent windows
+    if vary[2]:
+        phase = p[:, 2]
+        ref = init_guess["phase"]
+        phase[middle_fits_num] = ref + np.angle(np.exp(1j * (phase[middle_fits_num] - ref)))
+        phase[middle_fits_num:] = np.unwrap(phase[middle_fits_num:])
+        phase[: middle_fits_num + 1] = np.unwrap(phase[middle_fits_num::-1])[::-1]
+        p[:, 2] = np.clip(phase, p_min[2], p_max[2])
+
+    _, p_stderr, _ = batched_cos_fit(
+        t, y, mask, p, vary, p_min, p_max, max_iter=0
+    )
+
+    results = {par: p[:, j] for j, par in enumerate(COS_PAR_NAMES)}
+    results_stderr = {par: p_stderr[:, j] for j, par in enumerate(COS_PAR_NAMES)}
+
+    return {
+        "results": results,
+        "results_stderr": results_stderr,
+    }
+
+
+def batched_cos_fit(
+    t, y, mask, p0, vary, p_min, p_max, max_iter: int = 100, ftol: float = 1e-10
+):
+    """
+    Levenberg-Marquardt least squares fit of `fit_mods.CosFunc` to many data
+    sets at once. Parameters are kept within bounds by projecting every step.
+
+    Args:
+        t, y (array (N, L)): times and data of N data sets of L points
+        mask (bool array (N, L)): points of the data sets to fit
+        p0 (array (N, 4)): initial parameters, in the order of COS_PAR_NAMES
+        vary (bool array (4,)): parameters that are fitted
+        p_min, p_max (array (4,)): bounds of the parameters
+        max_iter (int): maximum number of iterations
+
+    Returns:
+        p (array (N, 4)): fitted parameters
+        p_stderr (array (N, 4)): standard errors, scaled with the reduced
+            chi-square as done by lmfit, 0 for the fixed parameters
+        chisqr (array (N,)): sum of squared residuals
+    """
+    p = np.array(p0, dtype=float)
+    nr_sets = len(p)
+    lam = np.full(nr_sets, 1e-3)
+    active = np.ones(nr_sets, dtype=bool)
+
+    def residuals_and_jacobian(p, t, y, mask):
+        phase = 2 * np.pi * p[:, 1, None] * t + p[:, 2, None]
+        cos, sin = np.cos(phase), np.sin(phase)
+        res = (p[:, 0, None] * cos + p[:, 3, None] - y) * mask
+        jac = np.stack(
+            [cos, -2 * np.pi * t * p[:, 0, None] * sin, -p[:, 0, None] * sin, np.ones_like(t)],
+            axis=-1,
+        )
+        jac *= mask[..., None] * vary
+        return res, jac
+
+    res, jac = residuals_and_jacobian(p, t, y, mask)
+    chisqr = np.sum(res ** 2, axis=1)
+    for _ in range(max_iter):
+        a = np.where(active)[0]
+        if not len(a):
+            break
+        JTJ = np.einsum("nli,nlj->nij", jac[a], jac[a])
+        grad = np.einsum("nli,nl->ni", jac[a], res[a])
+        diag = np.maximum(np.diagonal(JTJ, axis1=1, axis2=2), 1e-12)
+        step = -np.linalg.solve(
+            JTJ + (lam[a, None] * diag)[:, :, None] * np.eye(len(vary)), grad[..., None]
+        )[..., 0]
+        p_new = np.clip(p[a] + step, p_min, p_max)
+        res_new, jac_new = residuals_and_jacobian(p_new, t[a], y[a], mask[a])
+        chisqr_new = np.sum(res_new ** 2, axis=1)
+
+        better = chisqr_new < chisqr[a]
+        b = a[better]
+        converged = np.abs(chisqr[b] - chisqr_new[better]) <= ftol * (chisqr[b] + ftol)
+        p[b], res[b], jac[b], chisqr[b] = (
+            p_new[better], res_new[better], jac_new[better], chisqr_new[better]
+        )
+        lam[b] = np.maximum(lam[b] / 10, 1e-12)
+        lam[a[~better]] *= 10
+        active[b[converged]] = False
+        active[a[~better][lam[a[~better]] > 1e10]] = False
+
+    # Covariance of the varying parameters
+    nr_free = np.sum(mask, axis=1) - np.sum(vary)
+    JTJ = np.einsum("nli,nlj->nij", jac, jac)
+    JTJ[:, ~vary, ~vary] = 1
+    cov = np.linalg.pinv(JTJ) * (chisqr / np.maximum(nr_free, 1))[:, None, None]
+    p_stderr = np.sqrt(np.abs(np.diagonal(cov, axis1=1, axis2=2))) * vary
+
+    return p, p_stderr, chisqr
+
+
+def _linear_cos_guess(t, y, mask, p0, vary):
+    """
+    Guesses amplitude, phase and offset of `fit_mods.CosFunc` from a linear
+    least squares fit at the frequency of p0. Fixed parameters are kept.
+    """
+    phase = 2 * np.pi * p0[:, 1, None] * t
+    y_fit = y - (0 if vary[3] else p0[:, 3, None])
+    basis = [np.cos(phase), np.sin(phase)]
+    if vary[3]:
+        basis.append(np.ones_like(t))
+    basis = np.stack(basis, axis=-1) * mask[..., None]
+    coeffs = np.einsum("nil,nl->ni", np.linalg.pinv(basis), y_fit * mask)
+
+    p = p0.copy()
+    if vary[0]:
+        p[:, 0] = np.hypot(coeffs[:, 0], coeffs[:, 1])
+    if vary[2]:
+        p[:, 2] = np.arctan2(-coeffs[:, 1], coeffs[:, 0])
+    if vary[3]:
+        p[:, 3] = coeffs[:, 2]
+    return p
+
+
 def cryoscope_v2_processing(
     time_ns: np.array,
     osc_data: np.array,
@@ -199,6 +429,7 @@ def cryoscope_v2_processing(
     vln: str = "",
     insert_ideal_projection: bool = True,
     osc_amp_envelop_poly_deg: int = 1,
+    fitting_engine: str = "lmfit",
 ):
     """
     TBW
@@ -208,6 +439,9 @@ def cryoscope_v2_processing(
     `pnts_per_fit_second_pass` shouldn't be smaller than 3, this is the limit
     to fit the cosine (technically 2 is the limit but but probably will not
     work very well)
+
+    `fitting_engine` is passed to `moving_cos_fitting_window`, use "batched"
+    to fit all windows at once
     """
 
     assert time_ns[0] != 0.0, "Cryoscope time should not start at zero!"
@@ -243,6 +477,7 @@ def cryoscope_v2_processing(
         fixed_params=fixed_params_first_pass,
         max_params=max_params,
         min_params=min_params,
+        engine=fitting_engine,
     )
 
     results = res_dict["results"]
@@ -281,6 +516,7 @@ def cryoscope_v2_processing(
         fixed_params={"offset": fixed_offset, "amplitude": poly1d(time_ns)},
         max_params=max_params,
         min_params=min_params,
+        engine=fitting_engine,
     )
 
     res_dict["time_ns"] = time_ns
@@ -375,21 +611,31 @@ def optimize_fir_software(
     start_sample=0,
     stop_sample=None,
     cma_options={},
+    warm_start: bool = True,
 ):
+    """
+    Optimizes a FIR of `max_taps` taps that corrects the step response `y`
+    to its baseline, using CMA-ES. Returns the best FIR and the
+    `cma.CMAEvolutionStrategy`, in the same way as `cma.fmin2`.
+
+    See `optimize_fir_population` for how the optimization is done and for
+    `warm_start`.
+    """
     step_response = np.concatenate((np.array([0]), y))
     baseline = np.mean(y[baseline_start:baseline_stop])
-    x0 = [1] + (max_taps - 1) * [0]
-
-    def objective_function_fir(x):
-        y = step_response
-        zeros = np.zeros(taps - max_taps)
-        x = np.concatenate((x, zeros))
-        yc = signal.lfilter(x, 1, y)
-        return np.mean(np.abs(yc[1 + start_sample : stop_sample] - baseline)) / np.abs(
-            baseline
-        )
 
-    return cma.fmin2(objective_function_fir, x0, 0.1, options=cma_options)
+    # Corrected step response of FIR x: x @ response_matrix
+    # NB the taps beyond max_taps are zero and do not contribute
+    response_matrix = fir_response_matrix(step_response, max_taps)
+    response_matrix = response_matrix[1 + start_sample : stop_sample].T
+
+    return optimize_fir_population(
+        response_matrix,
+        baseline=baseline,
+        dc_gain=np.ones(max_taps),
+        cma_options=cma_options,
+        warm_start=warm_start,
+    )
 
 
 def optimize_fir_HDAWG(
@@ -401,21 +647,103 @@ def optimize_fir_HDAWG(
     cma_options={},
     max_taps=40,
     hdawg_taps=40,
+    warm_start: bool = True,
 ):
+    """
+    Same as `optimize_fir_software` for the FIR of the HDAWG, which is
+    parameterized by `max_taps` of the `hdawg_taps` hardware coefficients,
+    see `convert_FIR_from_HDAWG`.
+    """
     step_response = np.concatenate((np.array([0]), y))
     baseline = np.mean(y[baseline_start:baseline_stop])
-    x0 = [1] + (max_taps - 1) * [0]
-
-    def objective_function_fir(x):
-        y = step_response
-        zeros = np.zeros(hdawg_taps - max_taps)
-        x = np.concatenate((x, zeros))
-        yc = signal.lfilter(convert_FIR_from_HDAWG(x), 1, y)
-        return np.mean(np.abs(yc[1 + start_sample : stop_sample] - baseline)) / np.abs(
-            baseline
-        )
 
-    return cma.fmin2(objective_function_fir, x0, 0.1, options=cma_options)
+    # Maps the hardware coefficients to the taps of the FIR
+    hdawg_matrix = np.array(
+        [convert_FIR_from_HDAWG(x) for x in np.eye(hdawg_taps)[:max_taps]]
+    )
+    response_matrix = fir_response_matrix(step_response, hdawg_matrix.shape[1])
+    response_matrix = hdawg_matrix @ response_matrix[1 + start_sample : stop_sample].T
+
+    return optimize_fir_population(
+        response_matrix,
+        baseline=baseline,
+        dc_gain=np.sum(hdawg_matrix, axis=1),
+        cma_options=cma_options,
+        warm_start=warm_start,
+    )
+
+
+def fir_response_matrix(step_response, taps: int):
+    """
+    Returns the Toeplitz matrix T of the step response, such that
+    `signal.lfilter(fir, 1, step_response) == T @ fir` for a FIR of `taps`
+    taps.
+    """
+    first_row = np.zeros(taps)
+    first_row[0] = step_response[0]
+    return toeplitz(step_response, first_row)
+
+
+def fir_least_squares(response_matrix, baseline: float, dc_gain):
+    """
+    Least squares solution for the FIR coefficients x that bring the
+    corrected step response `x @ response_matrix` to the baseline, with the
+    constraint of unit DC gain, i.e. `dc_gain @ x == 1`.
+    """
+    nr_coeffs, nr_samples = response_matrix.shape
+    # Karush-Kuhn-Tucker system of the equality constrained least squares
+    kkt = np.zeros((nr_coeffs + 1, nr_coeffs + 1))
+    kkt[:nr_coeffs, :nr_coeffs] = 2 * response_matrix @ response_matrix.T
+    kkt[:nr_coeffs, -1] = dc_gain
+    kkt[-1, :nr_coeffs] = dc_gain
+    rhs = np.concatenate(
+        (2 * baseline * response_matrix @ np.ones(nr_samples), [1.0])
+    )
+    return np.linalg.lstsq(kkt, rhs, rcond=None)[0][:nr_coeffs]
+
+
+def optimize_fir_population(
+    response_matrix,
+    baseline: float,
+    dc_gain,
+    cma_options={},
+    sigma0: float = 0.1,
+    warm_start: bool = True,
+):
+    """
+    Minimizes the mean absolute deviation of the corrected step response
+    `x @ response_matrix` from the baseline, relative to the baseline, over
+    the FIR coefficients x, using CMA-ES.
+
+    The optimizer is driven by ask and tell, such that every population of
+    candidates is evaluated at once as a single matrix product.
+
+    If `warm_start`, the optimization starts from the constrained least
+    squares solution (see `fir_least_squares`), if that is better than the
+    identity FIR.
+
+    Returns:
+        x_best, es: best FIR coefficients and the `cma.CMAEvolutionStrategy`
+    """
+    def objective_function_fir(X):
+        yc = np.asarray(X) @ response_matrix
+        return np.mean(np.abs(yc - baseline), axis=-1) / np.abs(baseline)
+
+    x0 = np.zeros(len(response_matrix))
+    x0[0] = 1
+    if warm_start:
+        x_ls = fir_least_squares(response_matrix, baseline, dc_gain)
+        if objective_function_fir(x_ls) < objective_function_fir(x0):
+            x0 = x_ls
+
+    es = cma.CMAEvolutionStrategy(x0, sigma0, cma_options)
+    es.inject([x0], force=True)  # make sure the start is evaluated
+    while not es.stop():
+        X = es.ask()
+        es.tell(X, objective_function_fir(X).tolist())
+        es.disp()
+
+    return es.result.xbest, es
 
 
 def convolve_FIRs(FIRs):
@@ -4,6 +4,8 @@ import scipy as _sp
 from scipy.stats import chi2 as _chi2
 import warnings as _warnings
 import time as _time
+from concurrent.futures import ProcessPoolExecutor as _ProcessPoolExecutor
+from concurrent.futures import as_completed as _as_completed
 
 import itertools as _itertools
 from functools import reduce as _reduce
@@ -400,6 +402,17 @@ class ResidualTVD:
         # Set variable values
         self.T_params.value[:] = self.t_params.copy()
 
+    def reset(self):
+        """
+        Reset the transition matrix to the identity, so that the next call
+        gives the same result as a newly created object while keeping the
+        (compiled) cvxpy problem.
+        """
+        self.t_params[:] = 0
+        self.warning_msg = None
+        if self.weight != 0:
+            self.T_params.value = self.t_params.copy()
+
     def _obj(self, t_params):  # objective function for sanity checking cvxpy
         p = self.P.value
         q = self.Q.value
@@ -1217,7 +1230,8 @@ class ProfileLikelihoodPlot:
 
 def compute_disturbances_with_confidence(n_bits, data_ref, data_test, confidence_percent=68.0,
                                          max_weight=4, maxiters=20, search_tol=0.1, reltol=1e-5,
-                                         abstol=1e-5, solver="SCS", initial_treg_factor=1e-3, verbosity=1):
+                                         abstol=1e-5, solver="SCS", initial_treg_factor=1e-3, verbosity=1,
+                                         residual_tvd_cache=None):
     """
     Compute the weight-X distrubances between two data sets (including error bars).
 
@@ -1270,6 +1284,9 @@ def compute_disturbances_with_confidence(n_bits, data_ref, data_test, confidence
     verbosity : int, optional
         Sets the level of detail for messages printed to the console (higher = more detail).
 
+    residual_tvd_cache : dict, optional
+        See :func:`compute_residual_tvds`.
+
     Returns
     -------
     list
@@ -1279,7 +1296,8 @@ def compute_disturbances_with_confidence(n_bits, data_ref, data_test, confidence
     """
     rtvds_by_weight = compute_residual_tvds(n_bits, data_ref, data_test, confidence_percent,
                                             max_weight, maxiters, search_tol, reltol,
-                                            abstol, solver, initial_treg_factor, verbosity)
+                                            abstol, solver, initial_treg_factor, verbosity,
+                                            residual_tvd_cache)
     rtvds = [value_and_errorbar[0] for value_and_errorbar in rtvds_by_weight]
     errorbars = [value_and_errorbar[1] for value_and_errorbar in rtvds_by_weight]
 
@@ -1293,7 +1311,8 @@ def compute_disturbances_with_confidence(n_bits, data_ref, data_test, confidence
 
 def compute_residual_tvds(n_bits, data_ref, data_test, confidence_percent=68.0,
                           max_weight=4, maxiters=20, search_tol=0.1, reltol=1e-5,
-                          abstol=1e-5, solver="SCS", initial_treg_factor=1e-3, verbosity=1):
+                          abstol=1e-5, solver="SCS", initial_treg_factor=1e-3, verbosity=1,
+                          residual_tvd_cache=None):
     """
     Compute the weight-X residual TVDs between two data sets (including error bars).
 
@@ -1340,6 +1359,11 @@ def compute_residual_tvds(n_bits, data_ref, data_test, confidence_percent=68.0,
     verbosity : int, optional
         Sets the level of detail for messages printed to the console (higher = more detail).
 
+    residual_tvd_cache : dict, optional
+        If given, the :class:`ResidualTVD` objects used when `confidence_percent`
+        is None are stored in (and taken from) this dictionary, such that their
+        cvxpy problems are only built once when computing many data sets.
+
     Returns
     -------
     list
@@ -1369,7 +1393,7 @@ def compute_residual_tvds(n_bits, data_ref, data_test, confidence_percent=68.0,
         else:
             p_ml = _np.array(data_ref) / _np.sum(data_ref)
             q_ml = _np.array(data_test) / _np.sum(data_test)
-            residual_tvd_fn = ResidualTVD(weight, n_bits, solver=solver)
+            residual_tvd_fn = _get_residual_tvd(weight, n_bits, solver, residual_tvd_cache)
             resid_tvd = residual_tvd_fn(p_ml, q_ml, verbosity=verbosity - 2)
             errorbar = None
 
@@ -1390,7 +1414,7 @@ def compute_residual_tvds(n_bits, data_ref, data_test, confidence_percent=68.0,
                 else:
                     p_ml = _np.array(data_ref) / _np.sum(data_ref)
                     q_ml = _np.array(data_test) / _np.sum(data_test)
-                    residual_tvd_fn = ResidualTVD(weight, n_bits, solver=solver)
+                    residual_tvd_fn = _get_residual_tvd(weight, n_bits, solver, residual_tvd_cache)
                     resid_tvd = residual_tvd_fn(p_ml, q_ml, verbosity=verbosity - 2)
                     errorbar = None
             else:
@@ -1414,18 +1438,97 @@ def compute_residual_tvds(n_bits, data_ref, data_test, confidence_percent=68.0,
     return residualtvd_by_weight
 
 
-def resample_data(data, n_data_points=None, seed=None):
-    """ Sample from the ML probability distrubution of `data`."""
-    if seed is not None: _np.random.seed(seed)
+def _get_residual_tvd(weight, n_bits, solver, residual_tvd_cache=None):
+    """ Returns a (reset) ResidualTVD, taken from `residual_tvd_cache` if possible."""
+    if residual_tvd_cache is None:
+        return ResidualTVD(weight, n_bits, solver=solver)
+    key = (weight, n_bits, solver)
+    if key not in residual_tvd_cache:
+        residual_tvd_cache[key] = ResidualTVD(weight, n_bits, solver=solver)
+    else:
+        residual_tvd_cache[key].reset()
+    return residual_tvd_cache[key]
+
+
+def resample_data(data, n_data_points=None, seed=None, rng=None):
+    """
+    Sample from the ML probability distrubution of `data`.  If `rng` (a
+    `numpy.random.Generator`) is given it is used instead of the global
+    numpy random state.
+    """
     if n_data_points is None: n_data_points = _np.sum(data)
     p_ml = _np.array(data) / _np.sum(data)
+    if rng is not None:
+        return rng.multinomial(n_data_points, p_ml)
+    if seed is not None: _np.random.seed(seed)
     resampled = _np.random.multinomial(n_data_points, p_ml)
     return resampled
 
 
+def _compute_bootstrap_sample(n_bits, data_ref, data_test, max_weight, solver,
+                              verbosity, residual_tvd_cache=None):
+    """
+    Computes the disturbances of a single (re-sampled) data set, falling back
+    on ECOS when `solver` fails.  Returns an array of length `max_weight`,
+    which is all nans when both solvers fail.
+    """
+    try:
+        disturbances = compute_disturbances_with_confidence(
+            n_bits, data_ref, data_test, None, max_weight, solver=solver, verbosity=verbosity - 2,
+            residual_tvd_cache=residual_tvd_cache)
+    except Exception:
+        try:
+            if verbosity > 0: print("\nFalling back on ECOS")
+            disturbances = compute_disturbances_with_confidence(
+                n_bits, data_ref, data_test, None, max_weight, solver="ECOS", verbosity=verbosity - 2,
+                residual_tvd_cache=residual_tvd_cache)
+        except Exception:
+            if verbosity > 0: print("\nFailed using %s and ECOS - reporting nans" % solver)
+            return _np.full(max_weight, _np.nan)
+    return _np.array([disturbances[w][0] for w in range(max_weight)], 'd')
+
+
+# The ResidualTVD objects of a bootstrap worker process, kept for all the
+# samples that are computed by the worker.
+_worker_residual_tvds = {}
+
+
+def _compute_bootstrap_sample_in_worker(n_bits, data_ref, data_test, max_weight, solver):
+    return _compute_bootstrap_sample(n_bits, data_ref, data_test, max_weight, solver,
+                                     verbosity=0, residual_tvd_cache=_worker_residual_tvds)
+
+
+def _compute_bootstrap_samples_parallel(n_bits, resampled_data, max_weight, solver,
+                                        nr_workers, verbosity, callback):
+    """
+    Computes the disturbances of the re-sampled data sets in a pool of
+    `nr_workers` processes.  Results are stored as soon as a sample is finished
+    and are passed to `callback(i, dist_by_weight)`, where columns of samples
+    that are not finished yet are nan.
+    """
+    num_bootstrap_samples = len(resampled_data)
+    dist_by_weight = _np.full((max_weight, num_bootstrap_samples), _np.nan)
+    tStart = _time.time()
+    with _ProcessPoolExecutor(max_workers=nr_workers) as executor:
+        futures = {executor.submit(_compute_bootstrap_sample_in_worker, n_bits,
+                                   redata_ref, redata_test, max_weight, solver): i
+                   for i, (redata_ref, redata_test) in enumerate(resampled_data)}
+        for n_done, future in enumerate(_as_completed(futures)):
+            i = futures[future]
+            dist_by_weight[:, i] = future.result()
+            if verbosity > 0:
+                print("Finished bootstrap sample %d (%d of %d done, %.1fs)"
+                      % (i + 1, n_done + 1, num_bootstrap_samples, _time.time() - tStart))
+                _sys.stdout.flush()
+            if callback is not None:
+                callback(i, dist_by_weight)
+    return dist_by_weight
+
+
 def compute_disturbances_bootstrap_rawdata(n_bits, data_ref, data_test, num_bootstrap_samples=20,
                                            max_weight=4, solver="SCS", verbosity=1, seed=0,
-                                           return_resampled_data=False, add_one_to_data=True):
+                                           return_resampled_data=False, add_one_to_data=True,
+                                           nr_workers=None, callback=None):
     """
     Compute the weight-X distrubances between two data sets (including error bars).
 
@@ -1460,6 +1563,18 @@ def compute_disturbances_bootstrap_rawdata(n_bits, data_ref, data_test, num_boot
         Sets whether the bootstrap should be calculated after adding a single fake count to every
         possible outcome.
 
+    nr_workers : int, optional
+        If given, the bootstrap samples are computed in a pool of `nr_workers`
+        processes.  Every sample is then re-sampled from its own
+        `numpy.random.Generator` stream (spawned from `seed`), and each worker
+        re-uses its cvxpy problems for all the samples it computes.  If None,
+        the samples are computed one after the other.
+
+    callback : callable, optional
+        Only used when `nr_workers` is given.  Called as
+        `callback(i, bootstrap_disturbances_by_weight)` every time sample `i`
+        is finished, where the samples that are not finished yet are nan.
+
     Returns
     -------
     disturbance_by_weight_ML : numpy.ndarray
@@ -1483,33 +1598,31 @@ def compute_disturbances_bootstrap_rawdata(n_bits, data_ref, data_test, num_boot
     bootstrap_data_ref = data_ref + _np.ones(len(data_ref), dtype='int')
     bootstrap_data_test = data_test + _np.ones(len(data_test), dtype='int')
 
-    for i in range(num_bootstrap_samples):
+    if nr_workers is not None:
+        # independent random streams, such that the samples do not depend on
+        # the order in which they are computed
+        rngs = [_np.random.default_rng(s) for s in _np.random.SeedSequence(seed).spawn(num_bootstrap_samples)]
+        resampled_data = [(resample_data(bootstrap_data_ref, rng=rng),
+                           resample_data(bootstrap_data_test, rng=rng)) for rng in rngs]
         if verbosity > 0:
-            print("Analyzing bootstrap sample %d of %d..." % (i + 1, num_bootstrap_samples), end='')
-            _sys.stdout.flush(); tStart = _time.time()
-        redata_ref = resample_data(bootstrap_data_ref, seed=seed + i)
-        redata_test = resample_data(bootstrap_data_test, seed=seed + num_bootstrap_samples + i)
-        if return_resampled_data:
-            resampled_data.append((redata_ref, redata_test))
+            print("Analyzing %d bootstrap samples using %d workers" % (num_bootstrap_samples, nr_workers))
+        dist_by_weight = _compute_bootstrap_samples_parallel(
+            n_bits, resampled_data, max_weight, solver, nr_workers, verbosity, callback)
+    else:
+        for i in range(num_bootstrap_samples):
+            if verbosity > 0:
+                print("Analyzing bootstrap sample %d of %d..." % (i + 1, num_bootstrap_samples), end='')
+                _sys.stdout.flush(); tStart = _time.time()
+            redata_ref = resample_data(bootstrap_data_ref, seed=seed + i)
+            redata_test = resample_data(bootstrap_data_test, seed=seed + num_bootstrap_samples + i)
+            if return_resampled_data:
+                resampled_data.append((redata_ref, redata_test))
 
-        try:
-            disturbances = compute_disturbances_with_confidence(
-                n_bits, redata_ref, redata_test, None, max_weight, solver=solver, verbosity=verbosity - 2)
-        except Exception:
-            try:
-                if verbosity > 0: print("\nFalling back on ECOS")
-                disturbances = compute_disturbances_with_confidence(
-                    n_bits, redata_ref, redata_test, None, max_weight, solver="ECOS", verbosity=verbosity - 2)
-            except Exception:
-                if verbosity > 0: print("\nFailed using %s and ECOS - reporting nans" % solver)
-                for w in range(max_weight):
-                    dist_by_weight[w, i] = _np.nan
-
-        for w in range(max_weight):
-            dist_by_weight[w, i] = disturbances[w][0]
+            dist_by_weight[:, i] = _compute_bootstrap_sample(
+                n_bits, redata_ref, redata_test, max_weight, solver, verbosity)
 
-        if verbosity > 0:
-            print(" (%.1fs)" % (_time.time() - tStart))
+            if verbosity > 0:
+                print(" (%.1fs)" % (_time.time() - tStart))
 
     dist_ml = _np.array([dist_by_weight_ml[w][0] for w in range(max_weight)], 'd')
 
@@ -1571,7 +1684,8 @@ def compute_disturbances_from_bootstrap_rawdata(ml_disturbances, bootstrap_distu
 
 
 def compute_disturbances(n_bits, data_ref, data_test, num_bootstrap_samples=20,
-                         max_weight=4, solver="SCS", verbosity=1, add_one_to_data=True):
+                         max_weight=4, solver="SCS", verbosity=1, add_one_to_data=True,
+                         nr_workers=None):
     """
     Compute the weight-X disturbances between two data sets (including error bars).
 
@@ -1606,6 +1720,10 @@ def compute_disturbances(n_bits, data_ref, data_test, num_bootstrap_samples=20,
         Sets whether the bootstrap should be calculated after adding a single fake count to every
         possible outcome.
 
+    nr_workers : int, optional
+        The number of worker processes used to compute the bootstrap samples
+        (see :func:`compute_disturbances_bootstrap_rawdata`).
+
     Returns
     -------
     list
@@ -1615,7 +1733,8 @@ def compute_disturbances(n_bits, data_ref, data_test, num_bootstrap_samples=20,
     """
     dist_ml, dist = compute_disturbances_bootstrap_rawdata(
         n_bits, data_ref, data_test, num_bootstrap_samples,
-        max_weight, solver, verbosity, add_one_to_data=add_one_to_data)
+        max_weight, solver, verbosity, add_one_to_data=add_one_to_data,
+        nr_workers=nr_workers)
     return compute_disturbances_from_bootstrap_rawdata(dist_ml, dist)
 
 
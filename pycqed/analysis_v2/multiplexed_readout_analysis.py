@@ -31,6 +31,11 @@ class Multiplexed_Readout_Analysis(ba.BaseDataAnalysis):
     Threshold is auto determined as the mean of the data.
     Used to construct a assignment probability matris.
 
+    The shots of all channels are digitized at once into the declared state
+    of every shot. The data per prepared state (histograms, shots and the
+    assignment probability matrix) is only determined for up to
+    options_dict['max_qubits_state_resolved'] (default 10) qubits.
+
     WARNING: Not sure if post selection supports measurement
     data in two quadratures. Should use optimal weights if
     using post-selection.
@@ -106,65 +111,43 @@ class Multiplexed_Readout_Analysis(ba.BaseDataAnalysis):
         combinations = \
             ['{:0{}b}'.format(i, nr_qubits) for i in range(2**nr_qubits)]
         post_selection = self.post_selection
+        # Data per prepared state (histograms, assignment probability matrix)
+        # grows exponentially with the number of qubits
+        state_resolved = nr_qubits <= \
+            self.options_dict.get('max_qubits_state_resolved', 10)
         self.proc_data_dict['combinations'] = combinations
         self.proc_data_dict['qubit_labels'] = qubit_labels
+        self.proc_data_dict['state_resolved'] = state_resolved
 
         #############################################
         # Sort post-selection from measurement shots
         #############################################
-        self.proc_data_dict['Shots'] = {ch : {} for ch in Channels}
-
-        if post_selection == True:
-            # Post-selected shots
-            self.proc_data_dict['Post_selected_shots'] =\
-                {ch : {} for ch in Channels}
-            # Pre-measurement shots
-            self.proc_data_dict['Pre_measurement_shots'] =\
-                {ch : {} for ch in Channels}
-
-        # Loop over all qubits
-        for i, ch in enumerate(Channels):
-            ch_shots = raw_shots[:, i]
-
-            # Loop over prepared states
-            for j, comb in enumerate(combinations):
-                if post_selection == False:
-                    shots = ch_shots[j::len(combinations)]
-                    self.proc_data_dict['Shots'][ch][comb] = shots.copy()
-                else:
-                    pre_meas_shots = ch_shots[2*j::len(combinations)*2]
-                    shots = ch_shots[2*j+1::len(combinations)*2]
-                    self.proc_data_dict['Shots'][ch][comb] = shots.copy()
-                    self.proc_data_dict['Post_selected_shots'][ch][comb] =\
-                        shots.copy()
-                    self.proc_data_dict['Pre_measurement_shots'][ch][comb] =\
-                        pre_meas_shots.copy()
+        shots, pre_meas_shots, prepared_states = \
+            split_mux_shots(raw_shots, nr_qubits, post_selection)
+        self.proc_data_dict['prepared_states'] = prepared_states
+        if state_resolved:
+            self.proc_data_dict['Shots'] = \
+                sort_shots_by_state(shots, prepared_states, Channels,
+                                    combinations)
 
         #########################
         # Execute post_selection
         #########################
         if post_selection == True:
-            for comb in combinations: # Loop over prepared states
-                Idxs = []
-                # For each prepared state one needs to eliminate every shot
-                # if a single qubit fails post selection.
-                for i, ch in enumerate(Channels): # Loop over qubits
-                    # First, find all idxs for all qubits. This has to loop
-                    # over alll qubits before in pre-measurement.
-                    pre_meas_shots =\
-                        self.proc_data_dict['Pre_measurement_shots'][ch][comb]
-                    post_select_indices = dm_tools.get_post_select_indices(
-                        thresholds=[self.post_selec_thresholds[i]],
-                        init_measurements=[pre_meas_shots])
-                    Idxs += list(post_select_indices)
-
-                for i, ch in enumerate(Channels): # Loop over qubits
-                    # Now that we have all idxs, we can discard the shots that
-                    # failed in every qubit.
-                    shots = self.proc_data_dict['Post_selected_shots'][ch][comb]
-                    shots[Idxs] = np.nan # signal post_selection with nan
-                    shots = shots[~np.isnan(shots)] # discard post failed shots
-                    self.proc_data_dict['Post_selected_shots'][ch][comb] = shots
+            # For each prepared state one needs to eliminate every shot
+            # if a single qubit fails post selection.
+            post_sel_mask = get_post_selection_mask(
+                pre_meas_shots, self.post_selec_thresholds)
+            post_shots = shots[post_sel_mask]
+            post_prepared_states = prepared_states[post_sel_mask]
+            self.proc_data_dict['post_selection_mask'] = post_sel_mask
+            if state_resolved:
+                self.proc_data_dict['Pre_measurement_shots'] = \
+                    sort_shots_by_state(pre_meas_shots, prepared_states,
+                                        Channels, combinations)
+                self.proc_data_dict['Post_selected_shots'] = \
+                    sort_shots_by_state(post_shots, post_prepared_states,
+                                        Channels, combinations)
 
         ############################################
         # Histograms, thresholds and digitized data
@@ -172,153 +155,91 @@ class Multiplexed_Readout_Analysis(ba.BaseDataAnalysis):
         self.proc_data_dict['Histogram_data'] = {ch : {} for ch in Channels}
         self.proc_data_dict['PDF_data'] = {ch : {} for ch in Channels}
         self.proc_data_dict['CDF_data'] = {ch : {} for ch in Channels}
-        Shots_digitized = {ch : {} for ch in Channels}
         if post_selection == True:
             self.proc_data_dict['Post_Histogram_data'] = \
                 {ch : {} for ch in Channels}
             self.proc_data_dict['Post_PDF_data'] = {ch : {} for ch in Channels}
             self.proc_data_dict['Post_CDF_data'] = {ch : {} for ch in Channels}
-            Post_Shots_digitized = {ch : {} for ch in Channels}
+
+        # prepared state of every qubit (column) for every shot (row)
+        prepared_bits = get_state_bits(prepared_states, nr_qubits)
+        if post_selection == True:
+            post_prepared_bits = prepared_bits[post_sel_mask]
 
         for i, ch in enumerate(Channels):
             hist_range = (np.amin(raw_shots[:, i]), np.amax(raw_shots[:, i]))
-            Shots_0 = [] # used to store overall shots of a qubit
-            Shots_1 = []
-            if post_selection == True:
-                Post_Shots_0 = [] # used to store overall shots of a qubit
-                Post_Shots_1 = []
+            bin_edges = np.linspace(hist_range[0], hist_range[1], 101)
+            bin_centers = (bin_edges[1:] + bin_edges[:-1])/2
 
-            # Histograms
-            for comb in combinations:
+            # Histograms of each prepared state
+            if state_resolved:
                 if post_selection == True:
-                    shots = self.proc_data_dict['Post_selected_shots'][ch][comb]
-                    # Hitogram data of each prepared_state
-                    counts, bin_edges = np.histogram(shots, bins=100,
-                                                     range=hist_range)
-                    bin_centers = (bin_edges[1:] + bin_edges[:-1])/2
-                    self.proc_data_dict['Post_Histogram_data'][ch][comb]=\
-                        (counts, bin_centers)
-                    if comb[i] == '0':
-                        Post_Shots_0 = np.concatenate((Post_Shots_0, shots))
-                    else:
-                        Post_Shots_1 = np.concatenate((Post_Shots_1, shots))
-
-                shots = self.proc_data_dict['Shots'][ch][comb]
-                # Hitogram data of each prepared_state
-                counts, bin_edges = np.histogram(shots, bins=100,
-                                                 range=hist_range)
-                bin_centers = (bin_edges[1:] + bin_edges[:-1])/2
-                self.proc_data_dict['Histogram_data'][ch][comb] = \
-                    (counts, bin_centers)
-
-                if comb[i] == '0':
-                    Shots_0 = np.concatenate((Shots_0, shots))
-                else:
-                    Shots_1 = np.concatenate((Shots_1, shots))
-
-            # Cumulative sums
-            if post_selection == True:
-                # bin data according to unique bins
-                ubins_0, ucounts_0 = np.unique(Post_Shots_0, return_counts=True)
-                ubins_1, ucounts_1 = np.unique(Post_Shots_1, return_counts=True)
-                ucumsum_0 = np.cumsum(ucounts_0)
-                ucumsum_1 = np.cumsum(ucounts_1)
-                # merge |0> and |1> shot bins
-                all_bins = np.unique(np.sort(np.concatenate((ubins_0, ubins_1))))
-                # interpolate cumsum for all bins
-                int_cumsum_0=np.interp(x=all_bins,xp=ubins_0,fp=ucumsum_0,left=0)
-                int_cumsum_1=np.interp(x=all_bins,xp=ubins_1,fp=ucumsum_1,left=0)
-                norm_cumsum_0 = int_cumsum_0/np.max(int_cumsum_0)
-                norm_cumsum_1 = int_cumsum_1/np.max(int_cumsum_1)
-                self.proc_data_dict['Post_CDF_data'][ch]['cumsum_x_ds']=all_bins
-                self.proc_data_dict['Post_CDF_data'][ch]['cumsum_y_ds'] = \
-                    [int_cumsum_0, int_cumsum_1]
-                self.proc_data_dict['Post_CDF_data'][ch]['cumsum_y_ds_n'] = \
-                    [norm_cumsum_0, norm_cumsum_1]
-                # Calculating threshold
-                F_vs_th = (1-(1-abs(norm_cumsum_0-norm_cumsum_1))/2)
-                opt_idxs = np.argwhere(F_vs_th == np.amax(F_vs_th))
-                opt_idx = int(round(np.average(opt_idxs)))
-                #opt_idx = np.argmin(np.abs(all_bins-self.post_selec_thresholds[i]))
-                self.proc_data_dict['Post_PDF_data'][ch]['F_assignment_raw'] = \
-                    F_vs_th[opt_idx]
-                self.proc_data_dict['Post_PDF_data'][ch]['threshold_raw'] = \
-                    all_bins[opt_idx]
-            # bin data according to unique bins
-            ubins_0, ucounts_0 = np.unique(Shots_0, return_counts=True)
-            ubins_1, ucounts_1 = np.unique(Shots_1, return_counts=True)
-            ucumsum_0 = np.cumsum(ucounts_0)
-            ucumsum_1 = np.cumsum(ucounts_1)
-            # merge |0> and |1> shot bins
-            all_bins = np.unique(np.sort(np.concatenate((ubins_0, ubins_1))))
-            # interpolate cumsum for all bins
-            int_cumsum_0 = np.interp(x=all_bins,xp=ubins_0,fp=ucumsum_0,left=0)
-            int_cumsum_1 = np.interp(x=all_bins,xp=ubins_1,fp=ucumsum_1,left=0)
-            norm_cumsum_0 = int_cumsum_0/np.max(int_cumsum_0)
-            norm_cumsum_1 = int_cumsum_1/np.max(int_cumsum_1)
-            self.proc_data_dict['CDF_data'][ch]['cumsum_x_ds'] = all_bins
-            self.proc_data_dict['CDF_data'][ch]['cumsum_y_ds'] = \
-                [int_cumsum_0, int_cumsum_1]
-            self.proc_data_dict['CDF_data'][ch]['cumsum_y_ds_n'] = \
-                [norm_cumsum_0, norm_cumsum_1]
-            # Calculating threshold
-            F_vs_th = (1-(1-abs(norm_cumsum_0-norm_cumsum_1))/2)
-            opt_idxs = np.argwhere(F_vs_th == np.amax(F_vs_th))
-            opt_idx = int(round(np.average(opt_idxs)))
-            self.proc_data_dict['PDF_data'][ch]['F_assignment_raw'] = \
-                F_vs_th[opt_idx]
-            self.proc_data_dict['PDF_data'][ch]['threshold_raw'] = \
-                all_bins[opt_idx]
-
-            # Histogram of overall shots
+                    counts = calc_state_histograms(
+                        post_shots[:, i], post_prepared_states, nr_qubits,
+                        bin_edges)
+                    self.proc_data_dict['Post_Histogram_data'][ch] = \
+                        {comb: (counts[j], bin_centers)
+                         for j, comb in enumerate(combinations)}
+                counts = calc_state_histograms(
+                    shots[:, i], prepared_states, nr_qubits, bin_edges)
+                self.proc_data_dict['Histogram_data'][ch] = \
+                    {comb: (counts[j], bin_centers)
+                     for j, comb in enumerate(combinations)}
+
+            # Cumulative sums, thresholds and histograms of overall shots
             if post_selection == True:
-                counts_0, bin_edges = np.histogram(Post_Shots_0, bins=100,
-                                                   range=hist_range)
-                counts_1, bin_edges = np.histogram(Post_Shots_1, bins=100,
-                                                   range=hist_range)
-                bin_centers = (bin_edges[1:] + bin_edges[:-1])/2
+                Post_Shots_0 = post_shots[~post_prepared_bits[:, i], i]
+                Post_Shots_1 = post_shots[post_prepared_bits[:, i], i]
+                cdf_data, F_a, th = calc_cdf_threshold(
+                    Post_Shots_0, Post_Shots_1)
+                self.proc_data_dict['Post_CDF_data'][ch].update(cdf_data)
+                self.proc_data_dict['Post_PDF_data'][ch]['F_assignment_raw'] = F_a
+                self.proc_data_dict['Post_PDF_data'][ch]['threshold_raw'] = th
                 self.proc_data_dict['Post_PDF_data'][ch]['0'] = \
-                    (counts_0, bin_centers)
+                    (np.histogram(Post_Shots_0, bins=bin_edges)[0], bin_centers)
                 self.proc_data_dict['Post_PDF_data'][ch]['1'] = \
-                    (counts_1, bin_centers)
-            counts_0, bin_edges = np.histogram(Shots_0, bins=100,
-                                               range=hist_range)
-            counts_1, bin_edges = np.histogram(Shots_1, bins=100,
-                                               range=hist_range)
-            bin_centers = (bin_edges[1:] + bin_edges[:-1])/2
+                    (np.histogram(Post_Shots_1, bins=bin_edges)[0], bin_centers)
+            Shots_0 = shots[~prepared_bits[:, i], i]
+            Shots_1 = shots[prepared_bits[:, i], i]
+            cdf_data, F_a, th = calc_cdf_threshold(Shots_0, Shots_1)
+            self.proc_data_dict['CDF_data'][ch].update(cdf_data)
+            self.proc_data_dict['PDF_data'][ch]['F_assignment_raw'] = F_a
+            self.proc_data_dict['PDF_data'][ch]['threshold_raw'] = th
             self.proc_data_dict['PDF_data'][ch]['0'] = \
-                (counts_0, bin_centers)
+                (np.histogram(Shots_0, bins=bin_edges)[0], bin_centers)
             self.proc_data_dict['PDF_data'][ch]['1'] = \
-                (counts_1, bin_centers)
+                (np.histogram(Shots_1, bins=bin_edges)[0], bin_centers)
 
-            # Digitized data
-            for comb in combinations:
-                if post_selection == True:
-                    shots = self.proc_data_dict['Post_selected_shots'][ch][comb]
-                    th = self.proc_data_dict['Post_PDF_data'][ch]['threshold_raw']
-                    Post_Shots_digitized[ch][comb] = \
-                        np.array(shots > th, dtype=int)
-                shots = self.proc_data_dict['Shots'][ch][comb]
-                th = self.proc_data_dict['PDF_data'][ch]['threshold_raw']
-                Shots_digitized[ch][comb] = \
-                    np.array(shots > th, dtype=int)
+        # Digitized data, the declared state of all qubits as an integer
+        thresholds = [self.proc_data_dict['PDF_data'][ch]['threshold_raw']
+                      for ch in Channels]
+        declared_states = digitize_mux_shots(shots, thresholds)
+        self.proc_data_dict['declared_states'] = declared_states
+        if post_selection == True:
+            thresholds = \
+                [self.proc_data_dict['Post_PDF_data'][ch]['threshold_raw']
+                 for ch in Channels]
+            post_declared_states = digitize_mux_shots(post_shots, thresholds)
+            self.proc_data_dict['Post_declared_states'] = post_declared_states
 
         ##########################################
         # Calculate assignment probability matrix
         ##########################################
         if post_selection == True:
-            ass_prob_matrix = calc_assignment_prob_matrix(combinations,
-                Post_Shots_digitized)
-            cross_fid_matrix = calc_cross_fidelity_matrix(combinations,
-                ass_prob_matrix)
-            self.proc_data_dict['Post_assignment_prob_matrix'] = ass_prob_matrix
-            self.proc_data_dict['Post_cross_fidelity_matrix'] = cross_fid_matrix
-        assignment_prob_matrix = calc_assignment_prob_matrix(combinations,
-            Shots_digitized)
-        cross_fidelity_matrix = calc_cross_fidelity_matrix(combinations,
-            assignment_prob_matrix)
-        self.proc_data_dict['assignment_prob_matrix'] = assignment_prob_matrix
-        self.proc_data_dict['cross_fidelity_matrix'] = cross_fidelity_matrix
+            self.proc_data_dict['Post_cross_fidelity_matrix'] = \
+                calc_cross_fidelity_matrix_from_states(
+                    post_prepared_states, post_declared_states, nr_qubits)
+            if state_resolved:
+                self.proc_data_dict['Post_assignment_prob_matrix'] = \
+                    calc_assignment_prob_matrix_from_states(
+                        post_prepared_states, post_declared_states, nr_qubits)
+        self.proc_data_dict['cross_fidelity_matrix'] = \
+            calc_cross_fidelity_matrix_from_states(
+                prepared_states, declared_states, nr_qubits)
+        if state_resolved:
+            self.proc_data_dict['assignment_prob_matrix'] = \
+                calc_assignment_prob_matrix_from_states(
+                    prepared_states, declared_states, nr_qubits)
 
     def prepare_fitting(self):
         Channels = self.Channels
@@ -602,13 +523,13 @@ class Multiplexed_Readout_Analysis(ba.BaseDataAnalysis):
         Channels = self.Channels
         nr_qubits = self.nr_qubits
         qubit_labels = self.proc_data_dict['qubit_labels']
-        combinations = \
-            ['{:0{}b}'.format(i, nr_qubits) for i in range(2**nr_qubits)]
+        combinations = self.proc_data_dict['combinations']
+        state_resolved = self.proc_data_dict['state_resolved']
         self.axs_dict = {}
 
         if self.q_target == None:
             # Run analysis for all qubits
-            if self.post_selection is True:
+            if self.post_selection is True and state_resolved:
                 self.plot_dicts['assignment_probability_matrix_post'] = {
                     'plotfn': plot_assignment_prob_matrix,
                     'assignment_prob_matrix':
@@ -620,6 +541,7 @@ class Multiplexed_Readout_Analysis(ba.BaseDataAnalysis):
                     self.proc_data_dict['Post_assignment_prob_matrix'].T))*.8,
                     'post_selection': True
                     }
+            if self.post_selection is True:
                 self.plot_dicts['cross_fid_matrix_post'] = {
                     'plotfn': plot_cross_fid_matrix,
                     'prob_matrix':
@@ -631,16 +553,17 @@ class Multiplexed_Readout_Analysis(ba.BaseDataAnalysis):
                     self.proc_data_dict['Post_cross_fidelity_matrix'].T))*.8,
                     'post_selection': True
                     }
-            self.plot_dicts['assignment_probability_matrix'] = {
-                'plotfn': plot_assignment_prob_matrix,
-                'assignment_prob_matrix':
-                    self.proc_data_dict['assignment_prob_matrix'],
-                'combinations': self.proc_data_dict['combinations'],
-                'valid_combinations': self.proc_data_dict['combinations'],
-                'qubit_labels': qubit_labels,
-                'plotsize': np.array(np.shape(\
-                    self.proc_data_dict['assignment_prob_matrix'].T))*.8
-                }
+            if state_resolved:
+                self.plot_dicts['assignment_probability_matrix'] = {
+                    'plotfn': plot_assignment_prob_matrix,
+                    'assignment_prob_matrix':
+                        self.proc_data_dict['assignment_prob_matrix'],
+                    'combinations': self.proc_data_dict['combinations'],
+                    'valid_combinations': self.proc_data_dict['combinations'],
+                    'qubit_labels': qubit_labels,
+                    'plotsize': np.array(np.shape(\
+                        self.proc_data_dict['assignment_prob_matrix'].T))*.8
+                    }
             self.plot_dicts['cross_fid_matrix'] = {
                 'plotfn': plot_cross_fid_matrix,
                 'prob_matrix':
@@ -2003,55 +1926,208 @@ def estimate_threshold(P0, P1):
     th = x0[bounds[0]:bounds[1]][th_idx]
     return th
 
-######################################
-# Plotting functions
-######################################
-def calc_assignment_prob_matrix(combinations, digitized_data):
+def split_mux_shots(raw_shots, nr_qubits: int, post_selection: bool = False):
+    """
+    Splits the shots of a multiplexed SSRO experiment, in which the 2**n
+    combinations of |0> and |1> are prepared in turn.
+
+    Args:
+        raw_shots (array): shots of all channels, shape (nr_shots, nr_qubits)
+        nr_qubits (int): number of qubits
+        post_selection (bool): every shot is preceded by a pre-measurement
+
+    Returns:
+        shots (array): measurement shots, shape (nr_shots, nr_qubits)
+        pre_meas_shots (array): pre-measurement shots preceding the shots,
+            None if post_selection is False
+        prepared_states (array): the prepared state of every shot, as the
+            index in the (binary ordered) combinations
+    """
+    raw_shots = np.asarray(raw_shots)
+    if post_selection:
+        nr_shots = len(raw_shots)//2
+        pre_meas_shots = raw_shots[0:2*nr_shots:2]
+        shots = raw_shots[1:2*nr_shots:2]
+    else:
+        pre_meas_shots = None
+        shots = raw_shots
+    prepared_states = np.arange(len(shots)) % 2**nr_qubits
+    return shots, pre_meas_shots, prepared_states
+
+
+def get_state_bits(states, nr_qubits: int):
+    """
+    Returns the state of every qubit (column) in states, given as indices
+    in the binary ordered combinations, i.e., qubit 0 is the most
+    significant bit.
+    """
+    shifts = np.arange(nr_qubits - 1, -1, -1)
+    return ((np.asarray(states)[:, None] >> shifts) & 1).astype(bool)
+
+
+def digitize_mux_shots(shots, thresholds):
+    """
+    Digitizes the shots of all channels at once.
+
+    Returns the declared state of every shot as an index in the binary
+    ordered combinations, i.e., '1' for a channel if the shot is above the
+    threshold of that channel, and qubit 0 is the most significant bit.
+    """
+    nr_qubits = len(thresholds)
+    weights = 1 << np.arange(nr_qubits - 1, -1, -1, dtype=np.int64)
+    return (np.asarray(shots) > np.asarray(thresholds)) @ weights
+
+
+def get_post_selection_mask(pre_meas_shots, thresholds):
+    """
+    Returns a mask of the shots that pass post-selection, i.e., for which the
+    pre-measurement of none of the qubits is above its threshold (see
+    `dm_tools.get_post_select_indices`).
+    """
+    return ~np.any(np.asarray(pre_meas_shots) > np.asarray(thresholds),
+                   axis=1)
+
+
+def sort_shots_by_state(shots, states, Channels, combinations):
+    """
+    Returns the shots of every channel for every prepared state,
+    as {ch: {comb: shots}}.
+    """
+    order = np.argsort(states, kind='stable')
+    splits = np.cumsum(np.bincount(states, minlength=len(combinations)))[:-1]
+    sorted_shots = np.split(shots[order], splits)
+    return {ch: {comb: sorted_shots[j][:, i]
+                 for j, comb in enumerate(combinations)}
+            for i, ch in enumerate(Channels)}
 
-    assignment_prob_matrix = np.zeros((len(combinations), len(combinations)))
 
-    for i, input_state in enumerate(combinations):
-        for j, outcome in enumerate(combinations):
-            first_key = next(iter(digitized_data))
-            Check = np.ones(len(digitized_data[first_key][input_state]))
-            for k, ch in enumerate(digitized_data.keys()):
-                check = digitized_data[ch][input_state] == int(outcome[k])
-                Check *= check
+def calc_state_histograms(shots, states, nr_qubits: int, bin_edges):
+    """
+    Returns the histograms of the shots of a single channel for all prepared
+    states at once, shape (2**nr_qubits, len(bin_edges)-1). The binning is
+    the same as that of `np.histogram`.
+    """
+    nr_bins = len(bin_edges) - 1
+    idxs = np.searchsorted(bin_edges, shots, side='right') - 1
+    # The last bin includes the right edge
+    idxs[shots == bin_edges[-1]] = nr_bins - 1
+    in_range = (idxs >= 0) & (idxs < nr_bins)
+    counts = np.bincount(states[in_range]*nr_bins + idxs[in_range],
+                         minlength=2**nr_qubits*nr_bins)
+    return counts.reshape(2**nr_qubits, nr_bins)
+
+
+def calc_cdf_threshold(shots_0, shots_1):
+    """
+    Determines the threshold that maximizes the assignment fidelity from the
+    cumulative distributions of the shots of |0> and |1>.
+
+    Returns:
+        cdf_data (dict): the (normalized) cumulative distributions
+            'cumsum_y_ds(_n)' evaluated at all unique shots 'cumsum_x_ds'
+        F_assignment_raw (float): assignment fidelity at the threshold
+        threshold_raw (float)
+    """
+    # bin data according to unique bins
+    ubins_0, ucounts_0 = np.unique(shots_0, return_counts=True)
+    ubins_1, ucounts_1 = np.unique(shots_1, return_counts=True)
+    ucumsum_0 = np.cumsum(ucounts_0)
+    ucumsum_1 = np.cumsum(ucounts_1)
+    # merge |0> and |1> shot bins
+    all_bins = np.union1d(ubins_0, ubins_1)
+    # interpolate cumsum for all bins
+    int_cumsum_0 = np.interp(x=all_bins, xp=ubins_0, fp=ucumsum_0, left=0)
+    int_cumsum_1 = np.interp(x=all_bins, xp=ubins_1, fp=ucumsum_1, left=0)
+    norm_cumsum_0 = int_cumsum_0/np.max(int_cumsum_0)
+    norm_cumsum_1 = int_cumsum_1/np.max(int_cumsum_1)
+    cdf_data = {'cumsum_x_ds': all_bins,
+                'cumsum_y_ds': [int_cumsum_0, int_cumsum_1],
+                'cumsum_y_ds_n': [norm_cumsum_0, norm_cumsum_1]}
+    # Calculating threshold
+    F_vs_th = (1-(1-abs(norm_cumsum_0-norm_cumsum_1))/2)
+    opt_idxs = np.argwhere(F_vs_th == np.amax(F_vs_th))
+    opt_idx = int(round(np.average(opt_idxs)))
+    return cdf_data, F_vs_th[opt_idx], all_bins[opt_idx]
+
+
+def calc_assignment_prob_matrix_from_states(prepared_states, declared_states,
+                                            nr_qubits: int):
+    """
+    Returns the assignment probability matrix P(declared|prepared), with the
+    prepared state as the row index, from the prepared and declared state of
+    every shot.
+    """
+    nr_states = 2**nr_qubits
+    counts = np.bincount(prepared_states*nr_states + declared_states,
+                         minlength=nr_states**2)
+    counts = counts.reshape(nr_states, nr_states)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return counts/np.sum(counts, axis=1, keepdims=True)
+
+
+def calc_cross_fidelity_matrix_from_states(prepared_states, declared_states,
+                                           nr_qubits: int):
+    """
+    Returns the cross fidelity matrix (see `calc_cross_fidelity_matrix`)
+    from the prepared and declared state of every shot, without
+    constructing the full assignment probability matrix.
+    """
+    nr_states = 2**nr_qubits
+    declared_bits = get_state_bits(declared_states, nr_qubits)
+    counts = np.bincount(prepared_states, minlength=nr_states)
+    # number of shots in which a qubit (column) is declared in |1> for
+    # every prepared state (row)
+    counts_1 = np.stack([np.bincount(prepared_states,
+                                     weights=declared_bits[:, i],
+                                     minlength=nr_states)
+                         for i in range(nr_qubits)], axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        P_1 = counts_1/counts[:, None]
+        P_0 = (counts[:, None] - counts_1)/counts[:, None]
+    return _calc_cross_fidelity_matrix(P_0, P_1, nr_qubits)
+
+
+def _calc_cross_fidelity_matrix(P_0, P_1, nr_qubits: int):
+    """
+    P_0 and P_1 are the probabilities to declare a qubit (column) in |0>
+    and |1> for every prepared state (row).
+    """
+    prepared_bits = get_state_bits(np.arange(2**nr_qubits), nr_qubits)
+    normalization_factor = 2**nr_qubits/2
+    P_eiIj = P_1.T @ ~prepared_bits / normalization_factor  # P(e_i|0_j)
+    P_giPj = P_0.T @ prepared_bits / normalization_factor  # P(g_i|pi_j)
+    return 1 - P_eiIj - P_giPj
 
-            assignment_prob_matrix[i][j] = sum(Check)/len(Check)
 
-    return assignment_prob_matrix
+######################################
+# Plotting functions
+######################################
+def calc_assignment_prob_matrix(combinations, digitized_data):
+    """
+    Returns the assignment probability matrix from the digitized shots of
+    every channel for every prepared state, {ch: {comb: shots}}.
+    """
+    channels = list(digitized_data.keys())
+    nr_qubits = len(channels)
+    prepared_states = []
+    declared_states = []
+    for j, input_state in enumerate(combinations):
+        bits = np.stack([digitized_data[ch][input_state] for ch in channels],
+                        axis=1)
+        declared_states.append(digitize_mux_shots(bits, [0.5]*nr_qubits))
+        prepared_states.append(np.full(len(bits), j))
+    return calc_assignment_prob_matrix_from_states(
+        np.concatenate(prepared_states), np.concatenate(declared_states),
+        nr_qubits)
 
 def calc_cross_fidelity_matrix(combinations, assignment_prob_matrix):
 
     n = int(np.log2(len(combinations)))
-    crossFidMat = np.zeros((n, n))
-    for i in range(n):
-        for j in range(n):
-            P_eiIj = 0  # P(e_i|0_j)
-            P_giPj = 0  # P(g_i|pi_j)
-
-            # Loop over all entries in the Assignment probability matrix
-            for prep_idx, c_prep in enumerate(combinations):
-                for decl_idx, c_decl in enumerate(combinations):
-                    # Select all entries in the assignment matrix for ei|Ij
-                    if (c_decl[i]=='1') and (c_prep[j] == '0'):
-                        P_eiIj += assignment_prob_matrix[prep_idx, decl_idx]
-                    # Select all entries in the assignment matrix for ei|Ij
-                    elif (c_decl[i]=='0') and (c_prep[j] == '1'): # gi|Pj
-                        P_giPj += assignment_prob_matrix[prep_idx, decl_idx]
-
-            # Normalize probabilities
-            normalization_factor = (len(combinations)/2)
-
-            P_eiIj = P_eiIj/normalization_factor
-            P_giPj = P_giPj/normalization_factor
-
-            # Add entry to cross fidelity matrix
-            Fc = 1 - P_eiIj - P_giPj
-            crossFidMat[i,j] = Fc
-
-    return crossFidMat
+    # Probabilities P(e_i|prepared) and P(g_i|prepared) for every qubit i
+    declared_bits = get_state_bits(np.arange(len(combinations)), n)
+    P_1 = assignment_prob_matrix @ declared_bits
+    P_0 = assignment_prob_matrix @ ~declared_bits
+    return _calc_cross_fidelity_matrix(P_0, P_1, n)
 
 def plot_assignment_prob_matrix(assignment_prob_matrix,
                                 combinations, qubit_labels, ax=None,
@@ -8,6 +8,7 @@ import subprocess
 import string
 import getopt
 from numpy import zeros, eye
+import numpy as np
 import uuid
 
 i = j = 1j
@@ -817,14 +818,253 @@ def reconstructrho_process(x, dim, OPT):
 #-------------------------------------------------------------------------
 
 
+# In-process solver
+#
+# Solves the same problem as the semidefinite programs written by
+# writesdpa_state and writesdpa_process, i.e. it minimises
+#
+#   sum_k (data_k - p_k)**2/data_k     (fixedweight)
+#   sum_k (data_k - p_k)**2/p_k        (maximum likelihood)
+#
+# with predicted counts p_k = weights_k*Tr(E_k rho) over positive
+# semidefinite rho (with free trace, which is the normalisation N). For
+# process tomography rho is the Choi matrix (input x output) with
+# p_mn = d*weights_mn*Tr((R_mn^T x E_mn) rho), constrained to be trace
+# preserving up to the normalisation (Tr_out rho proportional to identity).
+#
+# Many datasets are reconstructed at once using accelerated projected
+# gradient descent with backtracking, vectorised over the datasets.
+#-------------------------------------------------------------------------
+
+
+def _project_psd(rho):
+    '''
+    projects a stack of hermitian matrices onto the positive semidefinite cone
+    '''
+    rho = (rho + np.conj(np.swapaxes(rho, -1, -2)))/2
+    eigvals, eigvecs = np.linalg.eigh(rho)
+    eigvals = np.clip(eigvals, 0, None)
+    return (eigvecs*eigvals[..., None, :]) @ np.conj(np.swapaxes(eigvecs, -1, -2))
+
+
+def _project_tp(rho, dim):
+    '''
+    projects a stack of Choi matrices onto the matrices with
+    Tr_out(rho) proportional to the identity
+    '''
+    tr_out = np.einsum('...ikjk->...ij', rho.reshape(rho.shape[:-2]+(dim,)*4))
+    deviation = tr_out - np.einsum('...ii->...', tr_out)[..., None, None]*eye(dim)/dim
+    return rho - np.kron(deviation, eye(dim)/dim)
+
+
+def _project_psd_tp(rho, dim, max_iter=500, tol=1e-13):
+    '''
+    projects a stack of Choi matrices onto the intersection of the positive
+    semidefinite cone and the (trace preserving) subspace of _project_tp,
+    using Dykstra's alternating projections
+    '''
+    x = _project_psd(_project_tp(rho, dim))
+    correction = np.zeros_like(rho)
+    for _ in range(max_iter):
+        y = _project_tp(x, dim)
+        x_new = _project_psd(y + correction)
+        correction = y + correction - x_new
+        converged = np.max(np.abs(x_new - x)) <= tol*max(np.max(np.abs(x_new)), 1)
+        x = x_new
+        if converged:
+            break
+    return x
+
+
+def _solve_tomo_batch(data, A, project, fixedweight, OPT):
+    '''
+    data:    (n_datasets, n_data) measured counts
+    A:       (n_datasets, n_data, D**2) such that p = Re(A @ vec(rho))
+    project: projection onto the feasible set of a stack of D x D matrices
+    '''
+    n_sets, n_data, D2 = A.shape
+    D = int(round(np.sqrt(D2)))
+    data = np.asarray(data, dtype=float)
+    # zero counts would exclude the data point from the fixed weight fit
+    denominators = np.clip(data, 1e-12, None)
+
+    def objective(rho):
+        p = np.real(np.einsum('bkn,bn->bk', A, rho.reshape(n_sets, D2)))
+        if fixedweight:
+            return np.sum((data - p)**2/denominators, axis=1), p
+        with np.errstate(divide='ignore', invalid='ignore'):
+            f = np.where(p > 0, (data - p)**2/p, np.inf)
+        return np.sum(f, axis=1), p
+
+    def gradient(p):
+        if fixedweight:
+            df_dp = -2*(data - p)/denominators
+        else:
+            df_dp = 1 - data**2/p**2
+        grad = np.einsum('bk,bkn->bn', df_dp, np.conj(A)).reshape(n_sets, D, D)
+        return (grad + np.conj(np.swapaxes(grad, -1, -2)))/2
+
+    # start from the (scaled) identity matching the total counts
+    rho = np.broadcast_to(eye(D, dtype=complex), (n_sets, D, D))
+    p_identity = np.real(np.einsum('bkn,n->bk', A, eye(D).reshape(D2)))
+    scale = np.sum(data, axis=1)/np.sum(p_identity, axis=1)
+    rho = project(rho*scale[:, None, None])
+
+    f, p = objective(rho)
+    y, f_y, p_y = rho, f, p
+    t = np.ones(n_sets)
+    step = 1/np.clip(2*np.sum(np.abs(A)**2/denominators[..., None], axis=(1, 2)),
+                     1e-300, None)
+    for ii in range(OPT['max_iter']):
+        grad = gradient(p_y)
+        # backtracking line search
+        for _ in range(60):
+            rho_new = project(y - step[:, None, None]*grad)
+            f_new, p_new = objective(rho_new)
+            diff = rho_new - y
+            bound = (f_y + np.real(np.sum(np.conj(grad)*diff, axis=(1, 2)))
+                     + np.sum(np.abs(diff)**2, axis=(1, 2))/(2*step))
+            accepted = f_new <= bound + 1e-12*np.abs(f_y)
+            if np.all(accepted):
+                break
+            step = np.where(accepted, step, step/2)
+
+        # restart the momentum if the objective increases
+        restart = f_new > f
+        t_new = np.where(restart, 1, (1 + np.sqrt(1 + 4*t**2))/2)
+        rho_new = np.where(restart[:, None, None], rho, rho_new)
+        f_new = np.where(restart, f, f_new)
+        p_new = np.where(restart[:, None], p, p_new)
+
+        # converged if the step is small, or if a projected gradient step
+        # (without momentum) does not decrease the objective anymore
+        change = np.max(np.abs(rho_new - rho), axis=(1, 2))
+        converged = np.where(
+            restart, t == 1,
+            change <= OPT['tol']*np.max(np.abs(rho_new), axis=(1, 2)))
+
+        momentum = ((t - 1)/t_new)[:, None, None]
+        y = rho_new + momentum*(rho_new - rho)
+        if np.any(momentum):
+            f_y, p_y = objective(y)
+            # do not leave the domain of the maximum likelihood objective
+            outside = ~np.isfinite(f_y)
+            y = np.where(outside[:, None, None], rho_new, y)
+            f_y = np.where(outside, f_new, f_y)
+            p_y = np.where(outside[:, None], p_new, p_y)
+        else:
+            f_y, p_y = f_new, p_new
+        rho, f, p, t = rho_new, f_new, p_new, t_new
+        # allow the step size to grow again
+        step = step*1.1
+        if np.all(converged):
+            break
+    else:
+        if OPT['verbose']:
+            print("Maximum number of iterations reached")
+
+    if OPT['verbose']:
+        print("Finished after %d iterations, objective: %s" % (ii+1, f))
+    return rho
+
+
+def _get_batch_weights(weights, n_sets, n_data):
+    weights = np.asarray(weights, dtype=float)
+    return np.broadcast_to(weights, (n_sets, n_data))
+
+
+def tomo_state_batch(data, observables, weights, fixedweight=True, tomo_options={}):
+    '''
+    Reconstructs the density matrices of many state tomography datasets in
+    one vectorised batch, in the same way as tomo_state.
+
+    data:        (n_datasets, n_data) array of counts
+    observables: list of n_data observables (shared by all datasets)
+    weights:     (n_data) or (n_datasets, n_data) array of weights
+
+    returns a (n_datasets, d, d) array of density matrices
+    '''
+    OPT = {'verbose': False, 'normalised': False,
+           'max_iter': 20000, 'tol': 1e-10}
+    for o, a in list(tomo_options.items()):
+        OPT[o] = a
+
+    data = np.atleast_2d(np.asarray(data, dtype=float))
+    n_sets, n_data = data.shape
+    observables = np.asarray(observables, dtype=complex)
+    dim = observables.shape[-1]
+    weights = _get_batch_weights(weights, n_sets, n_data)
+
+    # p_k = weights_k*Tr(E_k rho) = weights_k*vec(E_k^T).vec(rho)
+    A = weights[..., None]*np.swapaxes(observables, -1, -2).reshape(n_data, dim**2)
+    rho = _solve_tomo_batch(data, A, _project_psd, fixedweight, OPT)
+
+    if OPT['normalised']:
+        rho = rho/np.einsum('bii->b', rho)[:, None, None]
+    return rho
+
+
+def tomo_process_batch(data, inputs, observables, weights, fixedweight=True, tomo_options={}):
+    '''
+    Reconstructs the (Choi) process matrices of many process tomography
+    datasets in one vectorised batch, in the same way as tomo_process.
+
+    data:        (n_datasets, n_data) array of counts
+    inputs:      list of n_data input states (shared by all datasets)
+    observables: list of n_data observables (shared by all datasets)
+    weights:     (n_data) or (n_datasets, n_data) array of weights
+
+    returns a (n_datasets, d**2, d**2) array of process matrices
+    '''
+    OPT = {'verbose': False, 'normalised': False,
+           'max_iter': 20000, 'tol': 1e-10}
+    for o, a in list(tomo_options.items()):
+        OPT[o] = a
+
+    data = np.atleast_2d(np.asarray(data, dtype=float))
+    n_sets, n_data = data.shape
+    observables = np.asarray(observables, dtype=complex)
+    inputs = np.asarray(inputs, dtype=complex)
+    dim = observables.shape[-1]
+    weights = _get_batch_weights(weights, n_sets, n_data)
+
+    # p_mn = d*weights_mn*Tr((R_mn^T x E_mn) rho)
+    ops = np.einsum('kab,kcd->kacbd', np.swapaxes(inputs, -1, -2),
+                    observables).reshape(n_data, dim**2, dim**2)
+    A = dim*weights[..., None]*np.swapaxes(ops, -1, -2).reshape(n_data, dim**4)
+    rho = _solve_tomo_batch(data, A, lambda r: _project_psd_tp(r, dim),
+                            fixedweight, OPT)
+
+    if OPT['normalised']:
+        rho = rho/np.einsum('bii->b', rho)[:, None, None]
+    return rho
+
+#-------------------------------------------------------------------------
+
+
 def tomo_state(data, observables, weights, filebase=None, fixedweight=True, tomo_options={}):
+    '''
+    Reconstructs a density matrix from state tomography data.
+
+    The default solver 'mle' is the in-process solver of tomo_state_batch.
+    The solvers 'csdp', 'dsdp5' and 'sdplr' write the semidefinite program
+    to a file in the directory of this module and run the external solver.
+    '''
 
     OPT = {'verbose': False, 'prettyprint': False,
-           'solver': 'csdp', 'normalised': False}
+           'solver': 'mle', 'normalised': False}
     for o, a in list(tomo_options.items()):
         OPT[o] = a
     # default option defaults
 
+    if OPT['solver'] == 'mle':
+        rho = tomo_state_batch([data], observables, [weights],
+                               fixedweight=fixedweight,
+                               tomo_options=tomo_options)[0]
+        if OPT['prettyprint']:
+            pretty_print(rho)
+        return rho
+
     if filebase is None:
         filebase = 'temp' + str(uuid.uuid4())
 
@@ -891,13 +1131,28 @@ def tomo_state(data, observables, weights, filebase=None, fixedweight=True, tomo
 
 
 def tomo_process(data, inputs, observables, weights, filebase=None, fixedweight=True, tomo_options={}):
+    '''
+    Reconstructs a (Choi) process matrix from process tomography data.
+
+    The default solver 'mle' is the in-process solver of tomo_process_batch.
+    The solvers 'csdp', 'dsdp5' and 'sdplr' write the semidefinite program
+    to a file in the directory of this module and run the external solver.
+    '''
 
     OPT = {'verbose': False, 'prettyprint': False,
-           'solver': 'csdp', 'normalised': False}
+           'solver': 'mle', 'normalised': False}
     for o, a in list(tomo_options.items()):
         OPT[o] = a
     # default option defaults
 
+    if OPT['solver'] == 'mle':
+        rho = tomo_process_batch([data], inputs, observables, [weights],
+                                 fixedweight=fixedweight,
+                                 tomo_options=tomo_options)[0]
+        if OPT['prettyprint']:
+            pretty_print(rho)
+        return rho
+
     if filebase is None:
         filebase = 'temp' + str(uuid.uuid4())
 
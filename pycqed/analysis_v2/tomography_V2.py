@@ -187,31 +187,10 @@ class TomoAnalysis():
 
         """
 
-        # If the tomography bins have zero counts, they not satisfy gaussian noise. If N>>1 then turning them into 1 fixes
-        # convergence problems without screwing the total statistics/estimate.
-        # if(np.sum(np.where(np.array(counts_tomo) == 0)) > 0):
-                # print("WARNING: Some bins contain zero counts, this violates gaussian assumptions. \n \
-                        # If correct_zero_count_bins=True these will be set to 1 to minimize errors")
-        if correct_zero_count_bins:
-            counts_tomo = np.array([[int(b) if b > 0 else  1 for b in bin_counts] for bin_counts in counts_tomo])
-
-
-        #Select the correct data based on the bins used
-        #(and therefore based on the projection operators used)
-        data = counts_tomo[:,used_bins].T.flatten()
-        #get the total number of counts per tomo
-        N = np.array([np.sum(counts_tomo, axis=1) for k in used_bins]).flatten()
-
-        # add weights based on the total number of data points kept each run
-        # N_total is a bit arbitrary but should be the average number of total counts of all runs, since in nathans code this
-        # average is estimated as a parameter.
-        weights = N/float(N_total)
-        #get the observables from the rotation operators and the bins kept(and their corresponding projection operators)
-        measurement_vectors = []
-        for k in used_bins:
-            measurement_vectors.append([m.full() for m in  self.get_measurement_vector(measurement_operators[k])])
-        measurement_vector = np.vstack(measurement_vectors)
-        # print('length of the measurement vector'len(measurement_vector))
+        data, N, weights = self._get_SDPA_data(counts_tomo, N_total, used_bins,
+                                               correct_zero_count_bins)
+        measurement_vector = self._get_SDPA_measurement_vector(
+            measurement_operators, used_bins)
         #calculate the density matrix using the csdp solver
         a = time.time()
         rho_nathan = csdp_tomo.tomo_state(data, measurement_vector, weights)
@@ -247,21 +226,59 @@ class TomoAnalysis():
         If array_like is set to true it will just return a 3D array of rhos
         """
 
-        rhos= []
+        data_runs = []
+        weights_runs = []
         for i in range(n_runs):
             #generate a data set based on multinomial distribution with means according to the measured data
             mc = [np.random.multinomial(sum(counts),(np.array(counts)+0.0) / sum(counts)) for counts in counts_tomo]
-            rhos.append(self.execute_SDPA_2qubit_tomo(measurement_operators,
-                                                      mc,
-                                                      N_total,
-                                                      used_bins,
-                                                      correct_measurement_operators,
-                                                      TE_correction_matrix=TE_correction_matrix))
+            data, N, weights = self._get_SDPA_data(mc, N_total, used_bins)
+            data_runs.append(data)
+            weights_runs.append(weights)
+        measurement_vector = self._get_SDPA_measurement_vector(
+            measurement_operators, used_bins)
+
+        # all runs are reconstructed in a single batch
+        rhos = csdp_tomo.tomo_state_batch(data_runs, measurement_vector,
+                                          weights_runs)
+        rhos = rhos / np.einsum('bii->b', rhos)[:, None, None]
 
         if array_like:
-            return np.array([rho.full() for rho in rhos])
-        else:
             return rhos
+        else:
+            return [qtp.Qobj(rho, dims=self.qt_dims) for rho in rhos]
+
+    def _get_SDPA_data(self, counts_tomo, N_total, used_bins,
+                       correct_zero_count_bins=True):
+        """
+        Returns the data, total counts and weights for the SDPA tomo
+        """
+        # If the tomography bins have zero counts, they not satisfy gaussian noise. If N>>1 then turning them into 1 fixes
+        # convergence problems without screwing the total statistics/estimate.
+        # if(np.sum(np.where(np.array(counts_tomo) == 0)) > 0):
+                # print("WARNING: Some bins contain zero counts, this violates gaussian assumptions. \n \
+                        # If correct_zero_count_bins=True these will be set to 1 to minimize errors")
+        if correct_zero_count_bins:
+            counts_tomo = np.array([[int(b) if b > 0 else  1 for b in bin_counts] for bin_counts in counts_tomo])
+        counts_tomo = np.array(counts_tomo)
+
+        #Select the correct data based on the bins used
+        #(and therefore based on the projection operators used)
+        data = counts_tomo[:,used_bins].T.flatten()
+        #get the total number of counts per tomo
+        N = np.array([np.sum(counts_tomo, axis=1) for k in used_bins]).flatten()
+
+        # add weights based on the total number of data points kept each run
+        # N_total is a bit arbitrary but should be the average number of total counts of all runs, since in nathans code this
+        # average is estimated as a parameter.
+        weights = N/float(N_total)
+        return data, N, weights
+
+    def _get_SDPA_measurement_vector(self, measurement_operators, used_bins):
+        #get the observables from the rotation operators and the bins kept(and their corresponding projection operators)
+        measurement_vectors = []
+        for k in used_bins:
+            measurement_vectors.append([m.full() for m in  self.get_measurement_vector(measurement_operators[k])])
+        return np.vstack(measurement_vectors)
 
 
 
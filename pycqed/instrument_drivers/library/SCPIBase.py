@@ -38,10 +38,22 @@ class SCPIBase:
         err_cnt = self.get_system_error_count()
         if err_cnt>0:
             log.error(f"{self._name}: Found {err_cnt} SCPI errors:")
-            for _ in range(err_cnt):
-                log.error(self.get_system_error())
+            for err in self._ask_many(['system:err?'] * err_cnt):
+                log.error(err)
             raise RuntimeError(f"{self._name}: SCPI errors found")
 
+    def batch(self):
+        """
+        Context manager that collects the commands sent to the instrument and
+        sends them in a single write, which saves a network round trip per
+        command when setting many parameters, e.g.:
+            with instr.batch():
+                for ch in range(4):
+                    instr.set_output_state(ch, True)
+        Commands are sent when the context exits or when a reply is read
+        """
+        return self._transport.batch()
+
     ##########################################################################
     # Status printing, override for instruments that extend standard status
     ##########################################################################
@@ -183,8 +195,11 @@ class SCPIBase:
         self._transport.write_binary(bin_msg)
         self._transport.write('')                  # add a Line Terminator
 
-    def bin_block_read(self) -> bytes:
+    def bin_block_read(self) -> bytearray:
         """ read IEEE488.2 binblock
+
+        The data is received directly into a newly allocated bytearray, that
+        can be wrapped without copying (e.g. using np.frombuffer)
         """
         # get and decode header
         header_a = self._transport.read_binary(2)                        # read '#N'
@@ -195,7 +210,8 @@ class SCPIBase:
         digit_cnt = int(header_a_str[1])
         header_b = self._transport.read_binary(digit_cnt)
         byte_cnt = int(header_b.decode())
-        bin_block = self._transport.read_binary(byte_cnt)
+        bin_block = bytearray(byte_cnt)
+        self._transport.read_binary_into(bin_block)
         self._transport.read_binary(2)                                  # consume <CR><LF>
         return bin_block
 
@@ -219,6 +235,15 @@ class SCPIBase:
         self._transport.write(cmd_str)
         return self._transport.readline().rstrip()  # remove trailing white space, CR, LF
 
+    def _ask_many(self, cmd_strs: List[str]) -> List[str]:
+        """
+        send all queries in a single write, and then collect the replies
+        """
+        with self._transport.batch():
+            for cmd_str in cmd_strs:
+                self._transport.write(cmd_str)
+        return [self._transport.readline().rstrip() for _ in cmd_strs]
+
     def _ask_float(self, cmd_str: str) -> float:
         return float(self._ask(cmd_str))  # FIXME: can raise ValueError
 
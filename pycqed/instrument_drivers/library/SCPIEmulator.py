@@ -0,0 +1,199 @@
+"""
+    File:       SCPIEmulator.py
+    Purpose:    local emulator of a SCPI instrument, served over TCP
+    Usage:      with SCPIEmulator() as emu:
+                    transport = IPTransport('127.0.0.1', emu.port)
+    Notes:      intended for testing drivers and benchmarking transport throughput without hardware. The emulator
+                runs an asyncio server in a background thread, and implements generic SCPI behaviour only:
+                - a setting 'CMD value' is stored and returned by 'CMD?'
+                - a binblock 'CMD arg,#<N><len><data>' is stored and returned by 'CMD? arg'
+                - the IEEE488.2 common queries and the error queue (which is always empty) are answered
+                Override handle_command() to emulate instrument specific behaviour
+    Bugs:
+    Changelog:
+
+"""
+
+import asyncio
+import logging
+import re
+import threading
+from typing import Dict, Tuple, Union
+
+log = logging.getLogger(__name__)
+
+# matches the header '#<N>' of a binblock that follows the command header or a preceding argument
+_bin_block_header = re.compile(rb'[ ,]#([1-9])')
+
+# maximum length of a received command, including binblock data
+_max_cmd_len = 64 * 1024 * 1024
+
+
+class SCPIEmulator:
+    def __init__(self,
+                 host: str = '127.0.0.1',
+                 port: int = 0,
+                 identity: str = 'QuTech,SCPIEmulator,0,0') -> None:
+        """
+        Args:
+            host: address to listen on
+            port: port to listen on, 0 selects a free port (see attribute port after start())
+            identity: reply to '*IDN?'
+        """
+        self.host = host
+        self.port = port
+        self.identity = identity
+
+        self.settings: Dict[str, str] = {}                      # lowercase command header -> value
+        self.bin_blocks: Dict[Tuple[str, str], bytes] = {}      # (lowercase command header, arguments) -> data
+        self.nr_commands = 0                                    # number of commands handled
+
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    def __enter__(self) -> 'SCPIEmulator':
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    ##########################################################################
+    # Server control
+    ##########################################################################
+
+    def start(self) -> int:
+        """
+        start serving from a background thread. Returns the port
+        """
+        if self._thread is not None:
+            return self.port
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(started,), name='SCPIEmulator', daemon=True)
+        self._thread.start()
+        started.wait()
+        if self._server is None:
+            self._thread.join()
+            self._thread = None
+            raise RuntimeError(f'SCPIEmulator: failed to listen on {self.host}:{self.port}')
+        return self.port
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    ##########################################################################
+    # Command handling, override for instrument specific behaviour
+    ##########################################################################
+
+    def handle_command(self, cmd_str: str, bin_block: bytes = None) -> Union[str, bytes, None]:
+        """
+        Args:
+            cmd_str: received command excluding line terminator (and excluding binblock, if present)
+            bin_block: binblock data that followed cmd_str, or None
+
+        Returns:
+            reply: str for a line reply, bytes for a binblock reply, None if there is no reply
+        """
+        header, _, args = cmd_str.strip().partition(' ')
+        header = header.lower()
+        args = args.strip()
+
+        if bin_block is not None:
+            self.bin_blocks[(header, args.rstrip(','))] = bin_block
+            return None
+
+        if not header.endswith('?'):
+            if header == '*rst':
+                self.settings.clear()
+                self.bin_blocks.clear()
+            elif not header.startswith('*'):
+                self.settings[header] = args
+            return None
+
+        if header == '*idn?':
+            return self.identity
+        if header == '*opc?':
+            return '1'
+        if header in ['system:error:count?', 'syst:err:coun?']:
+            return '0'
+        if header in ['system:error?', 'system:err?', 'syst:err?']:
+            return '0,"No error"'
+        if (header[:-1], args) in self.bin_blocks:
+            return self.bin_blocks[(header[:-1], args)]
+        return self.settings.get(header[:-1], '0')
+
+    ##########################################################################
+    # Private helpers
+    ##########################################################################
+
+    def _run(self, started: threading.Event) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._serve_client, self.host, self.port, limit=_max_cmd_len))
+            self.port = self._server.sockets[0].getsockname()[1]
+        except OSError:
+            log.exception('SCPIEmulator: failed to start server')
+            return
+        finally:
+            started.set()
+
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            tasks = asyncio.all_tasks(self._loop)  # clients still connected
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._server = None
+            self._loop.close()
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                bin_block = None
+                match = _bin_block_header.search(line)
+                if match is not None:
+                    # NB: the binblock data may contain '\n', so readline() may have stopped inside it
+                    digit_cnt = int(match.group(1))
+                    pos = match.end()
+                    while len(line) < pos + digit_cnt:
+                        line += await reader.readexactly(pos + digit_cnt - len(line))
+                    byte_cnt = int(line[pos:pos + digit_cnt])
+                    end = pos + digit_cnt + byte_cnt
+                    if len(line) < end + 1:
+                        line += await reader.readexactly(end + 1 - len(line))   # data and line terminator
+                    bin_block = bytes(line[pos + digit_cnt:end])
+                    line = line[:match.start() + 1]
+
+                self.nr_commands += 1
+                reply = self.handle_command(line.decode('ascii', 'replace').rstrip(), bin_block)
+                if isinstance(reply, str):
+                    writer.write(reply.encode() + b'\n')
+                elif reply is not None:
+                    byte_cnt = str(len(reply))
+                    writer.write(f'#{len(byte_cnt)}{byte_cnt}'.encode() + reply + b'\r\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # stop() while the client is still connected, return normally so asyncio does not report the task
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
@@ -10,13 +10,21 @@
 """
 
 import socket
+from contextlib import contextmanager
 
 
 class Transport:
     """
     abstract base class for data transport to instruments
+
+    Commands written inside a batch() context are collected and sent in a
+    single write_binary() when the context exits, or earlier when data is
+    read or written with write_binary(). Derived classes must call flush()
+    before reading and before sending data in write_binary().
     """
 
+    _batch = None  # list of commands collected by batch(), None if not batching
+
     def __del__(self) -> None:
         self.close()
 
@@ -24,7 +32,11 @@ class Transport:
         pass
 
     def write(self, cmd_str: str) -> None:
-        pass
+        out_str = cmd_str + '\n'
+        if self._batch is None:
+            self.write_binary(out_str.encode('ascii'))
+        else:
+            self._batch.append(out_str.encode('ascii'))
 
     def write_binary(self, data: bytes) -> None:
         pass
@@ -32,23 +44,67 @@ class Transport:
     def read_binary(self, size: int) -> bytes:
         pass
 
+    def read_binary_into(self, buffer) -> None:
+        """
+        read len(buffer) bytes into a preallocated buffer (e.g. a bytearray or
+        numpy array). Derived classes can override this to avoid copying
+        """
+        view = memoryview(buffer).cast('B')
+        data = self.read_binary(len(view))
+        view[:len(data)] = data
+
     def readline(self) -> str:
         pass
 
+    @contextmanager
+    def batch(self):
+        """
+        collect all commands written inside the context and send them in a
+        single write, e.g.:
+            with transport.batch():
+                for ch in range(4):
+                    transport.write(f'OUTPUT{ch+1}:STATE 1')
+        """
+        if self._batch is not None:  # already batching
+            yield
+            return
+        self._batch = []
+        try:
+            yield
+        finally:
+            self.flush()
+            self._batch = None
+
+    def flush(self) -> None:
+        """
+        send the commands collected by batch()
+        """
+        if self._batch:
+            data = b''.join(self._batch)
+            self._batch.clear()
+            self.write_binary(data)
+
 
 
 class IPTransport(Transport):
     """
     Based on: SCPI.py, QCoDeS::IPInstrument
+
+    Received data is kept in a persistent buffer, such that data received
+    beyond the end of a line is not lost. Binary data is received directly
+    into the destination buffer, see read_binary_into()
     """
 
     def __init__(self, host: str,
                  port: int = 5025,
                  timeout = 40.0,
-                 snd_buf_size: int = 512 * 1024) -> None:
+                 snd_buf_size: int = 512 * 1024,
+                 rcv_buf_size: int = 64 * 1024) -> None:
         """
         establish connection, e.g. IPTransport('192.168.0.16', 4000)
         """
+        self._rx_buf = bytearray()  # received data not yet consumed
+        self._rx_chunk = bytearray(rcv_buf_size)  # preallocated for recv_into
         self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self._socket.settimeout(timeout)  # first set timeout (before connect)
         self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, snd_buf_size) # beef up buffer
@@ -56,31 +112,50 @@ class IPTransport(Transport):
         self._socket.connect((host, port))
 
     def close(self) -> None:
-        self._socket.close()
-
-    def write(self, cmd_str: str) -> None:
-        out_str = cmd_str + '\n'
-        self.write_binary(out_str.encode('ascii'))
+        if hasattr(self, '_socket'):
+            self._socket.close()
 
     def write_binary(self, data: bytes) -> None:
-        exp_len = len(data)
-        act_len = 0
-        while True:
-            act_len += self._socket.send(data[act_len:exp_len])
-            if act_len == exp_len:
-                break
+        self.flush()
+        self._socket.sendall(data)
 
     def read_binary(self, size: int) -> bytes:
-        data = self._socket.recv(size)
-        act_len = len(data)
-        exp_len = size
-        while act_len != exp_len:
-            data += self._socket.recv(exp_len - act_len)
-            act_len = len(data)
-        return data
+        data = bytearray(size)
+        self.read_binary_into(data)
+        return bytes(data)
+
+    def read_binary_into(self, buffer) -> None:
+        self.flush()
+        view = memoryview(buffer).cast('B')
+        size = len(view)
+        # first use data that was already received
+        act_len = min(size, len(self._rx_buf))
+        view[:act_len] = self._rx_buf[:act_len]
+        del self._rx_buf[:act_len]
+        while act_len != size:
+            rcv_len = self._socket.recv_into(view[act_len:], size - act_len)
+            if rcv_len == 0:
+                raise ConnectionError('connection closed by instrument')
+            act_len += rcv_len
 
     def readline(self) -> str:
-        return self._socket.makefile().readline()
+        self.flush()
+        start = 0
+        while True:
+            idx = self._rx_buf.find(b'\n', start)
+            if idx >= 0:
+                break
+            start = len(self._rx_buf)
+            self._receive()
+        line = self._rx_buf[:idx+1].decode()
+        del self._rx_buf[:idx+1]
+        return line
+
+    def _receive(self) -> None:
+        rcv_len = self._socket.recv_into(self._rx_chunk)
+        if rcv_len == 0:
+            raise ConnectionError('connection closed by instrument')
+        self._rx_buf += memoryview(self._rx_chunk)[:rcv_len]
 
 
 class VisaTransport(Transport):
@@ -101,17 +176,16 @@ class FileTransport(Transport):
     def close(self) -> None:
         self._out_file.close()
 
-    def write(self, cmd_str: str) -> None:
-        out_str = cmd_str + '\n'
-        self.write_binary(out_str.encode('ascii'))
-
     def write_binary(self, data: bytes) -> None:
+        self.flush()
         self._out_file.write(data)
 
     def read_binary(self, size: int) -> bytes:
+        self.flush()
         return self._inject_data.encode('utf-8')
 
     def readline(self) -> str:
+        self.flush()
         return self._inject_data
 
     def inject(self, data: bytes) -> None:
@@ -178,6 +178,9 @@ class HAL_ShimMQ(Instrument):
                 list of qubit names that have to be prepared
         """
         log.info('Configuring readout for {}'.format(qubits))
+        # the readout instruments are shared with other qubits, which should no longer skip preparing their readout
+        for qb_name in qubits:
+            self.find_instrument(qb_name)._invalidate_prep_instruments(['ro_awg'])
         if not reduced:
             self._prep_ro_sources(qubits=qubits)
 
@@ -214,7 +217,8 @@ class HAL_ShimMQ(Instrument):
             qubits: list,
             reduced: bool = False,
             bypass_flux: bool = False,
-            prepare_for_readout: bool = True
+            prepare_for_readout: bool = True,
+            force: bool = False
     ):
         """
         Prepare setup for a time domain experiment:
@@ -222,6 +226,10 @@ class HAL_ShimMQ(Instrument):
         Args:
             qubits (list of str):
                 list of qubit names that have to be prepared
+
+            force (bool):
+                also prepare the sources and pulses of qubits that are unchanged since their last preparation,
+                see HAL_ShimSQ.prepare_for_timedomain
         """
         if prepare_for_readout:
             self.prepare_readout(qubits=qubits, reduced=reduced)
@@ -233,8 +241,8 @@ class HAL_ShimMQ(Instrument):
 
         for qb_name in qubits:
             qb = self.find_instrument(qb_name)
-            qb._prep_td_sources()
-            qb._prep_mw_pulses()
+            qb._prepare_step('td_sources', qb._prep_td_sources, force=force)
+            qb._prepare_step('mw_pulses', qb._prep_mw_pulses, force=force)
             # qb._set_mw_fine_delay(qb.mw_fine_delay())
 
         # self._prep_td_configure_VSM()
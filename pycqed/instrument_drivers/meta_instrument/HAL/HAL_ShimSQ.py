@@ -7,10 +7,14 @@ Note:   a lot code was moved around within this file in December 2021. As a cons
 """
 
 
+import time
+import fnmatch
+import hashlib
 import logging
 import warnings
 import numpy as np
 from deprecated import deprecated
+from typing import Callable
 
 
 from pycqed.instrument_drivers.meta_instrument.qubit_objects.qubit_object import Qubit
@@ -27,10 +31,97 @@ from qcodes.instrument.parameter import ManualParameter, InstrumentRefParameter
 log = logging.getLogger(__name__)
 
 
+def _hash_value(h, value) -> None:
+    """
+    Updates hash h with a (nested) parameter value, including the full contents of arrays.
+    """
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        h.update(repr((value.dtype, value.shape)).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple, np.ndarray)):
+        h.update(b'[')
+        for v in value:
+            _hash_value(h, v)
+        h.update(b']')
+    elif isinstance(value, dict):
+        h.update(b'{')
+        for k, v in value.items():
+            _hash_value(h, k)
+            _hash_value(h, v)
+        h.update(b'}')
+    else:
+        h.update(repr(value).encode())
+        h.update(b',')
+
+
 class HAL_ShimSQ(Qubit):
+    # Dependencies of the steps of prepare_for_timedomain that are skipped if nothing they depend on has changed (see
+    # _prepare_step). For each step: the prefixes of the names of the qubit parameters it depends on, and the
+    # instruments it configures, with the patterns of the names of the relevant instrument parameters (None for all,
+    # or a function of the qubit returning the patterns). Instruments are given by (a dotted path of) instrument
+    # reference parameters
+    _PREP_STEP_DEPENDENCIES = {
+        'ro_awg': (
+            ('ro_', 'cfg_qubit_nr'),
+            {
+                'instr_acquisition': ('qas_0_integration_*', 'qas_0_rotations_*', 'qas_0_deskew_*',
+                                      'qas_0_crosstalk_*', 'sigouts_*_offset', 'sigouts_*_on'),
+                'instr_LutMan_RO': None
+            }
+        ),
+        'ro_sources': (
+            ('ro_freq', 'ro_pow_LO'),
+            {
+                'instr_LO_ro': None,
+                'instr_LutMan_RO': ('LO_freq',)
+            }
+        ),
+        'td_sources': (
+            ('freq_qubit', 'mw_freq_mod', 'mw_pow_td_source'),
+            {
+                'instr_spec_source': None,
+                'instr_LO_mw': None,
+                'instr_LutMan_MW': ('cfg_sideband_mode', 'channel_I', 'channel_Q'),
+                'instr_LutMan_MW.AWG': lambda qubit: qubit._prep_mw_awg_patterns('td_sources')
+            }
+        ),
+        'mw_pulses': (
+            ('mw_', 'spec_amp', 'anharmonicity', 'freq_qubit', 'cfg_with_vsm', 'cfg_prepare_mw_awg'),
+            {
+                'instr_LutMan_MW': None,
+                'instr_LutMan_MW.AWG': lambda qubit: qubit._prep_mw_awg_patterns('mw_pulses')
+            }
+        ),
+        'td_vsm': (
+            ('mw_vsm_', 'spec_vsm_', 'freq_qubit', 'cfg_qubit_nr'),
+            {
+                'instr_VSM': None,
+                'instr_CC': ('vsm_channel_delay*',)
+            }
+        ),
+    }
+
+    # Instruments holding state that is shared between qubits and not reflected in their parameters, for each step
+    # that configures it: the readout UHFQA runs a single program with the readout pulses of all qubits on its
+    # feedline. State that is reflected in parameters, e.g. the frequency of a shared LO, or the channel offsets of a
+    # microwave AWG shared by several qubits, is covered by the fingerprints
+    _PREP_SHARED_INSTRUMENTS = {
+        'ro_awg': ('instr_acquisition',),
+    }
+
+    # Number of times each (instrument name, step) of _PREP_SHARED_INSTRUMENTS was run, by any qubit. Part of the
+    # fingerprints, so a step that reconfigures a shared instrument also invalidates that step of the other qubits
+    # using it, see _invalidate_prep_instruments
+    _prep_instr_generations = {}
+
     def __init__(self, name, **kw):
         super().__init__(name, **kw)  # FIXME: Qubit should be below us in object hierarchy, but it inherits from Instrument
 
+        # state of the incremental preparation, see _prepare_step
+        self._prep_fingerprints = {}
+        self._prep_report = {}
+        self._prep_instr_pars = {}
+
         self._add_instrument_ref_parameters()
         self._add_config_parameters()
         self._add_mw_parameters()
@@ -68,31 +159,49 @@ class HAL_ShimSQ(Qubit):
         if self.instr_spec_source_2() != None:
             self.instr_spec_source_2.get_instr().off()
 
-    def prepare_readout(self, CW=False):
+    def prepare_readout(self, CW=False, force: bool = False):
         """
         Configures the readout. Consists of the following steps
         - instantiate the relevant detector functions
         - set the microwave frequencies and sources
         - generate the RO pulse
         - set the integration weights
+
+        Steps that were already done are skipped, see prepare_for_timedomain.
         """
         if self.cfg_prepare_ro_awg():
-            self.instr_acquisition.get_instr().load_default_settings(upload_sequence=False)
-            self._prep_ro_pulse(CW=CW)
-            self._prep_ro_integration_weights()
-            self._prep_deskewing_matrix()
+            self._prepare_step('ro_awg', self._prep_ro_awg, CW, force=force)
         else:
             warnings.warn('"cfg_prepare_ro_awg" set to False, not preparing readout .')
 
-        self._prep_ro_instantiate_detectors()
-        self._prep_ro_sources()
+        self._prepare_step('ro_detectors', self._prep_ro_instantiate_detectors, force=force)
+        self._prepare_step('ro_sources', self._prep_ro_sources, force=force)
 
-    def prepare_for_timedomain(self):
-        self.prepare_readout()
-        self._prep_td_sources()
-        self._prep_mw_pulses()
+    def prepare_for_timedomain(self, force: bool = False):
+        """
+        Prepares the readout, microwave sources and pulses for a time domain experiment.
+
+        If cfg_prepare_incremental is set, a step is skipped if none of the qubit and instrument parameters it depends
+        on changed since it last completed (see _PREP_STEP_DEPENDENCIES), and no other qubit (or HAL_ShimMQ) ran the
+        same step on a shared instrument since (see _PREP_SHARED_INSTRUMENTS). Changes made to the hardware outside of the qubit objects (e.g. set
+        directly on an instrument, or from another client) are not detected, use force=True to run all steps anyway.
+        The durations of the steps are available from prepare_report().
+        """
+        t0 = time.time()
+        self.prepare_readout(force=force)
+        self._prepare_step('td_sources', self._prep_td_sources, force=force)
+        self._prepare_step('mw_pulses', self._prep_mw_pulses, force=force)
         if self.cfg_with_vsm():
-            self._prep_td_configure_VSM()
+            self._prepare_step('td_vsm', self._prep_td_configure_VSM, force=force)
+
+        skipped = [step for step, report in self._prep_report.items() if report['skipped']]
+        log.info(f"{self.name}: prepared for time domain in {time.time() - t0:.3f}s, skipped steps: {skipped}")
+
+    def prepare_report(self) -> dict:
+        """
+        Returns for each preparation step whether it was skipped the last time, and its duration in seconds.
+        """
+        return {step: dict(report) for step, report in self._prep_report.items()}
 
     @deprecated(version='0.4', reason="unused")
     def prepare_for_fluxing(self, reset=True):
@@ -364,6 +473,17 @@ class HAL_ShimSQ(Qubit):
             initial_value=True,
             parameter_class=ManualParameter)
 
+        self.add_parameter(
+            'cfg_prepare_incremental',
+            vals=vals.Bool(),
+            docstring=('If True, prepare_for_timedomain skips steps of which the parameters they depend on did not '
+                       'change since they last completed. Changes made to the instruments other than through the '
+                       'qubit objects (e.g. directly, or from another client) are not detected, so disable (or use '
+                       'prepare_for_timedomain(force=True)) when the setup is not exclusively controlled by the '
+                       'qubit objects'),
+            initial_value=True,
+            parameter_class=ManualParameter)
+
         self.add_parameter(
             'cfg_with_vsm',
             vals=vals.Bool(),
@@ -925,6 +1045,109 @@ class HAL_ShimSQ(Qubit):
         AWG = self.instr_LutMan_MW.get_instr().AWG.get_instr()
         return isinstance(AWG, QuTech_AWG_Module)  # FIXME: QuTech_AWG_Module will be replaced by QWG
 
+    ##########################################################################
+    # Private prepare functions: incremental preparation
+    ##########################################################################
+
+    def _prepare_step(self, step: str, prepare: Callable, *args, force: bool = False) -> None:
+        """
+        Calls prepare(*args), unless the fingerprint of the dependencies of the step (and args) is the same as when
+        it last completed. Steps without dependencies in _PREP_STEP_DEPENDENCIES always run.
+        """
+        t0 = time.time()
+        incremental = self.cfg_prepare_incremental() and step in self._PREP_STEP_DEPENDENCIES
+        if incremental and not force and self._prep_fingerprints.get(step) == self._prep_fingerprint(step, args):
+            self._prep_report[step] = {'skipped': True, 'duration': time.time() - t0}
+            return
+
+        # NB: the state is unknown if prepare fails
+        self._prep_fingerprints.pop(step, None)
+        try:
+            prepare(*args)
+        finally:
+            self._invalidate_prep_instruments([step])
+        if incremental:
+            self._prep_fingerprints[step] = self._prep_fingerprint(step, args)
+        self._prep_report[step] = {'skipped': False, 'duration': time.time() - t0}
+
+    def _invalidate_prep_instruments(self, steps) -> None:
+        """
+        Marks the shared instruments of the steps (see _PREP_SHARED_INSTRUMENTS) as reconfigured, such that no qubit
+        using them skips these steps the next time, e.g. after HAL_ShimMQ configured the readout of several qubits.
+        """
+        generations = HAL_ShimSQ._prep_instr_generations
+        for step in steps:
+            for ref in self._PREP_SHARED_INSTRUMENTS.get(step, ()):
+                instr = self._prep_instrument(ref)
+                if instr is not None:
+                    generations[(instr.name, step)] = generations.get((instr.name, step), 0) + 1
+
+    def _prep_instrument(self, ref: str):
+        """
+        Returns the instrument given by a dotted path of instrument reference parameters, or None if not set.
+        """
+        instr = self
+        for ref_name in ref.split('.'):
+            if instr.parameters[ref_name]() is None:
+                return None
+            instr = instr.parameters[ref_name].get_instr()
+        return instr
+
+    def _prep_step_instruments(self, step: str) -> list:
+        """
+        Returns the (instrument, patterns) of the instruments the step depends on, see _PREP_STEP_DEPENDENCIES.
+        """
+        instruments = []
+        for ref, patterns in self._PREP_STEP_DEPENDENCIES[step][1].items():
+            instr = self._prep_instrument(ref)
+            if instr is not None:
+                instruments.append((instr, patterns(self) if callable(patterns) else patterns))
+        return instruments
+
+    def _prep_mw_awg_patterns(self, step: str) -> tuple:
+        """
+        Returns the patterns of the parameters of the microwave AWG that the step sets for this qubit, i.e. those of
+        its own channels, such that qubits sharing the AWG do not invalidate each other's steps.
+        """
+        MW_LutMan = self.instr_LutMan_MW.get_instr()
+        if step == 'td_sources':
+            # see _prep_td_sources
+            channel_I = MW_LutMan.parameters['channel_I']() if 'channel_I' in MW_LutMan.parameters else None
+            if channel_I is None:
+                return ('oscs_*_freq',)
+            return ('oscs_{}_freq'.format(int(channel_I - 1) // 2),)
+
+        # see _prep_mw_pulses
+        if self._using_QWG():
+            if self.cfg_with_vsm():
+                return ('ch*_offset',)
+            return tuple('ch{}_offset'.format(int(MW_LutMan.parameters[ch]())) for ch in ['channel_I', 'channel_Q'])
+        nr_channels = 4 if self.cfg_with_vsm() else 2
+        return tuple('sigouts_{}_offset'.format(self.mw_awg_ch() - 1 + i) for i in range(nr_channels))
+
+    def _prep_fingerprint(self, step: str, args: tuple) -> str:
+        par_prefixes = self._PREP_STEP_DEPENDENCIES[step][0]
+
+        h = hashlib.sha1()
+        _hash_value(h, args)
+        for name, par in self.parameters.items():
+            if name.startswith(par_prefixes):
+                _hash_value(h, (name, par.cache.get(get_if_invalid=False)))
+
+        for instr, patterns in self._prep_step_instruments(step):
+            # NB: the parameters of an instrument do not change, so the selection is only done once
+            key = (instr.name, patterns)
+            if key not in self._prep_instr_pars:
+                self._prep_instr_pars[key] = [
+                    par for name, par in instr.parameters.items()
+                    if patterns is None or any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+                ]
+            _hash_value(h, (instr.name, HAL_ShimSQ._prep_instr_generations.get((instr.name, step), 0)))
+            for par in self._prep_instr_pars[key]:
+                _hash_value(h, (par.name, par.cache.get(get_if_invalid=False)))
+
+        return h.hexdigest()
+
     ##########################################################################
     # Private prepare functions: CW
     ##########################################################################
@@ -945,6 +1168,12 @@ class HAL_ShimSQ(Qubit):
     # Private prepare functions: ro
     ##########################################################################
 
+    def _prep_ro_awg(self, CW=False):
+        self.instr_acquisition.get_instr().load_default_settings(upload_sequence=False)
+        self._prep_ro_pulse(CW=CW)
+        self._prep_ro_integration_weights()
+        self._prep_deskewing_matrix()
+
     # FIXME: UHFQC specific
     # FIXME: deskewing matrix is shared between all connected qubits
     def _prep_deskewing_matrix(self):
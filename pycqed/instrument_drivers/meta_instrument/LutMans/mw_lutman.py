@@ -227,6 +227,11 @@ class Base_MW_LutMan(Base_LutMan):
 
     """
 
+    def __init__(self, name, **kw):
+        # envelope basis of the DRAG pulses, see _get_envelope_basis
+        self._envelope_basis_cache = {}
+        super().__init__(name, **kw)
+
     ##########################################################################
     # Base_LutMan overrides
     ##########################################################################
@@ -354,6 +359,9 @@ class Base_MW_LutMan(Base_LutMan):
         else:
             f_modulation = 0
 
+        # DRAG pulses, generated together by _generate_drag_waveforms
+        drag_pulses = OrderedDict()
+
         # lutmap is expected to obey lutmap mw schema
         for idx, waveform in self.LutMap().items():
             if waveform['type'] == 'ge':
@@ -364,26 +372,16 @@ class Base_MW_LutMan(Base_LutMan):
                 else:
                     amp = theta_to_amp(theta=waveform['theta'],
                                        amp180=self.mw_amp180())
-                self._wave_dict[idx] = self.wf_func(
-                    amp=amp,
-                    phase=waveform['phi'],
-                    sigma_length=self.mw_gauss_width(),
-                    f_modulation=f_modulation,
-                    sampling_rate=self.sampling_rate(),
-                    motzoi=self.mw_motzoi(),
-                    delay=self.pulse_delay())
+                drag_pulses[idx] = (amp, waveform['phi'], f_modulation,
+                                    self.mw_motzoi())
+                self._wave_dict[idx] = None
 
             elif waveform['type'] == 'ef':
                 amp = theta_to_amp(theta=waveform['theta'],
                                    amp180=self.mw_ef_amp180())
-                self._wave_dict[idx] = self.wf_func(
-                    amp=amp,
-                    phase=waveform['phi'],
-                    sigma_length=self.mw_gauss_width(),
-                    f_modulation=self.mw_ef_modulation(),
-                    sampling_rate=self.sampling_rate(),
-                    motzoi=0,
-                    delay=self.pulse_delay())
+                drag_pulses[idx] = (amp, waveform['phi'],
+                                    self.mw_ef_modulation(), 0)
+                self._wave_dict[idx] = None
 
             elif waveform['type'] == 'raw-drag':
                 self._wave_dict[idx] = self.wf_func(
@@ -433,10 +431,10 @@ class Base_MW_LutMan(Base_LutMan):
                 raise ValueError
 
         # Add predistortions + test
-        if (self.mixer_apply_predistortion_matrix()
-                and apply_predistortion_matrix and self.cfg_sideband_mode != 'real-time'):
-            self._wave_dict = self.apply_mixer_predistortion_corrections(
-                self._wave_dict)
+        apply_predistortion = (self.mixer_apply_predistortion_matrix()
+                and apply_predistortion_matrix and self.cfg_sideband_mode != 'real-time')
+        self._wave_dict = self._generate_drag_waveforms(
+            drag_pulses, self._wave_dict, apply_predistortion)
         return self._wave_dict
 
     # FIXME: seems to be overridden in all derived classes: remove
@@ -472,6 +470,75 @@ class Base_MW_LutMan(Base_LutMan):
             wave_dict[key] = np.dot(M, val)
         return wave_dict
 
+    def _get_envelope_basis(self, f_modulation: float, motzoi: float):
+        """
+        Returns the waveforms of the unit amplitude DRAG pulses with phase 0
+        and 90 deg, as an array of shape (2, nr_channels, nr_samples).
+
+        self.wf_func is linear in amp*exp(1j*phase), so every DRAG pulse with
+        the same envelope is a linear combination of these two waveforms. The
+        basis is cached until the envelope parameters change.
+        """
+        key = (self.wf_func, self.mw_gauss_width(), f_modulation, motzoi,
+               self.pulse_delay(), self.sampling_rate())
+        basis = self._envelope_basis_cache.get(key)
+        if basis is None:
+            basis = np.array([self.wf_func(
+                amp=1,
+                phase=phase,
+                sigma_length=self.mw_gauss_width(),
+                f_modulation=f_modulation,
+                sampling_rate=self.sampling_rate(),
+                motzoi=motzoi,
+                delay=self.pulse_delay()) for phase in [0, 90]])
+            basis.flags.writeable = False
+            if len(self._envelope_basis_cache) >= 16:
+                self._envelope_basis_cache.clear()
+            self._envelope_basis_cache[key] = basis
+        return basis
+
+    def _generate_drag_waveforms(self, drag_pulses: dict, wave_dict: dict,
+                                 apply_predistortion: bool):
+        """
+        Fills in the DRAG pulses of wave_dict, and applies the mixer
+        predistortion corrections to all waveforms if apply_predistortion.
+
+        Args:
+            drag_pulses (dict): {idx: (amp, phase, f_modulation, motzoi)} of
+                the DRAG pulses in the LutMap
+            wave_dict (dict): waveforms of the LutMap, with None for the
+                DRAG pulses
+
+        The pulses are computed per envelope, as a single batched scaling and
+        rotation of the envelope basis, such that the predistortion only has
+        to be applied to the basis.
+        """
+        envelopes = OrderedDict()
+        for idx, (amp, phase, f_modulation, motzoi) in drag_pulses.items():
+            envelopes.setdefault((f_modulation, motzoi), []).append(idx)
+
+        waves = OrderedDict((idx, wave) for idx, wave in wave_dict.items()
+                            if idx not in drag_pulses)
+        for envelope in envelopes:
+            basis = self._get_envelope_basis(*envelope)
+            waves[('basis', envelope, 0)] = basis[0]
+            waves[('basis', envelope, 1)] = basis[1]
+        if apply_predistortion:
+            waves = self.apply_mixer_predistortion_corrections(waves)
+
+        for envelope, idxs in envelopes.items():
+            basis = np.array([waves.pop(('basis', envelope, 0)),
+                              waves.pop(('basis', envelope, 1))])
+            amps = np.array([drag_pulses[idx][0] for idx in idxs])
+            phases = np.deg2rad([drag_pulses[idx][1] for idx in idxs])
+            coeffs = np.stack([amps*np.cos(phases), amps*np.sin(phases)], axis=1)
+            pulses = np.empty((len(idxs), ) + basis.shape[1:])
+            np.einsum('kb,bcn->kcn', coeffs, basis, out=pulses)
+            for idx, pulse in zip(idxs, pulses):
+                waves[idx] = pulse
+
+        return OrderedDict((idx, waves[idx]) for idx in wave_dict)
+
     def _add_mixer_corr_pars(self):
         self.add_parameter(
             'mixer_alpha',
@@ -1015,6 +1082,9 @@ class AWG8_MW_LutMan(Base_MW_LutMan):
         else:
             raise KeyError('Unexpected argument for cfg_sideband_mode')
 
+        # DRAG pulses, generated together by _generate_drag_waveforms
+        drag_pulses = OrderedDict()
+
         # lutmap is expected to obey lutmap mw schema
         for idx, waveform in self.LutMap().items():
             if waveform['type'] == 'ge':
@@ -1025,26 +1095,16 @@ class AWG8_MW_LutMan(Base_MW_LutMan):
                 else:
                     amp = theta_to_amp(theta=waveform['theta'],
                                        amp180=self.mw_amp180())
-                self._wave_dict[idx] = self.wf_func(
-                    amp=amp,
-                    phase=waveform['phi'],
-                    sigma_length=self.mw_gauss_width(),
-                    f_modulation=f_modulation,
-                    sampling_rate=self.sampling_rate(),
-                    motzoi=self.mw_motzoi(),
-                    delay=self.pulse_delay())
+                drag_pulses[idx] = (amp, waveform['phi'], f_modulation,
+                                    self.mw_motzoi())
+                self._wave_dict[idx] = None
 
             elif waveform['type'] == 'ef':
                 amp = theta_to_amp(theta=waveform['theta'],
                                    amp180=self.mw_ef_amp180())
-                self._wave_dict[idx] = self.wf_func(
-                    amp=amp,
-                    phase=waveform['phi'],
-                    sigma_length=self.mw_gauss_width(),
-                    f_modulation=self.mw_ef_modulation(),
-                    sampling_rate=self.sampling_rate(),
-                    motzoi=0,
-                    delay=self.pulse_delay())
+                drag_pulses[idx] = (amp, waveform['phi'],
+                                    self.mw_ef_modulation(), 0)
+                self._wave_dict[idx] = None
 
             elif waveform['type'] == 'raw-drag':
                 self._wave_dict[idx] = self.wf_func(
@@ -1095,10 +1155,10 @@ class AWG8_MW_LutMan(Base_MW_LutMan):
                 raise ValueError
 
         # Add predistortions + test
-        if (self.mixer_apply_predistortion_matrix() and apply_predistortion_matrix and
-          self.cfg_sideband_mode() == 'static'):
-            self._wave_dict = self.apply_mixer_predistortion_corrections(
-                self._wave_dict)
+        apply_predistortion = (self.mixer_apply_predistortion_matrix() and apply_predistortion_matrix and
+          self.cfg_sideband_mode() == 'static')
+        self._wave_dict = self._generate_drag_waveforms(
+            drag_pulses, self._wave_dict, apply_predistortion)
         return self._wave_dict
 
     ##########################################################################
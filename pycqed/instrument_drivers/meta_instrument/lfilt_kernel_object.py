@@ -7,6 +7,7 @@ It is based on the kernel_object.DistortionsKernel
 """
 import numpy as np
 import logging
+import pickle
 from scipy import signal
 from qcodes.instrument.base import Instrument
 from qcodes.utils import validators as vals
@@ -56,6 +57,12 @@ class LinDistortionKernel(Instrument):
                 vals=vals.Dict(),
             )
 
+        # Compiled filters, see compile_filters
+        self._filter_cache_key = None
+        self._filter_cache = None
+        # Real-time distortion settings last set on the AWG
+        self._realtime_settings = {}
+
     def reset_kernels(self):
         """
         Resets all kernels to an empty dict so no distortion is applied.
@@ -100,7 +107,6 @@ class LinDistortionKernel(Instrument):
         amplitude to zero. This method of disabling is used so as not to
         change the latency that is introduced.
         """
-        max_exp_filters = 5
         try:
             AWG = self.instr_AWG.get_instr()
         except Exception as e:
@@ -108,27 +114,35 @@ class LinDistortionKernel(Instrument):
             logging.warning("Could not set realtime distortions to 0, AWG not found")
             return
 
+        for par, value in self._get_unused_realtime_settings():
+            self._set_realtime_setting(AWG, par, value)
+
+    def _get_unused_realtime_settings(self):
+        """
+        Returns a list of (parameter name, value) tuples of AWG settings that
+        turn off the unused real-time distortion filters.
+        """
+        max_exp_filters = 5
+        settings = []
+        if self.cfg_awg_channel() is None:
+            return settings
+        ch = self.cfg_awg_channel() - 1
+
         # Returns a dict with filter type and number of that type
         nr_filts = self.get_number_of_realtime_filters()
 
         # set exp_filters to 0
         for i in range(max_exp_filters):
             if i >= nr_filts["rt_exp_models"]:
-                AWG.set(
-                    "sigouts_{}_precompensation_exponentials_{}_amplitude".format(
-                        self.cfg_awg_channel() - 1, i
-                    ),
-                    0,
-                )
+                settings.append((
+                    "sigouts_{}_precompensation_exponentials_{}_amplitude".format(ch, i),
+                    0))
 
         # set bounce filters to 0
         if nr_filts["rt_bounce_models"] == 0:
-            AWG.set(
-                "sigouts_{}_precompensation_bounces_{}_enable".format(
-                    self.cfg_awg_channel() - 1, 0
-                ),
-                0,
-            )
+            settings.append((
+                "sigouts_{}_precompensation_bounces_{}_enable".format(ch, 0),
+                0))
 
         # Reset
 
@@ -136,49 +150,68 @@ class LinDistortionKernel(Instrument):
         if nr_filts["rt_fir_models"] == 0:
             impulse_resp = np.zeros(40)
             impulse_resp[0] = 1
-            AWG.set(
-                "sigouts_{}_precompensation_fir_coefficients".format(
-                    self.cfg_awg_channel() - 1
-                ),
-                impulse_resp,
-            )
+            settings.append((
+                "sigouts_{}_precompensation_fir_coefficients".format(ch),
+                impulse_resp))
 
         # set bias-tee filters to 0
-        pass  # Currently broken
+        # Currently broken
+        return settings
 
-    def distort_waveform(
-        self, waveform, length_samples: int = None, inverse: bool = False
-    ):
+    def _set_realtime_setting(self, AWG, par: str, value):
         """
-        Distorts a waveform using the models specified in the Kernel Object.
+        Sets a real-time distortion setting on the AWG, unless the same value
+        was already set by this object.
+        """
+        key = (AWG.name, par)
+        if key in self._realtime_settings and np.array_equal(
+                self._realtime_settings[key], value):
+            return
+        AWG.set(par, value)
+        self._realtime_settings[key] = np.copy(value)
 
-        Args:
-            waveform (array)    : waveform to be distorted
-            lenght_samples (int): number of samples after which to cut of wf
-            inverse (bool)      : if True apply the inverse of the waveform.
+    def clear_cache(self):
+        """
+        Clears the compiled filters and the record of the real-time settings
+        set on the AWG, such that everything is recompiled and set again on the
+        next call of distort_waveform. Use this if the AWG settings have been
+        changed by something other than this object.
+        """
+        self._filter_cache_key = None
+        self._filter_cache = None
+        self._realtime_settings = {}
 
-        Return:
-            y_sig (array)       : waveform with distortion filters applied
+    def _get_filter_cache_key(self, inverse: bool) -> bytes:
+        """
+        Returns a key that changes whenever the filters that would be compiled
+        change, also when a filter dict is modified in place.
+        """
+        filters = [self.get("filter_model_{:02}".format(filt_id))
+                   for filt_id in range(self._num_models)]
+        return pickle.dumps((inverse, self.cfg_sampling_rate(),
+                             self.instr_AWG(), self.cfg_awg_channel(), filters))
 
-        N.B. The bounce correction does not have an inverse implemented
-            (June 2018) MAR
-        N.B.2 The real-time FIR also does not have an inverse implemented.
-            (May 2019) MAR
-        N.B.3 the real-time distortions are reset and set on the HDAWG every
-            time a waveform is distorted. This is a suboptimal workflow.
+    def compile_filters(self, inverse: bool = False):
+        """
+        Compiles the filter models into the chain of linear filters applied
+        in software and the settings for the real-time filters of the AWG.
+        The result is cached until any of the filter models changes.
+
+        Args:
+            inverse (bool)      : if True compile the inverse filters.
 
+        Return:
+            filters (list)      : (b, a) coefficients of the software filters,
+                                  to be applied in order using lfilter
+            rt_settings (list)  : (parameter name, value) tuples of the AWG
+                                  settings of the real-time filters
         """
-        if length_samples is not None:
-            extra_samples = length_samples - len(waveform)
-            if extra_samples >= 0:
-                y_sig = np.concatenate([waveform, np.zeros(extra_samples)])
-            else:
-                y_sig = waveform[:extra_samples]
-        else:
-            y_sig = waveform
+        key = self._get_filter_cache_key(inverse)
+        if key == self._filter_cache_key:
+            return self._filter_cache
 
-        # Specific real-time filters are turned on below
-        self.set_unused_realtime_distortions_zero()
+        filters = []
+        rt_settings = self._get_unused_realtime_settings()
         nr_real_time_exp_models = 0
         nr_real_time_hp_models = 0
         nr_real_time_bounce_models = 0
@@ -189,121 +222,141 @@ class LinDistortionKernel(Instrument):
                 pass  # dict is empty
             else:
                 model = filt["model"]
-                AWG = self.instr_AWG.get_instr()
+                real_time = "real-time" in filt.keys() and filt["real-time"]
                 if model == "high-pass":
-                    if "real-time" in filt.keys() and filt["real-time"]:
+                    if real_time:
                         # Implementation tested and found not working -MAR
                         raise NotImplementedError()
                         nr_real_time_hp_models += 1
                         if nr_real_time_hp_models > 1:
                             raise ValueError()
                     else:
-                        y_sig = kf.bias_tee_correction(
-                            y_sig,
+                        filters.append(kf.bias_tee_correction_filter(
                             sampling_rate=self.cfg_sampling_rate(),
                             inverse=inverse,
                             **filt["params"]
-                        )
+                        ))
                 elif model == "exponential":
-                    if "real-time" in filt.keys() and filt["real-time"]:
-
-                        AWG.set(
-                            "sigouts_{}_precompensation_exponentials"
-                            "_{}_timeconstant".format(
-                                self.cfg_awg_channel() - 1, nr_real_time_exp_models
-                            ),
-                            filt["params"]["tau"],
-                        )
-                        AWG.set(
-                            "sigouts_{}_precompensation_exponentials"
-                            "_{}_amplitude".format(
-                                self.cfg_awg_channel() - 1, nr_real_time_exp_models
-                            ),
-                            filt["params"]["amp"],
-                        )
-                        AWG.set(
-                            "sigouts_{}_precompensation_exponentials"
-                            "_{}_enable".format(
-                                self.cfg_awg_channel() - 1, nr_real_time_exp_models
-                            ),
-                            1,
-                        )
+                    if real_time:
+                        for par, value in [("timeconstant", filt["params"]["tau"]),
+                                           ("amplitude", filt["params"]["amp"]),
+                                           ("enable", 1)]:
+                            rt_settings.append((
+                                "sigouts_{}_precompensation_exponentials"
+                                "_{}_{}".format(
+                                    self.cfg_awg_channel() - 1, nr_real_time_exp_models, par),
+                                value))
 
                         nr_real_time_exp_models += 1
                         if nr_real_time_exp_models > 5:
                             raise ValueError()
                     else:
-                        y_sig = kf.exponential_decay_correction(
-                            y_sig,
+                        filters.append(kf.exponential_decay_correction_filter(
                             sampling_rate=self.cfg_sampling_rate(),
                             inverse=inverse,
                             **filt["params"]
-                        )
+                        ))
                 elif model == "bounce":
-                    if "real-time" in filt.keys() and filt["real-time"]:
-
-                        AWG.set(
-                            "sigouts_{}_precompensation_bounces"
-                            "_{}_delay".format(
-                                self.cfg_awg_channel() - 1, nr_real_time_bounce_models
-                            ),
-                            filt["params"]["tau"],
-                        )
-                        AWG.set(
-                            "sigouts_{}_precompensation_bounces"
-                            "_{}_amplitude".format(
-                                self.cfg_awg_channel() - 1, nr_real_time_bounce_models
-                            ),
-                            filt["params"]["amp"],
-                        )
-                        AWG.set(
-                            "sigouts_{}_precompensation_bounces"
-                            "_{}_enable".format(
-                                self.cfg_awg_channel() - 1, nr_real_time_bounce_models
-                            ),
-                            1,
-                        )
+                    if real_time:
+                        for par, value in [("delay", filt["params"]["tau"]),
+                                           ("amplitude", filt["params"]["amp"]),
+                                           ("enable", 1)]:
+                            rt_settings.append((
+                                "sigouts_{}_precompensation_bounces"
+                                "_{}_{}".format(
+                                    self.cfg_awg_channel() - 1, nr_real_time_bounce_models, par),
+                                value))
 
                         nr_real_time_bounce_models += 1
                         if nr_real_time_bounce_models > 1:
                             raise ValueError()
                     else:
-                        y_sig = kf.first_order_bounce_corr(
-                            sig=y_sig,
+                        # N.B. equivalent to kf.first_order_bounce_corr
+                        filters.append(kf.first_order_bounce_corr_filter(
                             delay=filt["params"]["tau"],
                             amp=filt["params"]["amp"],
                             awg_sample_rate=2.4e9,
-                        )
+                        ))
 
                 elif model == "FIR":
                     fir_filter_coeffs = filt["params"]["weights"]
-                    if "real-time" in filt.keys() and filt["real-time"]:
+                    if real_time:
                         if len(fir_filter_coeffs) != 40:
                             raise ValueError(
                                 "Realtime FIR filter must contain 40 weights"
                             )
                         else:
-                            AWG.set(
+                            rt_settings.append((
                                 "sigouts_{}_precompensation_fir_coefficients".format(
-                                    self.cfg_awg_channel() - 1
-                                ),
-                                fir_filter_coeffs,
-                            )
-                            AWG.set(
+                                    self.cfg_awg_channel() - 1),
+                                fir_filter_coeffs))
+                            rt_settings.append((
                                 "sigouts_{}_precompensation_fir_enable".format(
-                                    self.cfg_awg_channel() - 1
-                                ),
-                                1,
-                            )
+                                    self.cfg_awg_channel() - 1),
+                                1))
                     else:
                         if not inverse:
-                            y_sig = signal.lfilter(fir_filter_coeffs, 1, y_sig)
+                            filters.append((fir_filter_coeffs, 1))
                         elif inverse:
-                            y_sig = signal.lfilter(np.ones(1), fir_filter_coeffs, y_sig)
+                            filters.append((np.ones(1), fir_filter_coeffs))
 
                 else:
                     raise KeyError("Model {} not recognized".format(model))
 
+        self._filter_cache_key = key
+        self._filter_cache = (filters, rt_settings)
+        return self._filter_cache
+
+    def distort_waveform(
+        self, waveform, length_samples: int = None, inverse: bool = False
+    ):
+        """
+        Distorts a waveform using the models specified in the Kernel Object.
+
+        Args:
+            waveform (array)    : waveform to be distorted, a 2D array
+                                  distorts several waveforms (rows) at once
+            lenght_samples (int): number of samples after which to cut of wf
+            inverse (bool)      : if True apply the inverse of the waveform.
+
+        Return:
+            y_sig (array)       : waveform with distortion filters applied
+
+        N.B. The bounce correction does not have an inverse implemented
+            (June 2018) MAR
+        N.B.2 The real-time FIR also does not have an inverse implemented.
+            (May 2019) MAR
+        N.B.3 The filters are compiled once (see compile_filters) and the
+            real-time distortions are only set on the HDAWG when they differ
+            from the values previously set by this object.
+        """
+        y_sig = np.array(waveform, dtype=float)
+        if length_samples is not None:
+            extra_samples = length_samples - y_sig.shape[-1]
+            if extra_samples >= 0:
+                pad_width = [(0, 0)]*(y_sig.ndim - 1) + [(0, extra_samples)]
+                y_sig = np.pad(y_sig, pad_width, 'constant')
+            else:
+                y_sig = y_sig[..., :extra_samples]
+
+        filters, rt_settings = self.compile_filters(inverse=inverse)
+
+        # Specific real-time filters are turned on below
+        nr_filts = self.get_number_of_realtime_filters()
+        try:
+            AWG = self.instr_AWG.get_instr()
+        except Exception as e:
+            if any(nr_filts.values()):
+                raise
+            logging.warning(e)
+            logging.warning("Could not set realtime distortions to 0, AWG not found")
+        else:
+            for par, value in rt_settings:
+                self._set_realtime_setting(AWG, par, value)
+
+        for b, a in filters:
+            y_sig = signal.lfilter(b, a, y_sig, axis=-1)
+
         if inverse:
             y_sig /= self.cfg_gain_correction()
         else:
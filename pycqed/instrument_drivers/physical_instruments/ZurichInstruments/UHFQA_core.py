@@ -6,6 +6,7 @@
 
 import time
 import logging
+import threading
 import numpy as np
 
 import pycqed.instrument_drivers.physical_instruments.ZurichInstruments.ZI_base_instrument as zibase
@@ -71,6 +72,38 @@ class UHFQA_core(zibase.ZI_base_instrument):
     USER_REG_AVG_CNT = 3
     USER_REG_ERR_CNT = 4
 
+    # Configuration nodes that are only changed by the driver, see ZI_base_instrument.
+    # NB: the error count user register is written by the sequencer, and the
+    # enable/reset/acquired nodes are changed by the device
+    CACHED_NODES = (
+        'awgs/0/userregs/[0-3]',
+        'qas/0/correlations/*',
+        'qas/0/crosstalk/bypass',
+        'qas/0/crosstalk/rows/*/cols/*',
+        'qas/0/delay',
+        'qas/0/deskew/rows/*/cols/*',
+        'qas/0/integration/length',
+        'qas/0/integration/mode',
+        'qas/0/integration/sources/*',
+        'qas/0/integration/weights/*',
+        'qas/0/monitor/averages',
+        'qas/0/monitor/length',
+        'qas/0/result/averages',
+        'qas/0/result/length',
+        'qas/0/result/source',
+        'qas/0/rotations/*',
+        'qas/0/thresholds/*/correlation/*',
+        'qas/0/thresholds/*/level',
+    )
+    # Cached nodes that the device rounds to its resolution or clips to its range
+    CACHED_NODES_READ_BACK = (
+        'qas/0/crosstalk/rows/*/cols/*',
+        'qas/0/delay',
+        'qas/0/deskew/rows/*/cols/*',
+        'qas/0/integration/length',
+        'qas/0/rotations/*',
+    )
+
     def __init__(self,
                  name,
                  device:                  str,
@@ -102,6 +135,9 @@ class UHFQA_core(zibase.ZI_base_instrument):
         # Used for keeping track of which nodes we are monitoring for data
         self._acquisition_nodes = []
 
+        # Set to make a running acquisition_poll stop, see acquisition_abort
+        self._acquisition_abort = threading.Event()
+
         # The following members define the characteristics of the configured
         # AWG program
         self._reset_awg_program_features()
@@ -476,6 +512,8 @@ class UHFQA_core(zibase.ZI_base_instrument):
                                channels=(0, 1),
                                mode='rl', 
                                poll=True) -> None:
+        self._acquisition_abort.clear()
+
         # Define the channels to use and subscribe to them
         self._acquisition_nodes = []
 
@@ -535,6 +573,7 @@ class UHFQA_core(zibase.ZI_base_instrument):
         self.auxins_0_averaging(8)
     
     def acquisition_arm(self, single=True) -> None:
+        self._acquisition_abort.clear()
         # time.sleep(0.01)
         self.awgs_0_single(single)
         self.start()
@@ -552,17 +591,45 @@ class UHFQA_core(zibase.ZI_base_instrument):
             timeout (float): time in seconds before timeout Error is raised.
 
         """
-        data = {k: [] for k, dummy in enumerate(self._acquisition_nodes)}
+        # Preallocate the result, such that data can be filled in place
+        data = {n: np.zeros(samples) for n in range(len(self._acquisition_nodes))}
+        nr_samples = [0]*len(self._acquisition_nodes)
+
+        for chunks in self.acquisition_poll_chunks(samples, arm=arm,
+                                                   acquisition_time=acquisition_time):
+            for n, chunk in chunks.items():
+                data[n][nr_samples[n]:nr_samples[n]+len(chunk)] = chunk
+                nr_samples[n] += len(chunk)
+
+        return data
+
+    def acquisition_poll_chunks(self, samples, arm=True,
+                                acquisition_time=0.010):
+        """
+        Polls the UHFQC for data and yields the data as it arrives, such that
+        it can be processed while the acquisition continues.
+
+        Args:
+            samples (int): the expected number of samples per channel
+            arm    (bool): if true arms the acquisition, disable when you
+                           need synchronous acquisition with some external dev
+            acquisition_time (float): time in sec between polls
+
+        Yields:
+            chunks (dict): for every channel that received data during a poll,
+                           the new samples keyed by the channel index. Samples
+                           beyond the expected number are dropped.
+        """
+        nr_samples = [0]*len(self._acquisition_nodes)
 
         # Start acquisition
         if arm:
             self.acquisition_arm()
 
         # Acquire data
-        gotem = [False]*len(self._acquisition_nodes)
         accumulated_time = 0
 
-        while accumulated_time < self.timeout() and not all(gotem):
+        while accumulated_time < self.timeout() and min(nr_samples, default=samples) < samples:
             dataset = self.poll(acquisition_time)
 
             # Enable the user to interrupt long (or buggy) acquisitions
@@ -573,24 +640,33 @@ class UHFQA_core(zibase.ZI_base_instrument):
                 self.acquisition_finalize()
                 raise e
 
+            if self._acquisition_abort.is_set():
+                self.acquisition_finalize()
+                raise TimeoutError("Error: acquisition aborted, got {} of {} samples".format(
+                    min(nr_samples, default=samples), samples))
+
+            chunks = {}
             for n, p in enumerate(self._acquisition_nodes):
                 if p in dataset:
-                    for v in dataset[p]:
-                        data[n] = np.concatenate((data[n], v['vector']))
-                        if len(data[n]) >= samples:
-                            gotem[n] = True
+                    vectors = [v['vector'] for v in dataset[p]]
+                    if len(vectors) == 0 or nr_samples[n] >= samples:
+                        continue
+                    chunk = np.concatenate(vectors) if len(vectors) > 1 else np.asarray(vectors[0])
+                    chunk = chunk[:samples-nr_samples[n]]
+                    nr_samples[n] += len(chunk)
+                    chunks[n] = chunk
             accumulated_time += acquisition_time
 
-        if not all(gotem):
+            if chunks:
+                yield chunks
+
+        if min(nr_samples, default=samples) < samples:
             self.acquisition_finalize()
             for n, _c in enumerate(self._acquisition_nodes):
-                if n in data:
-                    print("\t: Channel {}: Got {} of {} samples".format(
-                          n, len(data[n]), samples))
+                print("\t: Channel {}: Got {} of {} samples".format(
+                      n, nr_samples[n], samples))
             raise TimeoutError("Error: Didn't get all results!")
 
-        return data
-
     def acquisition_get(self, samples, arm=True,
                          acquisition_time=0.010):
         """
@@ -637,6 +713,13 @@ class UHFQA_core(zibase.ZI_base_instrument):
 
         return data
 
+    def acquisition_abort(self) -> None:
+        """
+        Makes a running acquisition_poll stop at its next poll, e.g. from another thread after a timeout. The
+        request is cleared when the next acquisition is armed or initialized.
+        """
+        self._acquisition_abort.set()
+
     def acquisition_finalize(self) -> None:
         self.stop()
         self.unsubs()
@@ -1,11 +1,14 @@
 import json
 import os
 import time
+import hashlib
+import h5py
 import numpy as np
 import matplotlib.pyplot as plt
 import logging
 import re
 import copy
+import fnmatch
 from datetime import datetime
 from functools import partial
 
@@ -47,6 +50,14 @@ def gen_partner_waveform_name(ch, cw):
     return gen_waveform_name(2*(ch//2) + ((ch + 1) % 2), cw)
 
 
+def gen_waveform_hash(waveform) -> str:
+    """
+    Returns a hash of the contents of a waveform, used to detect changes.
+    """
+    data = np.ascontiguousarray(waveform, dtype=np.float64)
+    return hashlib.sha1(data.tobytes()).hexdigest()
+
+
 def merge_waveforms(chan0=None, chan1=None, marker=None):
     """
     Merges waveforms for channel 0, channel 1 and marker bits into a single
@@ -175,6 +186,10 @@ def _gen_get_cmd(dev_get_func, node_path: str):
         return dev_get_func(node_path)
     return get_cmd
 
+
+# Marks a node that is not (yet) in the node cache
+_NOT_CACHED = object()
+
 ##########################################################################
 # Exceptions
 ##########################################################################
@@ -260,6 +275,9 @@ class MockDAQServer():
         self.poll_nodes = []
         self.verbose = verbose
         self.async_nodes = []
+        # When set, result data is split into vectors of (at most) this
+        # length, emulating the many events returned by a real poll
+        self.poll_vector_length = None
 
     def awgModule(self):
         return MockAwgModule(self)
@@ -478,8 +496,13 @@ class MockDAQServer():
                 print('poll', path)
             m = re.match(r'/(\w+)/qas/0/result/data/(\d+)/wave', path)
             if m:
-                poll_data[path] = [{'vector': np.random.rand(
-                    self.getInt('/' + m.group(1) + '/qas/0/result/length'))}]
+                data = np.random.rand(
+                    self.getInt('/' + m.group(1) + '/qas/0/result/length'))
+                if self.poll_vector_length is None:
+                    poll_data[path] = [{'vector': data}]
+                else:
+                    poll_data[path] = [{'vector': data[i:i+self.poll_vector_length]}
+                                       for i in range(0, len(data), self.poll_vector_length)]
                 continue
 
             m = re.match(r'/(\w+)/qas/0/monitor/inputs/(\d+)/wave', path)
@@ -610,6 +633,138 @@ class MockAwgModule():
     def execute(self):
         pass
 
+##########################################################################
+# Waveform stores
+##########################################################################
+
+
+class ZI_waveform_store():
+    """
+    Base class for the persistent storage of the codeword waveforms of a
+    device, such that waveforms survive a restart of the driver.
+
+    Waveforms are keyed by their name (see 'gen_waveform_name'). A content
+    hash is kept for every waveform, such that writing an unchanged waveform
+    does not touch the storage.
+    """
+
+    def __init__(self, directory: str, devname: str):
+        self.directory = directory
+        self.devname = devname
+        # Hashes of the waveforms as last exported to CSV files
+        self._csv_hashes = {}
+
+    def load(self, wf_name: str):
+        """
+        Returns the stored waveform, or None if it does not exist.
+        """
+        raise NotImplementedError('Virtual method with no implementation!')
+
+    def save(self, wf_name: str, waveform) -> bool:
+        """
+        Stores a waveform. Returns False if the stored waveform was identical.
+        """
+        raise NotImplementedError('Virtual method with no implementation!')
+
+    def flush(self) -> None:
+        """
+        Makes sure all saved waveforms are written to disk.
+        """
+        pass
+
+    def get_csv_filename(self, wf_name: str) -> str:
+        return os.path.join(self.directory, self.devname + '_' + wf_name + '.csv')
+
+    def export_csv(self, wf_name: str, waveform=None) -> bool:
+        """
+        Writes a waveform to the CSV file used by the seqc compiler, unless
+        it was already exported with identical contents.
+        Returns False if the file was up-to-date.
+        """
+        if waveform is None:
+            waveform = self.load(wf_name)
+        wf_hash = gen_waveform_hash(waveform)
+        filename = self.get_csv_filename(wf_name)
+        if self._csv_hashes.get(wf_name) == wf_hash and os.path.isfile(filename):
+            return False
+        np.savetxt(filename, waveform, delimiter=",")
+        self._csv_hashes[wf_name] = wf_hash
+        return True
+
+
+class ZI_csv_waveform_store(ZI_waveform_store):
+    """
+    Stores every waveform in a separate CSV file in the LabOne waves
+    directory, as read by the seqc compiler. Slow, but the CSV files are
+    always up-to-date.
+    """
+
+    def load(self, wf_name: str):
+        filename = self.get_csv_filename(wf_name)
+        try:
+            log.debug(f"{self.devname}: reading waveform from csv '{filename}'")
+            waveform = np.genfromtxt(filename, delimiter=',')
+        except OSError as e:
+            # if the waveform does not exist yet dont raise exception
+            log.warning(e)
+            return None
+        self._csv_hashes[wf_name] = gen_waveform_hash(waveform)
+        return waveform
+
+    def save(self, wf_name: str, waveform) -> bool:
+        return self.export_csv(wf_name, waveform)
+
+
+class ZI_hdf5_waveform_store(ZI_waveform_store):
+    """
+    Stores all waveforms of a device in a single HDF5 file, with a dataset
+    per waveform. The waveforms are kept in memory, changed waveforms are
+    written to the file by 'flush'.
+
+    CSV files are only written on request using 'export_csv', i.e. when
+    they are needed by the seqc compiler.
+    """
+
+    def __init__(self, directory: str, devname: str):
+        super().__init__(directory=directory, devname=devname)
+        self.filename = os.path.join(directory, devname + '_waveforms.h5')
+        self._waveforms = {}
+        self._hashes = {}
+        self._pending = set()
+
+        if os.path.isfile(self.filename):
+            log.debug(f"{self.devname}: reading waveforms from '{self.filename}'")
+            with h5py.File(self.filename, 'r') as f:
+                for wf_name, dset in f.items():
+                    self._waveforms[wf_name] = dset[()]
+                    self._hashes[wf_name] = dset.attrs['hash']
+
+    def load(self, wf_name: str):
+        return self._waveforms.get(wf_name, None)
+
+    def save(self, wf_name: str, waveform) -> bool:
+        wf_hash = gen_waveform_hash(waveform)
+        if self._hashes.get(wf_name) == wf_hash:
+            return False
+        self._waveforms[wf_name] = np.array(waveform, dtype=np.float64)
+        self._hashes[wf_name] = wf_hash
+        self._pending.add(wf_name)
+        return True
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        log.debug(f"{self.devname}: writing {len(self._pending)} waveforms to '{self.filename}'")
+        os.makedirs(self.directory, exist_ok=True)
+        with h5py.File(self.filename, 'a') as f:
+            for wf_name in self._pending:
+                if wf_name in f:
+                    del f[wf_name]
+                dset = f.create_dataset(wf_name, data=self._waveforms[wf_name])
+                dset.attrs['hash'] = self._hashes[wf_name]
+        self._pending.clear()
+
+
 ##########################################################################
 # Class
 ##########################################################################
@@ -624,8 +779,9 @@ class ZI_base_instrument(Instrument):
     of the firmware are installed on the instrument.
 
     The base class also manages waveforms for the instruments. The waveforms
-    are kept in a table, which is kept synchronized with CSV files in the
-    awg/waves folder belonging to LabOne. The base class will select whether
+    are kept in a table, which is kept synchronized with a waveform store in the
+    awg/waves folder belonging to LabOne (see 'ZI_waveform_store'). CSV files
+    are only written when a program is compiled. The base class will select whether
     to compile and configure an instrument based on changes to the waveforms
     and to the requested AWG program. Basically, if a waveform changes length
     or if the AWG program changes, then the program will be compiled and
@@ -633,8 +789,27 @@ class ZI_base_instrument(Instrument):
     has changed, but the length is the same, then the waveform will simply
     be updated on the instrument using a a fast waveform upload technique. Again,
     this is triggered when the 'start' method is called.
+
+    Nodes that are only ever changed by the driver itself can be declared in
+    CACHED_NODES. When the node cache is enabled (see 'node_cache_enabled'),
+    the values written to and read from those nodes are cached, so reading
+    them again does not need a round trip to the server, and writing the value
+    that the device holds is skipped. Nodes for which the device may apply a
+    different value than the one written (e.g. after rounding or clipping) are
+    declared in CACHED_NODES_READ_BACK: writing those drops the cached value,
+    which is read back from the device the next time it is needed.
+    The cache assumes that this driver is the only client changing the
+    cached nodes: changes made by other clients (e.g. the LabOne user
+    interface) are not seen until the cache is invalidated.
     """
 
+    # Patterns (fnmatch style) of the node paths relative to the device, e.g.
+    # 'qas/0/result/length', that are cached. Nodes that the device, sequencer
+    # or another client can change must not be listed here.
+    CACHED_NODES = ()
+    # Patterns of the cached nodes that the device rounds or clips when written
+    CACHED_NODES_READ_BACK = ()
+
     ##########################################################################
     # Constructor
     ##########################################################################
@@ -648,6 +823,7 @@ class ZI_base_instrument(Instrument):
                  apilevel: int= 5,
                  num_codewords: int= 0,
                  awg_module: bool=True,
+                 waveform_store: str='hdf5',
                  logfile: str = None,
                  **kw) -> None:
         """
@@ -659,12 +835,26 @@ class ZI_base_instrument(Instrument):
             port            (int) the port to connect to for the ziDataServer (don't change)
             apilevel        (int) the API version level to use (don't change unless you know what you're doing)
             awg_module      (bool) create an awgModule
+            waveform_store  (str) storage used for the codeword waveforms, 'hdf5' (a single file per device)
+                            or 'csv' (a CSV file per waveform, as used by the seqc compiler)
             num_codewords   (int) the number of codeword-based waveforms to prepare
             logfile         (str) file name where all commands should be logged
         """
         t0 = time.time()
         super().__init__(name=name, **kw)
 
+        # Values written to or read from the nodes matching CACHED_NODES
+        self._node_cache = {}
+        self._node_cache_enabled = True
+        self._node_cache_stats = {'hits': 0, 'misses': 0, 'skipped_writes': 0}
+        # Nodes set in async mode, which are invalidated by asyncEnd()
+        self._async_node_paths = set()
+        # Maps full node paths to whether they are cached, and whether they are read back after a write
+        self._node_is_cached = {}
+        self._node_is_read_back = {}
+        self._cached_nodes_regex = self._compile_node_patterns(self.CACHED_NODES)
+        self._read_back_nodes_regex = self._compile_node_patterns(self.CACHED_NODES_READ_BACK)
+
         # Decide which server to use based on name
         if server == 'emulator':
             log.info(f'{device}: Connecting to mock DAQ server')
@@ -686,6 +876,7 @@ class ZI_base_instrument(Instrument):
             log.info(f'{device}: Connecting to device')
             self.daq.connectDevice(device, interface)
         self.devname = device
+        self._interface = interface
         self.devtype = self.gets('features/devtype')
 
         # We're now connected, so do some sanity checking
@@ -723,6 +914,9 @@ class ZI_base_instrument(Instrument):
             # Will hold information about all configured waveforms
             self._awg_waveforms = {}
 
+            # Persistent storage of the waveforms
+            self._waveform_store = self._create_waveform_store(waveform_store)
+
             # Asserted when AWG needs to be reconfigured
             self._awg_needs_configuration = [False]*(self._num_awgs())
             self._awg_program = [None]*(self._num_awgs())
@@ -819,6 +1013,15 @@ class ZI_base_instrument(Instrument):
             parameter_class=ManualParameter,
             vals=validators.Ints())
 
+        self.add_parameter(
+            'node_cache_enabled',
+            set_cmd=self._set_node_cache_enabled,
+            get_cmd=self._get_node_cache_enabled,
+            docstring='Enables the cache of the nodes that are only changed by this driver (see CACHED_NODES). '
+            'Only enable when this driver is the only client controlling the device, changes made by other '
+            'clients (e.g. the LabOne user interface) are not seen while the cache is enabled.',
+            vals=validators.Bool())
+
     ##########################################################################
     # Private methods
     ##########################################################################
@@ -1065,23 +1268,31 @@ class ZI_base_instrument(Instrument):
                 log.debug(f"{self.devname}: Length of waveform has changed. Flagging awg as requiring recompilation.")
                 self._awg_needs_configuration[awg_nr] = True
 
-            # Update the associated CSV file
-            log.debug(f"{self.devname}: Updating csv waveform {wf_name}, for ch{ch}, cw{cw}")
-            self._write_csv_waveform(ch=ch, cw=cw, wf_name=wf_name,
-                                     waveform=waveform)
+            # Nothing to do if the waveform did not change, so it is not uploaded again
+            if np.array_equal(waveform, self._awg_waveforms[wf_name]['waveform']):
+                log.debug(f"{self.devname}: Waveform {wf_name} unchanged, skipping update.")
+                return
+
+            # Update the associated entry in the waveform store
+            log.debug(f"{self.devname}: Updating stored waveform {wf_name}, for ch{ch}, cw{cw}")
+            self._waveform_store.save(wf_name, waveform)
 
-            # And the entry in our table and mark it for update
-            self._awg_waveforms[wf_name]['waveform'] = waveform
+            # And the entry in our table and mark it for update. NB: a copy is stored, such that modifying the
+            # array passed in and setting it again is not seen as unchanged above
+            self._awg_waveforms[wf_name]['waveform'] = np.array(waveform, copy=True)
             log.debug(f"{self.devname}: Marking waveform as dirty.")
             self._awg_waveforms[wf_name]['dirty'] = True
 
         return write_func
 
-    def _write_csv_waveform(self, ch: int, cw: int, wf_name: str, waveform) -> None:
-        filename = os.path.join(
-            self._get_awg_directory(), 'waves',
-            self.devname + '_' + wf_name + '.csv')
-        np.savetxt(filename, waveform, delimiter=",")
+    def _create_waveform_store(self, waveform_store: str) -> ZI_waveform_store:
+        directory = os.path.join(self._get_awg_directory(), 'waves')
+        if waveform_store == 'hdf5':
+            return ZI_hdf5_waveform_store(directory=directory, devname=self.devname)
+        elif waveform_store == 'csv':
+            return ZI_csv_waveform_store(directory=directory, devname=self.devname)
+        else:
+            raise ziValueError(f"Unknown waveform store '{waveform_store}', expected 'hdf5' or 'csv'")
 
     def _gen_read_waveform(self, ch, cw):
         def read_func():
@@ -1093,44 +1304,46 @@ class ZI_base_instrument(Instrument):
             log.debug(f"{self.devname}: Reading waveform {wf_name} for ch{ch} cw{cw}")
             # Check if the waveform data is in our dictionary
             if wf_name not in self._awg_waveforms:
-                log.debug(f"{self.devname}: Waveform not in self._awg_waveforms: reading from csv file.")
+                log.debug(f"{self.devname}: Waveform not in self._awg_waveforms: reading from waveform store.")
                 # Initialize elements
                 self._awg_waveforms[wf_name] = {
                     'waveform': None, 'dirty': False, 'readonly': False}
                 # Make sure everything gets recompiled
                 log.debug(f"{self.devname}: Flagging awg as requiring recompilation.")
                 self._awg_needs_configuration[awg_nr] = True
-                # It isn't, so try to read the data from CSV
-                waveform = self._read_csv_waveform(ch, cw, wf_name)
+                # It isn't, so try to read the data from the store
+                waveform = self._waveform_store.load(wf_name)
                 # Check whether  we got something
                 if waveform is None:
-                    log.debug(f"{self.devname}: Waveform CSV does not exist, initializing to zeros.")
+                    log.debug(f"{self.devname}: Stored waveform does not exist, initializing to zeros.")
                     # Nope, initialize to zeros
                     waveform = np.zeros(32)
                     self._awg_waveforms[wf_name]['waveform'] = waveform
-                    # write the CSV file
-                    self._write_csv_waveform(ch, cw, wf_name, waveform)
+                    # store the waveform
+                    self._waveform_store.save(wf_name, waveform)
                 else:
                     # Got data, update dictionary
                     self._awg_waveforms[wf_name]['waveform'] = waveform
 
             # Get the waveform data from our dictionary, which must now
-            # have the data
-            return self._awg_waveforms[wf_name]['waveform']
+            # have the data. NB: returns a copy, see write_func
+            return self._awg_waveforms[wf_name]['waveform'].copy()
 
         return read_func
 
-    def _read_csv_waveform(self, ch: int, cw: int, wf_name: str):
-        filename = os.path.join(
-            self._get_awg_directory(), 'waves',
-            self.devname + '_' + wf_name + '.csv')
-        try:
-            log.debug(f"{self.devname}: reading waveform from csv '{filename}'")
-            return np.genfromtxt(filename, delimiter=',')
-        except OSError as e:
-            # if the waveform does not exist yet dont raise exception
-            log.warning(e)
-            return None
+    def _export_csv_waveforms(self, awg_nr: int) -> None:
+        """
+        Writes the CSV files of the waveforms used by an AWG, as needed by the
+        seqc compiler. Files that are up-to-date are not rewritten.
+        """
+        t0 = time.time()
+        exported = 0
+        for wf_names in self._get_waveform_table(awg_nr):
+            for wf_name in wf_names:
+                if self._waveform_store.export_csv(wf_name, self._awg_waveforms[wf_name]['waveform']):
+                    exported += 1
+        t1 = time.time()
+        log.debug(f"{self.devname}: Exported {exported} csv waveforms for AWG {awg_nr} in {1.0e3*(t1-t0):.1f} ms")
 
     def _length_match_waveforms(self, awg_nr):
         """
@@ -1260,6 +1473,8 @@ class ZI_base_instrument(Instrument):
         """
         if self._awg_program[awg_nr] is not None:
             log.info(f"{self.devname}: Configuring AWG {awg_nr} with predefined codeword program")
+            # The compiler reads the codeword waveforms from CSV files
+            self._export_csv_waveforms(awg_nr)
             full_program = \
                 '// Start of automatically generated codeword table\n' + \
                 self._codeword_table_preamble(awg_nr) + \
@@ -1281,63 +1496,195 @@ class ZI_base_instrument(Instrument):
         if self._logfile is not None:
             self._logfile.flush()
 
+    def _set_node_cache_enabled(self, value: bool) -> None:
+        self._node_cache_enabled = value
+        self.invalidate_node_cache()
+
+    def _get_node_cache_enabled(self) -> bool:
+        return self._node_cache_enabled
+
+    @staticmethod
+    def _compile_node_patterns(patterns):
+        if not patterns:
+            return None
+        return re.compile('|'.join(fnmatch.translate(pattern.lower()) for pattern in patterns))
+
+    def _match_node(self, full_path: str, regex) -> bool:
+        prefix = '/' + self.devname.lower() + '/'
+        return (regex is not None and full_path.startswith(prefix)
+                and regex.match(full_path[len(prefix):]) is not None)
+
+    def _is_cached_node(self, full_path: str) -> bool:
+        """
+        Returns True if the node with the given full path matches CACHED_NODES.
+        """
+        is_cached = self._node_is_cached.get(full_path)
+        if is_cached is None:
+            is_cached = self._match_node(full_path, self._cached_nodes_regex)
+            self._node_is_cached[full_path] = is_cached
+        return is_cached
+
+    def _is_read_back_node(self, full_path: str) -> bool:
+        """
+        Returns True if the node with the given full path matches CACHED_NODES_READ_BACK.
+        """
+        is_read_back = self._node_is_read_back.get(full_path)
+        if is_read_back is None:
+            is_read_back = self._match_node(full_path, self._read_back_nodes_regex)
+            self._node_is_read_back[full_path] = is_read_back
+        return is_read_back
+
+    def _node_cache_lookup(self, full_path: str):
+        """
+        Returns the cached value of a node, or _NOT_CACHED if the value must be read from the device.
+        """
+        if not self._node_cache_enabled or not self._is_cached_node(full_path):
+            return _NOT_CACHED
+        value = self._node_cache.get(full_path, _NOT_CACHED)
+        if value is _NOT_CACHED:
+            self._node_cache_stats['misses'] += 1
+        else:
+            self._node_cache_stats['hits'] += 1
+        return value
+
+    def _node_cache_skip_write(self, full_path: str, value) -> bool:
+        """
+        Returns True if the node is known to hold value already, so writing it can be skipped.
+        """
+        if not self._node_cache_enabled or not self._is_cached_node(full_path):
+            return False
+        cached = self._node_cache.get(full_path, _NOT_CACHED)
+        if cached is _NOT_CACHED or full_path in self._async_node_paths:
+            return False
+        if isinstance(cached, np.ndarray):
+            skip = np.array_equal(cached, value)
+        else:
+            skip = cached == value
+        if skip:
+            self._node_cache_stats['skipped_writes'] += 1
+        return skip
+
+    def _node_cache_store(self, full_path: str, value) -> None:
+        if self._node_cache_enabled and self._is_cached_node(full_path):
+            self._node_cache[full_path] = value
+
+    def _node_cache_written(self, full_path: str, value) -> None:
+        """
+        Caches the value written to a node. The value of a node written in
+        async mode is only known after asyncEnd(), and the value applied to a
+        node in CACHED_NODES_READ_BACK is read back the next time it is read.
+        """
+        if (full_path in self._async_node_paths or not self._node_cache_enabled
+                or not self._is_cached_node(full_path) or self._is_read_back_node(full_path)):
+            self._node_cache.pop(full_path, None)
+        else:
+            self._node_cache[full_path] = value
+
     ##########################################################################
     # Public methods: node helpers
     ##########################################################################
 
     def setd(self, path, value) -> None:
+        full_path = self._get_full_path(path)
+        if self._node_cache_skip_write(full_path, value):
+            return
         self._write_cmd_to_logfile(f'daq.setDouble("{path}", {value})')
         if self._async_mode:
-            self.daq.asyncSetDouble(self._get_full_path(path), value)
+            self.daq.asyncSetDouble(full_path, value)
+            # NB: the value is only known to be set after asyncEnd()
+            self._async_node_paths.add(full_path)
         else:
-            self.daq.setDouble(self._get_full_path(path), value)
+            self.daq.setDouble(full_path, value)
+        self._node_cache_written(full_path, float(value))
 
     def getd(self, path):
-        return self.daq.getDouble(self._get_full_path(path))
+        full_path = self._get_full_path(path)
+        value = self._node_cache_lookup(full_path)
+        if value is _NOT_CACHED:
+            value = self.daq.getDouble(full_path)
+            self._node_cache_store(full_path, value)
+        return value
 
     def seti(self, path, value) -> None:
+        full_path = self._get_full_path(path)
+        if self._node_cache_skip_write(full_path, value):
+            return
         self._write_cmd_to_logfile(f'daq.setDouble("{path}", {value})')
         if self._async_mode:
-            self.daq.asyncSetInt(self._get_full_path(path), value)
+            self.daq.asyncSetInt(full_path, value)
+            self._async_node_paths.add(full_path)
         else:
-            self.daq.setInt(self._get_full_path(path), value)
+            self.daq.setInt(full_path, value)
+        self._node_cache_written(full_path, int(value))
 
     def geti(self, path):
-        return self.daq.getInt(self._get_full_path(path))
+        full_path = self._get_full_path(path)
+        value = self._node_cache_lookup(full_path)
+        if value is _NOT_CACHED:
+            value = self.daq.getInt(full_path)
+            self._node_cache_store(full_path, value)
+        return value
 
     def sets(self, path, value) -> None:
+        full_path = self._get_full_path(path)
+        if self._node_cache_skip_write(full_path, value):
+            return
         self._write_cmd_to_logfile(f'daq.setString("{path}", {value})')
         if self._async_mode:
-            self.daq.asyncSetString(self._get_full_path(path), value)
+            self.daq.asyncSetString(full_path, value)
+            self._async_node_paths.add(full_path)
         else:
-            self.daq.setString(self._get_full_path(path), value)
+            self.daq.setString(full_path, value)
+        self._node_cache_written(full_path, value)
 
     def gets(self, path):
-        return self.daq.getString(self._get_full_path(path))
+        full_path = self._get_full_path(path)
+        value = self._node_cache_lookup(full_path)
+        if value is _NOT_CACHED:
+            value = self.daq.getString(full_path)
+            self._node_cache_store(full_path, value)
+        return value
 
     def setc(self, path, value) -> None:
+        full_path = self._get_full_path(path)
+        if self._node_cache_skip_write(full_path, value):
+            return
         self._write_cmd_to_logfile(f'daq.setComplex("{path}", {value})')
-        self.daq.setComplex(self._get_full_path(path), value)
+        self.daq.setComplex(full_path, value)
+        self._node_cache_written(full_path, complex(value))
 
     def getc(self, path):
-        return self.daq.getComplex(self._get_full_path(path))
+        full_path = self._get_full_path(path)
+        value = self._node_cache_lookup(full_path)
+        if value is _NOT_CACHED:
+            value = self.daq.getComplex(full_path)
+            self._node_cache_store(full_path, value)
+        return value
 
     def setv(self, path, value) -> None:
+        full_path = self._get_full_path(path)
+        if self._node_cache_skip_write(full_path, value):
+            return
         # Handle absolute path
         # print('DEBUG::setv {} {}'.format(path,value))
         if self.use_setVector:
             # self._write_cmd_to_logfile(f'daq.setVector("{path}", np.array({np.array2string(value, separator=",")}))')
-            self.daq.setVector(self._get_full_path(path), value)
+            self.daq.setVector(full_path, value)
         else:
             self._write_cmd_to_logfile(f'daq.vectorWrite("{path}", np.array({np.array2string(value, separator=",")}))')
-            self.daq.vectorWrite(self._get_full_path(path), value)
+            self.daq.vectorWrite(full_path, value)
+        self._node_cache_written(full_path, np.array(value))
 
     def getv(self, path):
         path = self._get_full_path(path)
+        value = self._node_cache_lookup(path)
+        if value is not _NOT_CACHED:
+            return value.copy()
         value = self.daq.get(path, True, 0)
         if path not in value:
             raise ziValueError('No value returned for path ' + path)
         else:
+            self._node_cache_store(path, np.array(value[path][0]['vector']))
             return value[path][0]['vector']
 
     def getdeep(self, path, timeout=5.0):
@@ -1376,6 +1723,42 @@ class ZI_base_instrument(Instrument):
     def sync(self) -> None:
         self.daq.sync()
 
+    ##########################################################################
+    # Public methods: node cache
+    ##########################################################################
+
+    def invalidate_node_cache(self, path: str=None) -> None:
+        """
+        Forgets the cached value of a node, or of all nodes if path is None, so
+        it is read from the device the next time it is needed.
+        """
+        if path is None:
+            self._node_cache.clear()
+        else:
+            self._node_cache.pop(self._get_full_path(path), None)
+
+    def node_cache_stats(self, reset: bool=False) -> dict:
+        """
+        Returns the number of reads that were served from the cache (hits) or
+        from the device (misses), and the number of writes that were skipped
+        because the value did not change.
+        """
+        stats = dict(self._node_cache_stats, size=len(self._node_cache))
+        if reset:
+            for key in self._node_cache_stats:
+                self._node_cache_stats[key] = 0
+        return stats
+
+    def reconnect(self) -> None:
+        """
+        Connects the device to the data server again, e.g. after a power cycle.
+        The node cache is invalidated as the device state is no longer known.
+        """
+        self.invalidate_node_cache()
+        if not self._is_device_connected(self.devname):
+            log.info(f'{self.devname}: Reconnecting to device')
+            self.daq.connectDevice(self.devname, self._interface)
+
     ##########################################################################
     # Public methods
     ##########################################################################
@@ -1400,6 +1783,9 @@ class ZI_base_instrument(Instrument):
                 self._upload_updated_waveforms(awg_nr)
                 self._clear_dirty_waveforms(awg_nr)
 
+        # Make sure the waveforms survive a restart
+        self._waveform_store.flush()
+
         # Start all AWG's
         for awg_nr in range(self._num_awgs()):
             # Skip AWG's without programs
@@ -1618,3 +2004,6 @@ class ZI_base_instrument(Instrument):
     def asyncEnd(self):
         self.daq.sync()
         self._async_mode = False
+        for path in self._async_node_paths:
+            self._node_cache.pop(path, None)
+        self._async_node_paths.clear()
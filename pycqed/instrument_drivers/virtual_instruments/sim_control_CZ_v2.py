@@ -116,6 +116,14 @@ class SimControlCZ_v2(Instrument):
             initial_value=False,
         )
 
+        self.add_parameter(
+            "nr_workers",
+            docstring="Number of processes used to compute the propagators for the flux bias samples of the quasi-static flux noise. 1 computes them in the current process.",
+            parameter_class=ManualParameter,
+            vals=vals.Ints(min_value=1),
+            initial_value=1,
+        )
+
         self.add_parameter(
             "T2_scaling",
             unit="a.u.",
@@ -192,6 +200,14 @@ class SimControlCZ_v2(Instrument):
             initial_value=True,
         )
 
+        self.add_parameter(
+            "propagator_engine",
+            docstring="Engine used to compute the propagator. 'qutip': czf_v2.time_evolution_new, 'numpy': czf_v2.time_evolution_numpy, which gives the same propagator (within 1e-9) much faster.",
+            parameter_class=ManualParameter,
+            vals=vals.Enum("qutip", "numpy"),
+            initial_value="qutip",
+        )
+
         self.add_parameter(
             "look_for_minimum",
             docstring="FB: If cost_func=None, if this is False my old cost func is used, if it's True that cost func is used to power 4",
@@ -3,7 +3,12 @@ Base detector functions, i.e. Detector_Function and its first order descendents
 extracted from pycqed/measurement/detector_functions.py commit 0da380ad2adf2dc998f5effef362cdf264b87948
 """
 
+import time
+import logging
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+log = logging.getLogger(__name__)
 
 
 class Detector_Function(object):
@@ -64,6 +69,13 @@ class Detector_Function(object):
     def get_values(self):  # FIXME: only for Hard_Detector?
         pass
 
+    def abort(self):
+        """
+        Requests a running get_values to stop as soon as possible. Called from
+        another thread, e.g. after a timeout of a concurrent Multi_Detector.
+        """
+        pass
+
     def finish(self, **kw):
         pass
 
@@ -114,6 +126,8 @@ class Multi_Detector(Detector_Function):
             detectors: list,
             detector_labels: list = None,
             det_idx_prefix: bool = True,
+            concurrent: bool = False,
+            timeout: float = None,
             **kw
     ):
         """
@@ -124,9 +138,27 @@ class Multi_Detector(Detector_Function):
         detector_labels (list):
             if not None, will be used instead instead of
             "det{idx}_" as a prefix for the different channels
+        concurrent (bool):
+            if True, get_values of the child detectors is executed in
+            parallel threads, such that the total latency is the maximum
+            instead of the sum of the child latencies
+        timeout (float):
+            time in seconds to wait for each child detector in concurrent
+            mode, None waits indefinitely. Child detectors that time out are
+            asked to stop, see Detector_Function.abort
         """
         self.detectors = detectors
         self.name = 'Multi_detector'
+        self.concurrent = concurrent
+        self.timeout = timeout
+        if detector_labels is None:
+            self.detector_labels = ['det{}'.format(i) for i in range(len(detectors))]
+        else:
+            self.detector_labels = list(detector_labels)
+        # Time in seconds spent in each child detector during the last get_values
+        self.timing = {}
+        # Thread pool for concurrent mode, kept until finish
+        self._executor = None
         self.value_names = []
         self.value_units = []
         for i, detector in enumerate(detectors):
@@ -202,15 +234,61 @@ class Multi_Detector(Detector_Function):
             setattr(self.detectors[-1], attr, value)
 
     def get_values(self):
-        values_list = []
         for detector in self.detectors:
             detector.arm()
-        for detector in self.detectors:
-            new_values = detector.get_values()
-            values_list.append(new_values)
+        values_list = self._get_child_values(lambda detector: detector.get_values())
         values = np.concatenate(values_list)
         return values
 
+    def _get_child_values(self, get_values_func) -> list:
+        """
+        Calls get_values_func(detector) for every child detector, either
+        sequentially or concurrently depending on self.concurrent. The results
+        are returned in the order of self.detectors, and the time spent per
+        child detector is stored in self.timing.
+        """
+        self.timing = {}
+
+        def timed_get_values(label, detector):
+            t0 = time.time()
+            try:
+                return get_values_func(detector)
+            finally:
+                self.timing[label] = time.time() - t0
+
+        if not self.concurrent:
+            values_list = [timed_get_values(label, detector)
+                           for label, detector in zip(self.detector_labels, self.detectors)]
+        else:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=len(self.detectors))
+            t_start = time.time()
+            futures = [self._executor.submit(timed_get_values, label, detector)
+                       for label, detector in zip(self.detector_labels, self.detectors)]
+            try:
+                values_list = []
+                for label, future in zip(self.detector_labels, futures):
+                    # The timeout applies to each detector, counted from the start
+                    if self.timeout is None:
+                        remaining = None
+                    else:
+                        remaining = max(0, t_start + self.timeout - time.time())
+                    try:
+                        values_list.append(future.result(timeout=remaining))
+                    except FutureTimeoutError:
+                        raise TimeoutError(
+                            'Detector {} did not return data within {} s'.format(label, self.timeout))
+            except BaseException:
+                # Don't leave detectors acquiring in the background
+                for detector, future in zip(self.detectors, futures):
+                    if not future.cancel() and not future.done():
+                        detector.abort()
+                raise
+
+        log.debug('{}: child detector timing {}'.format(
+            self.name, ', '.join('{}: {:.3f} s'.format(k, v) for k, v in self.timing.items())))
+        return values_list
+
     def acquire_data_point(self):
         # N.B. get_values and acquire_data point are virtually identical.
         # the only reason for their existence is a historical distinction
@@ -222,7 +300,14 @@ class Multi_Detector(Detector_Function):
             values = np.append(values, new_values)
         return values
 
+    def abort(self):
+        for detector in self.detectors:
+            detector.abort()
+
     def finish(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
         for detector in self.detectors:
             detector.finish()
 
@@ -25,8 +25,6 @@ class Multi_Detector_UHF(Multi_Detector):
     """
 
     def get_values(self):
-        values_list = []
-
         # Since master (holding cc object) is first in self.detectors,
         self.detectors[0].AWG.stop()
 
@@ -41,9 +39,8 @@ class Multi_Detector_UHF(Multi_Detector):
         self.detectors[0].AWG.start()
 
         # Get data
-        for detector in self.detectors:
-            new_values = detector.get_values(arm=False, is_single_detector=False)
-            values_list.append(new_values)
+        values_list = self._get_child_values(
+            lambda detector: detector.get_values(arm=False, is_single_detector=False))
         values = np.concatenate(values_list)
         return values
 
@@ -114,6 +111,9 @@ class UHFQC_input_average_detector(Hard_Detector):
             samples=self.nr_samples, averages=self.nr_averages,
             channels=self.channels, mode='iavg')
 
+    def abort(self):
+        self.UHFQC.acquisition_abort()
+
     def finish(self):
         self.UHFQC.acquisition_finalize()
         if self.AWG is not None:
@@ -472,6 +472,9 @@ class UHFQC_integrated_average_detector(Hard_Detector):
             mode='rl'
         )
 
+    def abort(self):
+        self.UHFQC.acquisition_abort()
+
     def finish(self):
         self.UHFQC.acquisition_finalize()
 
@@ -777,6 +780,9 @@ class UHFQC_integration_logging_det(Hard_Detector):
         self.UHFQC.qas_0_result_source(self.result_logging_mode_idx)
         self.UHFQC.acquisition_initialize(samples=self.nr_shots, averages=1, channels=self.channels, mode='rl')
 
+    def abort(self):
+        self.UHFQC.acquisition_abort()
+
     def finish(self):
         if self.AWG is not None:
             self.AWG.stop()
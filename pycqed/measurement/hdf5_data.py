@@ -16,6 +16,8 @@ import h5py
 import numpy as np
 import logging
 from uncertainties import UFloat
+from pycqed.utilities.datadir_index import get_datadir_index
+from pycqed.utilities.snapshot_store import get_snapshot_store
 
 # from pycqed.utilities.general import RepresentsInt
 
@@ -88,6 +90,12 @@ class DateTimeGenerator:
             else:
                 path = os.path.join(path, tsd)
 
+            if datesubdir:
+                # Create the folder and add it to the index of the datadir
+                get_datadir_index(datadir).create_measdir(path)
+            else:
+                os.makedirs(path, exist_ok=True)
+
         return path, tsd
 
     def new_filename(self, data_obj, folder):
@@ -277,6 +285,85 @@ def write_dict_to_hdf5(
             entry_point.attrs[key] = str(item)
 
 
+def write_snapshot_to_hdf5(snapshot: dict, entry_point, store):
+    """
+    Writes a station snapshot to an hdf5 file, storing the snapshots of the
+    instruments in a SnapshotStore (see `pycqed.utilities.snapshot_store`).
+
+    For every instrument a group is created in "instruments" that contains
+    the key of the stored snapshot and the path of the store (relative to the
+    hdf5 file) as attributes. Parameters that changed with respect to the
+    stored snapshot are written in a "parameters_diff" group.
+    The snapshot is read back by `read_dict_from_hdf5`.
+
+    Args:
+        snapshot (dict): station snapshot
+        entry_point (hdf5 group.file) : location in the nested hdf5
+            structure where to write to.
+        store (SnapshotStore): store of the instrument snapshots
+    """
+    write_dict_to_hdf5(
+        {k: v for k, v in snapshot.items() if k != "instruments"},
+        entry_point=entry_point,
+    )
+    store_path = os.path.relpath(
+        store.path, os.path.dirname(os.path.abspath(entry_point.file.filename))
+    )
+    instruments_grp = entry_point.create_group("instruments")
+    for name, ins_snapshot in snapshot.get("instruments", {}).items():
+        key, parameters_diff = store.reference(name, ins_snapshot)
+        ins_grp = instruments_grp.create_group(str(name))
+        ins_grp.attrs["snapshot_ref"] = key
+        ins_grp.attrs["snapshot_store"] = store_path
+        if parameters_diff is not None:
+            write_dict_to_hdf5(
+                parameters_diff,
+                entry_point=ins_grp.create_group("parameters_diff"),
+            )
+
+
+def _read_snapshot_ref_from_hdf5(h5_group) -> dict:
+    """
+    Reads a snapshot written by `write_snapshot_to_hdf5` from the store.
+    """
+    store_path = os.path.join(
+        os.path.dirname(os.path.abspath(h5_group.file.filename)),
+        h5_group.attrs["snapshot_store"],
+    )
+    parameters_diff = None
+    if "parameters_diff" in h5_group:
+        parameters_diff = read_dict_from_hdf5({}, h5_group["parameters_diff"])
+    return get_snapshot_store(store_path).resolve(
+        h5_group.attrs["snapshot_ref"], parameters_diff
+    )
+
+
+def _get_snapshot_entry(h5_file, path: str):
+    """
+    Returns the entry at path inside a snapshot that is stored in a
+    SnapshotStore, e.g., "Snapshot/instruments/q0/parameters/freq_qubit".
+    Raises a KeyError if path does not point inside a stored snapshot.
+    """
+    parts = [p for p in path.split("/") if p]
+    for i in range(len(parts), 0, -1):
+        group_path = "/".join(parts[:i])
+        if group_path in h5_file:
+            break
+    else:
+        raise KeyError(path)
+    group = h5_file[group_path]
+    if not isinstance(group, h5py.Group) or "snapshot_ref" not in group.attrs:
+        raise KeyError(path)
+    entry = _read_snapshot_ref_from_hdf5(group)
+    for part in parts[i:]:
+        if not isinstance(entry, dict):
+            raise KeyError(path)
+        if part not in entry and RepresentsInt(part):
+            part = int(part)
+        entry = entry[part]
+    return entry
+
+
 def read_dict_from_hdf5(data_dict: dict, h5_group):
     """
     Reads a dictionary from an hdf5 file or group that was written using the
@@ -290,6 +377,11 @@ def read_dict_from_hdf5(data_dict: dict, h5_group):
         h5_group  (hdf5 group):
                 hdf5 file or group from which to read.
     """
+    if "snapshot_ref" in h5_group.attrs:
+        # Instrument snapshot that is kept in a SnapshotStore
+        data_dict.update(_read_snapshot_ref_from_hdf5(h5_group))
+        return data_dict
+
     # if 'list_type' not in h5_group.attrs:
     for key, item in h5_group.items():
         if RepresentsInt(key):
@@ -384,6 +476,11 @@ def extract_pars_from_datafile(filepath: str, param_spec: dict) -> dict:
     f = h5py.File(filepath, "r")
     with h5py.File(filepath, "r") as f:
         for par_name, par_spec in param_spec.items():
+            if par_spec[0] not in f:
+                # The entry can be part of a snapshot in a SnapshotStore
+                param_dict[par_name] = _extract_par_from_snapshot_entry(
+                    _get_snapshot_entry(f, par_spec[0]), par_spec[1])
+                continue
             entry = f[par_spec[0]]
             if par_spec[1].startswith("dset"):
                 param_dict[par_name] = entry[()]  # deprecated syntax: entry.value
@@ -406,6 +503,21 @@ def extract_pars_from_datafile(filepath: str, param_spec: dict) -> dict:
     return param_dict
 
 
+def _extract_par_from_snapshot_entry(entry, spec: str):
+    """
+    Equivalent of the parameter specifications of `extract_pars_from_datafile`
+    for an entry of a snapshot that was read from a SnapshotStore.
+    """
+    if spec.startswith("dset") or spec.startswith("group"):
+        return entry
+    elif spec.startswith("attr:all_attr"):
+        return {k: v for k, v in entry.items() if not isinstance(v, dict)}
+    elif spec.startswith("attr"):
+        return entry[spec[5:]]
+    else:
+        raise ValueError("Parameter spec `{}` not recognized".format(spec))
+
+
 def RepresentsInt(s):
     try:
         int(s)
@@ -11,6 +11,7 @@ This implements three basic filters and a rounding function
 import logging
 import textwrap
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from scipy import signal
 
 # Uses an "old-style" kernel to correct the bounce. This should be replaced
@@ -24,16 +25,27 @@ def bias_tee_correction(ysig, tau: float, sampling_rate: float=1,
     Corrects for a bias tee correction using a linear IIR filter with time
     constant tau.
     """
+    b, a = bias_tee_correction_filter(tau=tau, sampling_rate=sampling_rate,
+                                      inverse=inverse)
+    filtered_signal = signal.lfilter(b, a, ysig)
+    return filtered_signal
+
+
+def bias_tee_correction_filter(tau: float, sampling_rate: float=1,
+                               inverse: bool=False):
+    """
+    Returns the numerator and denominator (b, a) of the IIR filter used in
+    bias_tee_correction.
+    """
     # factor 2 comes from bilinear transform
     k = 2*tau*sampling_rate
     b = [1, -1]
     a = [(k+1)/k, -(k-1)/k]
 
     if inverse:
-        filtered_signal = signal.lfilter(b, a, ysig)
+        return b, a
     else:
-        filtered_signal = signal.lfilter(a, b, ysig)
-    return filtered_signal
+        return a, b
 
 
 def exponential_decay_correction(ysig, tau: float, amp: float,
@@ -46,7 +58,19 @@ def exponential_decay_correction(ysig, tau: float, amp: float,
         y = gc*(1 + amp *exp(-t/tau))
     where gc is a gain correction factor that is ignored in the corrections.
     """
+    b, a = exponential_decay_correction_filter(
+        tau=tau, amp=amp, sampling_rate=sampling_rate, inverse=inverse)
+    filtered_signal = signal.lfilter(b, a, ysig)
+    return filtered_signal
 
+
+def exponential_decay_correction_filter(tau: float, amp: float,
+                                        sampling_rate: float=1,
+                                        inverse: bool=False):
+    """
+    Returns the numerator and denominator (b, a) of the IIR filter used in
+    exponential_decay_correction.
+    """
     # alpha ~1/8 is like averaging 8 samples, sets the timescale for averaging
     # larger alphas break the approximation of the low pass filter
     # numerical instability occurs if alpha > .03
@@ -72,10 +96,9 @@ def exponential_decay_correction(ysig, tau: float, amp: float,
     # if alpha > 0.03 the filter can be unstable.
 
     if inverse:
-        filtered_signal = signal.lfilter(b, a, ysig)
+        return b, a
     else:
-        filtered_signal = signal.lfilter(a, b, ysig)
-    return filtered_signal
+        return a, b
 
 
 def bounce_correction(ysig, tau: float, amp: float,
@@ -211,17 +234,39 @@ def coef_round(value, force_bshift=None):
     return new_value
 
 
+def _path_reduce(sig, paths, func):
+    """
+    Applies func (np.sum or np.mean) to consecutive blocks of paths samples,
+    the last block may be shorter. Equivalent to evaluating func on every
+    block separately, including the floating point rounding.
+    """
+    n_full = (sig.size // paths) * paths
+    reduced = func(sig[:n_full].reshape(-1, paths), axis=1)
+    if n_full < sig.size:
+        reduced = np.append(reduced, func(sig[n_full:]))
+    return reduced
+
+
+def _ema_recursion(x, hw_alpha, acc=0.):
+    """
+    Evaluates acc[n] = acc[n-1] + hw_alpha*(x[n] - acc[n-1]) for every
+    element along the first axis of x. The recursion is evaluated
+    explicitly (rather than using signal.lfilter) to reproduce the rounding
+    of the hardware model.
+    """
+    out = np.empty(x.shape)
+    for n in range(len(x)):
+        acc = acc + hw_alpha*(x[n] - acc)
+        out[n] = acc
+    return out
+
+
 def multipath_bias_tee(sig, k, paths):
     """
     hardware friendly
     hardware friendly bias-tee (or any other AC coupling) compensation filter
     """
-    tpl = np.ones((paths, ))
-    cs = 0
-    acc = []
-    for i in np.arange(0, sig.size, paths):
-        cs = cs + np.sum(sig[i:(i+paths)])
-        acc = np.append(acc, tpl*cs)
+    acc = np.repeat(np.cumsum(_path_reduce(sig, paths, np.sum)), paths)
     return sig + 1./k * (2*acc - sig)
 
 
@@ -230,15 +275,11 @@ def multipath_filter(sig, alpha, k, paths):
     hardware friendly
     exponential moving average correction filter
     """
-    tpl = np.ones((paths, ))
     hw_alpha = alpha*float(paths)
 
-    duf = tpl * 0.
-    acc = 0
-
-    for i in np.arange(0, sig.size, paths):
-        acc = acc + hw_alpha*(np.mean(sig[i:(i+paths)]) - acc)
-        duf = np.append(duf, tpl * acc)
+    acc = _ema_recursion(_path_reduce(sig, paths, np.mean), hw_alpha)
+    # the filter output is applied with a delay of one clock cycle
+    duf = np.concatenate((np.zeros(paths), np.repeat(acc, paths)))
     duf = duf[0:sig.size]
     return sig + k * (duf - sig)
 
@@ -250,7 +291,6 @@ def multipath_filter2(sig, alpha, k, paths, ppl,
     exponential moving average correction filter with pipeline simulation
     """
 
-    tpl = np.ones((paths, ))
     hw_alpha = alpha*float(paths*ppl)
     hw_k = k
 
@@ -258,36 +298,27 @@ def multipath_filter2(sig, alpha, k, paths, ppl,
         hw_alpha = coef_round(hw_alpha)
         hw_k = coef_round(hw_k)
 
-    duf = tpl * 0.
-    # due to the pipelining, there are actually ppl interleaved filters
-    acc = np.zeros((ppl, ))
-
     # make sure our vector has a length that is a multiple of ppl*paths
     extra = int(ppl*paths*np.ceil(sig.size/ppl/paths)-sig.size)
     if extra > 0:
         sig = np.append(sig, extra*[sig[-1]])
 
     # first create an array of averaged path values
-    du = []
-    for i in np.arange(0, sig.size, paths):
-        du = np.append(du, np.mean(sig[i:(i+paths)]))
-
-    # loop through the average bases
-    for i in np.arange(0, du.size, ppl):
-        # loop through the individual sub-filters
-        for j in np.arange(0, ppl):
-            # first calculate the filter input as an average of the previous
-            # path averages
-            ss = 0
-            for l in np.arange(0, ppl):
-                if i+j-l >= 0:
-                    ss = ss + du[i+j-l]
-
-            ss = ss / float(ppl)
-            # then process it by the filter
-            acc[j] = acc[j] + hw_alpha*(ss - acc[j])
-            # and add the filter output to the signal correction vector
-            duf = np.append(duf, tpl * acc[j])
+    du = _path_reduce(sig, paths, np.mean)
+
+    # the filter input is an average of the previous ppl path averages
+    ss = np.zeros(du.size)
+    for l in range(ppl):
+        ss[l:] = ss[l:] + du[:du.size-l]
+    ss = ss / float(ppl)
+
+    # due to the pipelining, there are actually ppl interleaved filters,
+    # filter j processes every ppl-th input starting at j
+    acc = _ema_recursion(ss.reshape(-1, ppl), hw_alpha,
+                         acc=np.zeros((ppl, ))).reshape(-1)
+
+    # the filter output is applied with a delay of one clock cycle
+    duf = np.concatenate((np.zeros(paths), np.repeat(acc, paths)))
     duf = duf[0:sig.size]
     return sig + hw_k * (duf - sig)
 
@@ -312,14 +343,19 @@ def multipath_filter3(sig, alpha, k, paths, ppl,
     # pad array by ma_len samples
     sig_padded = np.concatenate((np.zeros(ma_len - 1), sig))
 
-    # reserve space for internal state variable
-    u = np.zeros(len(sig_padded))
+    # average over the last ma_len samples, avg[n] is used for u[n]
+    avg = sliding_window_view(sig_padded, ma_len)[:-1].sum(axis=-1)/ma_len
 
     # recursively apply difference equation for internal state variable
-    for n in range(ma_len, len(sig_padded)):
-        # average over the last ma_len samples
-        avg = np.sum(sig_padded[n - ma_len: n])/ma_len
-        u[n] = u[n - ma_len] + hw_alpha*(avg - u[n - ma_len])
+    # u[n] = u[n - ma_len] + hw_alpha*(avg[n] - u[n - ma_len]), which are
+    # ma_len interleaved filters starting at u[0:ma_len] = 0
+    n_rows = int(np.ceil(len(sig_padded)/ma_len))
+    avg_rows = np.zeros(n_rows*ma_len)
+    avg_rows[ma_len:len(sig_padded)] = avg[:len(sig_padded)-ma_len]
+    u = np.zeros(n_rows*ma_len)
+    u[ma_len:] = _ema_recursion(avg_rows[ma_len:].reshape(-1, ma_len),
+                                hw_alpha, acc=np.zeros(ma_len)).reshape(-1)
+    u = u[:len(sig_padded)]
 
     # when computing the output, make sure to correctly remove the padding
     y = sig + hw_k * (u[ma_len - 1:] - sig)
@@ -341,43 +377,34 @@ def first_order_bounce_corr(sig, delay, amp, awg_sample_rate,
     Returns:
         sigout: Numpy array representing the output signal of the filter
     """
-    delay_n_samples = int(round(awg_sample_rate*delay))
-    if not 1 <= delay_n_samples < bufsize - 8:
-        raise ValueError(textwrap.dedent("""
-            The maximum delay ("{}"/ {:.2f}ns)needs to be less than {:d} (bufsize-8) AWG samples to save hardware resources.
-            The delay needs to be at least 1 AWG sample.")
-            """.format(delay_n_samples, delay*1e9, bufsize - 8)))
-    if not -1 < amp < 1:
-        raise ValueError(
-            "The amplitude ({}) needs to be between -1 and 1.".format(amp))
+    delay_n_samples = _check_first_order_bounce_params(
+        delay, amp, awg_sample_rate, bufsize)
 
     # The scope sampling rate is equal to the AWG sampling rate by default.
     if scope_sample_rate is None:
         scope_sample_rate = awg_sample_rate
 
-    # Reserve buffer space for bounce compensation
-    shift_reg = np.zeros(delay_n_samples)
-
+    sig = np.asarray(sig, dtype=float)
     awg_sample_incr = awg_sample_rate/scope_sample_rate
 
-    previous_awg_sample_cnt = 0
-    present_awg_sample_cnt = 0
-
     amp_hw = coef_round(amp, force_bshift=0)
 
-    sigout = np.zeros(len(sig))
+    # Number of AWG samples that have passed after each scope sample. The
+    # accumulation is done the same way as in the hardware model.
+    awg_sample_cnt = np.cumsum(np.full(len(sig), awg_sample_incr)).astype(int)
+    previous_awg_sample_cnt = np.concatenate(([0], awg_sample_cnt[:-1]))
 
-    for i, s in enumerate(sig):
-        # Compute output signal
-        sigout[i] = s + amp_hw*shift_reg[-1]
+    # The shift register holds the last delay_n_samples AWG samples, every
+    # AWG sample holds the scope sample during which it was taken. The output
+    # uses the oldest entry, which is zero until the register is filled.
+    delayed_awg_sample = previous_awg_sample_cnt - delay_n_samples + 1
+    filled = delayed_awg_sample >= 1
+    shift_reg_out = np.zeros(len(sig))
+    shift_reg_out[filled] = sig[np.searchsorted(
+        awg_sample_cnt, delayed_awg_sample[filled], side='left')]
 
-        present_awg_sample_cnt += awg_sample_incr
-        awg_sample_diff = int(present_awg_sample_cnt) - previous_awg_sample_cnt
-        if awg_sample_diff >= 1:
-            # Update shift register with present scope sample
-            shift_reg[awg_sample_diff:] = shift_reg[:-awg_sample_diff]
-            shift_reg[:awg_sample_diff] = s*np.ones(awg_sample_diff)
-            previous_awg_sample_cnt = int(present_awg_sample_cnt)
+    # Compute output signal
+    sigout = sig + amp_hw*shift_reg_out
 
     if sim_hw_delay:
         sigout = sigdelay(sigout, int(round(8*(4+5)/awg_sample_incr)))
@@ -385,6 +412,37 @@ def first_order_bounce_corr(sig, delay, amp, awg_sample_rate,
     return sigout
 
 
+def first_order_bounce_corr_filter(delay, amp, awg_sample_rate, bufsize=256):
+    """
+    Returns the FIR filter (b, a) that is equivalent to first_order_bounce_corr
+    when the scope sample rate equals the AWG sample rate, including the
+    rounding of the amplitude.
+    """
+    delay_n_samples = _check_first_order_bounce_params(
+        delay, amp, awg_sample_rate, bufsize)
+    b = np.zeros(delay_n_samples+1)
+    b[0] = 1.0
+    b[-1] = coef_round(amp, force_bshift=0)
+    return b, [1.0]
+
+
+def _check_first_order_bounce_params(delay, amp, awg_sample_rate, bufsize):
+    """
+    Checks the parameters of the real-time bounce correction and returns
+    the delay in AWG samples.
+    """
+    delay_n_samples = int(round(awg_sample_rate*delay))
+    if not 1 <= delay_n_samples < bufsize - 8:
+        raise ValueError(textwrap.dedent("""
+            The maximum delay ("{}"/ {:.2f}ns)needs to be less than {:d} (bufsize-8) AWG samples to save hardware resources.
+            The delay needs to be at least 1 AWG sample.")
+            """.format(delay_n_samples, delay*1e9, bufsize - 8)))
+    if not -1 < amp < 1:
+        raise ValueError(
+            "The amplitude ({}) needs to be between -1 and 1.".format(amp))
+    return delay_n_samples
+
+
 # def first_order_bounce_corr_with_interpolation(sig, delay, amp, awg_sample_rate, scope_sample_rate = None, bufsize=256):
 #     """ This function simulates the real-time bounce correction.
 
@@ -1,6 +1,7 @@
 import types
 import logging
 import time
+import threading
 from deprecated import deprecated
 import numpy as np
 from collections.abc import Iterable
@@ -33,6 +34,7 @@ from pycqed.utilities.general import (
 )
 from pycqed.utilities.general import get_module_name
 from pycqed.utilities.get_default_datadir import get_default_datadir
+from pycqed.utilities.snapshot_store import get_datadir_snapshot_store
 
 # Optimizer based on adaptive sampling
 from pycqed.utilities.learner1D_minimizer import Learner1D_Minimizer
@@ -188,6 +190,86 @@ class MeasurementControl(Instrument):
             initial_value=False,
         )
 
+        self.add_parameter(
+            "cfg_dset_buffered",
+            vals=vals.Bool(),
+            docstring="When True the data is kept in an in-memory buffer "
+            "and only written to the datafile in chunks (see "
+            "`cfg_dset_flush_interval_pts` and `cfg_dset_flush_interval_time`)"
+            " and at the end of the measurement. This avoids resizing and "
+            "rewriting the hdf5 dataset for every soft sweep point.",
+            parameter_class=ManualParameter,
+            initial_value=False,
+        )
+        self.add_parameter(
+            "cfg_dset_flush_interval_pts",
+            vals=vals.MultiType(vals.Ints(1), vals.Enum(None)),
+            docstring="Number of writes after which the buffered data is "
+            "flushed to the datafile. Only used if `cfg_dset_buffered` is True.",
+            parameter_class=ManualParameter,
+            initial_value=100,
+        )
+        self.add_parameter(
+            "cfg_dset_flush_interval_time",
+            unit="s",
+            vals=vals.MultiType(vals.Numbers(min_value=0), vals.Enum(None)),
+            docstring="Time after which the buffered data is flushed to the "
+            "datafile. Only used if `cfg_dset_buffered` is True.",
+            parameter_class=ManualParameter,
+            initial_value=10,
+        )
+        self.add_parameter(
+            "cfg_dset_chunk_rows",
+            vals=vals.MultiType(vals.Ints(1), vals.Enum(None)),
+            docstring="Number of rows per hdf5 chunk of the experimental data "
+            "dataset. If None the chunk size is determined by h5py.",
+            parameter_class=ManualParameter,
+            initial_value=None,
+        )
+        self.add_parameter(
+            "cfg_dset_compression",
+            vals=vals.Enum(None, "gzip", "lzf"),
+            docstring="Compression filter used for the experimental data "
+            "dataset.",
+            parameter_class=ManualParameter,
+            initial_value=None,
+        )
+        self.add_parameter(
+            "cfg_dset_compression_opts",
+            vals=vals.MultiType(vals.Ints(0, 9), vals.Enum(None)),
+            docstring="Compression level, only used for gzip compression.",
+            parameter_class=ManualParameter,
+            initial_value=None,
+        )
+
+        self.add_parameter(
+            "cfg_snapshot_store",
+            vals=vals.Bool(),
+            docstring="When True the snapshots of the instruments are kept "
+            "in a content-addressed store in the datadir (see "
+            "`pycqed.utilities.snapshot_store`) and the datafile only holds "
+            "references to them, plus the parameters that changed since the "
+            "stored snapshot. `read_dict_from_hdf5` resolves these "
+            "references transparently.",
+            parameter_class=ManualParameter,
+            initial_value=False,
+        )
+
+        self.add_parameter(
+            "cfg_plotmon_threaded",
+            vals=vals.Bool(),
+            docstring="When True the updates of the live plot monitors "
+            "(including the interpolated 2D and adaptive plot monitors) are "
+            "prepared by a background thread every `plotting_interval`, "
+            "instead of by the acquisition loop. The acquisition loop then "
+            "only hands the newly acquired rows to the plot monitors and draws "
+            "the prepared updates (Qt does not support drawing from another "
+            "thread), such that the time per point does not depend on the "
+            "time it takes to process the data for the plots.",
+            parameter_class=ManualParameter,
+            initial_value=False,
+        )
+
         self.add_parameter(
             "instrument_monitor",
             parameter_class=ManualParameter,
@@ -203,6 +285,12 @@ class MeasurementControl(Instrument):
             initial_value=[],
         )
 
+        # In-memory copy of the data used by the plot monitors, see
+        # `_push_plotmon_rows`
+        self._plotmon_data = None
+        self._plotmon_thread = None
+        self._plotmon_lock = threading.RLock()
+
         # pyqtgraph plotting process is reused for different measurements.
         if self.live_plot_enabled():
             self._create_plot_monitor()
@@ -335,6 +423,11 @@ class MeasurementControl(Instrument):
                     self.save_exp_metadata(exp_metadata, self.data_object)
                     if "bins" in exp_metadata.keys():
                         self.plotting_bins = exp_metadata["bins"]
+                self._plotmon_data = (
+                    mch.PlotmonData(self.dset.shape[1], bins=self.plotting_bins)
+                    if self.live_plot_enabled()
+                    else None
+                )
 
                 if mode != "adaptive":
                     try:
@@ -356,6 +449,11 @@ class MeasurementControl(Instrument):
                     raise ValueError('Mode "{}" not recognized.'.format(self.mode))
             except KeyboardFinish as e:
                 print(e)
+            finally:
+                self._stop_plotmon_thread()
+                # Ensures buffered data ends up in the datafile, also when
+                # the measurement is interrupted (e.g. KeyboardInterrupt)
+                self._flush_dset()
             result = self.dset[()]
             self._get_measurement_endtime()
             self._save_MC_metadata(self.data_object)  # timing labels etc
@@ -375,11 +473,24 @@ class MeasurementControl(Instrument):
     # NB: called both from run() and _measure_2D()
     def _measure(self, *kw):
         if self.live_plot_enabled():
-            self._initialize_plot_monitor()
+            with self._plotmon_lock:
+                self._initialize_plot_monitor()
 
         for sweep_function in self.sweep_functions:
             sweep_function.prepare()
 
+        if isinstance(self.dset, mch.BufferedDataset):
+            # Preallocate the buffer for the known number of points. Some swf
+            # only know the sweep points after preparing the detector, the
+            # buffer will grow as needed then
+            try:
+                sweep_points = self.get_sweep_points()
+            except AttributeError as e:
+                log.debug("Not preallocating data buffer: {}".format(e))
+                sweep_points = None
+            if sweep_points is not None and np.ndim(sweep_points) > 0:
+                self.dset.reserve(len(sweep_points))
+
         if (
             self.sweep_functions[0].sweep_control == "soft"
             and self.detector_function.detector_control == "soft"
@@ -421,6 +532,7 @@ class MeasurementControl(Instrument):
 
         check_keyboard_interrupt()
         self._update_instrument_monitor()
+        self._stop_plotmon_thread()
         self._update_plotmon(force_update=True)
         if self.mode == "2D":
             self._update_plotmon_2D(force_update=True)
@@ -499,7 +611,8 @@ class MeasurementControl(Instrument):
                 self.adaptive_besteval_indxs = [0]
 
                 if self.live_plot_enabled() and i_af_pars > last_i_af_pars:
-                    self._initialize_plot_monitor_adaptive()
+                    with self._plotmon_lock:
+                        self._initialize_plot_monitor_adaptive()
                 last_i_af_pars = i_af_pars
 
                 self.adaptive_function = af_pars.get("adaptive_function")
@@ -662,6 +775,7 @@ class MeasurementControl(Instrument):
         self.detector_function.finish()
         check_keyboard_interrupt()
         self._update_instrument_monitor()
+        self._stop_plotmon_thread()
         self._update_plotmon(force_update=True)
         self._update_plotmon_adaptive(force_update=True)
         return
@@ -720,6 +834,7 @@ class MeasurementControl(Instrument):
                 # There are some cases where the sweep points are not
                 # specified that you don't want to crash (e.g. on -off seq)
                 pass
+        self._push_plotmon_rows(start_idx, stop_idx)
 
         check_keyboard_interrupt()
         self._update_instrument_monitor()
@@ -795,6 +910,7 @@ class MeasurementControl(Instrument):
         )
 
         self.dset[start_idx:stop_idx, :] = new_vals.astype(np.float64)
+        self._push_plotmon_rows(start_idx, stop_idx, new_vals)
         # update plotmon
         check_keyboard_interrupt()
         self._update_instrument_monitor()
@@ -876,10 +992,14 @@ class MeasurementControl(Instrument):
         """
         Deletes arrays to clean up memory and avoid memory related mistakes
         """
+        # Normally already flushed at the end of `run`, this is a no-op then
+        self._flush_dset()
+
         # this data can be plotted by enabling persist_mode
         self._persist_dat = result
         self._persist_xlabs = self.sweep_par_names
         self._persist_ylabs = self.detector_function.value_names
+        self._plotmon_data = None
 
         for attr in [
             "TwoD_array",
@@ -1056,6 +1176,8 @@ class MeasurementControl(Instrument):
             self.main_QtPlot.win.nextRow()
 
     def _update_plotmon(self, force_update=False):
+        if self._plotmon_deferred(force_update):
+            return
         # Note: plotting_max_pts takes precendence over force update
         if self.live_plot_enabled() and (
             self.dset.shape[0] < self.plotting_max_pts()
@@ -1075,35 +1197,22 @@ class MeasurementControl(Instrument):
                 ):
 
                     nr_sweep_funcs = len(self.sweep_function_names)
+                    frame = mch.PlotmonFrame()
+                    data = self._get_plotmon_data()
+                    if self.plotting_bins is not None:
+                        # used to average e.g., single shot measuremnts
+                        # can be specified in MC.run(exp_metadata['bins'])
+                        binned_data = self._plotmon_data.binned_mean()
                     for y_ind in range(len(self.detector_function.value_names)):
                         for x_ind in range(nr_sweep_funcs):
-                            x = self.dset[:, x_ind]
-                            y = self.dset[:, nr_sweep_funcs + y_ind]
+                            x = data[:, x_ind]
+                            y = data[:, nr_sweep_funcs + y_ind]
 
-                            # used to average e.g., single shot measuremnts
-                            # can be specified in MC.run(exp_metadata['bins'])
                             if self.plotting_bins is not None:
                                 x = self.plotting_bins
-                                if len(y) % len(x) != 0:
-                                    # nan's are appended if shapes do not match
-                                    missing_vals = missing_vals = int(
-                                        len(x) - len(y) % len(x)
-                                    )
-                                    y_ext = np.concatenate(
-                                        [y, np.ones(missing_vals) * np.nan]
-                                    )
-                                else:
-                                    y_ext = y
-
-                                y = np.nanmean(
-                                    y_ext.reshape(
-                                        (len(self.plotting_bins), -1), order="F"
-                                    ),
-                                    axis=1,
-                                )
+                                y = binned_data[:, nr_sweep_funcs + y_ind]
 
-                            self.curves[i]["config"]["x"] = x
-                            self.curves[i]["config"]["y"] = y
+                            frame.set(self.curves[i]["config"], x=x, y=y)
                             i += 1
 
                             if (
@@ -1123,16 +1232,14 @@ class MeasurementControl(Instrument):
                                         if self.minimize_optimization
                                         else -threshold
                                     )
-                                    self.curves_mv_thresh[x_ind]["config"]["x"] = [
-                                        min_x,
-                                        max_x,
-                                    ]
-                                    self.curves_mv_thresh[x_ind]["config"]["y"] = [
-                                        threshold,
-                                        threshold,
-                                    ]
+                                    frame.set(
+                                        self.curves_mv_thresh[x_ind]["config"],
+                                        x=[min_x, max_x],
+                                        y=[threshold, threshold],
+                                    )
                     self._mon_upd_time = time.time()
-                    self.main_QtPlot.update_plot()
+                    frame.redraw(self.main_QtPlot)
+                    self._draw_plotmon_frame(frame)
             except Exception as e:
                 log.warning(e)
 
@@ -1179,28 +1286,41 @@ class MeasurementControl(Instrument):
         Adds latest measured value to the TwoD_array and sends it
         to the QC_QtPlot.
         """
+        if self._plotmon_deferred(force_update):
+            return
         if self.live_plot_enabled():
             try:
-                i = int((self.iteration) % (self.xlen * self.ylen))
-                x_ind = int(i % self.xlen)
-                y_ind = int(i / self.xlen)
-                for j in range(len(self.detector_function.value_names)):
-                    z_ind = len(self.sweep_functions) + j
-                    self.TwoD_array[y_ind, x_ind, j] = self.dset[i, z_ind]
-                self.secondary_QtPlot.traces[j]["config"]["z"] = self.TwoD_array[
-                    :, :, j
-                ]
                 if (
                     time.time() - self.time_last_2Dplot_update
                     > self.plotting_interval()
                     or self.iteration == len(self.sweep_points)
                     or force_update
                 ):
+                    frame = mch.PlotmonFrame()
+                    self._fill_plotmon_2D_array(frame)
                     self.time_last_2Dplot_update = time.time()
-                    self.secondary_QtPlot.update_plot()
+                    frame.redraw(self.secondary_QtPlot)
+                    self._draw_plotmon_frame(frame)
             except Exception as e:
                 log.warning(e)
 
+    def _fill_plotmon_2D_array(self, frame):
+        """
+        Copies the rows acquired since the last call into the TwoD_array
+        and sets it as the data shown by the plotmon_2D in `frame`.
+        """
+        data = self._get_plotmon_data()
+        rows = self._plotmon_data.get_changed_rows("2D")
+        idxs = np.arange(rows.start, rows.stop) % (self.xlen * self.ylen)
+        nr_sweep_funcs = len(self.sweep_functions)
+        self.TwoD_array[idxs // self.xlen, idxs % self.xlen, :] = data[
+            rows, nr_sweep_funcs:
+        ]
+        for j in range(len(self.detector_function.value_names)):
+            frame.set(
+                self.secondary_QtPlot.traces[j]["config"], z=self.TwoD_array[:, :, j]
+            )
+
     def _initialize_plot_monitor_2D_interp(self, ld=0):
         """
         Initialize a 2D plot monitor for interpolated (adaptive) plots
@@ -1284,6 +1404,8 @@ class MeasurementControl(Instrument):
         """
         Updates the interpolated 2D heatmap
         """
+        if self._plotmon_deferred(force_update):
+            return
         if self.live_plot_enabled() and len(self.sweep_function_names) == 2:
             try:
                 if (
@@ -1295,11 +1417,13 @@ class MeasurementControl(Instrument):
                     # exists to force reset the x- and y-axis scale
                     new_sc = TransformState(0, 1, True)
 
-                    x_vals = self.dset[:, 0]
-                    y_vals = self.dset[:, 1]
+                    frame = mch.PlotmonFrame()
+                    data = self._get_plotmon_data()
+                    x_vals = data[:, 0]
+                    y_vals = data[:, 1]
                     for j in range(len(self.detector_function.value_names)):
                         z_ind = len(self.sweep_functions) + j
-                        z_vals = self.dset[:, z_ind]
+                        z_vals = data[:, z_ind]
 
                         # Interpolate points
                         x_grid, y_grid, z_grid = interpolate_heatmap(
@@ -1307,30 +1431,29 @@ class MeasurementControl(Instrument):
                         )
                         # trace = self.secondary_QtPlot.traces[j]
                         trace = self.im_plots[j]
-                        trace["config"]["x"] = x_grid
-                        trace["config"]["y"] = y_grid
-                        trace["config"]["z"] = z_grid
+                        frame.set(trace["config"], x=x_grid, y=y_grid, z=z_grid)
                         # force rescale the axes
-                        trace["plot_object"]["scales"]["x"] = new_sc
-                        trace["plot_object"]["scales"]["y"] = new_sc
+                        frame.set(trace["plot_object"]["scales"], x=new_sc, y=new_sc)
 
                         # Mark all measured points on which the interpolation
                         # is based
                         trace = self.im_plot_scatters[j]
-                        trace["config"]["x"] = x_vals
-                        trace["config"]["y"] = y_vals
+                        frame.set(trace["config"], x=x_vals, y=y_vals)
                         # Mark the last sampled points
                         pnts_num = 4
                         if len(x_vals) > pnts_num:
                             trace = self.im_plot_scatters_last[j]
-                            trace["config"]["x"] = x_vals[-pnts_num:]
-                            trace["config"]["y"] = y_vals[-pnts_num:]
+                            frame.set(
+                                trace["config"],
+                                x=x_vals[-pnts_num:],
+                                y=y_vals[-pnts_num:],
+                            )
                         trace = self.im_plot_scatters_last_one[j]
-                        trace["config"]["x"] = x_vals[-1:]
-                        trace["config"]["y"] = y_vals[-1:]
+                        frame.set(trace["config"], x=x_vals[-1:], y=y_vals[-1:])
 
                     self.time_last_2Dplot_update = time.time()
-                    self.secondary_QtPlot.update_plot()
+                    frame.redraw(self.secondary_QtPlot)
+                    self._draw_plotmon_frame(frame)
             except Exception as e:
                 log.warning(e)
 
@@ -1475,6 +1598,8 @@ class MeasurementControl(Instrument):
                     self.iter_mv_threshold = iter_plotmon.traces[-1]
 
     def _update_plotmon_adaptive(self, force_update=False):
+        if self._plotmon_deferred(force_update):
+            return
         if self.CMA_detected:
             return self._update_plotmon_adaptive_cma(force_update=force_update)
         else:
@@ -1489,34 +1614,37 @@ class MeasurementControl(Instrument):
                     sweep_functions_num = len(self.sweep_functions)
                     detector_function_num = len(self.detector_function.value_names)
 
-                    # In case the dset is not complete yet
-                    # besteval_idxs = np.array(self.adaptive_besteval_indxs)
-                    len_dset = len(self.dset)
-                    # besteval_idxs = besteval_idxs[besteval_idxs < len(self.dset)]
+                    frame = mch.PlotmonFrame()
+                    data = self._get_plotmon_data()
+                    len_dset = len(data)
+                    # In case the data is not complete yet
+                    besteval_idxs = np.array(self.adaptive_besteval_indxs)
+                    besteval_idxs = besteval_idxs[besteval_idxs < len_dset]
                     # Update parameters' iterations
                     for k in range(sweep_functions_num):
-                        y = self.dset[:, k]
+                        y = data[:, k]
                         x = range(len_dset)
-                        besteval_idxs = np.array(self.adaptive_besteval_indxs)
                         y_besteval = y[besteval_idxs]
-                        self.iter_traces[k]["config"]["x"] = x
-                        self.iter_traces[k]["config"]["y"] = y
-                        self.iter_bever_x_traces[k]["config"]["x"] = besteval_idxs
-                        self.iter_bever_x_traces[k]["config"]["y"] = y_besteval
+                        frame.set(self.iter_traces[k]["config"], x=x, y=y)
+                        frame.set(
+                            self.iter_bever_x_traces[k]["config"],
+                            x=besteval_idxs,
+                            y=y_besteval,
+                        )
                         self.time_last_ad_plot_update = time.time()
-                    self.secondary_QtPlot.update_plot()
 
                     for j in range(detector_function_num):
                         y_ind = sweep_functions_num + j
-                        y = self.dset[:, y_ind]
+                        y = data[:, y_ind]
                         x = range(len_dset)
-                        besteval_idxs = np.array(self.adaptive_besteval_indxs)
                         y_besteval = y[besteval_idxs]
                         iter_traces_idx = j + sweep_functions_num
-                        self.iter_traces[iter_traces_idx]["config"]["x"] = x
-                        self.iter_traces[iter_traces_idx]["config"]["y"] = y
-                        self.iter_bever_traces[j]["config"]["x"] = besteval_idxs
-                        self.iter_bever_traces[j]["config"]["y"] = y_besteval
+                        frame.set(self.iter_traces[iter_traces_idx]["config"], x=x, y=y)
+                        frame.set(
+                            self.iter_bever_traces[j]["config"],
+                            x=besteval_idxs,
+                            y=y_besteval,
+                        )
                         if self.Learner_Minimizer_detected:
                             # We want just a line from the first pnt to the last
                             threshold = (
@@ -1530,16 +1658,14 @@ class MeasurementControl(Instrument):
                                     if self.minimize_optimization
                                     else -threshold
                                 )
-                                self.iter_mv_threshold["config"]["x"] = [
-                                    0,
-                                    len_dset - 1,
-                                ]
-                                self.iter_mv_threshold["config"]["y"] = [
-                                    threshold,
-                                    threshold,
-                                ]
+                                frame.set(
+                                    self.iter_mv_threshold["config"],
+                                    x=[0, len_dset - 1],
+                                    y=[threshold, threshold],
+                                )
                         self.time_last_ad_plot_update = time.time()
-                    self.secondary_QtPlot.update_plot()
+                    frame.redraw(self.secondary_QtPlot)
+                    self._draw_plotmon_frame(frame)
             except Exception as e:
                 log.warning(e)
         self._update_plotmon_2D_interp(force_update=force_update)
@@ -1781,6 +1907,8 @@ class MeasurementControl(Instrument):
                     i = 0
                     nr_sweep_funcs = len(self.sweep_function_names)
 
+                    frame = mch.PlotmonFrame()
+                    data = self._get_plotmon_data()
                     # best_idx -1 as we count from 0 and best eval
                     # counts from 1.
                     best_index = int(self.opt_res_dset[-1, -1] - 1)
@@ -1789,13 +1917,15 @@ class MeasurementControl(Instrument):
                     best_evals_idx = (self.opt_res_dset[:, -1] - 1).astype(int)
                     sweep_functions_num = len(self.sweep_functions)
                     for k in range(sweep_functions_num):
-                        y = self.dset[:, k]
+                        y = data[:, k]
                         x = range(len(y))
-                        self.iter_traces[k]["config"]["x"] = x
-                        self.iter_traces[k]["config"]["y"] = y
+                        frame.set(self.iter_traces[k]["config"], x=x, y=y)
 
-                        self.iter_bever_x_traces[k]["config"]["x"] = best_evals_idx
-                        self.iter_bever_x_traces[k]["config"]["y"] = y[best_evals_idx]
+                        frame.set(
+                            self.iter_bever_x_traces[k]["config"],
+                            x=best_evals_idx,
+                            y=y[best_evals_idx],
+                        )
 
                         self.time_last_ad_plot_update = time.time()
 
@@ -1807,16 +1937,18 @@ class MeasurementControl(Instrument):
                         ##########################################
                         for x_ind in range(nr_sweep_funcs):
 
-                            x = self.dset[:, x_ind]
-                            y = self.dset[:, y_ind]
+                            x = data[:, x_ind]
+                            y = data[:, y_ind]
 
-                            self.curves[i]["config"]["x"] = x
-                            self.curves[i]["config"]["y"] = y
+                            frame.set(self.curves[i]["config"], x=x, y=y)
 
                             best_x = x[best_index]
                             best_y = y[best_index]
-                            self.curves_best_ever[i]["config"]["x"] = [best_x]
-                            self.curves_best_ever[i]["config"]["y"] = [best_y]
+                            frame.set(
+                                self.curves_best_ever[i]["config"],
+                                x=[best_x],
+                                y=[best_y],
+                            )
                             mean_x = self.opt_res_dset[:, 2 + x_ind]
                             # std_x is needed to implement errorbars on X
                             # std_x = self.opt_res_dset[:, 2+nr_sweep_funcs+x_ind]
@@ -1824,31 +1956,40 @@ class MeasurementControl(Instrument):
                             mean_y = self.opt_res_dset[:, 2 + 2 * nr_sweep_funcs]
                             mean_y = get_generation_means(self.opt_res_dset[:, 1], y)
                             # TODO: turn into errorbars
-                            self.curves_distr_mean[i]["config"]["x"] = mean_x
-                            self.curves_distr_mean[i]["config"]["y"] = mean_y
+                            frame.set(
+                                self.curves_distr_mean[i]["config"], x=mean_x, y=mean_y
+                            )
                             i += 1
                         ##########################################
                         # Secondary plotmon
                         ##########################################
                         # Measured value vs function evaluation
-                        y = self.dset[:, y_ind]
+                        y = data[:, y_ind]
                         x = range(len(y))
-                        self.iter_traces[j + sweep_functions_num]["config"]["x"] = x
-                        self.iter_traces[j + sweep_functions_num]["config"]["y"] = y
+                        frame.set(
+                            self.iter_traces[j + sweep_functions_num]["config"],
+                            x=x,
+                            y=y,
+                        )
 
                         # generational means
                         gen_idx = self.opt_res_dset[:, 1]
-                        self.iter_mean_traces[j]["config"]["x"] = gen_idx
-                        self.iter_mean_traces[j]["config"]["y"] = mean_y
+                        frame.set(
+                            self.iter_mean_traces[j]["config"], x=gen_idx, y=mean_y
+                        )
 
                         # This plots the best ever measured value vs iteration
                         # number of evals column
                         best_func_val = y[best_evals_idx]
-                        self.iter_bever_traces[j]["config"]["x"] = best_evals_idx
-                        self.iter_bever_traces[j]["config"]["y"] = best_func_val
+                        frame.set(
+                            self.iter_bever_traces[j]["config"],
+                            x=best_evals_idx,
+                            y=best_func_val,
+                        )
 
-                    self.main_QtPlot.update_plot()
-                    self.secondary_QtPlot.update_plot()
+                    frame.redraw(self.main_QtPlot)
+                    frame.redraw(self.secondary_QtPlot)
+                    self._draw_plotmon_frame(frame)
                     self._update_plotmon_2D_interp(force_update=True)
 
                     self.time_last_ad_plot_update = time.time()
@@ -1862,29 +2003,92 @@ class MeasurementControl(Instrument):
         to the QC_QtPlot.
         Note that the plotmon only supports evenly spaced lattices.
         """
+        if self._plotmon_deferred(force_update=False):
+            return
         try:
             if self.live_plot_enabled():
-                i = int((self.iteration) % self.ylen)
-                y_ind = i
-                for j in range(len(self.detector_function.value_names)):
-                    z_ind = len(self.sweep_functions) + j
-                    self.TwoD_array[y_ind, :, j] = self.dset[
-                        i * self.xlen : (i + 1) * self.xlen, z_ind
-                    ]
-                    self.secondary_QtPlot.traces[j]["config"]["z"] = self.TwoD_array[
-                        :, :, j
-                    ]
-
                 if (
                     time.time() - self.time_last_2Dplot_update
                     > self.plotting_interval()
                     or self.iteration == len(self.sweep_points) / self.xlen
                 ):
+                    frame = mch.PlotmonFrame()
+                    self._fill_plotmon_2D_array(frame)
                     self.time_last_2Dplot_update = time.time()
-                    self.secondary_QtPlot.update_plot()
+                    frame.redraw(self.secondary_QtPlot)
+                    self._draw_plotmon_frame(frame)
         except Exception as e:
             log.warning(e)
 
+    def _push_plotmon_rows(self, start_idx, stop_idx, rows=None):
+        """
+        Hands the rows written to the dataset to the plot monitors. If the
+        rows are not given they are read back from the dataset.
+        """
+        if self._plotmon_data is not None:
+            if rows is None:
+                rows = self.dset[start_idx:stop_idx]
+            self._plotmon_data.put(start_idx, rows)
+
+    def _get_plotmon_data(self):
+        """
+        Returns the (in-memory) data to be plotted, including all rows that
+        were handed to the plot monitors so far.
+        """
+        self._plotmon_data.update()
+        return self._plotmon_data.data
+
+    def _plotmon_deferred(self, force_update):
+        """
+        Returns True if the update of the plot monitors is left to the
+        plotmon thread (see `cfg_plotmon_threaded`), starting the thread
+        if required.
+
+        The plotmon thread only prepares the updates, the frames it prepared
+        are drawn here, i.e., in the thread running the measurement.
+        """
+        if force_update or not (
+            self.live_plot_enabled() and self.cfg_plotmon_threaded()
+        ):
+            return False
+        if self._plotmon_thread is None:
+            self._plotmon_thread = mch.PlotmonThread(
+                self._update_plotmons_from_thread,
+                interval=self.plotting_interval(),
+                name="plotmon of {}".format(self.name),
+            )
+            self._plotmon_thread.start()
+        else:
+            self._plotmon_thread.draw_frame()
+        return True
+
+    def _update_plotmons_from_thread(self):
+        with self._plotmon_lock:
+            if self.mode == "adaptive":
+                self._update_plotmon_adaptive(force_update=True)
+            else:
+                self._update_plotmon(force_update=True)
+                if self.mode == "2D":
+                    self._update_plotmon_2D(force_update=True)
+
+    def _draw_plotmon_frame(self, frame):
+        """
+        Draws a frame prepared by one of the plotmon updates. Frames prepared
+        by the plotmon thread are handed to the thread running the
+        measurement instead, as Qt does not support drawing from another
+        thread.
+        """
+        thread = self._plotmon_thread
+        if thread is not None and threading.current_thread() is thread:
+            thread.put_frame(frame)
+        else:
+            frame.draw()
+
+    def _stop_plotmon_thread(self):
+        if self._plotmon_thread is not None:
+            self._plotmon_thread.stop()
+            self._plotmon_thread = None
+
     def _set_plotting_interval(self, plotting_interval):
         if hasattr(self, "main_QtPlot"):
             self.main_QtPlot.interval = plotting_interval
@@ -1938,15 +2142,29 @@ class MeasurementControl(Instrument):
 
     def _create_experimentaldata_dataset(self):
         data_group = self.data_object.create_group("Experimental Data")
+        nr_cols = len(self.sweep_functions) + len(self.detector_function.value_names)
+
+        dset_kw = {}
+        if self.cfg_dset_chunk_rows() is not None:
+            dset_kw["chunks"] = (self.cfg_dset_chunk_rows(), nr_cols)
+        if self.cfg_dset_compression() is not None:
+            dset_kw["compression"] = self.cfg_dset_compression()
+            if self.cfg_dset_compression() == "gzip":
+                dset_kw["compression_opts"] = self.cfg_dset_compression_opts()
+
         self.dset = data_group.create_dataset(
             "Data",
-            (0, len(self.sweep_functions) + len(self.detector_function.value_names)),
-            maxshape=(
-                None,
-                len(self.sweep_functions) + len(self.detector_function.value_names),
-            ),
+            (0, nr_cols),
+            maxshape=(None, nr_cols),
             dtype="float64",
+            **dset_kw
         )
+        if self.cfg_dset_buffered():
+            self.dset = mch.BufferedDataset(
+                self.dset,
+                flush_interval_pts=self.cfg_dset_flush_interval_pts(),
+                flush_interval_time=self.cfg_dset_flush_interval_time(),
+            )
         self._get_column_names()
         self.dset.attrs["column_names"] = h5d.encode_to_utf8(self.column_names)
         # Added to tell analysis how to extract the data
@@ -1965,6 +2183,14 @@ class MeasurementControl(Instrument):
             self.detector_function.value_units
         )
 
+    def _flush_dset(self):
+        """
+        Writes the buffered data to the datafile (if `cfg_dset_buffered`).
+        """
+        dset = getattr(self, "dset", None)
+        if isinstance(dset, mch.BufferedDataset):
+            dset.flush()
+
     def _create_experiment_result_dict(self):
         try:
             # only exists as an open dataset when running an
@@ -2141,7 +2367,14 @@ class MeasurementControl(Instrument):
                 # but was saved as a string
                 snap, keys=exclude_keys, types_to_str={complex})
 
-            h5d.write_dict_to_hdf5(cleaned_snapshot, entry_point=snap_grp)
+            if self.cfg_snapshot_store():
+                h5d.write_snapshot_to_hdf5(
+                    cleaned_snapshot,
+                    entry_point=snap_grp,
+                    store=get_datadir_snapshot_store(self.datadir()),
+                )
+            else:
+                h5d.write_dict_to_hdf5(cleaned_snapshot, entry_point=snap_grp)
 
             if self.save_legacy_snapshot:
                 # Below is old style saving of snapshot, exists for the sake of
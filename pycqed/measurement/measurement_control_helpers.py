@@ -3,10 +3,16 @@ measurement_control.py is becoming very large
 
 this file is intended for small helpers to keep main file more clean
 """
+import time
+import queue
+import logging
+import threading
 from collections.abc import Iterable
 from scipy.spatial import ConvexHull
 import numpy as np
 
+log = logging.getLogger(__name__)
+
 
 def scale_bounds(af_pars, x_scale=None):
     if x_scale is not None:
@@ -35,3 +41,362 @@ def scale_bounds(af_pars, x_scale=None):
                     af_pars[b_name] = scaled_bounds
 
     return True
+
+
+class BufferedDataset:
+    """
+    Write-behind buffer around an extendable 2D h5py dataset.
+
+    All reads and writes go to an in-memory numpy block. The h5py dataset is
+    only resized and written when `flush` is called, or automatically once
+    `flush_interval_pts` writes have been done or `flush_interval_time`
+    seconds have passed since the last flush. Only the rows that changed since
+    the last flush are written.
+
+    The in-memory block grows geometrically, `reserve` can be used to
+    preallocate it when the total number of rows is known in advance.
+
+    It mimics the parts of the `h5py.Dataset` interface that are used by the
+    MeasurementControl (`shape`, `len`, `resize`, `attrs` and indexing) such
+    that it can be used as a drop-in replacement for `MC.dset`.
+    """
+
+    def __init__(
+        self,
+        h5_dset,
+        flush_interval_pts: int = None,
+        flush_interval_time: float = None,
+    ):
+        self.h5_dset = h5_dset
+        self.attrs = h5_dset.attrs
+        self.dtype = h5_dset.dtype
+        self.flush_interval_pts = flush_interval_pts
+        self.flush_interval_time = flush_interval_time
+
+        self._shape = tuple(h5_dset.shape)
+        self._h5_nr_rows = self._shape[0]
+        self._data = np.zeros((max(self._shape[0], 1), self._shape[1]), dtype=self.dtype)
+        self._data[: self._shape[0]] = h5_dset[()]
+
+        self._dirty_start = None
+        self._dirty_stop = None
+        self._writes_since_flush = 0
+        self._last_flush_time = time.time()
+
+    @property
+    def shape(self):
+        return self._shape
+
+    def __len__(self):
+        return self._shape[0]
+
+    def __getitem__(self, key):
+        value = self._data[: self._shape[0]][key]
+        if isinstance(value, np.ndarray):
+            # h5py returns copies, not views on the buffer
+            value = value.copy()
+        return value
+
+    def __setitem__(self, key, value):
+        self._data[: self._shape[0]][key] = value
+        self._mark_dirty(*self._get_rows(key))
+        self._writes_since_flush += 1
+        self._flush_if_due()
+
+    def reserve(self, nr_rows: int):
+        """
+        Makes sure the in-memory block can hold at least `nr_rows` rows
+        without reallocating.
+        """
+        capacity = self._data.shape[0]
+        if nr_rows > capacity:
+            data = np.zeros((nr_rows, self._shape[1]), dtype=self.dtype)
+            data[:capacity] = self._data
+            self._data = data
+
+    def resize(self, shape):
+        """
+        Changes the (logical) shape of the dataset, same as
+        `h5py.Dataset.resize`. Only the number of rows can be changed.
+        """
+        nr_rows, nr_cols = shape
+        if nr_cols != self._shape[1]:
+            raise ValueError(
+                "Changing the number of columns ({} -> {}) is not "
+                "supported".format(self._shape[1], nr_cols)
+            )
+        old_nr_rows = self._shape[0]
+        if nr_rows > self._data.shape[0]:
+            # Grow geometrically to avoid reallocating for every new row
+            self.reserve(max(nr_rows, 2 * self._data.shape[0]))
+        if nr_rows > old_nr_rows:
+            # New rows are zero, consistent with the h5py fill value
+            self._data[old_nr_rows:nr_rows] = 0
+            self._mark_dirty(old_nr_rows, nr_rows)
+        self._shape = (nr_rows, nr_cols)
+
+    def flush(self):
+        """
+        Writes all changes since the last flush to the h5py dataset.
+        """
+        nr_rows = self._shape[0]
+        if self._h5_nr_rows != nr_rows:
+            self.h5_dset.resize(self._shape)
+            self._h5_nr_rows = nr_rows
+        if self._dirty_start is not None:
+            start_idx = self._dirty_start
+            stop_idx = min(self._dirty_stop, nr_rows)
+            if stop_idx > start_idx:
+                self.h5_dset[start_idx:stop_idx, :] = self._data[start_idx:stop_idx]
+        self._dirty_start = None
+        self._dirty_stop = None
+        self._writes_since_flush = 0
+        self._last_flush_time = time.time()
+
+    def _flush_if_due(self):
+        if (
+            self.flush_interval_pts is not None
+            and self._writes_since_flush >= self.flush_interval_pts
+        ) or (
+            self.flush_interval_time is not None
+            and time.time() - self._last_flush_time >= self.flush_interval_time
+        ):
+            self.flush()
+
+    def _get_rows(self, key):
+        """
+        Returns the range of rows affected by writing to `key`.
+        """
+        nr_rows = self._shape[0]
+        row_key = key[0] if isinstance(key, tuple) and len(key) else key
+        if isinstance(row_key, slice) and row_key.step in (None, 1):
+            start_idx, stop_idx, _ = row_key.indices(nr_rows)
+            return start_idx, max(start_idx, stop_idx)
+        if isinstance(row_key, (int, np.integer)):
+            row_idx = int(row_key) % nr_rows
+            return row_idx, row_idx + 1
+        # Anything more exotic, mark all rows as changed
+        return 0, nr_rows
+
+    def _mark_dirty(self, start_idx: int, stop_idx: int):
+        if self._dirty_start is None:
+            self._dirty_start, self._dirty_stop = start_idx, stop_idx
+        else:
+            self._dirty_start = min(self._dirty_start, start_idx)
+            self._dirty_stop = max(self._dirty_stop, stop_idx)
+
+
+class PlotmonData:
+    """
+    In-memory copy of the experimental data used by the plot monitors.
+
+    The MeasurementControl hands every block of rows it writes to the dataset
+    to `put`, which only puts a copy of them in a queue. The queued rows are
+    applied to the in-memory array by `update`, which is called by the plot
+    monitor right before plotting (possibly from another thread, see
+    `PlotmonThread`). Plotting therefore never reads the (h5py) dataset and
+    the cost of acquiring a point does not depend on the size of the dataset.
+
+    If `bins` are specified, the mean of every bin (rows i, i + len(bins),
+    i + 2*len(bins), ...) is kept up to date incrementally, see `binned_mean`.
+
+    `put` can be called from any thread, all other methods should only be
+    called by the (single) consumer of the data.
+    """
+
+    def __init__(self, nr_cols: int, bins=None):
+        self.bins = bins
+        self._queue = queue.SimpleQueue()
+        # Rows that have not been written yet are NaN
+        self._data = np.full((64, nr_cols), np.nan)
+        self._nr_rows = 0
+        # consumer -> [start_idx, stop_idx] of the rows changed since the
+        # last call to `get_changed_rows` by that consumer
+        self._changed_rows = {}
+        if bins is not None:
+            self._bin_sums = np.zeros((len(bins), nr_cols))
+            self._bin_counts = np.zeros((len(bins), nr_cols), dtype=int)
+
+    @property
+    def data(self):
+        """
+        The data written so far, a view on the in-memory array.
+        """
+        return self._data[: self._nr_rows]
+
+    def __len__(self):
+        return self._nr_rows
+
+    def put(self, start_idx: int, rows):
+        """
+        Queues rows written to the dataset, starting at row `start_idx`.
+        """
+        rows = np.array(rows, dtype=np.float64, ndmin=2)
+        self._queue.put((int(start_idx), rows))
+
+    def update(self) -> int:
+        """
+        Applies all queued rows, returns the number of blocks of rows applied.
+        """
+        nr_updates = 0
+        while True:
+            try:
+                start_idx, rows = self._queue.get_nowait()
+            except queue.Empty:
+                return nr_updates
+            self._write(start_idx, rows)
+            nr_updates += 1
+
+    def get_changed_rows(self, consumer) -> slice:
+        """
+        Returns the slice of rows that changed since the last call by
+        `consumer`, all rows on the first call.
+        """
+        start_idx, stop_idx = self._changed_rows.get(consumer, (0, self._nr_rows))
+        self._changed_rows[consumer] = [self._nr_rows, 0]
+        return slice(start_idx, max(start_idx, stop_idx))
+
+    def binned_mean(self):
+        """
+        Returns the mean over all non-NaN values in every bin, with shape
+        (len(bins), nr_cols).
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self._bin_sums / self._bin_counts
+
+    def _write(self, start_idx: int, rows):
+        stop_idx = start_idx + len(rows)
+        capacity = self._data.shape[0]
+        if stop_idx > capacity:
+            # Grow geometrically to avoid reallocating for every new row
+            data = np.full((max(stop_idx, 2 * capacity), self._data.shape[1]), np.nan)
+            data[:capacity] = self._data
+            self._data = data
+
+        if self.bins is not None:
+            # Replace the old values of the rows in the bin means
+            bin_idxs = np.arange(start_idx, stop_idx) % len(self.bins)
+            old_rows = self._data[start_idx:stop_idx]
+            for sign, values in [(-1, old_rows), (1, rows)]:
+                valid = ~np.isnan(values)
+                np.add.at(self._bin_sums, bin_idxs, sign * np.where(valid, values, 0))
+                np.add.at(self._bin_counts, bin_idxs, sign * valid)
+
+        self._data[start_idx:stop_idx] = rows
+        self._nr_rows = max(self._nr_rows, stop_idx)
+        for changed in self._changed_rows.values():
+            changed[0] = min(changed[0], start_idx)
+            changed[1] = max(changed[1], stop_idx)
+
+
+class PlotmonFrame:
+    """
+    The changes to the plot monitors prepared by a single update.
+
+    Preparing an update (reading the data, binning, interpolating) only
+    collects the new values of the trace configs and the plots to redraw in a
+    frame. `draw` applies them to the plots, which must happen in the thread
+    that owns the plot monitors (the thread running the measurement), also if
+    the frame was prepared by the `PlotmonThread`.
+    """
+
+    def __init__(self):
+        # id(mapping) -> (mapping, new values)
+        self._updates = {}
+        # id(plot) -> plot, in the order in which they are to be redrawn
+        self._plots = {}
+
+    def __bool__(self):
+        return bool(self._updates or self._plots)
+
+    def set(self, mapping: dict, **values):
+        """
+        Sets `values` in `mapping` (e.g., the "config" of a trace) when the
+        frame is drawn. Arrays are copied, such that the frame does not
+        change when the data it was prepared from is updated.
+        """
+        values = {
+            k: np.array(v) if isinstance(v, np.ndarray) else v
+            for k, v in values.items()
+        }
+        self._updates.setdefault(id(mapping), (mapping, {}))[1].update(values)
+
+    def redraw(self, plot):
+        """
+        Redraws `plot` when the frame is drawn.
+        """
+        self._plots[id(plot)] = plot
+
+    def merge(self, frame):
+        """
+        Adds the changes of a more recent `frame` to this frame.
+        """
+        for mapping, values in frame._updates.values():
+            self.set(mapping, **values)
+        for plot in frame._plots.values():
+            self.redraw(plot)
+
+    def draw(self):
+        for mapping, values in self._updates.values():
+            mapping.update(values)
+        for plot in self._plots.values():
+            plot.update_plot()
+
+
+class PlotmonThread(threading.Thread):
+    """
+    Background thread that calls `update_func` every `interval` seconds
+    until `stop` is called. Used to prepare the updates of the plot monitors
+    independently of the acquisition loop.
+
+    `update_func` hands the frames it prepares to `put_frame`. Qt does not
+    support drawing from a background thread, the thread owning the plot
+    monitors draws them by calling `draw_frame` regularly.
+    """
+
+    def __init__(self, update_func, interval: float, name: str = "plotmon"):
+        super().__init__(name=name, daemon=True)
+        self.update_func = update_func
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._frame_lock = threading.Lock()
+        self._frame = None
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.update_func()
+            except Exception as e:
+                log.warning(e)
+
+    def put_frame(self, frame: PlotmonFrame):
+        """
+        Hands a prepared frame to the drawing thread. Frames that were not
+        drawn yet are merged, such that only the latest state is drawn.
+        """
+        with self._frame_lock:
+            if self._frame is None:
+                self._frame = frame
+            else:
+                self._frame.merge(frame)
+
+    def draw_frame(self) -> bool:
+        """
+        Draws the pending frame, if any. Returns True if a frame was drawn.
+        """
+        with self._frame_lock:
+            frame, self._frame = self._frame, None
+        if not frame:
+            return False
+        frame.draw()
+        return True
+
+    def stop(self):
+        """
+        Stops the thread and waits for the current update to finish.
+        Frames that were not drawn yet are discarded.
+        """
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
+        self._frame = None
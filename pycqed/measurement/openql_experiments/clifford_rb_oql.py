@@ -255,6 +255,32 @@ def randomized_benchmarking(
         except KeyError:
             raise ValueError("Could not find flux duration. Specify manually!")
 
+    # Gate decompositions of all Cliffords, avoids instantiating a Clifford
+    # object for every Clifford in the sequences
+    cl_gates, cl_gate_offsets = Cl.get_flat_gate_decompositions()
+
+    if not simultaneous_single_qubit_RB and not simultaneous_single_qubit_parking_RB:
+        # Generate the sequences for all seeds at once, and the recovery
+        # Cliffords for every net Clifford. As before, the sequences include
+        # a recovery to the last net Clifford, the kernel of every net
+        # Clifford then appends a recovery from that to its own net Clifford
+        rb_sequences = {}
+        recovery_cliffords = {}
+        for interleaving_cl in interleaving_cliffords:
+            rb_sequences[interleaving_cl] = rb.randomized_benchmarking_sequences(
+                nr_cliffords,
+                nr_seeds,
+                number_of_qubits=number_of_qubits,
+                desired_net_cl=net_cliffords[-1],
+                max_clifford_idx=max_clifford_idx,
+                interleaving_cl=interleaving_cl,
+            )
+            for j, cl_seqs in enumerate(rb_sequences[interleaving_cl]):
+                net_cl_idxs = rb.calculate_net_clifford_indices(cl_seqs, Cl)
+                for net_clifford in net_cliffords:
+                    recovery_cliffords[interleaving_cl, j, net_clifford] = \
+                        rb.calculate_recovery_clifford_indices(net_cl_idxs, net_clifford, Cl)
+
     for seed in range(nr_seeds):
         for j, n_cl in enumerate(nr_cliffords):
             for interleaving_cl in interleaving_cliffords:
@@ -263,18 +289,7 @@ def randomized_benchmarking(
                         and not simultaneous_single_qubit_parking_RB
                 ):
                     # ############ 1 qubit, or 2 qubits using TwoQubitClifford
-                    # generate sequence
-                    for net_clifford in net_cliffords:
-                        cl_seq = rb.randomized_benchmarking_sequence(
-                            n_cl,
-                            number_of_qubits=number_of_qubits,
-                            desired_net_cl=net_clifford,
-                            max_clifford_idx=max_clifford_idx,
-                            interleaving_cl=interleaving_cl,
-                        )
-                        # FIXME: only last iteration is used
-
-                    net_cl_seq = rb.calculate_net_clifford(cl_seq, Cl)
+                    cl_seq = rb_sequences[interleaving_cl][j][seed]
 
                     # decompose
                     cl_seq_decomposed = [None] * len(cl_seq)
@@ -287,16 +302,14 @@ def randomized_benchmarking(
                         elif cl == 100_000:
                             cl_seq_decomposed[i] = [("I", ["q0", "q1"])]
                         else:
-                            # FIXME: inefficient: creates new object instance per clifford. More occurrences below
-                            cl_seq_decomposed[i] = Cl(cl).gate_decomposition
+                            cl_seq_decomposed[i] = cl_gates[cl_gate_offsets[cl]:cl_gate_offsets[cl + 1]]
 
                     # generate OpenQL kernel for every net_clifford
                     for net_clifford in net_cliffords:
                         # create decomposed sequence including recovery
-                        recovery_to_idx_clifford = net_cl_seq.get_inverse()
-                        recovery_clifford = Cl(net_clifford) * recovery_to_idx_clifford
+                        recovery_cl = recovery_cliffords[interleaving_cl, j, net_clifford][seed]
                         cl_seq_decomposed_with_net = cl_seq_decomposed + [
-                            recovery_clifford.gate_decomposition
+                            cl_gates[cl_gate_offsets[recovery_cl]:cl_gate_offsets[recovery_cl + 1]]
                         ]
                         k = p.create_kernel(
                             "RB_{}Cl_s{}_net{}_inter{}".format(
@@ -372,7 +385,7 @@ def randomized_benchmarking(
                                 interleaving_cl=interleaving_cl,
                             )
                             for cl in cl_seq:
-                                gates = Cl(cl).gate_decomposition
+                                gates = cl_gates[cl_gate_offsets[cl]:cl_gate_offsets[cl + 1]]
                                 # for g, q in gates:
                                 #     k.gate(g, q_idx)
 
@@ -435,9 +448,10 @@ def randomized_benchmarking(
                                 cl_seq_decomposed.append([("CZ", ["q0", "q1"])])
                             else:
                                 for q_str, cl_rb_seq in zip(rb_qubits, cl_rb_seq_all_q):
-                                    cl_decomposed = Cl(
-                                        cl_rb_seq[cl_i]
-                                    ).gate_decomposition
+                                    cl = cl_rb_seq[cl_i]
+                                    cl_decomposed = cl_gates[
+                                        cl_gate_offsets[cl]:cl_gate_offsets[cl + 1]
+                                    ]
                                     # the decomposition of the single qubit Cliffords
                                     # by default targets "q0", here we replace that
                                     cl_decomposed = [
@@ -1,12 +1,18 @@
 import re
+import os
+import sys
+import uuid
+import shutil
+import hashlib
 import logging
 import json
 import pathlib
 import inspect
+import functools
 import numpy as np
 from os import remove
-from os.path import join, dirname, isfile
-from typing import List, Tuple
+from os.path import join, dirname, isfile, isdir, basename
+from typing import Callable, List, Tuple
 from deprecated import deprecated
 
 import openql as ql
@@ -36,6 +42,12 @@ class OqlProgram:
     # self._configure_compiler). Additionally, OpenQL options are reset upon ql.initialize, so the value does not persist.
     output_dir = join(dirname(__file__), 'output')
 
+    # programs generated by builders decorated with 'cached_program' are stored in 'cache_dir', and the least recently
+    # used entries are removed if the cache exceeds 'cache_max_size' bytes. See cached_program
+    cache_dir = join(dirname(__file__), 'output', 'cache')
+    cache_max_size = 512 * 1024**2
+    cache_enabled = True
+
     def __init__(
             self,
             name: str,
@@ -71,9 +83,9 @@ class OqlProgram:
         self.sweep_points = None
 
         # create Platform and Program
-        self.platform = ql.Platform('OpenQL_Platform', platf_cfg)
+        self._platform = ql.Platform('OpenQL_Platform', platf_cfg)
         self.nqubits = self.platform.get_qubit_number()
-        self.program = ql.Program(
+        self._program = ql.Program(
             name,
             self.platform,
             self.nqubits,
@@ -109,6 +121,52 @@ class OqlProgram:
         self._map_filename = join(OqlProgram.output_dir, self.name + ".map")
 
 
+    @classmethod
+    def _from_compiled(
+            cls,
+            name: str,
+            platf_cfg: str,
+            nregisters: int,
+            nqubits: int,
+            filename: str,
+            map_filename: str
+    ) -> 'OqlProgram':
+        """
+        create an OqlProgram for files that were already compiled, without creating an OpenQL Platform and Program.
+        The result can be uploaded and run, but not extended or compiled again: accessing 'platform' or 'program'
+        (e.g. by create_kernel, add_kernel or compile) raises a RuntimeError
+        """
+
+        p = cls.__new__(cls)
+        p.name = name
+        p._platf_cfg = platf_cfg
+        p.nregisters = nregisters
+        p.nqubits = nqubits
+        p.sweep_points = None
+        p._platform = None
+        p._program = None
+        p.filename = filename
+        p._ext = os.path.splitext(filename)[1]
+        p._arch = 'CCL' if p._ext == '.qisa' else 'CC'
+        p._map_filename = map_filename
+        return p
+
+
+    @property
+    def platform(self) -> ql.Platform:
+        if self._platform is None:
+            raise RuntimeError(f"program '{self.name}' was already compiled (see OqlProgram._from_compiled), its "
+                               "OpenQL platform is not available")
+        return self._platform
+
+    @property
+    def program(self) -> ql.Program:
+        if self._program is None:
+            raise RuntimeError(f"program '{self.name}' was already compiled (see OqlProgram._from_compiled), its "
+                               "OpenQL program is not available")
+        return self._program
+
+
     def add_kernel(self, k: ql.Kernel) -> None:
         self.program.add_kernel(k)
 
@@ -993,6 +1051,214 @@ def check_recompilation_needed(
         raise NotImplementedError(
             'recompile should be True, False or "as needed"')
 
+#############################################################################
+# Program cache
+#############################################################################
+
+def cached_program(builder: Callable[..., OqlProgram]) -> Callable[..., OqlProgram]:
+    """
+    Decorator for functions that build and compile an OqlProgram, like those in single_qubit_oql.py, that stores the
+    compiled program in OqlProgram.cache_dir. If the builder is called again with the same arguments, the compiled
+    program is copied back to OqlProgram.output_dir instead of generating and compiling it again.
+
+    The cache key consists of the builder, its arguments, the OpenQL version, and the hashes of the platform
+    configuration file (argument 'platf_cfg') and of the source files of the builder, of this file and of the pycqed
+    modules used by the builder's module (see _program_source_files).
+
+    A program returned from the cache is created by OqlProgram._from_compiled: it can be uploaded and run, but its
+    'platform' and 'program' are not available.
+
+    NB: only use for builders whose program depends on nothing but their arguments (e.g., not on random numbers).
+    Calls with arguments that cannot be normalized (see _normalize_argument) are not cached. Changes to modules that are
+    only used indirectly by the builder are not detected, use clear_program_cache() after changing those
+    """
+
+    signature = inspect.signature(builder)
+
+    @functools.wraps(builder)
+    def wrapper(*args, **kwargs):
+        if not OqlProgram.cache_enabled:
+            return builder(*args, **kwargs)
+
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        try:
+            key = _program_cache_key(builder, bound.arguments)
+        except (TypeError, KeyError, OSError) as e:
+            log.debug(f"not caching program of '{builder.__name__}': {e}")
+            return builder(*args, **kwargs)
+
+        entry_dir = join(OqlProgram.cache_dir, key)
+        p = _load_cached_program(entry_dir, bound.arguments['platf_cfg'])
+        if p is not None:
+            log.info(f"using cached program '{p.name}' of '{builder.__name__}'")
+            return p
+
+        p = builder(*args, **kwargs)
+        if isinstance(p, OqlProgram):
+            _store_cached_program(p, entry_dir)
+        return p
+
+    return wrapper
+
+
+def clear_program_cache() -> None:
+    """
+    remove all programs from OqlProgram.cache_dir
+    """
+
+    if isdir(OqlProgram.cache_dir):
+        shutil.rmtree(OqlProgram.cache_dir)
+
+
+def _normalize_argument(value):
+    """
+    convert an argument of a program builder into a JSON serializable value that identifies it
+    """
+
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return {'dtype': str(value.dtype), 'shape': value.shape, 'data': value.ravel().tolist()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_argument(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _normalize_argument(v) for k, v in value.items()}
+    raise TypeError(f"unsupported argument type '{type(value).__name__}'")
+
+
+def _program_source_files(builder: Callable) -> List[str]:
+    """
+    return the source files of the builder, of this file and of the pycqed modules (directly) used by the builder's
+    module, e.g. the helpers imported by single_qubit_oql.py
+    """
+
+    files = {inspect.getsourcefile(builder), __file__}
+    for value in list(builder.__globals__.values()):
+        module = value if inspect.ismodule(value) else sys.modules.get(getattr(value, '__module__', None) or '')
+        if module is not None and module.__name__.split('.')[0] == 'pycqed':
+            fn = getattr(module, '__file__', None)
+            if fn is not None and fn.endswith('.py'):
+                files.add(fn)
+    return sorted(files)
+
+
+# maps (path, mtime, size) to the hash of the file, to avoid hashing unchanged source files on every call
+_source_hashes = {}
+
+
+def _source_file_hash(fn: str) -> str:
+    st = os.stat(fn)
+    key = (fn, st.st_mtime_ns, st.st_size)
+    if key not in _source_hashes:
+        _source_hashes[key] = get_file_sha256_hash(fn)
+    return _source_hashes[key]
+
+
+def _program_cache_key(builder: Callable, arguments: dict) -> str:
+    key = {
+        'builder': f'{builder.__module__}.{builder.__qualname__}',
+        'arguments': _normalize_argument(dict(arguments)),
+        'platf_cfg': get_file_sha256_hash(arguments['platf_cfg']),
+        'sources': {fn: _source_file_hash(fn) for fn in _program_source_files(builder)},
+        'openql_version': ql.get_version()
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def _load_cached_program(entry_dir: str, platf_cfg: str):
+    """
+    restore the files of a cached program to OqlProgram.output_dir, and return the program (or None if not cached)
+    """
+
+    try:
+        info = json.loads(pathlib.Path(join(entry_dir, 'program.json')).read_text())
+        sweep_points = None
+        if info['sweep_points'] is not None:
+            # NB: the cache directory may be shared, so never unpickle its contents
+            sweep_points = np.load(join(entry_dir, 'sweep_points.npy'), allow_pickle=False)
+            if info['sweep_points'] == 'list':
+                sweep_points = sweep_points.tolist()
+        os.makedirs(OqlProgram.output_dir, exist_ok=True)
+        for fn in info['files']:
+            shutil.copyfile(join(entry_dir, fn), join(OqlProgram.output_dir, fn))
+        os.utime(entry_dir)  # mark as recently used
+    except (OSError, ValueError, KeyError):
+        return None
+
+    p = OqlProgram._from_compiled(
+        name=info['name'],
+        platf_cfg=platf_cfg,
+        nregisters=info['nregisters'],
+        nqubits=info['nqubits'],
+        filename=join(OqlProgram.output_dir, info['filename']),
+        map_filename=join(OqlProgram.output_dir, info['map_filename'])
+    )
+    p.sweep_points = sweep_points
+    return p
+
+
+def _store_cached_program(p: OqlProgram, entry_dir: str) -> None:
+    if not isfile(p.filename):
+        return
+
+    files = [basename(p.filename)]
+    if isfile(p._map_filename):
+        files.append(basename(p._map_filename))
+
+    # the entry is assembled in a temporary directory and then renamed, so concurrent processes never see an
+    # incomplete entry
+    tmp_dir = f'{entry_dir}.{uuid.uuid4().hex}.tmp'
+    try:
+        os.makedirs(tmp_dir)
+        for fn in files:
+            shutil.copyfile(join(dirname(p.filename), fn), join(tmp_dir, fn))
+        sweep_points = None
+        if p.sweep_points is not None:
+            sweep_points = 'list' if isinstance(p.sweep_points, list) else 'array'
+            np.save(join(tmp_dir, 'sweep_points.npy'), np.asarray(p.sweep_points), allow_pickle=False)
+        info = {
+            'name': p.name,
+            'nregisters': p.nregisters,
+            'nqubits': p.nqubits,
+            'filename': basename(p.filename),
+            'map_filename': basename(p._map_filename),
+            'files': files,
+            'sweep_points': sweep_points
+        }
+        pathlib.Path(join(tmp_dir, 'program.json')).write_text(json.dumps(info))
+        os.replace(tmp_dir, entry_dir)
+    except (OSError, ValueError) as e:
+        # NB: OSError also happens if another process stored the same program first, ValueError if the sweep points
+        # can only be stored by pickling them
+        log.debug(f"not caching program '{p.name}': {e}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return
+
+    _evict_cached_programs(OqlProgram.cache_max_size)
+
+
+def _evict_cached_programs(max_size: int) -> None:
+    """
+    remove the least recently used entries from OqlProgram.cache_dir until its size is at most max_size bytes
+    """
+
+    entries = []
+    for entry in os.scandir(OqlProgram.cache_dir):
+        if entry.is_dir() and not entry.name.endswith('.tmp'):
+            size = sum(f.stat().st_size for f in os.scandir(entry.path))
+            entries.append((entry.stat().st_mtime, size, entry.path))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total_size -= size
+
+
 #############################################################################
 # Multiple program loading helpers
 #############################################################################
@@ -3,7 +3,7 @@ from deprecated import deprecated
 from typing import List, Union
 
 from pycqed.measurement.randomized_benchmarking import randomized_benchmarking as rb
-from pycqed.measurement.openql_experiments.openql_helpers import OqlProgram
+from pycqed.measurement.openql_experiments.openql_helpers import OqlProgram, cached_program
 
 
 def CW_tone(qubit_idx: int, platf_cfg: str) -> OqlProgram:
@@ -373,6 +373,7 @@ def Restless_Ramsey(time, qubit_idx: int, platf_cfg: str, cal_points: bool=True)
     p.compile()
     return p
 
+@cached_program
 def flipping(
         qubit_idx: int,
         number_of_flips,
@@ -456,6 +457,7 @@ def flipping(
     return p
 
 
+@cached_program
 def AllXY(
         qubit_idx: int,
         platf_cfg: str,
@@ -553,6 +555,7 @@ def depletion_AllXY(qubit_idx: int, platf_cfg: str):
     p.compile()
     return p
 
+@cached_program
 def T1(qubit_idx: int,
         platf_cfg: str,
         times: List[float],
@@ -734,6 +737,7 @@ def T1_second_excited_state(times, qubit_idx: int, platf_cfg: str) -> OqlProgram
     return p
 
 
+@cached_program
 def Ramsey(
         qubit_idx: int,
         platf_cfg: str,
@@ -885,6 +889,7 @@ def complex_Ramsey(times, qubit_idx: int, platf_cfg: str) -> OqlProgram:
     return p
 
 
+@cached_program
 def echo(times, qubit_idx: int, platf_cfg: str, delta_phase: int = 40) -> OqlProgram:
     """
     Single qubit Echo sequence.
@@ -1001,6 +1006,7 @@ def echo_ramzz(times, inv_qubit_idx: int, meas_qubit_idx: int,
     return p
 
 
+@cached_program
 def CPMG(times, order: int, qubit_idx: int, platf_cfg: str) -> OqlProgram:
     """
     Single qubit CPMG sequence.
@@ -1343,6 +1349,7 @@ def single_elt_on(qubit_idx: int, platf_cfg: str) -> OqlProgram:
     return p
 
 
+@cached_program
 def off_on(
         qubit_idx: int,
         pulse_comb: str,
@@ -1644,6 +1651,7 @@ def randomized_benchmarking(
     return p
 
 
+@cached_program
 def motzoi_XY(
         qubit_idx: int,
         platf_cfg: str,
@@ -1877,6 +1885,7 @@ def FastFeedbackControl(latency, qubit_idx: int, platf_cfg: str) -> OqlProgram:
     return p
 
 
+@cached_program
 def ef_rabi_seq(
         q0: int,
         amps: list,
@@ -37,5 +37,109 @@ def generate_hash_tables():
             f.write(str(h)+'\n')
     print("Successfully generated Clifford hash tables.")
 
+
+def construct_clifford_signed_permutations(generator, indices):
+    """
+    Returns the Pauli transfer matrices of the cliffords as signed
+    permutations.
+
+    The PTM of a Clifford maps every Pauli onto a single (signed) Pauli, i.e.
+    column j of the PTM has a single nonzero entry `sign[j]` in row `perm[j]`.
+
+    Returns:
+        perms (array): shape (len(indices), dim), the row of the nonzero
+            entry of every column.
+        signs (array): shape (len(indices), dim), the value (+1 or -1) of
+            the nonzero entry of every column.
+    """
+    ptms = np.array([generator(idx=idx).pauli_transfer_matrix.round().astype(int)
+                     for idx in indices])
+    perms = np.argmax(np.abs(ptms), axis=1)
+    signs = np.take_along_axis(ptms, perms[:, None, :], axis=1)[:, 0, :]
+    return perms, signs
+
+
+def construct_clifford_cayley_table(generator, group_size: int,
+                                    block_size: int = 64):
+    """
+    Constructs the Cayley (multiplication) table of a Clifford group.
+
+    Element [i, j] of the table is the index of the Clifford
+    `generator(i) * generator(j)`, i.e. the product of the Pauli transfer
+    matrices `np.dot(PTM_i, PTM_j)`.
+
+    Rather than multiplying and hashing all group_size**2 PTMs, the
+    Cliffords are represented as signed permutations of the Paulis. A
+    Clifford is uniquely identified by the images of the single qubit X and Z
+    Paulis of every qubit, which are used as a key to look up the index of
+    the product.
+    """
+    perms, signs = construct_clifford_signed_permutations(
+        generator, np.arange(group_size))
+    dim = perms.shape[1]
+    # columns of the X and Z Pauli of every qubit, for the Pauli basis
+    # ordering (I, X, Y, Z) of the PTMs, the least significant qubit last
+    nr_qubits = int(np.round(np.log(dim) / np.log(4)))
+    gen_cols = np.array([p * 4**q for q in range(nr_qubits) for p in [1, 3]])
+    bits_per_col = int(np.ceil(np.log2(dim))) + 1
+
+    def key(gen_perms, gen_signs):
+        k = np.zeros(gen_perms.shape[:-1], dtype=np.int64)
+        for i in range(len(gen_cols)):
+            col_key = 2 * gen_perms[..., i] + (gen_signs[..., i] < 0)
+            k |= col_key.astype(np.int64) << (bits_per_col * i)
+        return k
+
+    keys = key(perms[:, gen_cols], signs[:, gen_cols])
+    assert len(np.unique(keys)) == group_size, 'Generator images not unique'
+    key_lut = np.full(2**(bits_per_col * len(gen_cols)), -1, dtype=np.int64)
+    key_lut[keys] = np.arange(group_size)
+
+    gen_perms_right = perms[:, gen_cols]
+    gen_signs_right = signs[:, gen_cols]
+    cayley_table = np.empty((group_size, group_size), dtype=np.uint16)
+    for start in range(0, group_size, block_size):
+        stop = min(start + block_size, group_size)
+        # (PTM_i PTM_j) e_g = s_j[g] s_i[p_j[g]] e_{p_i[p_j[g]]}
+        prod_perms = perms[start:stop][:, gen_perms_right]
+        prod_signs = gen_signs_right[None, :, :] * signs[start:stop][:, gen_perms_right]
+        cayley_table[start:stop] = key_lut[key(prod_perms, prod_signs)]
+    return cayley_table
+
+
+def construct_clifford_inverse_table(cayley_table):
+    """
+    Returns the index of the inverse of every element, based on the
+    position of the identity (index 0) in every row of the Cayley table.
+    """
+    return np.argmax(cayley_table == 0, axis=1).astype(np.uint16)
+
+
+_cayley_table_generators = {
+    'single_qubit': (SingleQubitClifford, 24),
+    'two_qubit': (TwoQubitClifford, 11520),
+}
+
+
+def generate_cayley_table(prefix: str):
+    """
+    Generates the Cayley and inverse tables of a single Clifford group,
+    `prefix` is either 'single_qubit' or 'two_qubit'.
+    """
+    print("Generating {} Clifford Cayley table.".format(prefix))
+    generator, group_size = _cayley_table_generators[prefix]
+    cayley_table = construct_clifford_cayley_table(generator, group_size)
+    np.save(join(output_dir, prefix + '_cayley_table.npy'), cayley_table)
+    np.save(join(output_dir, prefix + '_inverse_table.npy'),
+            construct_clifford_inverse_table(cayley_table))
+    print("Successfully generated {} Clifford Cayley table.".format(prefix))
+
+
+def generate_cayley_tables():
+    for prefix in _cayley_table_generators:
+        generate_cayley_table(prefix)
+
+
 if __name__ == '__main__':
     generate_hash_tables()
+    generate_cayley_tables()
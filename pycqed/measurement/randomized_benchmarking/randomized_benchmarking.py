@@ -27,38 +27,69 @@ def calculate_net_clifford(
     Note: the order corresponds to the order in a pulse sequence but is
         the reverse of what it would be in a chained dot product.
     """
+    net_idx = calculate_net_clifford_indices(rb_clifford_indices, Cliff)
+    return Cliff(int(net_idx))
 
-    # Calculate the net clifford
-    net_clifford = Cliff(0)  # assumes element 0 is the Identity
-    for idx in rb_clifford_indices:
-        # [2020-07-03 Victor] the `abs` below was to remove the sign that was
-        # used to treat CZ as CZ and not the member of CNOT-like set of gates
-        # Using negative sign convention (i.e. `-4368` for the interleaved CZ)
-        # was a bad choice because there is no such thing as negative zero and
-        # the clifford numer 0 is the identity that is necessary for
-        # benchmarking an idling identity with the same duration as the time
-        # allocated to the flux pulses, for example
-        # cliff = Clifford(abs(idx))  # Deprecated!
-        assert idx > -1, (
+
+def calculate_net_clifford_indices(
+        rb_clifford_indices: np.ndarray,
+        Cliff:Clifford = SingleQubitClifford
+) -> np.ndarray:
+    """
+    Vectorized version of `calculate_net_clifford` based on the Cayley table
+    of the Clifford group.
+
+    Args:
+        rb_clifford_indices: array of integers specifying the cliffords. The
+            last axis corresponds to the sequence, all other axes are
+            calculated in parallel, e.g. shape (nr_seeds, nr_cliffords).
+        Cliff : Clifford object used to determine what
+            inversion technique to use and what indices are valid.
+            Valid choices are `SingleQubitClifford` and `TwoQubitClifford`
+
+    Returns:
+        net_clifford_indices: array of shape `rb_clifford_indices.shape[:-1]`
+            containing the indices of the net-cliffords.
+    """
+    rb_clifford_indices = np.asarray(rb_clifford_indices, dtype=int)
+    # [2020-07-03 Victor] the `abs` below was to remove the sign that was
+    # used to treat CZ as CZ and not the member of CNOT-like set of gates
+    # Using negative sign convention (i.e. `-4368` for the interleaved CZ)
+    # was a bad choice because there is no such thing as negative zero and
+    # the clifford numer 0 is the identity that is necessary for
+    # benchmarking an idling identity with the same duration as the time
+    # allocated to the flux pulses, for example
+    # cliff = Clifford(abs(idx))  # Deprecated!
+    if np.any(rb_clifford_indices < 0):
+        raise ValueError(
             "The convention for interleaved gates has changed! "
-            + "See notes in this function. "
-            + "You probably need to specify {}".format(100_000 + abs(idx))
+            + "See notes in calculate_net_clifford_indices. "
+            + "You probably need to specify {}".format(
+                100_000 + abs(np.min(rb_clifford_indices)))
         )
 
-        # In order to benchmark specific gates (and not cliffords), e.g. CZ but
-        # not as a member of the CNOT-like set of gates, or an identity with
-        # the same duration as the CZ we use, by convention, when specifying
-        # the interleaved gate, the index of the corresponding
-        # clifford + 100000, this is to keep it readable and bigger than the
-        # 11520 elements of the Two-qubit Clifford group C2
-        # corresponding clifford
-        cliff = Cliff(idx % 100_000)
-
+    # In order to benchmark specific gates (and not cliffords), e.g. CZ but
+    # not as a member of the CNOT-like set of gates, or an identity with
+    # the same duration as the CZ we use, by convention, when specifying
+    # the interleaved gate, the index of the corresponding
+    # clifford + 100000, this is to keep it readable and bigger than the
+    # 11520 elements of the Two-qubit Clifford group C2
+    # corresponding clifford
+    rb_clifford_indices = rb_clifford_indices % 100_000
+    if np.any(rb_clifford_indices >= Cliff.GRP_SIZE):
+        raise ValueError(
+            "Clifford index {} out of range for {} (group size {})".format(
+                np.max(rb_clifford_indices), Cliff.__name__, Cliff.GRP_SIZE))
+
+    cayley_table = Cliff.get_cayley_table()
+    # assumes element 0 is the Identity
+    net_clifford_indices = np.zeros(rb_clifford_indices.shape[:-1], dtype=int)
+    for cl_indices in np.moveaxis(rb_clifford_indices, -1, 0):
         # order of operators applied in is right to left, therefore
         # the new operator is applied on the left side.
-        net_clifford = cliff * net_clifford
+        net_clifford_indices = cayley_table[cl_indices, net_clifford_indices].astype(int)
 
-    return net_clifford
+    return net_clifford_indices
 
 
 # FIXME: deprecate along with randomized_benchmarking_sequence_old()
@@ -209,10 +240,97 @@ def randomized_benchmarking_sequence(
 
     if desired_net_cl is not None:
         # Calculate the net clifford
-        net_clifford = calculate_net_clifford(rb_clifford_indices, Cl)
+        net_clifford_idx = calculate_net_clifford_indices(rb_clifford_indices, Cl)
 
         # determine the inverse of the sequence
-        recovery_to_idx_clifford = net_clifford.get_inverse()
-        recovery_clifford = Cl(desired_net_cl) * recovery_to_idx_clifford
-        rb_clifford_indices = np.append(rb_clifford_indices, recovery_clifford.idx)
+        recovery_clifford = calculate_recovery_clifford_indices(
+            net_clifford_idx, desired_net_cl, Cl)
+        rb_clifford_indices = np.append(rb_clifford_indices, int(recovery_clifford))
     return rb_clifford_indices
+
+
+def calculate_recovery_clifford_indices(
+        net_clifford_indices: np.ndarray,
+        desired_net_cl: int = 0,
+        Cliff:Clifford = SingleQubitClifford
+) -> np.ndarray:
+    """
+    Calculates the cliffords that have to be appended to sequences with net
+    cliffords `net_clifford_indices` to make their net operation correspond
+    to `desired_net_cl`.
+
+    Vectorized equivalent of
+        `Cliff(desired_net_cl) * Cliff(net_clifford_idx).get_inverse()`
+    """
+    inverse_indices = Cliff.get_inverse_table()[np.asarray(net_clifford_indices)]
+    return Cliff.get_cayley_table()[desired_net_cl, inverse_indices].astype(int)
+
+
+def randomized_benchmarking_sequences(
+    nr_cliffords: list,
+    nr_seeds: int,
+    desired_net_cl: int = 0,
+    number_of_qubits: int = 1,
+    max_clifford_idx: int = 11520,
+    interleaving_cl: int = None,
+    seed: int = None,
+) -> list:
+    """
+    Generates randomized benchmarking sequences for all seeds and all
+    sequence lengths at once, see `randomized_benchmarking_sequence` for the
+    single sequence equivalent.
+
+    Args:
+        nr_cliffords (list): the number of Cliffords of the sequences
+        nr_seeds (int): number of random sequences per number of Cliffords
+        desired_net_cl (int): idx of the desired net clifford, if None is
+            specified no recovery Clifford is calculated
+        number_of_qubits (int): used to determine if Cliffords are drawn
+            from the single qubit or two qubit clifford group.
+        max_clifford_idx (int): used to set the index of the highest random
+            clifford generated.
+        interleaving_cl (int): interleaves the sequences with a specific
+            clifford if desired
+        seed (int): seed used to initialize the random number generators.
+            Every RB seed gets an independent `numpy.random.Generator`
+            spawned from this seed, such that the sequences of a given RB
+            seed do not depend on `nr_seeds`.
+
+    Returns:
+        list with one 2D integer array of clifford indices per entry of
+        `nr_cliffords`, of shape (nr_seeds, sequence length). If
+        `desired_net_cl` is not None the last column contains the recovery
+        cliffords.
+    """
+    if number_of_qubits == 1:
+        Cl = SingleQubitClifford
+        group_size = np.min([24, max_clifford_idx])
+    elif number_of_qubits == 2:
+        Cl = TwoQubitClifford
+        group_size = np.min([11520, max_clifford_idx])
+    else:
+        raise NotImplementedError()
+
+    rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(nr_seeds)]
+
+    rb_sequences = []
+    for n_cl in nr_cliffords:
+        rb_clifford_indices = np.array(
+            [rng.integers(0, group_size, int(n_cl)) for rng in rngs], dtype=int
+        ).reshape(nr_seeds, int(n_cl))
+
+        # Add interleaving cliffords if applicable
+        if interleaving_cl is not None:
+            rb_clif_ind_intl = np.empty((nr_seeds, 2 * int(n_cl)), dtype=int)
+            rb_clif_ind_intl[:, 0::2] = rb_clifford_indices
+            rb_clif_ind_intl[:, 1::2] = interleaving_cl
+            rb_clifford_indices = rb_clif_ind_intl
+
+        if desired_net_cl is not None:
+            net_clifford_indices = calculate_net_clifford_indices(rb_clifford_indices, Cl)
+            recovery_cliffords = calculate_recovery_clifford_indices(
+                net_clifford_indices, desired_net_cl, Cl)
+            rb_clifford_indices = np.column_stack(
+                [rb_clifford_indices, recovery_cliffords])
+        rb_sequences.append(rb_clifford_indices.astype(int))
+    return rb_sequences
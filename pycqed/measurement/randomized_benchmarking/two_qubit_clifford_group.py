@@ -1,6 +1,6 @@
 import numpy as np
 from zlib import crc32
-from os.path import join, dirname, abspath
+from os.path import join, dirname, abspath, exists
 from pycqed.measurement.randomized_benchmarking.clifford_group import clifford_group_single_qubit as C1, CZ, S1
 from pycqed.measurement.randomized_benchmarking.clifford_decompositions import epstein_efficient_decomposition
 
@@ -106,6 +106,9 @@ common_cliffords = {'I':  0, 'X':  3, 'Y':  6, 'Z':  9,
 class Clifford(object):
     # class variables
     _hash_table = None
+    _cayley_table = None
+    _inverse_table = None
+    _flat_gate_decompositions = None
 
     def __mul__(self, other):
         """
@@ -129,6 +132,51 @@ class Clifford(object):
         idx = self._get_clifford_id(inverse_ptm)
         return self.__class__(idx)
 
+    ##########################################################################
+    # Class methods
+    ##########################################################################
+
+    @classmethod
+    def get_cayley_table(cls) -> np.ndarray:
+        """
+        Returns the (memory-mapped) Cayley table of the group.
+
+        Element [i, j] is the index of the product `cls(i) * cls(j)`.
+        The table is generated the first time it is requested.
+        """
+        if cls._cayley_table is None:
+            cls._cayley_table = _load_clifford_table(cls._TABLE_PREFIX, 'cayley')
+        return cls._cayley_table
+
+    @classmethod
+    def get_inverse_table(cls) -> np.ndarray:
+        """
+        Returns the (memory-mapped) table of inverses of the group.
+
+        Element i is the index of `cls(i).get_inverse()`.
+        The table is generated the first time it is requested.
+        """
+        if cls._inverse_table is None:
+            cls._inverse_table = _load_clifford_table(cls._TABLE_PREFIX, 'inverse')
+        return cls._inverse_table
+
+    @classmethod
+    def get_flat_gate_decompositions(cls):
+        """
+        Returns the gate decompositions of all elements of the group as a
+        single flattened list of gates and an array of offsets.
+
+        The gates of element i are `gates[offsets[i]:offsets[i+1]]`. This
+        avoids instantiating a Clifford object to look up the decomposition
+        of every clifford in a sequence.
+        """
+        if cls._flat_gate_decompositions is None:
+            decompositions = [cls(idx).gate_decomposition for idx in range(cls.GRP_SIZE)]
+            offsets = np.cumsum([0] + [len(gates) for gates in decompositions])
+            gates = [gate for gates in decompositions for gate in gates]
+            cls._flat_gate_decompositions = (gates, offsets)
+        return cls._flat_gate_decompositions
+
     ##########################################################################
     # Abstract class methods
     ##########################################################################
@@ -141,6 +189,7 @@ class Clifford(object):
 class SingleQubitClifford(Clifford):
     # class constants
     GRP_SIZE = 24
+    _TABLE_PREFIX = 'single_qubit'
 
     # class variables
     _gate_decompositions = [None] * GRP_SIZE
@@ -194,6 +243,8 @@ class TwoQubitClifford(Clifford):
     assert(GRP_SIZE_CNOT == 5184)
     assert(GRP_SIZE == 11520)
 
+    _TABLE_PREFIX = 'two_qubit'
+
     # FIXME: fix remaining magic constants below, and handle common code blocks as such
 
     # class variables
@@ -497,6 +548,20 @@ def get_two_qubit_clifford_hash_table():
         hash_table = [int(line.rstrip('\n')) for line in f]
     return hash_table
 
+def _load_clifford_table(prefix: str, kind: str) -> np.ndarray:
+    """
+    Loads the Cayley or inverse table (`kind` 'cayley' or 'inverse') of the
+    group given by `prefix` as a read-only memory map. The tables of the
+    group are generated if they do not exist yet, see
+    "generate_clifford_hash_tables.py".
+    """
+    fn = join(hash_dir, '{}_{}_table.npy'.format(prefix, kind))
+    if not exists(fn):
+        print("Clifford group Cayley tables not detected.")
+        from pycqed.measurement.randomized_benchmarking.generate_clifford_hash_tables import generate_cayley_table
+        generate_cayley_table(prefix)
+    return np.load(fn, mmap_mode='r')
+
 # FIXME: replace by class methods _get_clifford_id()
 # def get_clifford_id(pauli_transfer_matrix):
 #     """
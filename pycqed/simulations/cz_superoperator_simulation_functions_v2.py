@@ -1,6 +1,7 @@
 import numpy as np
 import qutip as qtp
 import scipy
+import scipy.linalg
 
 from scipy.interpolate import interp1d
 import matplotlib.pyplot as plt
@@ -208,6 +209,24 @@ def coupled_transmons_hamiltonian_new(w_q0, w_q1, alpha_q0, alpha_q1, J):
 def calc_hamiltonian(amp, fluxlutman, fluxlutman_static, which_gate: str = "NE"):
     # all inputs should be given in terms of frequencies, i.e. without the 2*np.pi factor
     # instead, the output H includes already that factor
+    w_q0, w_q1, alpha_q0, alpha_q1, J_temp = calc_hamiltonian_coefficients(
+        amp, fluxlutman, fluxlutman_static, which_gate=which_gate
+    )
+
+    H = coupled_transmons_hamiltonian_new(
+        w_q0=w_q0, w_q1=w_q1, alpha_q0=alpha_q0, alpha_q1=alpha_q1, J=J_temp
+    )
+    return H
+
+
+def calc_hamiltonian_coefficients(
+    amp, fluxlutman, fluxlutman_static, which_gate: str = "NE"
+):
+    """
+    Frequencies, anharmonicities and coupling of the Hamiltonian of
+    coupled_transmons_hamiltonian_new at pulse amplitude amp (float or array).
+    Returns w_q0, w_q1, alpha_q0, alpha_q1, J (without the 2*np.pi factor).
+    """
     w_q0 = fluxlutman.calc_amp_to_freq(amp, "01", which_gate=which_gate)
     w_q1 = fluxlutman.calc_amp_to_freq(amp, "10", which_gate=which_gate)
     alpha_q0 = fluxlutman.calc_amp_to_freq(amp, "02", which_gate=which_gate) - 2 * w_q0
@@ -226,11 +245,7 @@ def calc_hamiltonian(amp, fluxlutman, fluxlutman_static, which_gate: str = "NE")
         / ((delta_q1 + delta_q0_intpoint) / (delta_q1 * delta_q0_intpoint))
         * ((delta_q1 + delta_q0) / (delta_q1 * delta_q0))
     )
-
-    H = coupled_transmons_hamiltonian_new(
-        w_q0=w_q0, w_q1=w_q1, alpha_q0=alpha_q0, alpha_q1=alpha_q1, J=J_temp
-    )
-    return H
+    return w_q0, w_q1, alpha_q0, alpha_q1, J_temp
 
 
 def rotating_frame_transformation_propagator_new(U, t: float, H):
@@ -1183,6 +1198,209 @@ def time_evolution_new(
     return U_final
 
 
+########################################################################
+# NumPy propagator engine
+########################################################################
+
+# Operators of coupled_transmons_hamiltonian_new as dense arrays
+_H_operators = [
+    op.full()
+    for op in [
+        n_q0,
+        n_q1,
+        a.dag() * a.dag() * a * a,
+        b.dag() * b.dag() * b * b,
+        a.dag() * b + a * b.dag(),
+    ]
+]
+
+
+def calc_hamiltonian_numpy(
+    amp, fluxlutman, fluxlutman_static, which_gate: str = "NE"
+):
+    """
+    Stack of the Hamiltonians calc_hamiltonian(amp[i], ...) as an array of
+    shape (len(amp), dim, dim).
+    """
+    amp = np.atleast_1d(amp)
+    coefficients = calc_hamiltonian_coefficients(
+        amp, fluxlutman, fluxlutman_static, which_gate=which_gate
+    )
+    w_q0, w_q1, alpha_q0, alpha_q1, J = [
+        np.broadcast_to(np.real(c), amp.shape)[:, None, None] for c in coefficients
+    ]
+    N_q0, N_q1, anharm_q0, anharm_q1, coupling = _H_operators
+    H = (
+        w_q0 * N_q0
+        + w_q1 * N_q1
+        + 1 / 2 * alpha_q0 * anharm_q0
+        + 1 / 2 * alpha_q1 * anharm_q1
+        - J * coupling
+    )
+    return H * (2 * np.pi)
+
+
+def _spre(A):
+    # Superoperator of A * rho in the column stacking convention of qutip
+    eye = np.eye(A.shape[-1])
+    return np.einsum("ij,...kl->...ikjl", eye, A).reshape(
+        A.shape[:-2] + (A.shape[-1] ** 2, A.shape[-1] ** 2)
+    )
+
+
+def _spost(A):
+    # Superoperator of rho * A in the column stacking convention of qutip
+    eye = np.eye(A.shape[-1])
+    return np.einsum("...ji,kl->...ikjl", A, eye).reshape(
+        A.shape[:-2] + (A.shape[-1] ** 2, A.shape[-1] ** 2)
+    )
+
+
+def _lindblad_dissipator(c):
+    cdag_c = c.conj().T @ c
+    return _spre(c) @ _spost(c.conj().T) - 0.5 * _spre(cdag_c) - 0.5 * _spost(cdag_c)
+
+
+def _ordered_product(U):
+    """
+    Time-ordered product U[-1] @ ... @ U[1] @ U[0] of a stack of matrices,
+    computed as a tree of batched matrix products.
+    """
+    while len(U) > 1:
+        products = U[1::2] @ U[0:len(U) - 1:2]
+        if len(U) % 2:
+            products = np.concatenate((products, U[-1:]))
+        U = products
+    return U[0]
+
+
+def time_evolution_numpy(
+    c_ops,
+    sim_control_CZ,
+    fluxlutman,
+    fluxlutman_static,
+    fluxbias_q1,
+    amp,
+    sim_step=None,
+    intervals_list=None,
+    which_gate: str = "NE",
+    batch_size: int = 256,
+):
+    """
+    Calculates the propagator (either unitary or superoperator)
+
+    Equivalent to time_evolution_new, but uses dense NumPy arrays instead
+    of Qobj's. The propagator of every unique time step (amplitude,
+    duration and rates of the jump operators) is computed once, by
+    diagonalizing the Hamiltonian in the unitary case or by exponentiating
+    the Liouvillian in stacks. The propagators of the time steps are
+    multiplied in batches of batch_size using a tree of matrix products.
+    The propagator agrees with the one of time_evolution_new within 1e-9.
+
+    Args:
+        see time_evolution_new
+        batch_size (int): number of time steps that are processed at once
+
+    Returns
+        U_final(Qobj): propagator
+
+    """
+    q_freq_10 = fluxlutman.get("q_freq_10_{}".format(which_gate))
+
+    if intervals_list is None:
+        intervals_list = np.zeros(np.size(amp)) + sim_step
+    amp = np.asarray(amp, dtype=float)
+    intervals_list = np.asarray(intervals_list, dtype=float)
+
+    H_0 = calc_hamiltonian(0, fluxlutman, fluxlutman_static, which_gate=which_gate)
+    if sim_control_CZ.dressed_compsub():
+        S = matrix_change_of_variables(H_0)
+    else:
+        S = np.eye(n_levels_q1 * n_levels_q0)
+
+    w_q1 = q_freq_10  # we 'save' the input value of w_q1
+    if fluxbias_q1 != 0:
+        w_q1_sweetspot = sim_control_CZ.w_q1_sweetspot()
+        if w_q1 > w_q1_sweetspot:
+            log.warning(
+                "Operating frequency of q1 should be lower than its sweet spot frequency."
+            )
+            w_q1 = w_q1_sweetspot
+
+        w_q1_biased = shift_due_to_fluxbias_q0_singlefrequency(
+            f_pulse=w_q1,
+            omega_0=w_q1_sweetspot,
+            fluxbias=fluxbias_q1,
+            positive_branch=True,
+        )
+    else:
+        w_q1_biased = w_q1
+
+    log.debug(
+        "Changing fluxlutman q_freq_10_{} value to {}".format(which_gate, w_q1_biased)
+    )
+    fluxlutman.set("q_freq_10_{}".format(which_gate), w_q1_biased)
+
+    # A time step is determined by its amplitude, its duration and the
+    # rates of the amplitude dependent jump operators
+    const_c_ops = [c.full() for c in c_ops if not isinstance(c, list)]
+    td_c_ops = [c for c in c_ops if isinstance(c, list)]
+    steps = np.column_stack(
+        [amp, intervals_list]
+        + [np.broadcast_to(np.asarray(c[1], dtype=float), amp.shape) for c in td_c_ops]
+    )
+    unique_steps, step_idx = np.unique(steps, axis=0, return_inverse=True)
+    step_idx = np.ravel(step_idx)
+
+    unique_amps, amp_idx = np.unique(unique_steps[:, 0], return_inverse=True)
+    H = calc_hamiltonian_numpy(
+        unique_amps, fluxlutman, fluxlutman_static, which_gate=which_gate
+    )
+    H = S.conj().T @ H @ S
+    dt = unique_steps[:, 1]
+
+    if c_ops != []:
+        # N.B. the jump operators are already in the H_0 basis
+        L_const = sum(
+            (_lindblad_dissipator(c) for c in const_c_ops),
+            np.zeros(((n_levels_q1 * n_levels_q0) ** 2,) * 2, dtype=complex),
+        )
+        D_td = [_lindblad_dissipator(c[0].full()) for c in td_c_ops]
+        L_H = -1j * (_spre(H) - _spost(H))
+        U_steps = np.empty(
+            (len(unique_steps),) + L_const.shape, dtype=complex
+        )
+        for start in range(0, len(unique_steps), batch_size):
+            batch = slice(start, start + batch_size)
+            L = L_H[amp_idx[batch]] + L_const
+            for k, D in enumerate(D_td):
+                L = L + (unique_steps[batch, 2 + k] ** 2)[:, None, None] * D
+            U_steps[batch] = scipy.linalg.expm(L * dt[batch, None, None])
+        dims = [[[n_levels_q1, n_levels_q0]] * 2] * 2
+    else:
+        E, V = np.linalg.eigh(H)
+        E, V = E[amp_idx], V[amp_idx]
+        U_steps = (V * np.exp(-1j * E * dt[:, None])[:, None, :]) @ V.conj().transpose(
+            0, 2, 1
+        )
+        dims = [[n_levels_q1, n_levels_q0]] * 2
+
+    exp_L_total = np.eye(U_steps.shape[-1], dtype=complex)
+    for start in range(0, len(step_idx), batch_size):
+        exp_L_total = (
+            _ordered_product(U_steps[step_idx[start:start + batch_size]])
+            @ exp_L_total
+        )
+
+    log.debug(
+        "Changing fluxlutman q_freq_10_{} value back to {}".format(which_gate, w_q1)
+    )
+    fluxlutman.set("q_freq_10_{}".format(which_gate), w_q1)
+
+    U_final = qtp.Qobj(exp_L_total, dims=dims)
+    return U_final
+
+
 def simulate_quantities_of_interest_superoperator_new(
     U, t_final, fluxlutman, fluxlutman_static, sim_control_CZ, which_gate: str = "NE"
 ):
@@ -19,6 +19,8 @@ from scipy.interpolate import interp1d
 import qutip as qtp
 import cma
 
+import pickle
+from concurrent.futures import ProcessPoolExecutor
 import logging
 
 reload(scCZ_v2)
@@ -364,7 +366,11 @@ def compute_propagator(arglist):
     )
 
     # Compute propagator
-    U_final = czf_v2.time_evolution_new(
+    if sim_control_CZ.propagator_engine() == "numpy":
+        time_evolution = czf_v2.time_evolution_numpy
+    else:
+        time_evolution = czf_v2.time_evolution_new
+    U_final = time_evolution(
         c_ops=c_ops,
         sim_control_CZ=sim_control_CZ,
         fluxlutman_static=fluxlutman_static,
@@ -379,6 +385,63 @@ def compute_propagator(arglist):
     return [U_final, t_final]
 
 
+# Instruments of a worker process of CZ_trajectory_superoperator, these are
+# created on the first call and updated only when the settings change
+_worker_instruments = None
+_worker_instrument_args = None
+
+
+def return_worker_instrument_args(fluxlutman, fluxlutman_static, sim_control_CZ):
+    """
+    Returns the settings of the instruments, pickled to be sent to the
+    worker processes of CZ_trajectory_superoperator.
+    """
+    args = []
+    for instrument in [fluxlutman, fluxlutman_static, sim_control_CZ]:
+        instr_args = czf_v2.return_instrument_args_v2(instrument)
+        # The cost function is not needed to compute the propagator and
+        # unset parameters can not be set in the worker
+        args.append(
+            {
+                key: val
+                for key, val in instr_args.items()
+                if key != "cost_func" and val is not None
+            }
+        )
+    return pickle.dumps(args)
+
+
+def compute_propagator_in_worker(instrument_args, arglist):
+    """
+    Computes the propagator in a worker process, see compute_propagator.
+
+    Args:
+        instrument_args (bytes): see return_worker_instrument_args
+        arglist (dict): arglist of compute_propagator without instruments
+    """
+    global _worker_instruments, _worker_instrument_args
+
+    if _worker_instruments is None:
+        _worker_instruments = [
+            flm.HDAWG_Flux_LutMan("fluxlutman_worker"),
+            flm.HDAWG_Flux_LutMan("fluxlutman_static_worker"),
+            scCZ_v2.SimControlCZ_v2("sim_control_CZ_worker"),
+        ]
+    if instrument_args != _worker_instrument_args:
+        for instrument, args in zip(_worker_instruments, pickle.loads(instrument_args)):
+            czf_v2.return_instrument_from_arglist_v2(instrument, args)
+        _worker_instrument_args = instrument_args
+
+    fluxlutman, fluxlutman_static, sim_control_CZ = _worker_instruments
+    arglist = dict(
+        arglist,
+        fluxlutman=fluxlutman,
+        fluxlutman_static=fluxlutman_static,
+        sim_control_CZ=sim_control_CZ,
+    )
+    return compute_propagator(arglist)
+
+
 class CZ_trajectory_superoperator(det.Soft_Detector):
     def __init__(
         self,
@@ -481,6 +544,46 @@ class CZ_trajectory_superoperator(det.Soft_Detector):
             # list of 2 elements: stepresponse (=y) as a function of time (=t)
             self.fitted_stepresponse_ty = fitted_stepresponse_ty
 
+        self._executor = None
+        self._executor_nr_workers = None
+
+    def compute_propagators(self, input_to_parallelize):
+        """
+        Computes the propagators for a list of arglists of
+        compute_propagator, in parallel if sim_control_CZ.nr_workers() > 1.
+        The results are returned in the order of the input.
+        """
+        nr_workers = self.sim_control_CZ.nr_workers()
+        if nr_workers == 1:
+            return [compute_propagator(arglist) for arglist in input_to_parallelize]
+
+        if self._executor_nr_workers != nr_workers:
+            self.finish()
+            self._executor = ProcessPoolExecutor(max_workers=nr_workers)
+            self._executor_nr_workers = nr_workers
+
+        instrument_args = return_worker_instrument_args(
+            self.fluxlutman, self.fluxlutman_static, self.sim_control_CZ
+        )
+        instrument_keys = ["fluxlutman", "fluxlutman_static", "sim_control_CZ"]
+        worker_arglists = [
+            {key: val for key, val in arglist.items() if key not in instrument_keys}
+            for arglist in input_to_parallelize
+        ]
+        return list(
+            self._executor.map(
+                compute_propagator_in_worker,
+                [instrument_args] * len(worker_arglists),
+                worker_arglists,
+            )
+        )
+
+    def finish(self, **kw):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._executor_nr_workers = None
+
     def acquire_data_point(self, **kw):
 
         # Discretize average (integral) over a Gaussian distribution
@@ -531,8 +634,8 @@ class CZ_trajectory_superoperator(det.Soft_Detector):
                 delta_x_q1 = 1
                 values_gaussian_q1 = np.array([1])
 
-            # This is actually the input that was parallelized in an old version.
-            # Currently it just creates a list that is provided sequentially to compute_propagator
+            # List of arglists for compute_propagator, computed in parallel
+            # if sim_control_CZ.nr_workers() > 1
             input_to_parallelize = []
 
             weights = []
@@ -566,8 +669,7 @@ class CZ_trajectory_superoperator(det.Soft_Detector):
 
             U_final_vec = []
             t_final_vec = []
-            for input_arglist in input_to_parallelize:
-                result_list = compute_propagator(input_arglist)
+            for result_list in self.compute_propagators(input_to_parallelize):
                 if self.sim_control_CZ.double_cz_pi_pulses() != "":
                     # Experimenting with single qubit ideal pi pulses
                     if self.sim_control_CZ.double_cz_pi_pulses() == "with_pi_pulses":
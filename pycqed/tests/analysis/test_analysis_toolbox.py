@@ -1,7 +1,12 @@
 import os
+import time
+import sqlite3
 import pytest
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pycqed as pq
 from pycqed.analysis import analysis_toolbox as a_tools
+from pycqed.utilities.datadir_index import DatadirIndex
 
 datadir = os.path.join(pq.__path__[0], 'tests', 'test_data')
 a_tools.datadir = datadir
@@ -36,3 +41,85 @@ def test_get_datafilepath_from_timestamp_raises_no_data():
     timestamp = '20170412_183929'
     with pytest.raises(ValueError):
         a_tools.get_datafilepath_from_timestamp(timestamp)
+
+
+def test_datadir_index_tracks_new_folders(tmpdir):
+    from pycqed.measurement.hdf5_data import DateTimeGenerator
+    tmp_datadir = str(tmpdir)
+    ts = time.strptime('20200102_101010', '%Y%m%d_%H%M%S')
+    path, tsd = DateTimeGenerator().create_data_dir(
+        tmp_datadir, name='Rabi', ts=ts)
+    assert os.path.isdir(path)
+    assert a_tools.latest_data('Rabi', folder=tmp_datadir) == path
+
+    # Folders that are not created through the DateTimeGenerator are found too
+    os.makedirs(os.path.join(tmp_datadir, '20200102', '111111_Ramsey'))
+    assert a_tools.latest_data(folder=tmp_datadir).endswith('111111_Ramsey')
+    assert a_tools.data_from_time('20200102_101010', folder=tmp_datadir) == path
+
+    # The index persists between sessions
+    index = a_tools.get_datadir_index(tmp_datadir)
+    assert os.path.isfile(index.filename)
+    new_index = DatadirIndex(tmp_datadir)
+    assert new_index.get_measdirs('20200102') == ['101010_Rabi', '111111_Ramsey']
+
+
+def test_datadir_index_closes_connections(tmpdir, monkeypatch):
+    connections = []
+
+    def connect(*args, **kw):
+        connections.append(sqlite3_connect(*args, **kw))
+        return connections[-1]
+    sqlite3_connect = sqlite3.connect
+    monkeypatch.setattr(sqlite3, 'connect', connect)
+
+    os.makedirs(os.path.join(str(tmpdir), '20200102', '101010_Rabi'))
+    index = DatadirIndex(str(tmpdir))
+    assert index.get_measdirs('20200102', rescan=True) == ['101010_Rabi']
+    assert len(connections) == 2
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+    # the database is still usable after closing
+    assert DatadirIndex(str(tmpdir)).get_measdirs('20200102') == ['101010_Rabi']
+
+
+def test_get_data_from_timestamp_list_h5py():
+    timestamps = ['20170412_183928', '20170412_185618']
+    params_dict = {'folder': 'folder', 'sweep_points': 'sweep_points',
+                   'measured_values': 'measured_values',
+                   'value_names': 'value_names'}
+    ref_data = a_tools.get_data_from_timestamp_list(
+        list(timestamps), param_names=params_dict)
+
+    for nr_workers in [1, 2]:
+        data = a_tools.get_data_from_timestamp_list_h5py(
+            list(timestamps), param_names=params_dict, nr_workers=nr_workers)
+        assert list(data.keys()) == list(ref_data.keys())
+        assert data['timestamps'] == timestamps
+        assert data['folder'] == ref_data['folder']
+        assert data['value_names'] == ref_data['value_names']
+        for key in ['sweep_points', 'measured_values']:
+            for val, ref_val in zip(data[key], ref_data[key]):
+                np.testing.assert_array_equal(val, ref_val)
+
+
+def test_get_data_from_timestamp_list_h5py_workers(monkeypatch):
+    nr_workers = []
+
+    class Executor(ThreadPoolExecutor):
+        def __init__(self, max_workers):
+            super().__init__(max_workers=max_workers)
+            nr_workers.append(max_workers)
+    monkeypatch.setattr(a_tools, 'ProcessPoolExecutor', Executor)
+    monkeypatch.setattr(a_tools.os, 'cpu_count', lambda: 64)
+
+    timestamps = ['20170412_183928', '20170412_185618']
+    a_tools.get_data_from_timestamp_list_h5py(
+        list(timestamps), param_names=['folder'])
+    # No more processes than timestamps are started
+    assert nr_workers == [2]
+
+    with pytest.raises(ValueError):
+        a_tools.get_data_from_timestamp_list_h5py(
+            list(timestamps), param_names='folder')
@@ -0,0 +1,109 @@
+import unittest
+import numpy as np
+from scipy import signal
+from pycqed.analysis_v2 import cryoscope_v2_tools as ct
+
+
+class Test_cryoscope_v2_tools(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+        rng = np.random.RandomState(0)
+        self.time_ns = np.arange(1, 81) * 1.0
+        # detuning settling towards the plateau, as for a distorted flux pulse
+        self.freqs = 0.3 * (1 - 0.15 * np.exp(-self.time_ns / 8))
+        phase = 2 * np.pi * np.cumsum(self.freqs) + 0.7
+        self.osc_data = 0.45 * np.cos(phase) + 0.5 \
+            + 0.005 * rng.randn(len(self.time_ns))
+
+    def test_batched_cos_fit(self):
+        t = np.tile(np.arange(5.0), (3, 1))
+        p_true = np.array([[0.4, 0.2, 0.1, 0.5],
+                           [0.5, 0.3, -2.0, 0.4],
+                           [0.3, 0.25, 3.0, 0.6]])
+        y = p_true[:, 0, None] * np.cos(
+            2 * np.pi * p_true[:, 1, None] * t + p_true[:, 2, None]) \
+            + p_true[:, 3, None]
+        mask = np.ones(t.shape, dtype=bool)
+        p0 = p_true + [0.05, 0.02, 0.3, -0.05]
+        vary = np.ones(4, dtype=bool)
+        p, p_stderr, chisqr = ct.batched_cos_fit(
+            t, y, mask, p0, vary,
+            p_min=np.array([0, 0.1, -10, -np.inf]),
+            p_max=np.array([1, 0.8, 10, np.inf]))
+        np.testing.assert_allclose(p, p_true, atol=1e-6)
+        np.testing.assert_allclose(chisqr, 0, atol=1e-12)
+
+        # fixed parameters are not changed and have no error
+        vary[3] = False
+        p, p_stderr, chisqr = ct.batched_cos_fit(
+            t, y, mask, p0, vary,
+            p_min=np.array([0, 0.1, -10, -np.inf]),
+            p_max=np.array([1, 0.8, 10, np.inf]))
+        np.testing.assert_array_equal(p[:, 3], p0[:, 3])
+        np.testing.assert_array_equal(p_stderr[:, 3], 0)
+
+    def test_batched_engine_matches_lmfit(self):
+        res = {}
+        for engine in ["lmfit", "batched"]:
+            res[engine] = ct.cryoscope_v2_processing(
+                time_ns=self.time_ns,
+                osc_data=self.osc_data,
+                vln="cos",
+                min_params={"frequency": 0.1},
+                max_params={"frequency": 0.6},
+                fitting_engine=engine)
+        res_lmfit, res_batched = res["lmfit"], res["batched"]
+
+        self.assertEqual(res_lmfit["results"].keys(),
+                         res_batched["results"].keys())
+        np.testing.assert_array_equal(res_lmfit["time_ns"],
+                                      res_batched["time_ns"])
+        for par in ["frequency", "amplitude", "offset"]:
+            np.testing.assert_allclose(res_batched["results"][par],
+                                       res_lmfit["results"][par],
+                                       rtol=1e-3, atol=1e-4)
+            np.testing.assert_allclose(res_batched["results_stderr"][par],
+                                       res_lmfit["results_stderr"][par],
+                                       rtol=0.1, atol=1e-6)
+        # the phase is continuous and only defined modulo 2 pi
+        phase = res_batched["results"]["phase"]
+        self.assertLess(np.max(np.abs(np.diff(phase))), np.pi)
+        np.testing.assert_allclose(
+            np.cos(phase - res_lmfit["results"]["phase"]), 1, atol=1e-3)
+
+    def test_fir_response_matrix(self):
+        rng = np.random.RandomState(1)
+        step_response = np.concatenate(([0], 1 - 0.1 * np.exp(-np.arange(50) / 5)))
+        fir = rng.randn(12)
+        T = ct.fir_response_matrix(step_response, len(fir))
+        np.testing.assert_allclose(T @ fir, signal.lfilter(fir, 1, step_response))
+
+    def test_fir_least_squares(self):
+        t = np.arange(200) / 2.4
+        y = 1 - 0.05 * np.exp(-t / 5)
+        step_response = np.concatenate(([0], y))
+        response_matrix = ct.fir_response_matrix(step_response, 20)[1:].T
+        fir = ct.fir_least_squares(response_matrix, 1.0, np.ones(20))
+        self.assertAlmostEqual(np.sum(fir), 1)
+        identity = np.eye(20)[0]
+        self.assertLess(np.mean(np.abs(fir @ response_matrix - 1)),
+                        0.5 * np.mean(np.abs(identity @ response_matrix - 1)))
+
+    def test_optimize_fir(self):
+        t = np.arange(200) / 2.4
+        y = 1 - 0.05 * np.exp(-t / 5)
+        step_response = np.concatenate(([0], y))
+        cma_options = {"verb_disp": 0, "verb_log": 0, "maxfevals": 500, "seed": 1}
+        for optimize, kw in [(ct.optimize_fir_software, {"max_taps": 16}),
+                             (ct.optimize_fir_HDAWG, {"max_taps": 16, "hdawg_taps": 16})]:
+            opt_fir, es = optimize(y, baseline_start=150, cma_options=cma_options, **kw)
+            self.assertEqual(len(opt_fir), 16)
+            if optimize is ct.optimize_fir_HDAWG:
+                opt_fir = ct.convert_FIR_from_HDAWG(opt_fir)
+            # the population objective is the same as for a single FIR
+            yc = signal.lfilter(opt_fir, 1, step_response)
+            baseline = np.mean(y[150:])
+            self.assertAlmostEqual(
+                es.result.fbest, np.mean(np.abs(yc[1:] - baseline)) / baseline)
+            self.assertLess(es.result.fbest, 0.5 * np.mean(np.abs(y - baseline)))
@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+from pycqed.analysis_v2 import disturbancecalc as dc
+
+
+@unittest.skipIf(dc._cp is None, 'cvxpy is not installed')
+class Test_disturbancecalc(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+        rng = np.random.RandomState(3)
+        self.n_bits = 3
+        p = rng.dirichlet(2*np.ones(2**self.n_bits))
+        q = 0.8*p + 0.2*rng.dirichlet(np.ones(2**self.n_bits))
+        self.data_ref = rng.multinomial(20000, p)
+        self.data_test = rng.multinomial(20000, q)
+
+    def test_residual_tvd_cache(self):
+        cache = {}
+        rng = np.random.RandomState(0)
+        for i in range(2):
+            data_ref = rng.permutation(self.data_ref)
+            rtvds = dc.compute_residual_tvds(
+                self.n_bits, data_ref, self.data_test, None, max_weight=3,
+                verbosity=0, residual_tvd_cache=cache)
+            rtvds_ref = dc.compute_residual_tvds(
+                self.n_bits, data_ref, self.data_test, None, max_weight=3,
+                verbosity=0)
+            np.testing.assert_allclose(np.array(rtvds)[:, 0].astype(float),
+                                       np.array(rtvds_ref)[:, 0].astype(float),
+                                       atol=1e-5)
+        self.assertGreater(len(cache), 0)
+
+    def test_bootstrap_parallel(self):
+        finished = []
+        kw = dict(num_bootstrap_samples=4, max_weight=3, verbosity=0)
+        dist_ml, dist = dc.compute_disturbances_bootstrap_rawdata(
+            self.n_bits, self.data_ref, self.data_test, nr_workers=2,
+            callback=lambda i, d: finished.append(i), **kw)
+        self.assertEqual(dist.shape, (3, 4))
+        self.assertEqual(sorted(finished), [0, 1, 2, 3])
+        self.assertFalse(np.any(np.isnan(dist)))
+
+        # the samples do not depend on the number of workers
+        dist_ml_1, dist_1 = dc.compute_disturbances_bootstrap_rawdata(
+            self.n_bits, self.data_ref, self.data_test, nr_workers=1, **kw)
+        np.testing.assert_allclose(dist_ml, dist_ml_1)
+        np.testing.assert_allclose(dist, dist_1, atol=1e-4)
@@ -0,0 +1,102 @@
+import unittest
+import numpy as np
+import pycqed.analysis.tools.data_manipulation as dm_tools
+from pycqed.analysis_v2 import multiplexed_readout_analysis as mra
+
+
+class Test_Multiplexed_Readout_helpers(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+        rng = np.random.RandomState(0)
+        self.nr_qubits = 3
+        self.combinations = ['{:0{}b}'.format(i, self.nr_qubits)
+                             for i in range(2**self.nr_qubits)]
+        states = np.tile(np.arange(2**self.nr_qubits), 200)
+        bits = mra.get_state_bits(states, self.nr_qubits)
+        # every shot is preceded by a pre-measurement
+        self.raw_shots = np.empty((2*len(states), self.nr_qubits))
+        self.raw_shots[0::2] = 0.2*rng.randn(*bits.shape) \
+            + (rng.rand(*bits.shape) < 0.05)
+        self.raw_shots[1::2] = bits + 0.35*rng.randn(*bits.shape)
+
+    def test_split_and_digitize(self):
+        shots, pre_meas_shots, prepared_states = mra.split_mux_shots(
+            self.raw_shots, self.nr_qubits, post_selection=True)
+        np.testing.assert_array_equal(shots, self.raw_shots[1::2])
+        np.testing.assert_array_equal(pre_meas_shots, self.raw_shots[0::2])
+        for j, comb in enumerate(self.combinations):
+            np.testing.assert_array_equal(
+                shots[prepared_states == j], self.raw_shots[2*j+1::16])
+
+        declared_states = mra.digitize_mux_shots(shots, [0.5]*self.nr_qubits)
+        for i in range(self.nr_qubits):
+            np.testing.assert_array_equal(
+                mra.get_state_bits(declared_states, self.nr_qubits)[:, i],
+                shots[:, i] > 0.5)
+        # the declared state of a noiseless shot is the prepared state
+        bits = mra.get_state_bits(prepared_states, self.nr_qubits)
+        np.testing.assert_array_equal(
+            mra.digitize_mux_shots(bits, [0.5]*self.nr_qubits),
+            prepared_states)
+
+    def test_post_selection_mask(self):
+        pre_meas_shots = self.raw_shots[0::2]
+        thresholds = [0.5, 0.4, 0.6]
+        mask = mra.get_post_selection_mask(pre_meas_shots, thresholds)
+        idxs = dm_tools.get_post_select_indices(
+            thresholds=thresholds, init_measurements=pre_meas_shots.T)
+        np.testing.assert_array_equal(np.where(~mask)[0], idxs)
+
+    def test_assignment_and_cross_fidelity_matrix(self):
+        shots, _, prepared_states = mra.split_mux_shots(
+            self.raw_shots, self.nr_qubits, post_selection=True)
+        declared_states = mra.digitize_mux_shots(shots, [0.5]*self.nr_qubits)
+        A = mra.calc_assignment_prob_matrix_from_states(
+            prepared_states, declared_states, self.nr_qubits)
+        for i in range(len(self.combinations)):
+            np.testing.assert_allclose(A[i], np.bincount(
+                declared_states[prepared_states == i],
+                minlength=len(self.combinations))/200)
+
+        # digitized shots per channel and prepared state
+        digitized_data = mra.sort_shots_by_state(
+            mra.get_state_bits(declared_states, self.nr_qubits).astype(int),
+            prepared_states, ['ch{}'.format(i) for i in range(3)],
+            self.combinations)
+        np.testing.assert_allclose(
+            mra.calc_assignment_prob_matrix(self.combinations, digitized_data),
+            A)
+
+        Fc = mra.calc_cross_fidelity_matrix_from_states(
+            prepared_states, declared_states, self.nr_qubits)
+        np.testing.assert_allclose(
+            mra.calc_cross_fidelity_matrix(self.combinations, A), Fc)
+        # the diagonal is the assignment fidelity of every qubit
+        prepared_bits = mra.get_state_bits(prepared_states, self.nr_qubits)
+        declared_bits = mra.get_state_bits(declared_states, self.nr_qubits)
+        for i in range(self.nr_qubits):
+            P_e0 = np.mean(declared_bits[~prepared_bits[:, i], i])
+            P_g1 = np.mean(~declared_bits[prepared_bits[:, i], i])
+            self.assertAlmostEqual(Fc[i, i], 1 - P_e0 - P_g1)
+
+    def test_state_histograms(self):
+        shots, _, prepared_states = mra.split_mux_shots(
+            self.raw_shots, self.nr_qubits, post_selection=True)
+        bin_edges = np.linspace(np.min(shots[:, 0]), np.max(shots[:, 0]), 101)
+        counts = mra.calc_state_histograms(
+            shots[:, 0], prepared_states, self.nr_qubits, bin_edges)
+        for j in range(len(self.combinations)):
+            np.testing.assert_array_equal(
+                counts[j], np.histogram(shots[prepared_states == j, 0],
+                                        bins=bin_edges)[0])
+
+    def test_cdf_threshold(self):
+        rng = np.random.RandomState(1)
+        shots_0 = rng.randn(1000)
+        shots_1 = rng.randn(1000) + 4
+        cdf_data, F_a, th = mra.calc_cdf_threshold(shots_0, shots_1)
+        self.assertGreater(F_a, 0.97)
+        self.assertLess(abs(th - 2), 0.5)
+        self.assertEqual(cdf_data['cumsum_y_ds'][0][-1], 1000)
+        np.testing.assert_allclose(cdf_data['cumsum_y_ds_n'][1][-1], 1)
@@ -309,6 +309,111 @@ class test_HAL_ShimSQ(unittest.TestCase):
         self.assertEqual(self.MW2.frequency(), 4.56e9 + 100e6)
         self.assertEqual(self.MW2.power(), 13)
 
+    def test_prep_td_incremental(self):
+        self.assertTrue(self.shim.cfg_prepare_incremental())
+        self._check_prep_td_incremental()
+
+        self.shim.cfg_prepare_incremental(False)
+        try:
+            self.shim.prepare_for_timedomain()
+            self.assertFalse(any(step['skipped'] for step in self.shim.prepare_report().values()))
+        finally:
+            self.shim.cfg_prepare_incremental(True)
+
+    def _check_prep_td_incremental(self):
+        self.shim.prepare_for_timedomain(force=True)
+        report = self.shim.prepare_report()
+        self.assertFalse(any(step['skipped'] for step in report.values()))
+
+        # nothing changed
+        self.shim.prepare_for_timedomain()
+        report = self.shim.prepare_report()
+        for step in ['ro_awg', 'ro_sources', 'td_sources', 'mw_pulses']:
+            self.assertTrue(report[step]['skipped'])
+        self.assertFalse(report['ro_detectors']['skipped'])
+
+        # changing a qubit parameter only reruns the steps depending on it
+        self.shim.mw_pow_td_source(14)
+        self.shim.prepare_for_timedomain()
+        report = self.shim.prepare_report()
+        self.assertFalse(report['td_sources']['skipped'])
+        self.assertTrue(report['ro_awg']['skipped'])
+        self.assertEqual(self.MW2.power(), 14)
+
+        # changing an instrument parameter reruns the step configuring it
+        self.MW2.off()
+        self.shim.prepare_for_timedomain()
+        self.assertFalse(self.shim.prepare_report()['td_sources']['skipped'])
+        self.assertEqual(self.MW2.status(), 'on')
+
+        # preparing the readout of another qubit on the same instruments reruns the readout steps
+        other = HAL_ShimSQ('HAL_ShimSQ_other')
+        try:
+            for name, par in self.shim.parameters.items():
+                if name.startswith('instr_') and par() is not None:
+                    other.set(name, par())
+            other.ro_freq(5.53e9)
+            other.ro_freq_mod(250e6)  # NB: sets another frequency of the shared LO
+            other.cfg_qubit_nr(2)
+            other.prepare_readout()
+            self.shim.prepare_for_timedomain()
+            report = self.shim.prepare_report()
+            self.assertFalse(report['ro_awg']['skipped'])
+            self.assertFalse(report['ro_sources']['skipped'])
+            self.assertTrue(report['td_sources']['skipped'])
+
+            # also if the instruments were reconfigured without changing any parameters, e.g. by HAL_ShimMQ
+            other._invalidate_prep_instruments(['ro_awg'])
+            self.shim.prepare_for_timedomain()
+            report = self.shim.prepare_report()
+            self.assertFalse(report['ro_awg']['skipped'])
+            self.assertTrue(report['ro_sources']['skipped'])
+        finally:
+            other.close()
+
+    def test_prep_td_incremental_shared_mw_awg(self):
+        # qubits on other channels of the same microwave AWG do not invalidate each other's preparation
+        mw_lutman = mwl.AWG8_MW_LutMan('MW_LutMan_other')
+        other = HAL_ShimSQ('HAL_ShimSQ_other')
+        qubits = [self.shim, other]
+        try:
+            mw_lutman.channel_I(3)
+            mw_lutman.channel_Q(4)
+            mw_lutman.mw_modulation(100e6)
+            mw_lutman.sampling_rate(2.4e9)
+            mw_lutman.AWG(self.AWG.name)
+
+            for name, par in self.shim.parameters.items():
+                if name.startswith('instr_') and par() is not None:
+                    other.set(name, par())
+            other.instr_LutMan_MW(mw_lutman.name)
+            other.cfg_with_vsm(False)
+            other.freq_qubit(self.shim.freq_qubit())
+            other.mw_freq_mod(self.shim.mw_freq_mod())
+            other.mw_pow_td_source(self.shim.mw_pow_td_source())  # the LO is shared
+            other.mw_awg_ch(3)
+            other.mw_mixer_offs_GI(.3)
+            other.mw_mixer_offs_GQ(.4)
+            other.ro_freq(5.53e9)
+            other.ro_freq_mod(300e6)
+            other.cfg_qubit_nr(2)
+            self.shim.mw_awg_ch(1)
+
+            for qubit in qubits:
+                qubit.prepare_for_timedomain(force=True)
+            for qubit in qubits:
+                qubit.prepare_for_timedomain()
+                report = qubit.prepare_report()
+                self.assertTrue(report['mw_pulses']['skipped'])
+                self.assertTrue(report['td_sources']['skipped'])
+                # the readout UHFQA is shared
+                self.assertFalse(report['ro_awg']['skipped'])
+            self.assertEqual(self.AWG.sigouts_2_offset(), .3)
+            self.assertEqual(self.AWG.sigouts_3_offset(), .4)
+        finally:
+            other.close()
+            mw_lutman.close()
+
     # def test_prep_td_pulses(self):
     #     pass # FIXME: moved to HAL_Transmon
     # NB: lutman handling resides in HAL_Transmon, not HAL_ShimSQ
@@ -0,0 +1,113 @@
+import unittest
+import logging
+from contextlib import nullcontext
+import numpy as np
+
+from pycqed.instrument_drivers.library.Transport import IPTransport
+from pycqed.instrument_drivers.library.SCPIEmulator import SCPIEmulator
+from pycqed.instrument_drivers.physical_instruments.QuTech.QWGCore import QWGCore
+
+
+class Test_IPTransport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.emulator = SCPIEmulator()
+        cls.emulator.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.emulator.stop()
+
+    def setUp(self):
+        self.transport = IPTransport('127.0.0.1', self.emulator.port, timeout=10)
+        self.qwgcore = QWGCore('qwg', self.transport)
+
+    def tearDown(self):
+        self.transport.close()
+
+    def test_readline_multiple_replies(self):
+        # replies to queries sent in one write arrive together, and must be
+        # kept for subsequent reads
+        self.transport.write_binary(b'*IDN?\n*OPC?\nsystem:error:count?\n')
+        self.assertEqual(self.transport.readline(), self.emulator.identity + '\n')
+        self.assertEqual(self.transport.readline(), '1\n')
+        self.assertEqual(self.transport.readline(), '0\n')
+
+    def test_batch(self):
+        nr_commands = self.emulator.nr_commands
+        with self.qwgcore.batch():
+            for ch in range(4):
+                self.transport.write(f'SOUR{ch+1}:VOLT:LEV:IMM:AMPL {0.1*(ch+1):.1f}')
+            with self.qwgcore.batch():  # nested
+                self.transport.write('OUTPUT1:STATE 1')
+            self.assertEqual(len(self.transport._batch), 5)
+        self.assertIsNone(self.transport._batch)
+
+        replies = self.qwgcore._ask_many(
+            [f'SOUR{ch+1}:VOLT:LEV:IMM:AMPL?' for ch in range(4)] + ['OUTPUT1:STATE?'])
+        self.assertEqual(replies, ['0.1', '0.2', '0.3', '0.4', '1'])
+        self.assertEqual(self.emulator.nr_commands - nr_commands, 10)
+
+    def test_query_flushes_batch(self):
+        with self.qwgcore.batch():
+            self.transport.write('OUTPUT2:STATE 1')
+            self.assertEqual(self.qwgcore._ask('OUTPUT2:STATE?'), '1')
+            self.qwgcore.check_errors()
+
+    def test_waveform_round_trip(self):
+        rng = np.random.RandomState(0)
+        # large enough to need several receives, and containing '\n' bytes
+        waveform = rng.uniform(-1, 1, 100000).astype(np.float32)
+        waveform[:10] = np.frombuffer(b'\n' * 40, dtype=np.float32)
+        with self.qwgcore.batch():
+            self.qwgcore.new_waveform_real('test', len(waveform))
+            self.qwgcore.send_waveform_data_real('test', waveform)
+            self.qwgcore.send_waveform_data_real('test2', waveform[:3])
+        np.testing.assert_array_equal(self.qwgcore.get_waveform_data_float('test'), waveform)
+        np.testing.assert_array_equal(self.qwgcore.get_waveform_data_float('test2'), waveform[:3])
+        self.assertEqual(self.qwgcore.get_identity(), self.emulator.identity)
+
+    def test_read_binary_into(self):
+        self.transport.write('BIN:DATA #15abcde')
+        self.transport.write('BIN:DATA?')
+        buf = bytearray(8)
+        self.transport.read_binary_into(buf)
+        self.assertEqual(bytes(buf), b'#15abcde')
+        self.assertEqual(self.transport.read_binary(2), b'\r\n')
+
+    def test_batch_single_send(self):
+        nr_sends = []
+        write_binary = self.transport.write_binary
+        self.transport.write_binary = lambda data: (nr_sends.append(data), write_binary(data))
+
+        nr_commands = 100
+        for batched in [False, True]:
+            nr_sends.clear()
+            with self.qwgcore.batch() if batched else nullcontext():
+                for i in range(nr_commands):
+                    self.transport.write(f'TEST:VALUE {i}')
+            self.assertEqual(len(nr_sends), 1 if batched else nr_commands)
+            self.assertEqual(self.qwgcore._ask('TEST:VALUE?'), str(nr_commands - 1))
+
+
+class Test_SCPIEmulator(unittest.TestCase):
+    def test_stop_with_connected_client(self):
+        # stopping the emulator while a client is connected must not make asyncio log an error
+        records = []
+        handler = logging.Handler(level=logging.ERROR)
+        handler.emit = records.append
+        logger = logging.getLogger('asyncio')
+        logger.addHandler(handler)
+        try:
+            emulator = SCPIEmulator()
+            emulator.start()
+            transport = IPTransport('127.0.0.1', emulator.port, timeout=10)
+            try:
+                transport.write('*IDN?')
+                self.assertEqual(transport.readline(), emulator.identity + '\n')
+                emulator.stop()
+            finally:
+                transport.close()
+        finally:
+            logger.removeHandler(handler)
+        self.assertEqual(records, [])
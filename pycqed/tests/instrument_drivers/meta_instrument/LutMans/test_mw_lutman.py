@@ -128,6 +128,49 @@ class Test_MW_LutMan(unittest.TestCase):
             delay=0, phase=0)[0]
         np.testing.assert_array_almost_equal(expected_wf_spec, generated_wf[0])
 
+    def test_generating_drag_pulses_from_envelope_basis(self):
+        """Test that all DRAG pulses match a separately generated pulse."""
+        lm = self.AWG8_VSM_MW_LutMan
+        # NB: phase correction pulses are not supported by the VSM LutMan
+        lm.LutMap({idx: waveform for idx, waveform in mwl.default_mw_lutmap.items()
+                   if waveform['type'] != 'phase'})
+        lm.mw_motzoi(0.2)
+        lm.G_mixer_phi(5)
+        lm.D_mixer_alpha(1.1)
+        wave_dict = lm.generate_standard_waveforms()
+        M_G = wf.mixer_predistortion_matrix(lm.G_mixer_alpha(), lm.G_mixer_phi())
+        M_D = wf.mixer_predistortion_matrix(lm.D_mixer_alpha(), lm.D_mixer_phi())
+
+        for idx, waveform in lm.LutMap().items():
+            if waveform['type'] == 'ge':
+                motzoi, f_modulation = lm.mw_motzoi(), lm.mw_modulation()
+            elif waveform['type'] == 'ef':
+                motzoi, f_modulation = 0, lm.mw_ef_modulation()
+            else:
+                continue
+            if waveform['type'] == 'ge' and abs(waveform['theta']) == 90:
+                amp = np.sign(waveform['theta'])*lm.mw_amp180()*lm.mw_amp90_scale()
+            else:
+                amp = mwl.theta_to_amp(
+                    waveform['theta'],
+                    lm.mw_amp180() if waveform['type'] == 'ge' else lm.mw_ef_amp180())
+            expected_wfs = wf.mod_gauss_VSM(
+                amp=amp, phase=waveform['phi'],
+                sigma_length=lm.mw_gauss_width(), f_modulation=f_modulation,
+                sampling_rate=lm.sampling_rate(), motzoi=motzoi)
+            expected_wfs = np.concatenate([np.dot(M_G, expected_wfs[0:2]),
+                                           np.dot(M_D, expected_wfs[2:4])])
+            np.testing.assert_array_almost_equal(expected_wfs, wave_dict[idx])
+
+        # the envelope is only recomputed when its parameters change
+        nr_envelopes = len(lm._envelope_basis_cache)
+        lm.generate_standard_waveforms()
+        self.assertEqual(len(lm._envelope_basis_cache), nr_envelopes)
+        lm.mw_motzoi(0.1)
+        lm.generate_standard_waveforms()
+        self.assertEqual(len(lm._envelope_basis_cache), nr_envelopes + 1)
+        lm.set_default_lutmap()
+
     def test_codeword_idx_to_parnames(self):
 
         parnames = self.AWG8_MW_LutMan._codeword_idx_to_parnames(3)
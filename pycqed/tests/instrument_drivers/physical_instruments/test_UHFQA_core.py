@@ -163,4 +163,135 @@ class Test_UHFQA_core(unittest.TestCase):
         assert self.uhf.qas_0_rotations_3() == (1+1j)
 
     def test_start(self):
-        self.uhf.start()
\ No newline at end of file
+        self.uhf.start()
+
+    def test_acquisition_poll_chunked(self):
+        self.uhf._awg_program_features['loop_cnt'] = True
+        self.uhf.acquisition_initialize(samples=1000, averages=1,
+                                        channels=(0, 1), mode='rl')
+        # Emulate the many small vectors returned by a real poll
+        self.uhf.daq.poll_vector_length = 64
+        try:
+            data = self.uhf.acquisition_poll(samples=1000, arm=False)
+        finally:
+            self.uhf.daq.poll_vector_length = None
+            self.uhf.acquisition_finalize()
+            self.uhf._reset_awg_program_features()
+
+        self.assertEqual(sorted(data.keys()), [0, 1])
+        for n in data:
+            self.assertEqual(data[n].shape, (1000,))
+
+    def test_acquisition_poll_chunks(self):
+        self.uhf._awg_program_features['loop_cnt'] = True
+        self.uhf.acquisition_initialize(samples=100, averages=1,
+                                        channels=(0,), mode='rl')
+        try:
+            chunks = list(self.uhf.acquisition_poll_chunks(samples=100, arm=False))
+        finally:
+            self.uhf.acquisition_finalize()
+            self.uhf._reset_awg_program_features()
+
+        self.assertEqual(sum(len(c[0]) for c in chunks), 100)
+
+    def test_node_cache_disabled(self):
+        self.assertTrue(self.uhf.node_cache_enabled())
+        self.uhf.node_cache_enabled(False)
+        try:
+            path = '/dev2109/qas/0/result/length'
+            self.uhf.qas_0_result_length(10)
+            self.uhf.daq.setInt(path, 20)
+            self.assertEqual(self.uhf.qas_0_result_length(), 20)
+            self.assertEqual(self.uhf.node_cache_stats()['size'], 0)
+        finally:
+            self.uhf.node_cache_enabled(True)
+
+    def test_node_cache(self):
+        self.uhf.qas_0_result_length(123)
+        self.uhf.node_cache_stats(reset=True)
+
+        # reads and unchanged writes of cached nodes do not access the device
+        path = '/dev2109/qas/0/result/length'
+        self.uhf.daq.setInt(path, 456)
+        self.assertEqual(self.uhf.qas_0_result_length(), 123)
+        self.uhf.qas_0_result_length(123)
+        self.assertEqual(self.uhf.daq.getInt(path), 456)
+        self.uhf.qas_0_result_length(124)
+        self.assertEqual(self.uhf.daq.getInt(path), 124)
+        self.assertEqual(self.uhf.qas_0_result_length(), 124)
+
+        stats = self.uhf.node_cache_stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 0)
+        self.assertEqual(stats['skipped_writes'], 1)
+
+        # nodes changed by the device or sequencer are not cached
+        self.uhf.qas_0_result_enable(1)
+        self.uhf.qas_0_result_enable(1)
+        self.uhf.set('awgs_0_userregs_{}'.format(UHF.UHFQA_core.USER_REG_ERR_CNT), 0)
+        self.uhf.get('awgs_0_userregs_{}'.format(UHF.UHFQA_core.USER_REG_ERR_CNT))
+        self.assertEqual(self.uhf.node_cache_stats(), stats)
+
+    def test_node_cache_repeated_write(self):
+        calls = []
+        set_double = self.uhf.daq.setDouble
+        self.uhf.daq.setDouble = lambda path, value: (calls.append(path), set_double(path, value))
+        try:
+            self.uhf.invalidate_node_cache()
+            self.uhf.setd('qas/0/thresholds/0/level', 0.25)
+            self.uhf.setd('qas/0/thresholds/0/level', 0.25)
+        finally:
+            del self.uhf.daq.setDouble
+        self.assertEqual(calls, ['/dev2109/qas/0/thresholds/0/level'])
+
+    def test_node_cache_async(self):
+        # the value of a node written in async mode is not cached
+        path = '/dev2109/qas/0/thresholds/1/level'
+        self.uhf.setd('qas/0/thresholds/1/level', 0.5)
+        self.uhf.asyncBegin()
+        self.uhf.setd('qas/0/thresholds/1/level', 0.25)
+        self.uhf.setd('qas/0/thresholds/1/level', 0.25)
+        self.uhf.asyncEnd()
+        self.uhf.daq.setDouble(path, 0.75)
+        self.uhf.node_cache_stats(reset=True)
+        self.assertEqual(self.uhf.getd('qas/0/thresholds/1/level'), 0.75)
+        self.assertEqual(self.uhf.node_cache_stats()['misses'], 1)
+
+    def test_node_cache_read_back(self):
+        # the device may apply another value than the one written, which is read back
+        path = '/dev2109/qas/0/delay'
+        self.uhf.qas_0_delay(10)
+        self.uhf.daq.setInt(path, 12)
+        self.assertEqual(self.uhf.qas_0_delay(), 12)
+        self.uhf.node_cache_stats(reset=True)
+        self.uhf.qas_0_delay(10)
+        self.assertEqual(self.uhf.node_cache_stats()['skipped_writes'], 0)
+        self.assertEqual(self.uhf.daq.getInt(path), 10)
+
+    def test_node_cache_vector(self):
+        weights = np.linspace(-1, 1, 4096)
+        self.uhf.qas_0_integration_weights_0_real(weights)
+        weights[0] = 0
+        self.uhf.node_cache_stats(reset=True)
+        value = self.uhf.qas_0_integration_weights_0_real()
+        self.assertEqual(value[0], -1)
+        value[1] = 0
+        self.assertEqual(self.uhf.qas_0_integration_weights_0_real()[1], -1 + 2/4095)
+        self.uhf.qas_0_integration_weights_0_real(np.linspace(-1, 1, 4096))
+        stats = self.uhf.node_cache_stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 0)
+        self.assertEqual(stats['skipped_writes'], 1)
+
+    def test_node_cache_invalidate(self):
+        path = '/dev2109/qas/0/result/length'
+        self.uhf.qas_0_result_length(10)
+        self.uhf.daq.setInt(path, 20)
+        self.assertEqual(self.uhf.qas_0_result_length(), 10)
+        self.uhf.invalidate_node_cache('qas/0/result/length')
+        self.assertEqual(self.uhf.qas_0_result_length(), 20)
+
+        self.uhf.daq.setInt(path, 30)
+        self.uhf.reconnect()
+        self.assertEqual(self.uhf.qas_0_result_length(), 30)
+        self.assertEqual(self.uhf.node_cache_stats()['size'], 1)
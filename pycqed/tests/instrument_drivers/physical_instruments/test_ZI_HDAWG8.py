@@ -57,3 +57,66 @@ class Test_ZI_HDAWG8(unittest.TestCase):
         # Now the compilation must have been executed again
         self.assertEqual(
             Test_ZI_HDAWG8.hd._awgModule.get_compilation_count(0), 2)
+
+    def test_unchanged_waveform_not_dirty(self):
+        w0 = 0.25*numpy.ones(48)
+        Test_ZI_HDAWG8.hd.wave_ch3_cw001(w0)
+        Test_ZI_HDAWG8.hd._clear_dirty_waveforms(1)
+
+        # Writing identical data must not flag the waveform for upload
+        Test_ZI_HDAWG8.hd.wave_ch3_cw001(w0.copy())
+        self.assertFalse(
+            Test_ZI_HDAWG8.hd._awg_waveforms['wave_ch3_cw001']['dirty'])
+
+        Test_ZI_HDAWG8.hd.wave_ch3_cw001(0.5*w0)
+        self.assertTrue(
+            Test_ZI_HDAWG8.hd._awg_waveforms['wave_ch3_cw001']['dirty'])
+
+    def test_waveform_modified_in_place(self):
+        w0 = 0.25*numpy.ones(48)
+        Test_ZI_HDAWG8.hd.wave_ch3_cw002(w0)
+        Test_ZI_HDAWG8.hd._clear_dirty_waveforms(1)
+
+        # Setting the same array again after modifying it must be seen as a change
+        w0[:8] = 0.5
+        Test_ZI_HDAWG8.hd.wave_ch3_cw002(w0)
+        self.assertTrue(
+            Test_ZI_HDAWG8.hd._awg_waveforms['wave_ch3_cw002']['dirty'])
+        numpy.testing.assert_array_equal(Test_ZI_HDAWG8.hd.wave_ch3_cw002(), w0)
+
+        # Also when modifying the array that was read back
+        Test_ZI_HDAWG8.hd._clear_dirty_waveforms(1)
+        w1 = Test_ZI_HDAWG8.hd.wave_ch3_cw002()
+        w1[:8] = 0.75
+        Test_ZI_HDAWG8.hd.wave_ch3_cw002(w1)
+        self.assertTrue(
+            Test_ZI_HDAWG8.hd._awg_waveforms['wave_ch3_cw002']['dirty'])
+
+
+class Test_ZI_waveform_store(unittest.TestCase):
+    def test_hdf5_store_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = zibi.ZI_hdf5_waveform_store(directory=tmpdir, devname='dev8026')
+            w0 = numpy.linspace(0, 1, 64)
+            self.assertIsNone(store.load('wave_ch1_cw000'))
+            self.assertTrue(store.save('wave_ch1_cw000', w0))
+            # Saving identical data is a no-op
+            self.assertFalse(store.save('wave_ch1_cw000', w0.copy()))
+            store.flush()
+
+            store = zibi.ZI_hdf5_waveform_store(directory=tmpdir, devname='dev8026')
+            numpy.testing.assert_array_equal(store.load('wave_ch1_cw000'), w0)
+
+    def test_csv_export_only_when_changed(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = zibi.ZI_hdf5_waveform_store(directory=tmpdir, devname='dev8026')
+            w0 = numpy.linspace(0, 1, 64)
+            store.save('wave_ch1_cw000', w0)
+            self.assertTrue(store.export_csv('wave_ch1_cw000'))
+            self.assertFalse(store.export_csv('wave_ch1_cw000'))
+            store.save('wave_ch1_cw000', 2*w0)
+            self.assertTrue(store.export_csv('wave_ch1_cw000'))
+
+            filename = os.path.join(tmpdir, 'dev8026_wave_ch1_cw000.csv')
+            numpy.testing.assert_array_almost_equal(
+                numpy.genfromtxt(filename, delimiter=','), 2*w0)
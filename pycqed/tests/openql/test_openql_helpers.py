@@ -1,6 +1,9 @@
 import unittest
 import os
+import tempfile
+import numpy as np
 
+from pycqed.measurement.openql_experiments import openql_helpers as oqh
 from pycqed.measurement.openql_experiments.openql_helpers import OqlProgram
 
 
@@ -31,6 +34,92 @@ class Test_openql_compiler_helpers(unittest.TestCase):
         p.compile()
 
 
+class Test_program_cache(unittest.TestCase):
+
+    def setUp(self):
+        curdir = os.path.dirname(__file__)
+        self.config_fn = os.path.join(curdir, 'test_cfg_cc.json')
+        self._output_dir = OqlProgram.output_dir
+        self._cache_dir = OqlProgram.cache_dir
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        OqlProgram.output_dir = os.path.join(self._tmp_dir.name, 'output')
+        OqlProgram.cache_dir = os.path.join(self._tmp_dir.name, 'cache')
+        os.makedirs(OqlProgram.output_dir)
+        self.nr_builds = 0
+
+        @oqh.cached_program
+        def build(qubit_idx: int, platf_cfg: str, times=None):
+            self.nr_builds += 1
+            p = OqlProgram('test_program_cache', platf_cfg)
+            for i, t in enumerate(times):
+                k = p.create_kernel('wait_{}'.format(i))
+                k.gate('wait', [qubit_idx], int(t))
+                k.measure(qubit_idx)
+                p.add_kernel(k)
+            p.sweep_points = times
+            p.compile()
+            return p
+        self.build = build
+
+    def tearDown(self):
+        oqh.clear_program_cache()
+        OqlProgram.output_dir = self._output_dir
+        OqlProgram.cache_dir = self._cache_dir
+        self._tmp_dir.cleanup()
+
+    def test_cache_hit(self):
+        times = np.arange(0, 100, 20)
+        p0 = self.build(0, self.config_fn, times=times)
+        program = open(p0.filename).read()
+        self.build(1, self.config_fn, times=times)
+        os.remove(p0.filename)
+        p1 = self.build(0, self.config_fn, times)
+        self.assertEqual(self.nr_builds, 2)
+        self.assertEqual(p1.filename, p0.filename)
+        self.assertEqual(open(p1.filename).read(), program)
+        self.assertEqual(p1.nqubits, p0.nqubits)
+        np.testing.assert_array_equal(p1.sweep_points, times)
+
+        self.build(0, self.config_fn, times=times[:-1])
+        self.assertEqual(self.nr_builds, 3)
+
+    def test_cached_program_fields(self):
+        self.build(0, self.config_fn, times=[0, 20])
+        p = self.build(0, self.config_fn, times=[0, 20])
+        self.assertEqual(self.nr_builds, 1)
+        self.assertEqual(p.sweep_points, [0, 20])
+
+        # a program from the cache cannot be extended or compiled again
+        with self.assertRaises(RuntimeError):
+            p.platform
+        with self.assertRaises(RuntimeError):
+            p.create_kernel('another_kernel')
+        with self.assertRaises(RuntimeError):
+            p.compile()
+
+    def test_cache_key(self):
+        key = oqh._program_cache_key(
+            self.build.__wrapped__, {'qubit_idx': 0, 'platf_cfg': self.config_fn})
+        # the source files of the modules used by the builder are part of the key
+        self.assertIn(oqh.__file__, oqh._program_source_files(self.build.__wrapped__))
+
+        version = oqh.ql.get_version
+        oqh.ql.get_version = lambda: 'another version'
+        try:
+            self.assertNotEqual(oqh._program_cache_key(
+                self.build.__wrapped__, {'qubit_idx': 0, 'platf_cfg': self.config_fn}), key)
+        finally:
+            oqh.ql.get_version = version
+
+    def test_cache_eviction(self):
+        for i in range(3):
+            self.build(i, self.config_fn, times=[0, 20])
+        oqh._evict_cached_programs(0)
+        self.assertEqual(os.listdir(OqlProgram.cache_dir), [])
+        self.build(0, self.config_fn, times=[0, 20])
+        self.assertEqual(self.nr_builds, 4)
+
+
 class Test_openql_calibration_point_helpers(unittest.TestCase):
 # FIXME: the tests below appear to have never been implemented, but would be useful
 
@@ -1,5 +1,9 @@
 import os
 import sys
+import glob
+import tempfile
+import threading
+import h5py
 import pycqed as pq
 import unittest
 import numpy as np
@@ -7,6 +11,7 @@ from scipy.spatial import ConvexHull
 import adaptive
 import pycqed.analysis.analysis_toolbox as a_tools
 from pycqed.measurement import measurement_control
+from pycqed.measurement import measurement_control_helpers as mch
 from pycqed.measurement.sweep_functions import (
     None_Sweep,
     None_Sweep_idx,
@@ -501,6 +506,204 @@ class Test_MeasurementControl(unittest.TestCase):
         np.testing.assert_array_almost_equal(x, sweep_pts)
         np.testing.assert_array_almost_equal(y0, y_exp, decimal=5)
 
+    def _run_buffered(self, label, mode="1D", detector=None, **cfg):
+        """
+        Runs a soft sweep with the buffered dataset in a separate datadir and
+        returns the returned dataset and the dataset read back from the file.
+        """
+        cfg = dict(dict(cfg_dset_buffered=True), **cfg)
+        old_cfg = {name: self.MC.parameters[name]() for name in cfg}
+        old_datadir = self.MC.datadir()
+        with tempfile.TemporaryDirectory() as datadir:
+            self.MC.datadir(datadir)
+            for name, value in cfg.items():
+                self.MC.parameters[name](value)
+            try:
+                self.MC.set_sweep_function(None_Sweep(sweep_control="soft"))
+                self.MC.set_sweep_points(np.linspace(0, 10, 20))
+                if mode == "2D":
+                    self.MC.set_sweep_function_2D(None_Sweep(sweep_control="soft"))
+                    self.MC.set_sweep_points_2D(np.linspace(5, 10, 5))
+                self.MC.set_detector_function(
+                    det.Dummy_Detector_Soft() if detector is None else detector)
+                try:
+                    dset = self.MC.run(label, mode=mode)["dset"]
+                except KeyboardInterrupt:
+                    dset = None
+            finally:
+                self.MC.datadir(old_datadir)
+                for name, value in old_cfg.items():
+                    self.MC.parameters[name](value)
+
+            filepath, = glob.glob(os.path.join(datadir, "*", "*", "*.hdf5"))
+            with h5py.File(filepath, "r") as data_file:
+                file_dset = data_file["Experimental Data"]["Data"]
+                return dset, file_dset[()], file_dset.compression
+
+    def test_soft_sweep_2D_buffered_dset(self):
+        self.MC.soft_avg(3)
+        dset, file_dset, compression = self._run_buffered(
+            "2D_soft_buffered", mode="2D",
+            cfg_dset_flush_interval_pts=7,
+            cfg_dset_chunk_rows=16,
+            cfg_dset_compression="gzip")
+
+        self.assertEqual(np.shape(dset), (20 * 5, 4))
+        np.testing.assert_array_almost_equal(
+            dset[:, 0], np.tile(np.linspace(0, 10, 20), 5))
+        np.testing.assert_array_almost_equal(
+            dset[:, 1], np.repeat(np.linspace(5, 10, 5), 20))
+
+        # The data in the file should be identical to the returned data
+        self.assertEqual(compression, "gzip")
+        np.testing.assert_array_equal(file_dset, dset)
+
+    def test_buffered_dset_flush_interval(self):
+        with h5py.File("buffered_dset_test", "w", driver="core",
+                       backing_store=False) as data_file:
+            h5_dset = data_file.create_dataset(
+                "Data", (0, 2), maxshape=(None, 2), dtype="float64")
+            dset = mch.BufferedDataset(h5_dset, flush_interval_pts=3)
+            for i in range(5):
+                dset.resize((i + 1, 2))
+                dset[i, :] = [i, 2 * i]
+                # flushed every 3 writes only
+                self.assertEqual(h5_dset.shape[0], 3 if i >= 2 else 0)
+            np.testing.assert_array_equal(h5_dset[()], [[0, 0], [1, 2], [2, 4]])
+            dset.flush()
+            np.testing.assert_array_equal(h5_dset[()], dset[()])
+
+            dset = mch.BufferedDataset(h5_dset, flush_interval_time=0)
+            dset[1, :] = [-1, -1]
+            np.testing.assert_array_equal(h5_dset[1], [-1, -1])
+
+    def test_buffered_dset_flush_on_interrupt(self):
+        class Interrupting_Detector(det.Dummy_Detector_Soft):
+            def acquire_data_point(self, **kw):
+                if self.i == 13:
+                    raise KeyboardInterrupt()
+                return super().acquire_data_point(**kw)
+
+        dset, file_dset, _ = self._run_buffered(
+            "1D_soft_buffered_interrupted",
+            detector=Interrupting_Detector(),
+            cfg_dset_flush_interval_pts=None,
+            cfg_dset_flush_interval_time=None)
+
+        self.assertIsNone(dset)
+        self.assertEqual(file_dset.shape, (13, 3))
+        np.testing.assert_array_almost_equal(
+            file_dset[:, 0], np.linspace(0, 10, 20)[:13])
+        np.testing.assert_array_almost_equal(
+            file_dset[:, 1], np.sin(np.arange(13) / 15 / np.pi))
+
+    def _record_plotmon_threads(self):
+        """
+        Records the names of the threads preparing (in "prepare") and drawing
+        (in "draw") the plot monitors.
+        """
+        threads = {"prepare": set(), "draw": set()}
+        update_from_thread = self.MC._update_plotmons_from_thread
+
+        def recording_update_from_thread():
+            threads["prepare"].add(threading.current_thread().name)
+            update_from_thread()
+
+        def recording_update_plot(update_plot):
+            def update():
+                threads["draw"].add(threading.current_thread().name)
+                update_plot()
+            return update
+
+        self.MC._update_plotmons_from_thread = recording_update_from_thread
+        for plot in [self.MC.main_QtPlot, self.MC.secondary_QtPlot]:
+            plot.update_plot = recording_update_plot(plot.update_plot)
+        return threads
+
+    def _stop_recording_plotmon_threads(self):
+        del self.MC._update_plotmons_from_thread
+        for plot in [self.MC.main_QtPlot, self.MC.secondary_QtPlot]:
+            del plot.update_plot
+
+    def test_soft_sweep_1D_threaded_plotmon(self):
+        self.MC.soft_avg(2)
+        self.MC.cfg_plotmon_threaded(True)
+        self.MC.plotting_interval(0.01)
+        self.mock_parabola.delay(0.002)
+        threads = self._record_plotmon_threads()
+        try:
+            bins = np.arange(5)
+            self.MC.set_sweep_function(self.mock_parabola.x)
+            self.MC.set_sweep_points(np.linspace(0, 10, 30))
+            self.MC.set_detector_function(det.Dummy_Detector_Soft())
+            dat = self.MC.run("threaded_plotmon", exp_metadata={"bins": bins})
+        finally:
+            self._stop_recording_plotmon_threads()
+            self.mock_parabola.delay(0)
+            self.MC.cfg_plotmon_threaded(False)
+            self.MC.plotting_interval(3)
+            self.MC.soft_avg(1)
+        self.assertIsNone(self.MC._plotmon_thread)
+
+        # The updates are prepared by the plotmon thread, but only drawn by
+        # the thread running the measurement
+        self.assertEqual(threads["prepare"], {"plotmon of MC"})
+        self.assertEqual(threads["draw"], {threading.current_thread().name})
+
+        # The plotmon shows the binned means of all acquired data
+        dset = dat["dset"]
+        for i in range(2):
+            np.testing.assert_array_almost_equal(
+                self.MC.curves[i]["config"]["y"],
+                np.mean(dset[:, i + 1].reshape((len(bins), -1), order="F"), axis=1),
+            )
+
+    def test_adaptive_threaded_plotmon(self):
+        self.MC.cfg_plotmon_threaded(True)
+        self.MC.plotting_interval(0.01)
+        self.mock_parabola.noise(0)
+        self.mock_parabola.delay(0.002)
+        threads = self._record_plotmon_threads()
+        interpolate_threads = set()
+        interpolate_heatmap = measurement_control.interpolate_heatmap
+
+        def recording_interpolate_heatmap(*args, **kw):
+            interpolate_threads.add(threading.current_thread().name)
+            return interpolate_heatmap(*args, **kw)
+
+        measurement_control.interpolate_heatmap = recording_interpolate_heatmap
+        try:
+            self.MC.set_sweep_functions([self.mock_parabola.x, self.mock_parabola.y])
+            self.MC.set_adaptive_function_parameters(
+                {
+                    "adaptive_function": nelder_mead,
+                    "x0": [-50, -50],
+                    "initial_step": [2.5, 2.5],
+                    "maxiter": 50,
+                }
+            )
+            self.MC.set_detector_function(self.mock_parabola.parabola)
+            dat = self.MC.run("threaded adaptive plotmon", mode="adaptive")
+        finally:
+            measurement_control.interpolate_heatmap = interpolate_heatmap
+            self._stop_recording_plotmon_threads()
+            self.mock_parabola.delay(0)
+            self.MC.cfg_plotmon_threaded(False)
+            self.MC.plotting_interval(3)
+        self.assertIsNone(self.MC._plotmon_thread)
+
+        # The adaptive and interpolated 2D plot monitors are also prepared
+        # by the plotmon thread, the final update by the measurement thread
+        main_thread = threading.current_thread().name
+        self.assertEqual(threads["prepare"], {"plotmon of MC"})
+        self.assertEqual(interpolate_threads, {"plotmon of MC", main_thread})
+        self.assertEqual(threads["draw"], {main_thread})
+
+        dset = dat["dset"]
+        np.testing.assert_array_almost_equal(
+            self.MC.iter_traces[2]["config"]["y"], dset[:, 2]
+        )
+
     def test_adaptive_measurement_nelder_mead(self):
         self.MC.soft_avg(1)
         self.mock_parabola.noise(0)
@@ -963,3 +1166,59 @@ class Test_MeasurementControl(unittest.TestCase):
         self.mock_parabola.close()
         del self.station.components["MC"]
         del self.station.components["mock_parabola"]
+
+
+class Test_PlotmonData(unittest.TestCase):
+    def test_rows_and_binned_mean(self):
+        rng = np.random.RandomState(0)
+        data = rng.rand(50, 3)
+        data[7, 2] = np.nan
+        plotmon_data = mch.PlotmonData(3, bins=np.arange(4))
+        for start_idx in range(0, 50, 5):
+            plotmon_data.put(start_idx, data[start_idx : start_idx + 5])
+        self.assertEqual(plotmon_data.update(), 10)
+        self.assertEqual(plotmon_data.get_changed_rows("test"), slice(0, 50))
+
+        # Overwrite rows, e.g. for soft averages
+        data[10:20] = rng.rand(10, 3)
+        plotmon_data.put(10, data[10:20])
+        plotmon_data.update()
+        np.testing.assert_array_equal(plotmon_data.data, data)
+        self.assertEqual(plotmon_data.get_changed_rows("test"), slice(10, 20))
+        self.assertEqual(plotmon_data.get_changed_rows("test"), slice(50, 50))
+
+        data_ext = np.concatenate([data, np.full((2, 3), np.nan)])
+        np.testing.assert_array_almost_equal(
+            plotmon_data.binned_mean(),
+            np.nanmean(data_ext.reshape((4, -1, 3), order="F"), axis=1),
+        )
+
+
+class Test_PlotmonFrame(unittest.TestCase):
+    def test_merged_frames_draw_latest_state(self):
+        class Plot:
+            nr_updates = 0
+
+            def update_plot(self):
+                self.nr_updates += 1
+
+        plot = Plot()
+        config = {"x": [0], "y": [0]}
+        thread = mch.PlotmonThread(None, interval=1)
+        self.assertFalse(thread.draw_frame())
+
+        data = np.arange(4.0)
+        for i in range(3):
+            frame = mch.PlotmonFrame()
+            frame.set(config, x=data, y=data * i)
+            frame.redraw(plot)
+            thread.put_frame(frame)
+        # Frames hold a copy of the data they were prepared from
+        data[:] = -1
+        self.assertEqual(config, {"x": [0], "y": [0]})
+
+        self.assertTrue(thread.draw_frame())
+        np.testing.assert_array_equal(config["x"], np.arange(4.0))
+        np.testing.assert_array_equal(config["y"], 2 * np.arange(4.0))
+        self.assertEqual(plot.nr_updates, 1)
+        self.assertFalse(thread.draw_frame())
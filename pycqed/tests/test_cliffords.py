@@ -257,6 +257,53 @@ class TestCliffordCalculus(unittest.TestCase):
             self.assertTrue((Cl_inv*Cl).idx == 0)
 
 
+class TestCayleyTables(unittest.TestCase):
+
+    def test_single_qubit_cayley_table(self):
+        cayley_table = tqc.SingleQubitClifford.get_cayley_table()
+        self.assertEqual(cayley_table.shape, (24, 24))
+        for i in range(24):
+            for j in range(24):
+                prod = tqc.SingleQubitClifford(i)*tqc.SingleQubitClifford(j)
+                self.assertEqual(cayley_table[i, j], prod.idx)
+
+    def test_two_qubit_cayley_table(self):
+        cayley_table = tqc.TwoQubitClifford.get_cayley_table()
+        self.assertEqual(cayley_table.shape, (11520, 11520))
+        for i, j in zip(test_indices_2Q, test_indices_2Q[::-1]):
+            prod = tqc.TwoQubitClifford(i)*tqc.TwoQubitClifford(j)
+            self.assertEqual(cayley_table[i, j], prod.idx)
+
+    def test_inverse_tables(self):
+        inverse_table = tqc.SingleQubitClifford.get_inverse_table()
+        for i in range(24):
+            Cl_inv = tqc.SingleQubitClifford(i).get_inverse()
+            self.assertEqual(inverse_table[i], Cl_inv.idx)
+
+        inverse_table = tqc.TwoQubitClifford.get_inverse_table()
+        for i in test_indices_2Q:
+            Cl_inv = tqc.TwoQubitClifford(i).get_inverse()
+            self.assertEqual(inverse_table[i], Cl_inv.idx)
+
+    def test_calculate_net_clifford_indices(self):
+        rng = np.random.RandomState(42)
+        seqs = rng.randint(0, 11520, (10, 30))
+        seqs[:, 5] = 104368  # interleaved CZ convention
+        net_cl_indices = rb.calculate_net_clifford_indices(
+            seqs, tqc.TwoQubitClifford)
+        self.assertEqual(net_cl_indices.shape, (10,))
+        for seq, net_cl_idx in zip(seqs, net_cl_indices):
+            net_cl = tqc.TwoQubitClifford(0)
+            for idx in seq:
+                net_cl = tqc.TwoQubitClifford(idx % 100_000)*net_cl
+            self.assertEqual(net_cl_idx, net_cl.idx)
+
+        with pytest.raises(ValueError):
+            rb.calculate_net_clifford_indices([3, -4368], tqc.TwoQubitClifford)
+        with pytest.raises(ValueError):
+            rb.calculate_net_clifford_indices([3, 24], tqc.SingleQubitClifford)
+
+
 class TestCliffordGateDecomposition(unittest.TestCase):
     def test_single_qubit_gate_decomposition(self):
         for i in range(24):
@@ -358,3 +405,51 @@ class TestCliffordClassRBSeqs(unittest.TestCase):
             # no test for correctness here. Corectness depend on the fact
             # that it implements code very similar to the Single qubit version
             # and has components that are all tested.
+
+
+class TestBatchedRBSeqs(unittest.TestCase):
+    def test_net_clifford_of_batched_sequences(self):
+        nr_cliffords = [1, 4, 50]
+        for number_of_qubits, Cl in [(1, tqc.SingleQubitClifford),
+                                     (2, tqc.TwoQubitClifford)]:
+            for net_cl in [0, 3]:
+                rb_seqs = rb.randomized_benchmarking_sequences(
+                    nr_cliffords, nr_seeds=20, desired_net_cl=net_cl,
+                    number_of_qubits=number_of_qubits, seed=7)
+                self.assertEqual(len(rb_seqs), len(nr_cliffords))
+                for n_cl, cl_seqs in zip(nr_cliffords, rb_seqs):
+                    self.assertEqual(cl_seqs.shape, (20, n_cl + 1))
+                    net_cls = rb.calculate_net_clifford_indices(cl_seqs, Cl)
+                    assert_array_equal(net_cls, net_cl)
+
+    def test_interleaved_batched_sequences(self):
+        rb_seqs = rb.randomized_benchmarking_sequences(
+            [10], nr_seeds=5, desired_net_cl=None, number_of_qubits=2,
+            interleaving_cl=104368, seed=3)
+        self.assertEqual(rb_seqs[0].shape, (5, 20))
+        assert_array_equal(rb_seqs[0][:, 1::2], 104368)
+
+        net_cls = rb.calculate_net_clifford_indices(
+            rb_seqs[0], tqc.TwoQubitClifford)
+        rec_cls = rb.calculate_recovery_clifford_indices(
+            net_cls, 0, tqc.TwoQubitClifford)
+        for net_cl, rec_cl in zip(net_cls, rec_cls):
+            prod = tqc.TwoQubitClifford(rec_cl)*tqc.TwoQubitClifford(net_cl)
+            self.assertEqual(prod.idx, 0)
+
+    def test_batched_seed_reproduces(self):
+        rb_seqs_a = rb.randomized_benchmarking_sequences(
+            [5, 100], nr_seeds=3, number_of_qubits=2, seed=5)
+        rb_seqs_b = rb.randomized_benchmarking_sequences(
+            [5, 100], nr_seeds=10, number_of_qubits=2, seed=5)
+        # sequences of an RB seed do not depend on the number of seeds
+        for seqs_a, seqs_b in zip(rb_seqs_a, rb_seqs_b):
+            assert_array_equal(seqs_a, seqs_b[:3])
+
+    def test_flat_gate_decompositions(self):
+        for Cl in [tqc.SingleQubitClifford, tqc.TwoQubitClifford]:
+            gates, offsets = Cl.get_flat_gate_decompositions()
+            self.assertEqual(len(offsets), Cl.GRP_SIZE + 1)
+            for idx in [0, 3, 16, 21]:
+                self.assertEqual(gates[offsets[idx]:offsets[idx+1]],
+                                 Cl(idx).gate_decomposition)
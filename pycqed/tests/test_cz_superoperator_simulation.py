@@ -0,0 +1,92 @@
+import numpy as np
+
+from pycqed.instrument_drivers.meta_instrument.LutMans import flux_lutman_vcz as flm
+from pycqed.instrument_drivers.virtual_instruments import sim_control_CZ_v2 as scCZ_v2
+from pycqed.simulations import cz_superoperator_simulation_functions_v2 as czf_v2
+from pycqed.simulations import cz_superoperator_simulation_v2 as czs_v2
+
+from qcodes import Instrument
+
+
+class TestTimeEvolutionNumpy:
+
+    @classmethod
+    def setup_class(cls):
+        cls.fluxlutman = flm.HDAWG_Flux_LutMan('fluxlutman_sim')
+        cls.fluxlutman_static = flm.HDAWG_Flux_LutMan('fluxlutman_static_sim')
+        cls.sim_control_CZ = scCZ_v2.SimControlCZ_v2('sim_control_CZ_sim')
+
+        cls.fluxlutman.q_polycoeffs_freq_01_det(np.array([-2.5e9, 0, 0]))
+        cls.fluxlutman.q_polycoeffs_anharm(np.array([0, 0, -300e6]))
+        cls.fluxlutman.q_freq_01(6e9)
+        cls.fluxlutman.q_freq_10_NE(4.8e9)
+        cls.fluxlutman.q_J2_NE(15e6)
+        cls.fluxlutman.bus_freq_NE(27e9)
+        cls.fluxlutman_static.q_polycoeffs_anharm(np.array([0, 0, -280e6]))
+        cls.sim_control_CZ.w_q0_sweetspot(6e9)
+        cls.sim_control_CZ.w_q1_sweetspot(4.9e9)
+
+        # Trapezoidal pulse to the 11-02 interaction point
+        cls.amp = np.concatenate((
+            np.linspace(0, 0.6, 20), np.full(100, 0.6), np.linspace(0.6, 0, 20)))
+        cls.intervals_list = np.full(len(cls.amp), 0.1e-9)
+        cls.intervals_list[60] = 2e-9
+
+    @classmethod
+    def teardown_class(cls):
+        Instrument.close_all()
+
+    def compare_time_evolution(self, c_ops, fluxbias_q1=0):
+        kw = dict(c_ops=c_ops, sim_control_CZ=self.sim_control_CZ,
+                  fluxlutman=self.fluxlutman,
+                  fluxlutman_static=self.fluxlutman_static,
+                  fluxbias_q1=fluxbias_q1, amp=self.amp,
+                  intervals_list=self.intervals_list)
+        U_ref = czf_v2.time_evolution_new(**kw)
+        U = czf_v2.time_evolution_numpy(batch_size=32, **kw)
+
+        assert U.dims == U_ref.dims
+        assert U.type == U_ref.type
+        np.testing.assert_allclose(U.full(), U_ref.full(), rtol=0, atol=1e-9)
+        assert self.fluxlutman.q_freq_10_NE() == 4.8e9
+
+    def test_unitary(self):
+        self.compare_time_evolution(c_ops=[])
+        self.compare_time_evolution(c_ops=[], fluxbias_q1=0.01)
+
+    def test_superoperator(self):
+        # Relaxation of both qubits and amplitude dependent dephasing of q0
+        Tphi_q0_vec = 10e-6 / (1 + self.amp)
+        c_ops = [np.sqrt(1 / 30e-6) * czf_v2.a,
+                 np.sqrt(1 / 40e-6) * czf_v2.b,
+                 [czf_v2.n_q0, np.sqrt(1 / (2 * Tphi_q0_vec))]]
+        self.compare_time_evolution(c_ops=c_ops)
+        self.compare_time_evolution(c_ops=c_ops, fluxbias_q1=0.01)
+
+    def test_parallel_flux_noise_sampling(self):
+        self.sim_control_CZ.sigma_q0(1e-4)
+        self.sim_control_CZ.sigma_q1(1e-4)
+        self.sim_control_CZ.n_sampling_gaussian_vec(np.array([3]))
+        self.sim_control_CZ.propagator_engine('numpy')
+        d = czs_v2.CZ_trajectory_superoperator(
+            fluxlutman=self.fluxlutman,
+            fluxlutman_static=self.fluxlutman_static,
+            sim_control_CZ=self.sim_control_CZ)
+        try:
+            self.sim_control_CZ.nr_workers(1)
+            values = d.acquire_data_point()
+            self.sim_control_CZ.nr_workers(2)
+            values_parallel = d.acquire_data_point()
+            np.testing.assert_array_equal(values_parallel, values)
+
+            # Changed settings are applied in the worker processes
+            self.fluxlutman.vcz_amp_sq_NE(0.5)
+            values_parallel = d.acquire_data_point()
+            self.sim_control_CZ.nr_workers(1)
+            values = d.acquire_data_point()
+            np.testing.assert_array_equal(values_parallel, values)
+        finally:
+            d.finish()
+            self.sim_control_CZ.nr_workers(1)
+            self.sim_control_CZ.sigma_q0(0)
+            self.sim_control_CZ.sigma_q1(0)
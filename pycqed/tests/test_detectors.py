@@ -1,3 +1,5 @@
+import time
+import threading
 import numpy as np
 import pytest
 
@@ -6,6 +8,7 @@ from pycqed.measurement.sweep_functions import None_Sweep
 import pycqed.measurement.detector_functions as det
 from pycqed.instrument_drivers.physical_instruments.dummy_instruments \
     import DummyParHolder
+import pycqed.instrument_drivers.physical_instruments.ZurichInstruments.UHFQuantumController as UHF
 
 from qcodes import station
 
@@ -196,6 +199,111 @@ class TestDetectors:
         np.testing.assert_array_almost_equal(y[0], dset[:, 3])
         np.testing.assert_array_almost_equal(y[1], dset[:, 4])
 
+    def test_multi_detector_hard_concurrent(self):
+        # Every child waits for the others, which only returns if they
+        # are read out at the same time
+        barrier = threading.Barrier(2)
+
+        class Concurrent_Detector(det.Mock_Detector):
+            def get_values(self):
+                barrier.wait(timeout=10)
+                return self.mock_values
+
+        d0 = Concurrent_Detector(detector_control='hard',
+                                 mock_values=np.zeros((1, 5)))
+        d1 = Concurrent_Detector(detector_control='hard',
+                                 mock_values=np.ones((1, 5)))
+        dm = det.Multi_Detector([d0, d1], detector_labels=['fl0', 'fl1'],
+                                concurrent=True)
+
+        values = dm.get_values()
+        np.testing.assert_array_equal(values, [np.zeros(5), np.ones(5)])
+        assert sorted(dm.timing.keys()) == ['fl0', 'fl1']
+
+        # The thread pool is reused until finish
+        executor = dm._executor
+        dm.get_values()
+        assert dm._executor is executor
+        dm.finish()
+        assert dm._executor is None
+
+    def test_multi_detector_concurrent_timeout(self):
+        class Blocking_Detector(det.Mock_Detector):
+            def __init__(self, **kw):
+                super().__init__(**kw)
+                self.aborted = threading.Event()
+
+            def get_values(self):
+                if not self.aborted.wait(timeout=10):
+                    raise RuntimeError('not aborted')
+                return self.mock_values
+
+            def abort(self):
+                self.aborted.set()
+
+        d0 = det.Mock_Detector(detector_control='hard',
+                               mock_values=np.zeros((1, 5)))
+        d1 = Blocking_Detector(detector_control='hard',
+                               mock_values=np.ones((1, 5)))
+        dm = det.Multi_Detector([d0, d1], detector_labels=['fl0', 'fl1'],
+                                concurrent=True, timeout=0.1)
+        with pytest.raises(TimeoutError, match='fl1'):
+            dm.get_values()
+        # The child that timed out is asked to stop
+        assert d1.aborted.is_set()
+        dm.finish()
+
+    def test_multi_detector_UHFQC_concurrent(self):
+        uhfs = [UHF.UHFQC(name='MOCK_UHF_{}'.format(i), server='emulator',
+                          device='dev{}'.format(2109 + i), interface='1GbE')
+                for i in range(2)]
+        try:
+            barrier = threading.Barrier(2)
+            poll_threads = []
+            mock_polls = [uhf.daq.poll for uhf in uhfs]
+            for uhf, poll in zip(uhfs, mock_polls):
+                uhf._awg_program_features['loop_cnt'] = True
+
+                def concurrent_poll(*args, poll=poll, **kw):
+                    poll_threads.append(threading.get_ident())
+                    barrier.wait(timeout=10)
+                    return poll(*args, **kw)
+                uhf.daq.poll = concurrent_poll
+
+            detectors = [det.UHFQC_integrated_average_detector(
+                UHFQC=uhf, channels=(0, 1), nr_averages=1)
+                for uhf in uhfs]
+            dm = det.Multi_Detector(
+                detectors, detector_labels=['fl0', 'fl1'], concurrent=True)
+            dm.prepare(sweep_points=np.arange(7))
+            values = dm.get_values()
+            assert np.shape(values) == (4, 7)
+            # Both were polled from different threads, at the same time
+            assert len(set(poll_threads)) == 2
+
+            # A detector that does not get data is aborted on timeout
+            uhfs[1].timeout(5)
+            polls_after_abort = []
+
+            def empty_poll(*args, **kw):
+                if uhfs[1]._acquisition_abort.is_set():
+                    polls_after_abort.append(1)
+                time.sleep(0.01)
+                return {}
+            uhfs[0].daq.poll = mock_polls[0]
+            uhfs[1].daq.poll = empty_poll
+            dm.timeout = 0.2
+            with pytest.raises(TimeoutError, match='fl1'):
+                dm.get_values()
+            # The acquisition stops at its next poll
+            dm._executor.shutdown(wait=True)
+            assert uhfs[1]._acquisition_abort.is_set()
+            assert len(polls_after_abort) <= 1
+            dm.finish()
+        finally:
+            for uhf in uhfs:
+                uhf.close()
+
     def test_Mock_Detector(self):
         x = np.linspace(0, 20, 31)
         y = x**2
@@ -1,4 +1,5 @@
 import os
+import tempfile
 import pycqed as pq
 import unittest
 import h5py
@@ -219,6 +220,114 @@ class Test_HDF5(unittest.TestCase):
         # complex numbers are automatically converted to strings
         self.assertEqual(self.mock_parabola_2.complex_like(), 1.0 + 4.0j)
 
+    def test_loading_settings_from_snapshot_store(self):
+        """
+        Tests storing the instrument snapshots in a snapshot store and
+        reading them back from the datafile.
+        """
+        self.MC.cfg_snapshot_store(True)
+        # Use an empty store
+        tmp_datadir = tempfile.TemporaryDirectory()
+        self.MC.datadir(tmp_datadir.name)
+        try:
+            try:
+                arr = np.linspace(12, 42, 11)
+                self.mock_parabola.array_like(arr)
+                self.mock_parabola.x(42.23)
+                self.mock_parabola.dict_like({'a': {'b': [2, 3, 5]}})
+                self.mock_parabola.complex_like(1.0 + 4.0j)
+
+                for y in [2, 3]:
+                    # The second run only differs in the parameter y
+                    self.mock_parabola.y(y)
+                    self.MC.set_sweep_function(self.mock_parabola.x)
+                    self.MC.set_sweep_points([0, 1])
+                    self.MC.set_detector_function(
+                        self.mock_parabola.skewed_parabola)
+                    self.MC.run('test_MC_snapshot_store')
+                filepath = self.MC.data_object.filepath
+            finally:
+                self.MC.cfg_snapshot_store(False)
+                self.MC.datadir(self.datadir)
+
+            with h5py.File(filepath, 'r') as f:
+                ins_grp = f['Snapshot/instruments/mock_parabola']
+                self.assertIn('snapshot_ref', ins_grp.attrs)
+                # x is also changed by the first run
+                self.assertIn('y', ins_grp['parameters_diff'].keys())
+                self.assertNotIn('array_like', ins_grp['parameters_diff'].keys())
+                snapshot = h5d.read_dict_from_hdf5({}, f['Snapshot'])
+            parameters = snapshot['instruments']['mock_parabola']['parameters']
+            self.assertEqual(parameters['y']['value'], 3)
+            np.testing.assert_array_equal(parameters['array_like']['value'], arr)
+
+            pars = h5d.extract_pars_from_datafile(filepath, {
+                'y': ('Snapshot/instruments/mock_parabola/parameters/y',
+                      'attr:value'),
+                'array_like': (
+                    'Snapshot/instruments/mock_parabola/parameters/array_like',
+                    'attr:all_attr')})
+            self.assertEqual(pars['y'], 3)
+            np.testing.assert_array_equal(pars['array_like']['value'], arr)
+
+            self.mock_parabola.array_like(arr + 5)
+            self.mock_parabola.y(1)
+            gen.load_settings_onto_instrument_v2(self.mock_parabola,
+                                                 filepath=filepath)
+            np.testing.assert_array_equal(self.mock_parabola.array_like(), arr)
+            self.assertEqual(self.mock_parabola.y(), 3)
+            self.assertEqual(self.mock_parabola.dict_like(),
+                             {'a': {'b': [2, 3, 5]}})
+            self.assertEqual(self.mock_parabola.complex_like(), 1.0 + 4.0j)
+        finally:
+            tmp_datadir.cleanup()
+
+    def test_loading_settings_onto_instruments(self):
+        arr = np.linspace(12, 42, 11)
+        self.mock_parabola.array_like(arr)
+        self.mock_parabola.y(2)
+        self.mock_parabola_2.y(4)
+        # The last sweep point, such that x is not changed by the run
+        self.mock_parabola.x(1)
+
+        self.MC.set_sweep_function(self.mock_parabola.x)
+        self.MC.set_sweep_points([0, 1])
+        self.MC.set_detector_function(self.mock_parabola.skewed_parabola)
+        self.MC.run('test_MC_bulk_settings_loading')
+        filepath = self.MC.data_object.filepath
+
+        self.mock_parabola.array_like(arr + 5)
+        self.mock_parabola.y(3)
+        self.mock_parabola_2.y(5)
+
+        report = gen.load_settings_onto_instruments(
+            [self.mock_parabola, 'mock_parabola_2'],
+            label='test_MC_bulk_settings_loading', verbose=False)
+        np.testing.assert_array_equal(self.mock_parabola.array_like(), arr)
+        self.assertEqual(self.mock_parabola.y(), 2)
+        self.assertEqual(self.mock_parabola_2.y(), 4)
+        self.assertEqual(report['instruments']['mock_parabola']['set'], 2)
+        self.assertEqual(report['instruments']['mock_parabola_2']['set'], 1)
+        self.assertGreater(report['instruments']['mock_parabola']['skipped'], 0)
+        self.assertEqual(report['instruments']['mock_parabola']['failed'], 0)
+        self.assertEqual(set(report['instruments']),
+                         {'mock_parabola', 'mock_parabola_2'})
+        self.assertGreater(report['time'], 0)
+
+        # Restoring again does not set anything
+        report = gen.load_settings_onto_instruments(
+            [self.mock_parabola, self.mock_parabola_2], filepath=filepath,
+            verbose=False)
+        self.assertEqual(report['instruments']['mock_parabola']['set'], 0)
+        self.assertEqual(report['instruments']['mock_parabola_2']['set'], 0)
+
+        # Loading from another instrument
+        report = gen.load_settings_onto_instruments(
+            [self.mock_parabola_2], filepath=filepath, verbose=False,
+            load_from_instr={'mock_parabola_2': 'mock_parabola'})
+        self.assertEqual(self.mock_parabola_2.y(), 2)
+        self.assertEqual(report['instruments']['mock_parabola_2']['failed'], 0)
+
 
 def test_wr_rd_hdf5_array():
     datadir = os.path.join(pq.__path__[0], 'tests', 'test_data')
@@ -1,3 +1,4 @@
+import time
 import unittest
 import numpy as np
 from scipy import signal
@@ -7,6 +8,132 @@ import matplotlib.pyplot as plt
 import pycqed.measurement.kernel_functions_ZI as ZI_kf
 
 
+##########################################################################
+# Sample-by-sample reference implementations of the hardware filters,
+# used to check the vectorized implementations
+##########################################################################
+
+def _reference_multipath_bias_tee(sig, k, paths):
+    tpl = np.ones((paths, ))
+    cs = 0
+    acc = []
+    for i in np.arange(0, sig.size, paths):
+        cs = cs + np.sum(sig[i:(i+paths)])
+        acc = np.append(acc, tpl*cs)
+    return sig + 1./k * (2*acc - sig)
+
+
+def _reference_multipath_filter(sig, alpha, k, paths):
+    tpl = np.ones((paths, ))
+    hw_alpha = alpha*float(paths)
+    duf = tpl * 0.
+    acc = 0
+    for i in np.arange(0, sig.size, paths):
+        acc = acc + hw_alpha*(np.mean(sig[i:(i+paths)]) - acc)
+        duf = np.append(duf, tpl * acc)
+    duf = duf[0:sig.size]
+    return sig + k * (duf - sig)
+
+
+def _reference_multipath_filter2(sig, alpha, k, paths, ppl):
+    tpl = np.ones((paths, ))
+    hw_alpha = ZI_kf.coef_round(alpha*float(paths*ppl))
+    hw_k = ZI_kf.coef_round(k)
+    duf = tpl * 0.
+    acc = np.zeros((ppl, ))
+    extra = int(ppl*paths*np.ceil(sig.size/ppl/paths)-sig.size)
+    if extra > 0:
+        sig = np.append(sig, extra*[sig[-1]])
+    du = []
+    for i in np.arange(0, sig.size, paths):
+        du = np.append(du, np.mean(sig[i:(i+paths)]))
+    for i in np.arange(0, du.size, ppl):
+        for j in np.arange(0, ppl):
+            ss = 0
+            for l in np.arange(0, ppl):
+                if i+j-l >= 0:
+                    ss = ss + du[i+j-l]
+            ss = ss / float(ppl)
+            acc[j] = acc[j] + hw_alpha*(ss - acc[j])
+            duf = np.append(duf, tpl * acc[j])
+    duf = duf[0:sig.size]
+    return sig + hw_k * (duf - sig)
+
+
+def _reference_multipath_filter3(sig, alpha, k, paths, ppl):
+    ma_len = ppl*paths
+    hw_alpha = ZI_kf.coef_round(alpha*float(ma_len))
+    hw_k = ZI_kf.coef_round(k)
+    sig_padded = np.concatenate((np.zeros(ma_len - 1), sig))
+    u = np.zeros(len(sig_padded))
+    for n in range(ma_len, len(sig_padded)):
+        avg = np.sum(sig_padded[n - ma_len: n])/ma_len
+        u[n] = u[n - ma_len] + hw_alpha*(avg - u[n - ma_len])
+    return sig + hw_k * (u[ma_len - 1:] - sig)
+
+
+def _reference_first_order_bounce_corr(sig, delay, amp, awg_sample_rate,
+                                       scope_sample_rate=None):
+    delay_n_samples = int(round(awg_sample_rate*delay))
+    if scope_sample_rate is None:
+        scope_sample_rate = awg_sample_rate
+    shift_reg = np.zeros(delay_n_samples)
+    awg_sample_incr = awg_sample_rate/scope_sample_rate
+    previous_awg_sample_cnt = 0
+    present_awg_sample_cnt = 0
+    amp_hw = ZI_kf.coef_round(amp, force_bshift=0)
+    sigout = np.zeros(len(sig))
+    for i, s in enumerate(sig):
+        sigout[i] = s + amp_hw*shift_reg[-1]
+        present_awg_sample_cnt += awg_sample_incr
+        awg_sample_diff = int(present_awg_sample_cnt) - previous_awg_sample_cnt
+        if awg_sample_diff >= 1:
+            shift_reg[awg_sample_diff:] = shift_reg[:-awg_sample_diff]
+            shift_reg[:awg_sample_diff] = s*np.ones(awg_sample_diff)
+            previous_awg_sample_cnt = int(present_awg_sample_cnt)
+    return sigout
+
+
+def benchmark_hw_filters(nr_samples: int = 48000, repetitions: int = 3):
+    """
+    Compares the run time of the reference and vectorized hardware filters,
+    by default for a 20 us waveform at 2.4 GS/s.
+
+    Returns:
+        timings (dict): filter name -> (reference time, vectorized time) in s
+    """
+    sig = np.random.default_rng(0).standard_normal(int(nr_samples))
+    cases = {
+        'first_order_bounce_corr': (
+            _reference_first_order_bounce_corr, ZI_kf.first_order_bounce_corr,
+            (sig, 10e-9, 0.1, 2.4e9)),
+        'multipath_bias_tee': (
+            _reference_multipath_bias_tee, ZI_kf.multipath_bias_tee,
+            (sig, 0.3, 8)),
+        'multipath_filter': (
+            _reference_multipath_filter, ZI_kf.multipath_filter,
+            (sig, 0.01, 0.2, 8)),
+        'multipath_filter2': (
+            _reference_multipath_filter2, ZI_kf.multipath_filter2,
+            (sig, 0.01, 0.2, 8, 2)),
+        'multipath_filter3': (
+            _reference_multipath_filter3, ZI_kf.multipath_filter3,
+            (sig, 0.01, 0.2, 8, 2)),
+    }
+    timings = {}
+    for name, (ref_func, func, args) in cases.items():
+        t = []
+        for f in (ref_func, func):
+            t0 = time.perf_counter()
+            for _ in range(repetitions):
+                f(*args)
+            t.append((time.perf_counter() - t0)/repetitions)
+        timings[name] = tuple(t)
+        print('{:<26s} reference {:8.4f} s, vectorized {:8.4f} s ({:.0f}x)'.format(
+            name, t[0], t[1], t[0]/t[1]))
+    return timings
+
+
 class Test_Kernel_functions_ZI(unittest.TestCase):
 
     @classmethod
@@ -92,3 +219,49 @@ class Test_Kernel_functions_ZI(unittest.TestCase):
         # plt.legend()
         # plt.savefig("test_exponential_decay_correction_hw_friendly_continous.png", dpi = 600)
         # plt.show()
+
+
+class Test_Kernel_functions_ZI_vectorized(unittest.TestCase):
+    """
+    The vectorized filters must reproduce the sample-by-sample hardware
+    model exactly, including the coefficient rounding.
+    """
+
+    def setUp(self):
+        self.sig = np.random.default_rng(42).standard_normal(1003)
+
+    def test_multipath_bias_tee(self):
+        sig = self.sig[:1000]
+        np.testing.assert_array_equal(
+            ZI_kf.multipath_bias_tee(sig, 0.3, 8),
+            _reference_multipath_bias_tee(sig, 0.3, 8))
+
+    def test_multipath_filter(self):
+        np.testing.assert_array_equal(
+            ZI_kf.multipath_filter(self.sig, 0.01, 0.2, 8),
+            _reference_multipath_filter(self.sig, 0.01, 0.2, 8))
+
+    def test_multipath_filter2(self):
+        for ppl in (1, 2, 3):
+            np.testing.assert_array_equal(
+                ZI_kf.multipath_filter2(self.sig, 0.01, 0.2, 8, ppl),
+                _reference_multipath_filter2(self.sig, 0.01, 0.2, 8, ppl))
+
+    def test_multipath_filter3(self):
+        for ppl in (1, 2, 3):
+            np.testing.assert_array_equal(
+                ZI_kf.multipath_filter3(self.sig, 0.01, 0.2, 8, ppl),
+                _reference_multipath_filter3(self.sig, 0.01, 0.2, 8, ppl))
+
+    def test_first_order_bounce_corr(self):
+        for scope_sample_rate in (None, 1.2e9, 0.9e9):
+            for delay in (5/2.4e9, 10e-9):
+                np.testing.assert_array_equal(
+                    ZI_kf.first_order_bounce_corr(
+                        self.sig, delay, 0.1, 2.4e9, scope_sample_rate),
+                    _reference_first_order_bounce_corr(
+                        self.sig, delay, 0.1, 2.4e9, scope_sample_rate))
+
+
+if __name__ == '__main__':
+    benchmark_hw_filters()
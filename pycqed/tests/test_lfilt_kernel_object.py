@@ -125,6 +125,44 @@ class Test_LinDistortionKernelObject(unittest.TestCase):
 
         # Add tests for enabling realtime fiters
 
+    def test_distort_waveform_batched(self):
+        waveforms = np.random.default_rng(0).standard_normal((3, 100))
+        distorted = self.k0.distort_waveform(waveforms, length_samples=200)
+        self.assertEqual(distorted.shape, (3, 200))
+        for wf, dist_wf in zip(waveforms, distorted):
+            np.testing.assert_array_equal(
+                self.k0.distort_waveform(wf, length_samples=200), dist_wf)
+
+    def test_compiled_filters_cached(self):
+        filters, _ = self.k0.compile_filters()
+        self.assertIs(self.k0.compile_filters()[0], filters)
+
+        # Modifying a filter invalidates the cache, also when done in place
+        self.k0.filter_model_01()['params']['amp'] = 0.5
+        self.assertIsNot(self.k0.compile_filters()[0], filters)
+
+    def test_realtime_settings_only_set_when_changed(self):
+        self.k0.reset_kernels()
+        self.k0.clear_cache()
+        self.k0.filter_model_00(
+            {'model': 'exponential',
+             'real-time': True,
+             'params': {'tau': 1e-6, 'amp': 0.1}})
+        self.k0.distort_waveform(np.ones(20))
+        assert self.AWG.sigouts_0_precompensation_exponentials_0_amplitude() == 0.1
+
+        # Unchanged settings are not set again
+        self.AWG.sigouts_0_precompensation_exponentials_0_amplitude(0.3)
+        self.k0.distort_waveform(np.ones(20))
+        assert self.AWG.sigouts_0_precompensation_exponentials_0_amplitude() == 0.3
+
+        self.k0.filter_model_00(
+            {'model': 'exponential',
+             'real-time': True,
+             'params': {'tau': 1e-6, 'amp': 0.2}})
+        self.k0.distort_waveform(np.ones(20))
+        assert self.AWG.sigouts_0_precompensation_exponentials_0_amplitude() == 0.2
+
     @classmethod
     def tearDownClass(self):
         self.k0.close()
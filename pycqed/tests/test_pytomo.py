@@ -0,0 +1,56 @@
+import numpy as np
+import unittest
+from pycqed.analysis_v2 import pytomo
+
+
+class Test_pytomo(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+        # Projectors on the eigenstates of X, Y and Z
+        paulis = [np.array([[0, 1], [1, 0]]),
+                  np.array([[0, -1j], [1j, 0]]),
+                  np.array([[1, 0], [0, -1]])]
+        self.observables = np.array(
+            [(np.eye(2) + s*p)/2 for p in paulis for s in [1, -1]])
+
+    def test_tomo_state_noiseless(self):
+        psi = np.array([np.cos(0.3), np.exp(0.4j)*np.sin(0.3)])
+        N = 1000
+        rho_ideal = N*np.outer(psi, psi.conj())
+        data = np.real(np.einsum('kij,ji->k', self.observables, rho_ideal))
+        weights = np.ones(len(data))
+        for fixedweight in [True, False]:
+            rho = pytomo.tomo_state(data, self.observables, weights,
+                                    fixedweight=fixedweight)
+            np.testing.assert_allclose(rho, rho_ideal, atol=1e-3*N)
+
+    def test_tomo_state_batch(self):
+        rng = np.random.RandomState(0)
+        data = rng.poisson(500, size=(5, len(self.observables)))
+        weights = np.ones(data.shape)
+        rhos = pytomo.tomo_state_batch(data, self.observables, weights)
+        self.assertEqual(rhos.shape, (5, 2, 2))
+        for d, w, rho in zip(data, weights, rhos):
+            # physical (PSD) and equal to the single data set result
+            np.testing.assert_allclose(rho, rho.conj().T)
+            self.assertGreater(np.linalg.eigvalsh(rho).min(), -1e-8)
+            rho_single = pytomo.tomo_state(d, self.observables, w)
+            np.testing.assert_allclose(rho_single, rho, atol=1e-4)
+
+    def test_tomo_process_batch(self):
+        rng = np.random.RandomState(1)
+        # every combination of input state and observable
+        inputs = np.repeat(self.observables[::2], len(self.observables), 0)
+        observables = np.tile(self.observables, (3, 1, 1))
+        data = rng.poisson(500, size=(3, len(inputs)))
+        weights = np.ones(data.shape)
+        chois = pytomo.tomo_process_batch(data, inputs, observables, weights)
+        self.assertEqual(chois.shape, (3, 4, 4))
+        for choi in chois:
+            self.assertGreater(np.linalg.eigvalsh(choi).min(), -1e-8)
+            # trace preserving, the partial trace over the output is
+            # proportional to the identity
+            partial_trace = np.einsum('ikjk->ij', choi.reshape(2, 2, 2, 2))
+            np.testing.assert_allclose(
+                partial_trace, np.eye(2)*partial_trace[0, 0], atol=1e-6)
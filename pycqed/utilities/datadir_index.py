@@ -0,0 +1,184 @@
+"""
+Persistent index of the measurement folders in a datadir.
+
+The datadir is structured as <datadir>/<YYYYMMDD>/<hhmmss>_<label>/. Looking
+up data by timestamp or label requires listing the day directories, which is
+slow on large datadirs on network storage. The DatadirIndex keeps the contents
+of every day directory in an SQLite database stored in the datadir, together
+with the modification time of the day directory. A day directory is only
+listed again when it has been modified since it was indexed.
+"""
+import os
+import logging
+import sqlite3
+import threading
+from contextlib import closing
+
+log = logging.getLogger(__name__)
+
+INDEX_FILENAME = '.pycqed_datadir_index.sqlite'
+
+
+class DatadirIndex:
+    """
+    Index of the measurement folders in a datadir, keyed by day directory.
+
+    The index is kept in memory and persisted in an SQLite database in the
+    datadir. If the database can not be written (e.g., a read-only datadir),
+    the index is only kept in memory.
+    """
+
+    def __init__(self, datadir: str, filename: str = INDEX_FILENAME):
+        self.datadir = datadir
+        self.filename = os.path.join(datadir, filename)
+        # daystamp -> (signature, sorted list of measurement folder names)
+        self._days = {}
+        self._lock = threading.Lock()
+        self._persistent = True
+        self._execute(self._create_tables)
+
+    ##########################################################################
+    # Public methods
+    ##########################################################################
+
+    def get_measdirs(self, daystamp: str, rescan: bool = False) -> list:
+        """
+        Returns the sorted names of all entries in a day directory.
+
+        Args:
+            daystamp (str): name of the day directory, e.g. '20170412'
+            rescan (bool): list the day directory even if it is unchanged
+
+        Raises FileNotFoundError if the day directory does not exist.
+        """
+        signature = self._get_signature(daystamp)
+        with self._lock:
+            if not rescan:
+                cached = self._days.get(daystamp)
+                if cached is not None and cached[0] == signature:
+                    return list(cached[1])
+
+                stored = self._execute(self._load_day, daystamp, signature)
+                if stored is not None:
+                    self._days[daystamp] = (signature, stored)
+                    return list(stored)
+
+            measdirs = sorted(os.listdir(os.path.join(self.datadir, daystamp)))
+            self._days[daystamp] = (signature, measdirs)
+            self._execute(self._store_day, daystamp, signature, measdirs)
+            return list(measdirs)
+
+    def create_measdir(self, path: str) -> None:
+        """
+        Creates a measurement folder <datadir>/<daystamp>/<name> and adds it
+        to the index, without listing the day directory again.
+        """
+        daydir, name = os.path.split(os.path.normpath(path))
+        daystamp = os.path.basename(daydir)
+        try:
+            signature_before = self._get_signature(daystamp)
+        except FileNotFoundError:
+            signature_before = None
+
+        os.makedirs(path, exist_ok=True)
+
+        signature = self._get_signature(daystamp)
+        with self._lock:
+            cached = self._days.get(daystamp)
+            if signature_before is None:
+                # A new day directory, this is the only folder
+                measdirs = sorted(os.listdir(daydir))
+            elif cached is not None and cached[0] == signature_before:
+                # The index was up-to-date before creating the folder
+                measdirs = sorted(set(cached[1]) | {name})
+            else:
+                # Leave it for get_measdirs to list the day directory
+                return
+            self._days[daystamp] = (signature, measdirs)
+            self._execute(self._store_day, daystamp, signature, measdirs)
+
+    def clear(self) -> None:
+        """
+        Removes all entries from the index.
+        """
+        with self._lock:
+            self._days = {}
+            self._execute(self._clear)
+
+    ##########################################################################
+    # Private methods
+    ##########################################################################
+
+    def _get_signature(self, daystamp: str) -> tuple:
+        # The number of links of a directory changes when a sub folder is
+        # created, which is also detected when the mtime resolution is coarse
+        stat = os.stat(os.path.join(self.datadir, daystamp))
+        return (stat.st_mtime_ns, stat.st_nlink)
+
+    def _execute(self, func, *args):
+        """
+        Executes func(connection, *args) on the database. Disables the
+        persistent index if the database can not be used.
+        """
+        if not self._persistent:
+            return None
+        try:
+            # NB: the connection context manager only commits, closing releases the file
+            with closing(sqlite3.connect(self.filename, timeout=10)) as conn, conn:
+                return func(conn, *args)
+        except (sqlite3.Error, OSError) as e:
+            log.warning("Datadir index '{}' not available, using an in-memory "
+                        "index instead: {}".format(self.filename, e))
+            self._persistent = False
+            return None
+
+    @staticmethod
+    def _create_tables(conn) -> None:
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS daydirs ('
+            'daystamp TEXT PRIMARY KEY, mtime_ns INTEGER, nlink INTEGER)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS measdirs ('
+            'daystamp TEXT, name TEXT, PRIMARY KEY (daystamp, name))')
+
+    @staticmethod
+    def _load_day(conn, daystamp: str, signature: tuple):
+        row = conn.execute(
+            'SELECT mtime_ns, nlink FROM daydirs WHERE daystamp = ?',
+            (daystamp, )).fetchone()
+        if row is None or tuple(row) != tuple(signature):
+            return None
+        rows = conn.execute(
+            'SELECT name FROM measdirs WHERE daystamp = ? ORDER BY name',
+            (daystamp, )).fetchall()
+        return [r[0] for r in rows]
+
+    @staticmethod
+    def _store_day(conn, daystamp: str, signature: tuple, measdirs: list) -> None:
+        conn.execute('DELETE FROM measdirs WHERE daystamp = ?', (daystamp, ))
+        conn.executemany(
+            'INSERT INTO measdirs (daystamp, name) VALUES (?, ?)',
+            [(daystamp, name) for name in measdirs])
+        conn.execute(
+            'INSERT OR REPLACE INTO daydirs (daystamp, mtime_ns, nlink) '
+            'VALUES (?, ?, ?)', (daystamp, ) + tuple(signature))
+
+    @staticmethod
+    def _clear(conn) -> None:
+        conn.execute('DELETE FROM measdirs')
+        conn.execute('DELETE FROM daydirs')
+
+
+_indices = {}
+_indices_lock = threading.Lock()
+
+
+def get_datadir_index(datadir: str) -> DatadirIndex:
+    """
+    Returns the (shared) DatadirIndex of a datadir.
+    """
+    key = os.path.abspath(datadir)
+    with _indices_lock:
+        if key not in _indices:
+            _indices[key] = DatadirIndex(datadir)
+        return _indices[key]
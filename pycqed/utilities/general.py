@@ -1,5 +1,8 @@
 import time
+import numbers
+from collections import OrderedDict
 from collections.abc import MutableMapping
+from copy import deepcopy
 import os
 import sys
 import numpy as np
@@ -9,6 +12,7 @@ import json
 import datetime
 from pycqed.measurement.hdf5_data import read_dict_from_hdf5
 from pycqed.analysis import analysis_toolbox as a_tools
+from qcodes.instrument.base import Instrument
 import errno
 import pycqed as pq
 import glob
@@ -254,31 +258,166 @@ def load_settings_onto_instrument_v2(
 
 
     """
+    instrument_name = instrument.name
+    if load_from_instr is None:
+        load_from_instr = instrument_name
+
+    filepath, snapshots = _find_instrument_snapshots(
+        [load_from_instr], label=label, filepath=filepath, timestamp=timestamp
+    )
+    if filepath is None:
+        logging.warning(
+            'Could not open settings for instrument "%s"' % (instrument_name)
+        )
+        return False
+
+    _set_parameters_from_snapshot(
+        instrument, snapshots[load_from_instr], ignore_pars=ignore_pars
+    )
+    return True
+
+
+def load_settings_onto_instruments(
+    instruments: list,
+    load_from_instr: dict = None,
+    label: str = "",
+    filepath: str = None,
+    timestamp: str = None,
+    ignore_pars: set = None,
+    skip_unchanged: bool = True,
+    verbose: bool = True,
+):
+    """
+    Loads settings from an hdf5 file onto a list of instruments, e.g., all
+    the instruments of a device. The file is located in the same way as in
+    `load_settings_onto_instrument_v2`, but it is only opened once and only
+    the snapshots of the requested instruments are read.
+
+    Args:
+        instruments (list)    : instruments (or instrument names) onto which
+            settings should be loaded
+        load_from_instr (dict): optional mapping of instrument name to the
+            name of another instrument from which to load the settings.
+        label (str)           : label used for finding the last datafile
+        filepath (str)        : exact filepath of the hdf5 file to load.
+        timestamp (str)       : timestamp of file in the datadir
+        ignore_pars (set)     : names of parameters that are not loaded
+        skip_unchanged (bool) : do not set parameters of which the cached
+            value is equal to the stored value
+        verbose (bool)        : print a summary
+
+    Returns:
+        dict with under "instruments", for every instrument, the number of
+        parameters that were "set", "skipped" and "failed", and under "time"
+        the total time in seconds.
+        Returns False if no settings file could be opened.
+    """
+    t0 = time.time()
+    instruments = [
+        Instrument.find_instrument(ins) if isinstance(ins, str) else ins
+        for ins in instruments
+    ]
+    if load_from_instr is None:
+        load_from_instr = {}
+    source_names = [load_from_instr.get(ins.name, ins.name) for ins in instruments]
+
+    filepath, snapshots = _find_instrument_snapshots(
+        source_names, label=label, filepath=filepath, timestamp=timestamp
+    )
+    if filepath is None:
+        logging.warning(
+            "Could not open settings for instruments {}".format(
+                [ins.name for ins in instruments]
+            )
+        )
+        return False
+
+    ins_reports = {}
+    for ins, source_name in zip(instruments, source_names):
+        n_set, n_skipped, n_failed = _set_parameters_from_snapshot(
+            ins,
+            snapshots[source_name],
+            ignore_pars=ignore_pars,
+            skip_unchanged=skip_unchanged,
+        )
+        ins_reports[ins.name] = {
+            "set": n_set,
+            "skipped": n_skipped,
+            "failed": n_failed,
+        }
+    report = {"instruments": ins_reports, "time": time.time() - t0}
+
+    if verbose:
+        print(
+            "Loaded settings of {} instruments from {} in {:.2f} s: "
+            "{} set, {} skipped, {} failed".format(
+                len(instruments),
+                filepath,
+                report["time"],
+                sum(r["set"] for r in ins_reports.values()),
+                sum(r["skipped"] for r in ins_reports.values()),
+                sum(r["failed"] for r in ins_reports.values()),
+            )
+        )
+    return report
+
+
+# Instrument snapshots read from settings files, keyed by the file and its
+# modification time, see `_read_instrument_snapshots`
+_instrument_snapshots_cache = OrderedDict()
+_INSTRUMENT_SNAPSHOTS_CACHE_SIZE = 8
 
+
+def _read_instrument_snapshots(filepath: str, instrument_names: list) -> dict:
+    """
+    Reads the snapshots of the instruments in instrument_names from the
+    "Snapshot" group of an hdf5 file. The snapshots are cached, such that
+    restoring instruments one by one only reads every snapshot once.
+    """
+    stat = os.stat(filepath)
+    key = (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)
+    if key in _instrument_snapshots_cache:
+        _instrument_snapshots_cache.move_to_end(key)
+    else:
+        _instrument_snapshots_cache[key] = {}
+        if len(_instrument_snapshots_cache) > _INSTRUMENT_SNAPSHOTS_CACHE_SIZE:
+            _instrument_snapshots_cache.popitem(last=False)
+    cached = _instrument_snapshots_cache[key]
+
+    missing = [name for name in instrument_names if name not in cached]
+    if missing:
+        with h5py.File(filepath, "r") as f:
+            instruments_group = f["Snapshot"]["instruments"]
+            for name in missing:
+                cached[name] = read_dict_from_hdf5({}, instruments_group[name])
+    # The snapshots are copied as parameters can hold mutable values
+    return {name: deepcopy(cached[name]) for name in instrument_names}
+
+
+def _find_instrument_snapshots(
+    instrument_names: list,
+    label: str = "",
+    filepath: str = None,
+    timestamp: str = None,
+):
+    """
+    Returns the filepath and the instrument snapshots of the last datafile
+    (matching label/timestamp) that contains all the instruments.
+    Returns (None, None) if no such file was found.
+    """
     older_than = None
     folder = None
-    instrument_name = instrument.name
-    success = False
     count = 0
     # Will try multiple times in case the last measurements failed and
     # created corrupt data files.
-    while success is False and count < 3:
+    while count < 3:
         if filepath is None:
             folder = a_tools.get_folder(
                 timestamp=timestamp, label=label, older_than=older_than
             )
             filepath = a_tools.measurement_filename(folder)
         try:
-
-            f = h5py.File(filepath, "r")
-            snapshot = {}
-            read_dict_from_hdf5(snapshot, h5_group=f["Snapshot"])
-
-            if load_from_instr is None:
-                ins_group = snapshot["instruments"][instrument_name]
-            else:
-                ins_group = snapshot["instruments"][load_from_instr]
-            success = True
+            return filepath, _read_instrument_snapshots(filepath, instrument_names)
         except Exception as e:
             logging.warning("Exception occured reading from {}".format(folder))
             logging.warning(e)
@@ -291,16 +430,22 @@ def load_settings_onto_instrument_v2(
             # will not look for an earlier data file
             folder = None
             filepath = None
-            success = False
         count += 1
+    return None, None
 
-    if not success:
-        logging.warning(
-            'Could not open settings for instrument "%s"' % (instrument_name)
-        )
-        return False
 
-    for parname, par in ins_group["parameters"].items():
+def _set_parameters_from_snapshot(
+    instrument, ins_snapshot: dict, ignore_pars: set = None, skip_unchanged=False
+):
+    """
+    Sets the parameters of an instrument to the values in its snapshot.
+    If skip_unchanged, parameters of which the cached value is equal to the
+    value in the snapshot are not set.
+
+    Returns the number of parameters that were set, skipped and failed.
+    """
+    n_set = n_skipped = n_failed = 0
+    for parname, par in ins_snapshot["parameters"].items():
         try:
             if hasattr(instrument.parameters[parname], "set") and (
                 par["value"] is not None
@@ -314,15 +459,45 @@ def load_settings_onto_instrument_v2(
                             # This detects that in the hdf5 file the parameter
                             # was saved as string due to type incompatibility
                             par_value = eval(par_value)
+                    if skip_unchanged and _values_equal(
+                        instrument.parameters[parname].cache.get(
+                            get_if_invalid=False
+                        ),
+                        par_value,
+                    ):
+                        n_skipped += 1
+                        continue
                     instrument.set(parname, par_value)
+                    n_set += 1
         except Exception as e:
             print(
                 'Could not set parameter: "{}" to "{}" '
-                'for instrument "{}"'.format(parname, par["value"], instrument_name)
+                'for instrument "{}"'.format(parname, par["value"], instrument.name)
             )
             logging.warning(e)
-    f.close()
-    return True
+            n_failed += 1
+    return n_set, n_skipped, n_failed
+
+
+def _values_equal(a, b) -> bool:
+    """
+    Returns True if a and b are equal values of the same type (all numbers
+    are considered to be of the same type).
+    """
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return (
+            isinstance(a, np.ndarray)
+            and isinstance(b, np.ndarray)
+            and np.array_equal(a, b)
+        )
+    try:
+        equal = bool(a == b)
+    except Exception:
+        return False
+    return equal and (
+        type(a) == type(b)
+        or isinstance(a, numbers.Number) and isinstance(b, numbers.Number)
+    )
 
 
 def send_email(subject="PycQED needs your attention!", body="", email=None):
@@ -0,0 +1,243 @@
+"""
+Content-addressed store for instrument snapshots.
+
+Saving the full station snapshot in every measurement file is slow for large
+setups, while the snapshot of most instruments hardly changes between
+measurements. The SnapshotStore keeps the snapshot of an instrument as a
+compressed JSON blob named after the SHA-256 hash of its contents, in a
+directory shared by all measurements of a datadir. A measurement file then
+only holds a reference to a blob, plus the parameters that changed since
+that blob was written (see `hdf5_data.write_snapshot_to_hdf5`).
+"""
+import os
+import gzip
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from copy import deepcopy
+from functools import lru_cache
+
+import numpy as np
+from uncertainties import UFloat
+
+log = logging.getLogger(__name__)
+
+STORE_DIRNAME = '.pycqed_snapshot_store'
+
+
+class SnapshotStore:
+    """
+    Store of instrument snapshots, keyed by the hash of their contents.
+
+    Args:
+        path (str): directory of the store, created if it does not exist
+        max_diff_fraction (float): maximum fraction of the parameters of an
+            instrument that can have changed for a snapshot to be referenced
+            as a diff against the previously stored snapshot, instead of
+            being stored as a new blob.
+    """
+
+    def __init__(self, path: str, max_diff_fraction: float = 0.5):
+        self.path = path
+        self.max_diff_fraction = max_diff_fraction
+        # instrument name -> (key, {parameter name: encoded parameter}) of
+        # the last blob stored (or referenced) for that instrument
+        self._last = {}
+        self._lock = threading.Lock()
+
+    ##########################################################################
+    # Public methods
+    ##########################################################################
+
+    def put(self, snapshot: dict) -> str:
+        """
+        Stores a snapshot and returns its key. Nothing is written if the
+        snapshot is already in the store.
+        """
+        data = encode(snapshot)
+        key = hashlib.sha256(data).hexdigest()
+        self._write_blob(key, data)
+        return key
+
+    def get(self, key: str) -> dict:
+        """
+        Returns the snapshot stored under key.
+        """
+        return deepcopy(_read_blob(self._blob_path(key)))
+
+    def resolve(self, key: str, parameters_diff: dict = None) -> dict:
+        """
+        Returns the snapshot stored under key, with the parameters in
+        parameters_diff replaced.
+        """
+        snapshot = self.get(key)
+        if parameters_diff:
+            snapshot['parameters'].update(parameters_diff)
+        return snapshot
+
+    def reference(self, name: str, snapshot: dict):
+        """
+        Returns a (key, parameters_diff) reference to the snapshot of
+        instrument name, storing the snapshot if required.
+
+        If only a few parameters changed since the last snapshot of the
+        instrument that was stored, the snapshot is not stored but
+        referenced as the key of the last one plus the changed parameters.
+        Otherwise, parameters_diff is None.
+        """
+        parameters = snapshot.get('parameters', {})
+        encoded = {par_name: encode(par) for par_name, par in parameters.items()}
+        data = encode(snapshot)
+        key = hashlib.sha256(data).hexdigest()
+
+        with self._lock:
+            last = self._last.get(name)
+            if last is not None and last[0] != key \
+                    and not os.path.exists(self._blob_path(key)):
+                last_key, last_encoded = last
+                diff = self._get_parameters_diff(
+                    last_key, last_encoded, snapshot, encoded)
+                if diff is not None:
+                    return last_key, diff
+
+            self._write_blob(key, data)
+            self._last[name] = (key, encoded)
+        return key, None
+
+    ##########################################################################
+    # Private methods
+    ##########################################################################
+
+    def _blob_path(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key + '.json.gz')
+
+    def _write_blob(self, key: str, data: bytes) -> None:
+        filename = self._blob_path(key)
+        if os.path.exists(filename):
+            return
+        folder = os.path.dirname(filename)
+        os.makedirs(folder, exist_ok=True)
+        # Write to a temporary file first such that a blob is never read
+        # while it is being written
+        fd, tmp_filename = tempfile.mkstemp(dir=folder, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(gzip.compress(data, mtime=0))
+            os.replace(tmp_filename, filename)
+        except Exception:
+            os.remove(tmp_filename)
+            raise
+
+    def _get_parameters_diff(self, last_key: str, last_encoded: dict,
+                             snapshot: dict, encoded: dict):
+        """
+        Returns the parameters of snapshot that differ from the stored
+        snapshot last_key, or None if snapshot can not be expressed as a
+        (small enough) diff against it.
+        """
+        if set(encoded) != set(last_encoded):
+            return None
+        changed = [par_name for par_name, data in encoded.items()
+                   if data != last_encoded[par_name]]
+        if len(changed) > self.max_diff_fraction * len(encoded):
+            return None
+
+        # All other entries (e.g., submodules) have to be unchanged
+        last_snapshot = _read_blob(self._blob_path(last_key))
+        if set(snapshot) != set(last_snapshot):
+            return None
+        for k, v in snapshot.items():
+            if k != 'parameters' and encode(v) != encode(last_snapshot[k]):
+                return None
+        return {par_name: snapshot['parameters'][par_name]
+                for par_name in changed}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_snapshot_store(path: str) -> SnapshotStore:
+    """
+    Returns the (shared) SnapshotStore at path.
+    """
+    key = os.path.abspath(path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = SnapshotStore(path)
+        return _stores[key]
+
+
+def get_datadir_snapshot_store(datadir: str) -> SnapshotStore:
+    """
+    Returns the (shared) SnapshotStore of a datadir.
+    """
+    return get_snapshot_store(os.path.join(datadir, STORE_DIRNAME))
+
+
+@lru_cache(maxsize=1024)
+def _read_blob(filename: str) -> dict:
+    # Blobs are never modified, so they can be cached by filename
+    with open(filename, 'rb') as f:
+        return decode(gzip.decompress(f.read()))
+
+
+##############################################################################
+# Serialization
+##############################################################################
+
+def encode(obj) -> bytes:
+    """
+    Canonical JSON serialization of a snapshot, used both for storing and for
+    hashing. Types that are not supported are stored as a string, in the same
+    way as `hdf5_data.write_dict_to_hdf5` does.
+    """
+    return json.dumps(_to_json(obj), sort_keys=True,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def decode(data: bytes):
+    """
+    Inverse of encode.
+    """
+    return json.loads(data.decode('utf-8'), object_hook=_from_json)
+
+
+def _to_json(obj):
+    if isinstance(obj, dict):
+        return {str(k): _to_json(v) for k, v in obj.items()}
+    elif isinstance(obj, tuple):
+        return {'__tuple__': [_to_json(v) for v in obj]}
+    elif isinstance(obj, list):
+        return [_to_json(v) for v in obj]
+    elif isinstance(obj, np.ndarray):
+        if obj.dtype.kind in 'biuf':
+            return {'__ndarray__': obj.tolist(), 'dtype': obj.dtype.str}
+        return [_to_json(v) for v in obj.tolist()]
+    elif isinstance(obj, np.generic):
+        return _to_json(obj.item())
+    elif isinstance(obj, UFloat):
+        return {'nominal_value': obj.nominal_value, 'std_dev': obj.std_dev}
+    elif obj is None or isinstance(obj, (str, bool, int, float)):
+        return obj
+    log.debug('Type "{}" of "{}" not supported, storing as string'.format(
+        type(obj), obj))
+    return str(obj)
+
+
+def _from_json(dct):
+    if '__tuple__' in dct:
+        return tuple(dct['__tuple__'])
+    if '__ndarray__' in dct:
+        return np.array(dct['__ndarray__'], dtype=dct['dtype'])
+    # int keys are restored in the same way as by read_dict_from_hdf5
+    return {_to_key(k): v for k, v in dct.items()}
+
+
+def _to_key(k: str):
+    try:
+        return int(k)
+    except ValueError:
+        return k